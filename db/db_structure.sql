@@ -83,9 +83,10 @@ INSERT INTO DBSources (sourceID, sourceName, sourceAbbr, sourceURL, indexLink) V
 DROP TABLE IF EXISTS Images;
 
 CREATE TABLE Images (
-    imagesID INTEGER PRIMARY KEY,
-    taxonID  INTEGER REFERENCES Taxa (TaxonID),
-    image    BLOB
+    imagesID  INTEGER PRIMARY KEY,
+    taxonID   INTEGER REFERENCES Taxa (TaxonID),
+    image     BLOB,
+    imageHash TEXT
 );
 
 
@@ -1463,7 +1464,9 @@ CREATE TABLE Taxa (
     authorship      TEXT,
     yearPublishing  INTEGER,
     namePublishedIn TEXT,
-    rankID          INTEGER REFERENCES TaxonRanks (rankID) 
+    rankID          INTEGER REFERENCES TaxonRanks (rankID),
+    canonicalNameNorm  TEXT,
+    scientificNameNorm TEXT
 );
 
 INSERT INTO Taxa (taxonID, scientificName, canonicalName, authorship, yearPublishing, namePublishedIn, rankID) VALUES (1, 'Biota Cavalier-Smith', 'Biota', 'Cavalier-Smith', '', '', 1);
@@ -6163,5 +6166,25 @@ INSERT INTO TypeSources (typeID, typeName, typeLocalName) VALUES (14, 'doctoral
 INSERT INTO TypeSources (typeID, typeName, typeLocalName) VALUES (15, 'postdoctoral thesis ', NULL);
 INSERT INTO TypeSources (typeID, typeName, typeLocalName) VALUES (16, 'candidat thesis', 'кандилдатская дисертация');
 
+-- Индекс: DBIndexes_taxonID
+DROP INDEX IF EXISTS DBIndexes_taxonID;
+
+CREATE INDEX DBIndexes_taxonID ON DBIndexes (taxonID);
+
+-- Индекс: Taxa_scientificName
+DROP INDEX IF EXISTS Taxa_scientificName;
+
+CREATE INDEX Taxa_scientificName ON Taxa (scientificName);
+
+-- Индекс: TaxonTree_mainTaxonID
+DROP INDEX IF EXISTS TaxonTree_mainTaxonID;
+
+CREATE INDEX TaxonTree_mainTaxonID ON TaxonTree (mainTaxonID);
+
+-- Индекс: TaxonTree_taxonID
+DROP INDEX IF EXISTS TaxonTree_taxonID;
+
+CREATE INDEX TaxonTree_taxonID ON TaxonTree (taxonID);
+
 COMMIT TRANSACTION;
 PRAGMA foreign_keys = on;
@@ -0,0 +1,507 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module is the console interface of the program for batch jobs, for
+example, under cron on a server without a display. It loads only mli.lib,
+and every command imports what it needs when it runs, so the start is fast.
+
+Commands:
+    sync RANK     Updates the taxa of the rank from GBIF.
+    inat FILE     Imports links to iNaturalist from a CSV file.
+    names FILE    Imports vernacular names of GBIF or iNaturalist.
+    xref SOURCE FILE
+                  Imports the keys of the taxa in another database.
+    dedup         Merges taxa with the same name and rank.
+    export [FILE] Writes the database as an SQL script.
+    reindex       Creates missing indexes, rebuilds them and the statistics.
+
+The metrics of a run (the requests by endpoint, the wait for the rate
+limit, the cache, the stages of the import and the written rows) are shown
+with the progress of sync and inat, and are written as JSON to the file of
+--metrics or of the option 'file' of the section [Metrics].
+
+Function:
+    cli_connect(oArgs)
+    cli_dedup(oConnector, oArgs)
+    cli_export(oConnector, oArgs)
+    cli_get_config(sFileConfig)
+    cli_get_parser()
+    cli_inat(oConnector, oArgs)
+    cli_names(oConnector, oArgs)
+    cli_reindex(oConnector, oArgs)
+    cli_sync(oConnector, oArgs)
+    cli_xref(oConnector, oArgs)
+    main(lArgs=None)
+
+Class:
+    Progress(sWhat, bQuiet=False, oStream=None, fInterval=1.0,
+             oMetrics=None)
+
+Using:
+    mli-sync sync species --workers 8
+    python -m mli.cli --config /etc/mli/config.ini export backup.sql
+"""
+
+import argparse
+import csv
+import sys
+from os import path
+from time import perf_counter
+
+from mli.lib.config import ConfigProgram
+from mli.lib.metrics import Metrics, metrics_set
+from mli.lib.str import str_get_file_patch
+
+# The directory with config.ini and the db directory by default.
+BASE_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+class Progress:
+    """ Reports the progress and the throughput of a command. On a terminal
+    the line is updated in place, otherwise a line is written every
+    fInterval seconds, so the log of cron stays short. With metrics their
+    summary follows the progress. """
+
+    def __init__(self, sWhat, bQuiet=False, oStream=None, fInterval=1.0,
+                 oMetrics=None):
+        """ Initiating a class.
+
+        :param sWhat: What is counted, for example, 'taxa'.
+        :type sWhat: str
+        :param bQuiet: If True, only the summary is written.
+        :type bQuiet: bool
+        :param oStream: The stream of the report, sys.stderr by default.
+        :type oStream: io.TextIOBase or None
+        :param fInterval: The least pause between reports in seconds.
+        :type fInterval: float
+        :param oMetrics: The metrics of the run.
+        :type oMetrics: Metrics or None
+        """
+        self.sWhat = sWhat
+        self.bQuiet = bQuiet
+        self.oStream = oStream or sys.stderr
+        self.fInterval = fInterval
+        self.oMetrics = oMetrics
+        self.bTTY = self.oStream.isatty()
+        self.fStart = perf_counter()
+        self.fLast = self.fStart
+        self.iDone = 0
+
+    def get_rate(self):
+        """ Gets the number of processed items per second. """
+        fTime = perf_counter() - self.fStart
+        return self.iDone / fTime if fTime else 0.0
+
+    def __call__(self, iDone, iTotal=None):
+        """ Takes the progress.
+
+        :param iDone: Number of processed items.
+        :type iDone: int
+        :param iTotal: Number of all items, if it is known.
+        :type iTotal: int or None
+        :return: None
+        """
+        self.iDone = iDone
+        fNow = perf_counter()
+        if self.bQuiet or fNow - self.fLast < self.fInterval and \
+                iDone != iTotal:
+            return
+
+        self.fLast = fNow
+        sTotal = f'/{iTotal}' if iTotal else ''
+        sLine = f'{self.sWhat}: {iDone}{sTotal}, {self.get_rate():.1f}/s'
+        if self.oMetrics is not None:
+            sLine = f'{sLine}; {self.oMetrics.get_summary()}'
+        if self.bTTY:
+            self.oStream.write(f'\r{sLine}\x1b[K')
+        else:
+            self.oStream.write(f'{sLine}\n')
+        self.oStream.flush()
+
+    def finish(self, sResult=''):
+        """ Writes the summary.
+
+        :param sResult: Additional text of the summary.
+        :type sResult: str
+        :return: None
+        """
+        fTime = perf_counter() - self.fStart
+        if self.bTTY and not self.bQuiet:
+            self.oStream.write('\n')
+        self.oStream.write(f'{self.sWhat}: {self.iDone} in {fTime:.1f} s, '
+                           f'{self.get_rate():.1f}/s{sResult}\n')
+        if self.oMetrics is not None:
+            self.oStream.write(
+                f'metrics: {self.oMetrics.get_summary(bDetail=True)}\n')
+        self.oStream.flush()
+
+
+def cli_get_config(sFileConfig):
+    """ Reads the configuration file. The relative paths of the file are
+    taken from its directory.
+
+    :param sFileConfig: The path of the configuration file.
+    :type sFileConfig: str
+    :return: The configuration and its directory.
+    :rtype: tuple[ConfigProgram, str]
+    """
+    sFileConfig = path.abspath(sFileConfig)
+    sBaseDir = path.dirname(sFileConfig)
+    return ConfigProgram(sBaseDir, sFileConfig), sBaseDir
+
+
+def cli_connect(oArgs):
+    """ Opens the database of the configuration, as the main window does, or
+    the database given by --db.
+
+    :param oArgs: The arguments of the command line.
+    :type oArgs: argparse.Namespace
+    :return: The connection, or None if the database is not found.
+    :rtype: SQL or None
+    """
+    from mli.lib.sql import SQL, check_connect_db
+
+    sBaseDir = oArgs.sBaseDir
+    oConfig = oArgs.oConfig
+    sDBDir = oConfig.get_config_value('DB', 'db_dir', 'db')
+    sDBPath = oArgs.db or oConfig.get_config_value('DB', 'db_path', '')
+    if not sDBPath:
+        sDBFile = oConfig.get_config_value('DB', 'db_file', 'mli.db')
+        sDBPath = str_get_file_patch(sBaseDir, sDBDir)
+        sDBPath = str_get_file_patch(sDBPath, sDBFile)
+    if not path.isfile(sDBPath):
+        print(f'The database {sDBPath} is not found.', file=sys.stderr)
+        return
+
+    oConnector = SQL(sDBPath)
+    check_connect_db(oConnector, sBaseDir, sDBDir)
+    return oConnector
+
+
+def cli_sync(oConnector, oArgs):
+    """ Updates the taxa of the rank from GBIF. """
+    from mli.lib.gbif_client import GBIFClient, gbif_set_client
+    from mli.lib.gbif_sync import GBIFSync
+    from mli.lib.lichen_groups import LichenGroups, lichen_set_groups
+
+    sRank = oArgs.rank.lower()
+    iLevel = int(sRank) if sRank.isdigit() else oConnector.sql_get_id(
+        'TaxonRanks', 'rankID', 'rankName', (sRank,))
+    if not iLevel or not oConnector.get_rank_name('rankName', iLevel):
+        print(f'The rank {oArgs.rank} is not found.', file=sys.stderr)
+        return 1
+
+    oConfig = oArgs.oConfig
+    if not oConfig.has_section('GBIF'):
+        oConfig.add_section('GBIF')
+    sCacheFile = oConfig.get('GBIF', 'cache_file', fallback='')
+    if sCacheFile:
+        oConfig.set('GBIF', 'cache_file',
+                    str_get_file_patch(oArgs.sBaseDir, sCacheFile))
+    if oArgs.offline:
+        oConfig.set('GBIF', 'offline', 'yes')
+    oClient = GBIFClient.from_config(oConfig)
+    oOldClient = gbif_set_client(oClient)
+    oOldGroups = lichen_set_groups(LichenGroups.from_db(oConnector, oConfig))
+
+    oSync = GBIFSync(oConnector, oArgs.workers)
+    oProgress = Progress('taxa', oArgs.quiet, oMetrics=oArgs.oMetrics)
+    try:
+        iCount = oSync.update(iLevel, not oArgs.no_recover, oProgress,
+                              oArgs.full)
+    finally:
+        gbif_set_client(oOldClient)
+        lichen_set_groups(oOldGroups)
+        oClient.close()
+
+    dCount = oSync.get_queue(iLevel).count()
+    dStats = oSync.oRegistry.get_stats()
+    oProgress.finish(f', updated {iCount}, waiting {dCount["pending"]}, '
+                     f'failed {dCount["failed"]}, requests saved '
+                     f'{dStats["requests"]}, unchanged '
+                     f'{dStats["fresh"] + dStats["subtrees"]} taxa and '
+                     f'{dStats["unchanged"]} records')
+    return 0
+
+
+def cli_inat(oConnector, oArgs):
+    """ Imports links to iNaturalist from a CSV file. """
+    from mli.lib.inat_csv_parser import inat_get_file
+
+    oProgress = Progress('rows', oArgs.quiet, oMetrics=oArgs.oMetrics)
+    try:
+        iCount = inat_get_file(oConnector, oArgs.file, oProgress)
+    except (OSError, csv.Error, KeyError) as e:
+        print(f'Cannot read {oArgs.file}: {e}', file=sys.stderr)
+        return 1
+    if iCount is False:
+        return 1
+
+    oProgress.finish(f', added {iCount} links')
+    return 0
+
+
+def cli_names(oConnector, oArgs):
+    """ Imports vernacular names of GBIF or iNaturalist. """
+    from mli.lib.vernacular import VernacularImporter
+
+    if oArgs.source == 'inat':
+        from mli.lib.inat_csv_parser import INAT_SOURCE_ID as iSourceID
+    else:
+        from mli.lib.gbif_parser import GBIF_SOURCE_ID as iSourceID
+
+    oProgress = Progress('names', oArgs.quiet, oMetrics=oArgs.oMetrics)
+    oImporter = VernacularImporter(oConnector, iSourceID,
+                                   iBatch=oArgs.batch, fProgress=oProgress)
+    dCount = oImporter.load_file(oArgs.file)
+    if not dCount:
+        print(f'Cannot import {oArgs.file}.', file=sys.stderr)
+        return 1
+
+    oProgress.iDone = dCount['names']
+    oProgress.finish(f', read {dCount["read"]} rows, known '
+                     f'{dCount["duplicates"]}, without taxon '
+                     f'{dCount["no_taxon"]}, unknown language '
+                     f'{dCount["no_lang"]}, failed {dCount["failed"]}')
+    return 0
+
+
+def cli_xref(oConnector, oArgs):
+    """ Imports the keys of the taxa in a database of DBSources. """
+    from mli.lib.xref import XREF_SOURCES, XRefImporter
+
+    oSource = XREF_SOURCES.get(oArgs.source.lower())
+    if oSource is None:
+        print(f'Unknown source {oArgs.source}, the sources: '
+              f'{", ".join(sorted(XREF_SOURCES))}.', file=sys.stderr)
+        return 1
+    for sColumn in ('names', 'indexes', 'authors'):
+        sValue = getattr(oArgs, sColumn)
+        if sValue:
+            oSource = oSource._replace(**{sColumn: (sValue.lower(),)})
+
+    fUnmatched = None
+    if oArgs.unmatched:
+        try:
+            fReport = open(oArgs.unmatched, 'w', encoding='utf-8')
+        except OSError as e:
+            print(f'Cannot write {oArgs.unmatched}: {e}', file=sys.stderr)
+            return 1
+
+        def write_unmatched(sName, sIndex):
+            fReport.write(f'{sName}\t{sIndex}\n')
+
+        fUnmatched = write_unmatched
+
+    oProgress = Progress('rows', oArgs.quiet, oMetrics=oArgs.oMetrics)
+    oImporter = XRefImporter(oConnector, oSource, bUpdate=oArgs.update,
+                             iBatch=oArgs.batch, fProgress=oProgress,
+                             fUnmatched=fUnmatched)
+    try:
+        dCount = oImporter.load_file(oArgs.file)
+    finally:
+        if fUnmatched:
+            fReport.close()
+    if not dCount:
+        print(f'Cannot import {oArgs.file}.', file=sys.stderr)
+        return 1
+
+    oProgress.iDone = dCount['read']
+    oProgress.finish(f', added {dCount["added"]} links, updated '
+                     f'{dCount["updated"]}, known {dCount["known"]}, '
+                     f'repeated {dCount["duplicates"]}, unmatched '
+                     f'{dCount["unmatched"]}, empty {dCount["empty"]}, '
+                     f'failed {dCount["failed"]}')
+    return 0
+
+
+def cli_dedup(oConnector, oArgs):
+    """ Merges taxa with the same name and rank. """
+    oProgress = Progress('duplicated names', oArgs.quiet)
+    lGarbage = oConnector.get_garbage() or []
+    oProgress(len(lGarbage))
+    if oArgs.dry_run:
+        for sName, iRank, iCount in lGarbage:
+            print(f'{sName}\t{iRank}\t{iCount}')
+        oProgress.finish()
+        return 0
+
+    iCount = oConnector.del_garbage()
+    if iCount is False:
+        return 1
+
+    oProgress.finish(f', deleted {iCount} taxa')
+    return 0
+
+
+def cli_export(oConnector, oArgs):
+    """ Writes the database as an SQL script. """
+    oProgress = Progress('lines', oArgs.quiet)
+    fOut = sys.stdout
+    if oArgs.file != '-':
+        fOut = open(oArgs.file, 'w', encoding='utf-8')
+    iLine = 0
+    try:
+        for iLine, sLine in enumerate(oConnector.export_db(), 1):
+            fOut.write(f'{sLine}\n')
+            if not iLine % 1000:
+                oProgress(iLine)
+    finally:
+        if fOut is not sys.stdout:
+            fOut.close()
+
+    oProgress.iDone = iLine
+    oProgress.finish()
+    return 0
+
+
+def cli_reindex(oConnector, oArgs):
+    """ Creates missing indexes, normalizes the names of all taxa again,
+    rebuilds the indexes and the statistics.
+    """
+    from mli.lib.sql import INDEXES
+
+    oProgress = Progress('indexes', oArgs.quiet)
+    if not oConnector.create_indexes() or \
+            not oConnector.update_norm_names(True) or \
+            not oConnector.execute_script('REINDEX; ANALYZE;'):
+        return 1
+
+    oProgress(len(INDEXES))
+    oProgress.finish()
+    return 0
+
+
+def cli_get_parser():
+    """ Makes the parser of the command line.
+
+    :return: The parser.
+    :rtype: argparse.ArgumentParser
+    """
+    oParser = argparse.ArgumentParser(
+        prog='mli-sync',
+        description='Batch jobs of Manual Lichen identification.')
+    oParser.add_argument('--config', default=path.join(BASE_DIR,
+                                                       'config.ini'),
+                         help='the configuration file')
+    oParser.add_argument('--db', help='the database instead of the one of '
+                                      'the configuration')
+    oParser.add_argument('-q', '--quiet', action='store_true',
+                         help='write only the summary')
+    oParser.add_argument('--metrics', metavar='FILE',
+                         help='write the metrics of the run as JSON')
+    oCommands = oParser.add_subparsers(dest='command', required=True)
+
+    oSync = oCommands.add_parser('sync', help='update taxa from GBIF')
+    oSync.add_argument('rank', help='a name or an ID of the rank')
+    oSync.add_argument('-w', '--workers', type=int, default=8,
+                       help='taxa requested at the same time')
+    oSync.add_argument('--no-recover', action='store_true',
+                       help="don't take the jobs of a running update")
+    oSync.add_argument('--offline', action='store_true',
+                       help='use only the cache of GBIF answers')
+    oSync.add_argument('--full', action='store_true',
+                       help='fetch also the taxa which did not change')
+    oSync.set_defaults(fCommand=cli_sync)
+
+    oINat = oCommands.add_parser('inat', help='import iNaturalist links')
+    oINat.add_argument('file', help="a CSV file with 'Name' and 'ID'")
+    oINat.set_defaults(fCommand=cli_inat)
+
+    oNames = oCommands.add_parser('names', help='import vernacular names')
+    oNames.add_argument('file', help='VernacularName.tsv, a CSV file or a '
+                                     'zip archive with them')
+    oNames.add_argument('-s', '--source', choices=('gbif', 'inat'),
+                        default='gbif',
+                        help='the database of the keys of the taxa')
+    oNames.add_argument('-b', '--batch', type=int, default=10000,
+                        help='names inserted by one transaction')
+    oNames.set_defaults(fCommand=cli_names)
+
+    oXRef = oCommands.add_parser('xref', help='import keys of a database')
+    oXRef.add_argument('source', help='the database of DBSources: inat, '
+                                      'ncbi, col, mycobank, if, gbif...')
+    oXRef.add_argument('file', help='a CSV, TSV, JSON Lines, dmp file or '
+                                    'a Darwin Core archive')
+    oXRef.add_argument('-n', '--name', dest='names',
+                       help='the column of the names')
+    oXRef.add_argument('-i', '--id', dest='indexes',
+                       help='the column of the keys')
+    oXRef.add_argument('-a', '--author', dest='authors',
+                       help='the column of the authors')
+    oXRef.add_argument('-u', '--update', action='store_true',
+                       help='replace the keys which are in the database')
+    oXRef.add_argument('-r', '--unmatched', metavar='FILE',
+                       help='write the names without a taxon to the file')
+    oXRef.add_argument('-b', '--batch', type=int, default=10000,
+                       help='rows written by one transaction')
+    oXRef.set_defaults(fCommand=cli_xref)
+
+    oDedup = oCommands.add_parser('dedup',
+                                  help='merge taxa with the same name')
+    oDedup.add_argument('-n', '--dry-run', action='store_true',
+                        help='only list the duplicated names')
+    oDedup.set_defaults(fCommand=cli_dedup)
+
+    oExport = oCommands.add_parser('export', help='dump the database')
+    oExport.add_argument('file', nargs='?', default='-',
+                         help='the SQL file, stdout by default')
+    oExport.set_defaults(fCommand=cli_export)
+
+    oReindex = oCommands.add_parser('reindex', help='rebuild indexes')
+    oReindex.set_defaults(fCommand=cli_reindex)
+
+    return oParser
+
+
+def main(lArgs=None):
+    """ Runs a command of the command line.
+
+    :param lArgs: The arguments, sys.argv by default.
+    :type lArgs: list[str] or None
+    :return: The exit status.
+    :rtype: int
+    """
+    oArgs = cli_get_parser().parse_args(lArgs)
+    oArgs.oConfig, oArgs.sBaseDir = cli_get_config(oArgs.config)
+    oConnector = cli_connect(oArgs)
+    if oConnector is None:
+        return 1
+
+    sMetrics = oArgs.metrics
+    if sMetrics is None:
+        sMetrics = oArgs.oConfig.get_config_value('Metrics', 'file', '')
+        if sMetrics:
+            sMetrics = str_get_file_patch(oArgs.sBaseDir, sMetrics)
+    oArgs.oMetrics = Metrics()
+    oOldMetrics = metrics_set(oArgs.oMetrics)
+    iStatus = 1
+    try:
+        iStatus = oArgs.fCommand(oConnector, oArgs)
+    finally:
+        metrics_set(oOldMetrics)
+        if sMetrics and not oArgs.oMetrics.dump(
+                sMetrics, {'command': oArgs.command, 'status': iStatus}):
+            print(f'Cannot write the metrics to {sMetrics}.',
+                  file=sys.stderr)
+
+    return iStatus
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from gettext import gettext as _
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from mli.lib.backup import backup_db
+
+
+class BackupThread(QThread):
+    """ Makes a backup of the database in a background thread and reports
+    the progress by signals, so the interface isn't frozen while copying.
+    """
+    progress = pyqtSignal(str)
+
+    def __init__(self, sFileDB, sBackupDir, iKeep=5, iPages=64,
+                 oParent=None):
+        """ Initiating a class.
+
+        :param sFileDB: Path to the database.
+        :type sFileDB: str
+        :param sBackupDir: The directory where backups are stored.
+        :type sBackupDir: str
+        :param iKeep: Number of backups that should be kept.
+        :type iKeep: int
+        :param iPages: Number of pages copied at one step.
+        :type iPages: int
+        """
+        super(BackupThread, self).__init__(oParent)
+        self.sFileDB = sFileDB
+        self.sBackupDir = sBackupDir
+        self.iKeep = iKeep
+        self.iPages = iPages
+
+    def run(self):
+        sBackup = backup_db(self.sFileDB, self.sBackupDir, self.iKeep,
+                            self.iPages, self.on_progress)
+        if sBackup:
+            self.progress.emit(f'{_("Резервная копия создана:")} {sBackup}')
+        else:
+            self.progress.emit(_('Не удалось создать резервную копию!'))
+
+    def on_progress(self, iCopied, iTotal):
+        iPercent = int(iCopied * 100 / iTotal) if iTotal else 100
+        self.progress.emit(f'{_("Резервное копирование:")} {iPercent}%')
+
+
+if __name__ == '__main__':
+    pass
@@ -21,6 +21,7 @@ from PyQt6.QtGui import QAction, QIcon
 from PyQt6.QtWidgets import QApplication, QComboBox, QCompleter, \
     QInputDialog, QMainWindow, QTextBrowser
 
+from mli.gui.backup_thread import BackupThread
 from mli.gui.color_dialogs import NewColor, EditColor
 from mli.gui.file_dialogs import OpenFileDialog
 from mli.gui.substract_dialogs import EditSubstrateDialog, NewSubstrateDialog
@@ -35,6 +36,7 @@ from mli.gui.taxon_info import TaxonBrowser
 from mli.lib.config import ConfigProgram
 from mli.lib.sql import SQL, check_connect_db
 from mli.lib.str import str_get_file_patch, str_get_path
+from mli.lib.taxon_card import CARD_CACHE_SIZE, TaxonCardCache
 
 
 class MainWindow(QMainWindow):
@@ -42,6 +44,7 @@ class MainWindow(QMainWindow):
         super().__init__()
 
         self.sPathApp = sPath
+        self.oBackupThread = None
         oConfigProgram = ConfigProgram(self.sPathApp)
         sBasePath = oConfigProgram.sDir
         sDBPath = oConfigProgram.get_config_value('DB', 'db_path')
@@ -54,6 +57,22 @@ class MainWindow(QMainWindow):
         self.oConnector = SQL(sDBPath)
         check_connect_db(self.oConnector, sBasePath, sDBDir)
 
+        sBackupDir = oConfigProgram.get_config_value('Backup', 'backup_dir',
+                                                     'backup')
+        self.sBackupDir = str_get_file_patch(sBasePath, sBackupDir)
+        self.iBackupKeep = int(oConfigProgram.get_config_value(
+            'Backup', 'backup_keep', '5'))
+        self.iBackupPages = int(oConfigProgram.get_config_value(
+            'Backup', 'backup_pages', '64'))
+
+        bCardsInDB = oConfigProgram.get_config_value(
+            'Cache', 'taxon_cards_in_db', 'no') == 'yes'
+        iCardsInMemory = int(oConfigProgram.get_config_value(
+            'Cache', 'taxon_cards_in_memory', str(CARD_CACHE_SIZE)))
+        self.oCardCache = TaxonCardCache(self.oConnector,
+                                         bPersistent=bCardsInDB,
+                                         iMaxCards=iCardsInMemory)
+
         self.setWindowTitle(_('Manual Lichen identification'))
         self.oCentralWidget = CentralTabWidget(self)
 
@@ -76,6 +95,7 @@ class MainWindow(QMainWindow):
         """ Method collect all actions which can do from GUI of program. """
         # File menu
         self.oOpenDB = QAction(_('Открыть базу данных...'), self)
+        self.oBackupDB = QAction(_('Резервная копия базы данных'), self)
         self.oPrint = QAction(_('Печать...'))
         self.oSetting = QAction(_('Настройки...'))
         self.oExitAct = QAction(QIcon.fromTheme('SP_exit'), _('Выход'), self)
@@ -113,6 +133,7 @@ class MainWindow(QMainWindow):
         # Create file menu
         oFileMenu = oMenuBar.addMenu(_('&Файл'))
         oFileMenu.addAction(self.oOpenDB)
+        oFileMenu.addAction(self.oBackupDB)
         oFileMenu.addSeparator()
         oFileMenu.addAction(self.oPrint)
         oFileMenu.addSeparator()
@@ -157,6 +178,7 @@ class MainWindow(QMainWindow):
         method or function in program. """
         # Menu File
         self.oOpenDB.triggered.connect(self.onOpenDB)
+        self.oBackupDB.triggered.connect(self.onBackupDB)
         self.oSetting.triggered.connect(self.onOpenSetting)
         self.oExitAct.triggered.connect(QApplication.quit)
 
@@ -178,13 +200,34 @@ class MainWindow(QMainWindow):
         self.oAbout.triggered.connect(self.onDisplayAbout)
 
     def get_page_taxon_info(self, sTaxonName):
-        return TaxonBrowser(self.oConnector, sTaxonName)
+        iTaxonID = self.oConnector.get_taxon_id(sTaxonName)
+        if not iTaxonID:
+            return TaxonBrowser(self.oConnector, sTaxonName)
+
+        bCached = self.oCardCache.has_card(iTaxonID)
+        oTaxonBrowser = TaxonBrowser(self.oConnector, sTaxonName,
+                                     self.oCardCache, iTaxonID)
+        if not bCached:
+            self.oCardCache.prewarm(iTaxonID)
+
+        return oTaxonBrowser
 
     def get_taxon_list(self):
         tTaxonList = self.oConnector.get_full_taxon_list()
 
         return [tRow[0] for tRow in tTaxonList]
 
+    def onBackupDB(self):
+        """ Starts a backup of the database in a background thread. """
+        if self.oBackupThread is not None and self.oBackupThread.isRunning():
+            return
+
+        self.oBackupThread = BackupThread(self.oConnector.sFileDB,
+                                          self.sBackupDir, self.iBackupKeep,
+                                          self.iBackupPages, self)
+        self.oBackupThread.progress.connect(self.onSetStatusBarMessage)
+        self.oBackupThread.start()
+
     def onDisplayAbout(self):
         """ Method open dialog window with information about the program. """
         oAbout = About(self)
@@ -0,0 +1,147 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module provides an online backup of the database with rotation of old
+copies. The backup is made by steps, so it can be run in a background thread
+while the program keeps working with the database.
+
+Function:
+    backup_db(sFileDB, sBackupDir, iKeep=5, iPages=64, fProgress=None)
+    backup_get_list(sFileDB, sBackupDir)
+    backup_get_name(sFileDB, sBackupDir)
+    backup_rotate(sFileDB, sBackupDir, iKeep=5)
+
+Using:
+    sBackup = backup_db('db/mli.db', 'db/backup', iKeep=3)
+"""
+
+import logging
+import os
+from datetime import datetime
+
+from mli.lib.sql import SQL
+from mli.lib.str import str_get_file_patch
+
+
+def backup_get_name(sFileDB, sBackupDir):
+    """ Generates a name for a new backup from the name of the database and
+    the current time, so that the sorting by name is the sorting by age.
+
+    :param sFileDB: Path to the database.
+    :type sFileDB: str
+    :param sBackupDir: The directory where backups are stored.
+    :type sBackupDir: str
+    :return: Path to the new backup file.
+    :rtype: str
+    """
+    sStem = os.path.splitext(os.path.basename(sFileDB))[0]
+    sTime = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return str_get_file_patch(sBackupDir, f'{sStem}-{sTime}.db')
+
+
+def backup_get_list(sFileDB, sBackupDir):
+    """ Gets the list of backups of the database from the oldest to the
+    newest.
+
+    :param sFileDB: Path to the database.
+    :type sFileDB: str
+    :param sBackupDir: The directory where backups are stored.
+    :type sBackupDir: str
+    :return: Paths to the backup files.
+    :rtype: list[str]
+    """
+    if not os.path.isdir(sBackupDir):
+        return []
+
+    sStem = os.path.splitext(os.path.basename(sFileDB))[0]
+    lFiles = [sFile for sFile in os.listdir(sBackupDir)
+              if sFile.startswith(f'{sStem}-') and sFile.endswith('.db')]
+    return [str_get_file_patch(sBackupDir, sFile) for sFile in sorted(lFiles)]
+
+
+def backup_rotate(sFileDB, sBackupDir, iKeep=5):
+    """ Deletes the oldest backups, so that no more than iKeep remain.
+
+    :param sFileDB: Path to the database.
+    :type sFileDB: str
+    :param sBackupDir: The directory where backups are stored.
+    :type sBackupDir: str
+    :param iKeep: Number of backups that should be kept.
+    :type iKeep: int
+    :return: Paths to the deleted files.
+    :rtype: list[str]
+    """
+    lFiles = backup_get_list(sFileDB, sBackupDir)
+    lDelete = lFiles[:max(len(lFiles) - iKeep, 0)]
+    for sFile in lDelete:
+        os.remove(sFile)
+
+    return lDelete
+
+
+def backup_db(sFileDB, sBackupDir, iKeep=5, iPages=64, fProgress=None):
+    """ Makes a backup of the database and rotates old backups.
+
+    The function opens its own connection to the database, so it can be
+    called from any thread. The copy is written into a temporary file and is
+    renamed only when it is completed, thus an interrupted backup never
+    replaces a good one.
+
+    :param sFileDB: Path to the database.
+    :type sFileDB: str
+    :param sBackupDir: The directory where backups are stored.
+    :type sBackupDir: str
+    :param iKeep: Number of backups that should be kept.
+    :type iKeep: int
+    :param iPages: Number of pages copied at one step.
+    :type iPages: int
+    :param fProgress: The function that is called after every step with
+        two arguments: copied pages and total pages.
+    :type fProgress: callable or None
+    :return: Path to the backup, or None if the backup failed.
+    :rtype: str or None
+    """
+    # SQL() would create an empty database instead of a missing one.
+    if not os.path.isfile(sFileDB):
+        logging.error(f'The database {sFileDB} is not found, no backup.')
+        return
+
+    os.makedirs(sBackupDir, exist_ok=True)
+    sBackup = backup_get_name(sFileDB, sBackupDir)
+    sPart = f'{sBackup}.part'
+
+    def on_progress(iStatus, iRemaining, iTotal):
+        if fProgress is not None:
+            fProgress(iTotal - iRemaining, iTotal)
+
+    oConnector = SQL(sFileDB)
+    bDone = oConnector.backup(sPart, iPages, on_progress)
+    oConnector.close()
+    if not bDone:
+        if os.path.exists(sPart):
+            os.remove(sPart)
+        return
+
+    os.replace(sPart, sBackup)
+    backup_rotate(sFileDB, sBackupDir, iKeep)
+
+    return sBackup
+
+
+if __name__ == '__main__':
+    pass
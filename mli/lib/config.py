@@ -86,16 +86,22 @@ class ConfigProgram(ConfigParser):
         self.read(self.sFilePath)
         self.lSections = self.sections()
 
-    def get_config_value(self, sSection, sOption):
+    def get_config_value(self, sSection, sOption, sFallback=None):
         """ The method allows reading from a configuration file.
 
         :param sSection: The section in the configuration file to read from.
         :type sSection: str
         :param sOption: The option in the configuration file to need reading.
         :type sOption: str
+        :param sFallback: The value that is returned if there is no such
+            option in the file. If it isn't specified, an exception is raised.
+        :type sFallback: str or None
         :return: The value of the specified parameter in the section.
         :rtype: str
         """
+        if sFallback is not None:
+            return self.get(sSection, sOption, fallback=sFallback)
+
         return self.get(sSection, sOption)
 
     def set_config_value(self, sSection, sOption, sValue=''):
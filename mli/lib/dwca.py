@@ -0,0 +1,185 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module reads Darwin Core Archives. The files of an archive are read
+straight from the zip file line by line, so an archive of any size takes
+little memory.
+
+Function:
+    dwca_get_meta(oZip)
+    dwca_iter_rows(oZip, oFile)
+
+Class:
+    DwCAFile
+
+Using:
+    with zipfile.ZipFile('backbone.zip') as oZip:
+        dFiles = dwca_get_meta(oZip)
+        for dRow in dwca_iter_rows(oZip, dFiles['Taxon']):
+            print(dRow['scientificName'])
+"""
+
+import io
+import logging
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+
+# The description of a data file of the archive: the name of the file in the
+# archive, the field separator, number of header lines, the encoding, the
+# list of (index, term) and the dictionary of default values.
+DwCAFile = namedtuple('DwCAFile', 'location, delimiter, skip, encoding, '
+                                  'fields, defaults')
+
+DWCA_NS = '{http://rs.tdwg.org/dwc/text/}'
+
+
+def dwca_term(sTerm):
+    """ Takes the short name of a term: 'scientificName' from
+    'http://rs.tdwg.org/dwc/terms/scientificName'.
+
+    :param sTerm: The term URI.
+    :type sTerm: str
+    :return: The short name.
+    :rtype: str
+    """
+    return sTerm.rstrip('/').rsplit('/', 1)[-1]
+
+
+def dwca_unescape(sString):
+    """ Turns '\\t' and '\\n' written in meta.xml into the characters.
+
+    :param sString: A separator from meta.xml.
+    :type sString: str
+    :return: The separator.
+    :rtype: str
+    """
+    return sString.replace('\\t', '\t').replace('\\n', '\n')
+
+
+def dwca_get_meta(oZip):
+    """ Reads meta.xml of the archive. If there is no meta.xml, every file of
+    the archive is described by its header line.
+
+    :param oZip: The opened archive.
+    :type oZip: zipfile.ZipFile
+    :return: Dictionary of the short row type ('Taxon', 'VernacularName')
+        and the description of its file.
+    :rtype: dict[str, DwCAFile]
+    """
+    if 'meta.xml' not in oZip.namelist():
+        return dwca_guess_meta(oZip)
+
+    with oZip.open('meta.xml') as fMeta:
+        oRoot = ElementTree.parse(fMeta).getroot()
+
+    dFiles = {}
+    for oNode in oRoot:
+        sTag = oNode.tag.replace(DWCA_NS, '')
+        if sTag not in ('core', 'extension'):
+            continue
+
+        lFields = []
+        dDefaults = {}
+        oID = oNode.find(f'{DWCA_NS}id')
+        if oID is None:
+            oID = oNode.find(f'{DWCA_NS}coreid')
+        if oID is not None:
+            lFields.append((int(oID.get('index')), 'id'))
+        for oField in oNode.iter(f'{DWCA_NS}field'):
+            sTerm = dwca_term(oField.get('term'))
+            if oField.get('index') is None:
+                dDefaults[sTerm] = oField.get('default')
+            else:
+                lFields.append((int(oField.get('index')), sTerm))
+
+        sRowType = dwca_term(oNode.get('rowType'))
+        sLocation = oNode.find(f'{DWCA_NS}files/{DWCA_NS}location').text
+        if sLocation.strip() not in oZip.namelist():
+            logging.warning(f'{sLocation} of {sRowType} is not found.')
+            continue
+
+        dFiles[sRowType] = DwCAFile(
+            sLocation.strip(),
+            dwca_unescape(oNode.get('fieldsTerminatedBy', ',')),
+            int(oNode.get('ignoreHeaderLines', '0')),
+            oNode.get('encoding', 'UTF-8'),
+            lFields, dDefaults)
+
+    return dFiles
+
+
+def dwca_guess_meta(oZip):
+    """ Describes the tab separated files of an archive without meta.xml by
+    their header lines, the first column is the ID.
+
+    :param oZip: The opened archive.
+    :type oZip: zipfile.ZipFile
+    :return: Dictionary of the file name without extension and the
+        description of the file.
+    :rtype: dict[str, DwCAFile]
+    """
+    dFiles = {}
+    for sName in oZip.namelist():
+        if not sName.endswith(('.tsv', '.txt')):
+            continue
+
+        with oZip.open(sName) as fFile:
+            sHeader = fFile.readline().decode('utf-8-sig').rstrip('\r\n')
+        lFields = [(0, 'id')]
+        lFields.extend((iIndex, dwca_term(sTerm)) for iIndex, sTerm
+                       in enumerate(sHeader.split('\t')))
+        dFiles[sName.rsplit('/', 1)[-1].rsplit('.', 1)[0]] = DwCAFile(
+            sName, '\t', 1, 'UTF-8', lFields, {})
+
+    return dFiles
+
+
+def dwca_iter_rows(oZip, oFile):
+    """ Reads rows of a data file of the archive one by one. Empty values are
+    returned as None.
+
+    :param oZip: The opened archive.
+    :type oZip: zipfile.ZipFile
+    :param oFile: The description of the file.
+    :type oFile: DwCAFile
+    :return: Dictionaries of the short term and the value.
+    :rtype: collections.abc.Iterator[dict[str, str|None]]
+    """
+    iMax = max(iIndex for iIndex, _ in oFile.fields)
+    with oZip.open(oFile.location) as fFile:
+        oText = io.TextIOWrapper(fFile, encoding=oFile.encoding,
+                                 newline='\n')
+        for _ in range(oFile.skip):
+            oText.readline()
+
+        for iLine, sLine in enumerate(oText, oFile.skip + 1):
+            lValues = sLine.rstrip('\r\n').split(oFile.delimiter)
+            if len(lValues) <= iMax:
+                if len(lValues) > 1:
+                    logging.warning(f'{oFile.location}:{iLine} has '
+                                    f'{len(lValues)} fields.')
+                lValues.extend([''] * (iMax + 1 - len(lValues)))
+
+            dRow = dict(oFile.defaults)
+            for iIndex, sTerm in oFile.fields:
+                dRow[sTerm] = lValues[iIndex] or dRow.get(sTerm)
+            yield dRow
+
+
+if __name__ == '__main__':
+    pass
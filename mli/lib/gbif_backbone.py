@@ -0,0 +1,345 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module imports the lichens of GBIF Backbone Taxonomy from the Darwin
+Core Archive (https://hosted-datasets.gbif.org/datasets/backbone/) without
+the network.
+
+The import is done in two passes. The first pass reads Taxon.tsv from the
+zip file, selects lichens by LichenGroups and inserts them into Taxa and
+DBIndexes by batches of a Pipeline, keeping only the gbif keys of the
+parent and the accepted name of every taxon. The second pass turns these
+keys into the IDs of the database and fills TaxonTree. After that, the
+vernacular names and the identifiers of the imported taxa are read from the
+extensions of the archive. Taxa whose gbif key is already in the database
+are not inserted again, but are used as parents.
+
+Class:
+    BackboneImporter(oConnector, sFileZip, fFilter=None, iBatch=10000)
+
+Using:
+    oImporter = BackboneImporter(oConnector, 'backbone.zip')
+    dCount = oImporter.load()
+"""
+
+import logging
+import re
+import zipfile
+
+from mli.lib.dwca import dwca_get_meta, dwca_iter_rows
+from mli.lib.gbif_parser import GBIF_SOURCE_ID, GBIF_STATUSES
+from mli.lib.lichen_groups import LichenGroups
+from mli.lib.name_parser import name_parse_authorship
+from mli.lib.pipeline import Pipeline
+from mli.lib.vernacular import LangMap
+
+RE_DIGIT = re.compile(r'\d')
+
+
+class BackboneImporter:
+    """ Loads taxa, their tree, vernacular names and links to other
+    databases from GBIF Backbone archive.
+
+    *Methods*
+        * load -- Makes all steps of the import in one transaction.
+        * load_taxa -- The first pass: Taxa and DBIndexes.
+        * load_tree -- The second pass: TaxonTree.
+        * load_vernacular -- LocalNames from VernacularName extension.
+        * load_identifiers -- DBIndexes from Identifier extension.
+    """
+
+    def __init__(self, oConnector, sFileZip, fFilter=None, iBatch=10000):
+        """ Initiating a class.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param sFileZip: The path to the archive.
+        :type sFileZip: str
+        :param fFilter: The function that selects taxa by a row of
+            Taxon.tsv, by default the lichens of the groups of the database.
+        :type fFilter: callable or None
+        :param iBatch: Number of rows inserted by one statement.
+        :type iBatch: int
+        """
+        self.oConnector = oConnector
+        self.sFileZip = sFileZip
+        if fFilter is None:
+            fFilter = LichenGroups.from_db(oConnector).is_lichen
+        self.fFilter = fFilter
+        self.iBatch = iBatch
+        # gbif key -> taxon's ID in database, for all known taxa.
+        self.dKeys = {}
+        # (taxon's ID, key of parent, key of accepted, status's ID) of the
+        # imported taxa.
+        self.lTree = []
+
+    def get_map(self, sSQL, tValues=()):
+        """ Reads two columns of a query into a dictionary.
+
+        :param sSQL: SQL query with two columns: key and value.
+        :type sSQL: str
+        :param tValues: Values of the query.
+        :type tValues: tuple
+        :return: The dictionary.
+        :rtype: dict
+        """
+        oCursor = self.oConnector.execute_query(sSQL, tValues)
+        if not oCursor:
+            return {}
+
+        return dict(oCursor.fetchall())
+
+    def load(self):
+        """ Imports the archive. If a step fails, nothing is saved.
+
+        :return: Numbers of inserted taxa, tree records, local names and
+            links, or False if the import failed.
+        :rtype: dict[str, int] or bool
+        """
+        dCount = {}
+        try:
+            with zipfile.ZipFile(self.sFileZip) as oZip:
+                dFiles = dwca_get_meta(oZip)
+                dCount['taxa'] = self.load_taxa(oZip, dFiles['Taxon'])
+                dCount['tree'] = self.load_tree()
+                dCount['names'] = self.load_vernacular(
+                    oZip, dFiles.get('VernacularName'))
+                dCount['links'] = self.load_identifiers(
+                    oZip, dFiles.get('Identifier'))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile,
+                RuntimeError) as e:
+            self.oConnector.oConnector.rollback()
+            logging.exception(f'Cannot import {self.sFileZip}: {e}')
+            return False
+
+        self.oConnector.oConnector.commit()
+        return dCount
+
+    def insert(self, sTable, sColumns, lValues):
+        """ Inserts a batch without commit.
+
+        :param sTable: Table name as string.
+        :type sTable: str
+        :param sColumns: Columns names of the table.
+        :type sColumns: str
+        :param lValues: Tuples of values.
+        :type lValues: list[tuple]
+        :return: Number of inserted rows.
+        :rtype: int
+        """
+        if not lValues:
+            return 0
+
+        iCount = self.oConnector.insert_many(sTable, sColumns, lValues,
+                                             bCommit=False)
+        if iCount is False:
+            raise RuntimeError(f'Insert into {sTable} failed.')
+        return iCount
+
+    def load_taxa(self, oZip, oFile):
+        """ The first pass: selects taxa and inserts them into Taxa and
+        DBIndexes.
+
+        :param oZip: The opened archive.
+        :type oZip: zipfile.ZipFile
+        :param oFile: The description of Taxon.tsv.
+        :type oFile: DwCAFile
+        :return: Number of inserted taxa.
+        :rtype: int
+        """
+        self.dKeys = self.get_map(
+            'SELECT taxonIndex, taxonID FROM DBIndexes WHERE sourceID=?;',
+            (GBIF_SOURCE_ID,))
+        dRanks = self.get_map('SELECT rankName, rankID FROM TaxonRanks;')
+        dStatuses = self.get_map(
+            'SELECT statusName, statusID FROM TaxonStatuses;')
+        iTaxonID = self.oConnector.execute_query(
+            'SELECT IFNULL(MAX(taxonID), 0) FROM Taxa;').fetchone()[0]
+
+        # The rows are parsed in this thread, so the IDs go in order.
+        def parse(dRow):
+            nonlocal iTaxonID
+            sKey = dRow.get('taxonID') or dRow['id']
+            sName = dRow.get('canonicalName')
+            iRank = dRanks.get((dRow.get('taxonRank') or '').lower())
+            if sKey in self.dKeys or not sName or not iRank or \
+                    RE_DIGIT.search(sName) or not self.fFilter(dRow):
+                return
+
+            sAuthor, sYear, sBracket, _, _, _ = name_parse_authorship(
+                dRow.get('scientificNameAuthorship'))
+            if sBracket:
+                sAuthor = f'({sBracket}) {sAuthor or ""}'.strip()
+            sStatus = (dRow.get('taxonomicStatus') or '').lower()
+            iStatus = dStatuses.get(GBIF_STATUSES.get(sStatus, sStatus))
+
+            iTaxonID += 1
+            self.dKeys[sKey] = iTaxonID
+            self.lTree.append((iTaxonID, dRow.get('parentNameUsageID'),
+                               dRow.get('acceptedNameUsageID'), iStatus,))
+            return ((iTaxonID, dRow.get('scientificName') or sName, sName,
+                     sAuthor, int(sYear) if sYear else None,
+                     dRow.get('namePublishedIn'), iRank,),
+                    (iTaxonID, GBIF_SOURCE_ID, sKey,))
+
+        def write(lBatch):
+            self.insert_taxa([tTaxon for _, (tTaxon, _) in lBatch],
+                             [tIndex for _, (_, tIndex) in lBatch])
+
+        return self.run(dwca_iter_rows(oZip, oFile), parse, write)
+
+    def run(self, iRows, fParse, fWrite):
+        """ Passes the rows through a Pipeline by batches of iBatch. The
+        rows are parsed and written by this thread, and a failed row or
+        batch stops the import.
+
+        :param iRows: The rows of a file of the archive.
+        :type iRows: Iterable[dict]
+        :param fParse: The function that makes the values of a row, or None
+            if the row is skipped.
+        :type fParse: callable
+        :param fWrite: The function that inserts a batch of (row, values).
+        :type fWrite: callable
+        :return: Number of the written rows.
+        :rtype: int
+        """
+        def fail(_, oError):
+            raise oError
+
+        oPipeline = Pipeline(fWrite, fParse=fParse, iBatch=self.iBatch,
+                             fInterval=None, fFail=fail, bSplit=False,
+                             sName='backbone')
+        return oPipeline.run(iRows)['written']
+
+    def insert_taxa(self, lTaxa, lIndexes):
+        """ Inserts a batch of taxa and their gbif keys.
+
+        :param lTaxa: Tuples of Taxa's values.
+        :type lTaxa: list[tuple]
+        :param lIndexes: Tuples of DBIndexes's values.
+        :type lIndexes: list[tuple]
+        :return: Number of inserted taxa.
+        :rtype: int
+        """
+        iCount = self.insert('Taxa', 'taxonID, scientificName, '
+                                     'canonicalName, authorship, '
+                                     'yearPublishing, namePublishedIn, '
+                                     'rankID', lTaxa)
+        self.insert('DBIndexes', 'taxonID, sourceID, taxonIndex', lIndexes)
+
+        return iCount
+
+    def load_tree(self):
+        """ The second pass: a synonym gets its accepted name as the main
+        taxon, an accepted taxon gets its parent.
+
+        :return: Number of inserted records.
+        :rtype: int
+        """
+        lValues = []
+        for iTaxonID, sParent, sAccepted, iStatus in self.lTree:
+            iMain = self.dKeys.get(sAccepted or sParent)
+            lValues.append((iTaxonID, iMain, iStatus,))
+        self.lTree = []
+
+        return self.insert('TaxonTree', 'taxonID, mainTaxonID, statusID',
+                           lValues)
+
+    def load_vernacular(self, oZip, oFile):
+        """ Inserts vernacular names of known taxa into LocalNames. The
+        language is looked up by LangMap.
+
+        :param oZip: The opened archive.
+        :type oZip: zipfile.ZipFile
+        :param oFile: The description of VernacularName.tsv.
+        :type oFile: DwCAFile or None
+        :return: Number of inserted names.
+        :rtype: int
+        """
+        if oFile is None:
+            return 0
+
+        oLangs = LangMap.from_db(self.oConnector)
+        oCursor = self.oConnector.execute_query(
+            'SELECT taxonID, langID, localName FROM LocalNames;')
+        setNames = set(oCursor.fetchall()) if oCursor else set()
+
+        def parse(dRow):
+            iTaxonID = self.dKeys.get(dRow['id'])
+            iLang = oLangs.resolve(dRow.get('language'))
+            sName = (dRow.get('vernacularName') or '').strip()
+            tValues = (iTaxonID, iLang, sName,)
+            if not iTaxonID or not iLang or not sName or \
+                    tValues in setNames:
+                return
+
+            setNames.add(tValues)
+            return tValues
+
+        def write(lBatch):
+            self.insert('LocalNames', 'taxonID, langID, localName',
+                        [tValues for _, tValues in lBatch])
+
+        return self.run(dwca_iter_rows(oZip, oFile), parse, write)
+
+    def load_identifiers(self, oZip, oFile):
+        """ Inserts links of known taxa to other databases into DBIndexes.
+        The database is found by the beginning of the identifier, that must
+        be the same as indexLink of DBSources.
+
+        :param oZip: The opened archive.
+        :type oZip: zipfile.ZipFile
+        :param oFile: The description of Identifier.tsv.
+        :type oFile: DwCAFile or None
+        :return: Number of inserted links.
+        :rtype: int
+        """
+        if oFile is None:
+            return 0
+
+        dSources = self.get_map(
+            "SELECT indexLink, sourceID FROM DBSources WHERE indexLink!='' "
+            "AND sourceID!=?;", (GBIF_SOURCE_ID,))
+        dSources = {sLink.split('://', 1)[-1]: iSource
+                    for sLink, iSource in dSources.items()}
+        oCursor = self.oConnector.execute_query(
+            'SELECT taxonID, sourceID, taxonIndex FROM DBIndexes;')
+        setLinks = set(oCursor.fetchall()) if oCursor else set()
+
+        def parse(dRow):
+            iTaxonID = self.dKeys.get(dRow['id'])
+            sLink = (dRow.get('identifier') or '').split('://', 1)[-1]
+            if not iTaxonID or not sLink:
+                return
+
+            for sPrefix, iSource in dSources.items():
+                tValues = (iTaxonID, iSource, sLink[len(sPrefix):],)
+                if sLink.startswith(sPrefix) and tValues[2] and \
+                        tValues not in setLinks:
+                    setLinks.add(tValues)
+                    return tValues
+
+        def write(lBatch):
+            self.insert('DBIndexes', 'taxonID, sourceID, taxonIndex',
+                        [tValues for _, tValues in lBatch])
+
+        return self.run(dwca_iter_rows(oZip, oFile), parse, write)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,563 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module provides one HTTP client for all requests to GBIF API. The
+client keeps connections alive in a pool, limits the rate of requests by
+a token bucket, retries failed requests with exponential backoff and sets
+timeouts, so a crawl runs at the allowed rate instead of sleeping after
+every request. With a ResponseCache the decoded requests are answered from
+the cache while the records are fresh, expired records are checked by
+conditional requests, and in the offline mode only the cache is used.
+The lists of the pages are decoded while they are downloaded by
+iter_json(). The time of every request by its endpoint, the wait for the
+rate limiter, the hits of the cache and the failed requests are counted
+in the shared Metrics.
+
+Function:
+    gbif_get_client()
+    gbif_set_client(oClient)
+
+Class:
+    GBIFClient(sBaseURL=GBIF_API, fRate=5.0, iBurst=5, iRetries=5,
+               fBackoff=0.5, fTimeout=30.0, iPoolSize=10, oCache=None,
+               bOffline=False)
+    TokenBucket(fRate, iBurst=1)
+
+Using:
+    oClient = gbif_get_client()
+    dData = oClient.get_json('species/5')
+"""
+
+import json
+import logging
+import re
+import threading
+from time import monotonic, sleep
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mli.lib.http_cache import ResponseCache, http_cache_key
+from mli.lib.json_stream import json_stream_items
+from mli.lib.metrics import metrics_get
+
+GBIF_API = 'https://api.gbif.org/v1/'
+
+# HTTP statuses after which a request is repeated.
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Size of the chunks of a streamed response in bytes.
+CHUNK_SIZE = 16384
+
+# The keys and the UUIDs in a path, they are one endpoint for the metrics.
+RE_PATH_KEY = re.compile(r'(?<=/)(\d+|[0-9a-f]{8}(-[0-9a-f]{4}){3}-'
+                         r'[0-9a-f]{12})(?=/|$)', re.IGNORECASE)
+
+
+class TokenBucket:
+    """ Limits the rate of events. The bucket is filled with fRate tokens
+    per second up to iBurst tokens, and every event takes one token. If the
+    bucket is empty, the caller waits for the next token. The bucket can be
+    shared by several threads.
+    """
+
+    def __init__(self, fRate, iBurst=1):
+        """ Initiating a class.
+
+        :param fRate: Number of tokens per second. Zero or less means that
+            the rate isn't limited.
+        :type fRate: float
+        :param iBurst: The size of the bucket.
+        :type iBurst: int
+        """
+        self.fRate = fRate
+        self.iBurst = max(iBurst, 1)
+        self.fTokens = float(self.iBurst)
+        self.fTime = monotonic()
+        self.oLock = threading.Lock()
+
+    def acquire(self, iTokens=1):
+        """ Takes tokens from the bucket, waiting until they are available.
+
+        :param iTokens: Number of tokens.
+        :type iTokens: int
+        :return: Time of waiting in seconds.
+        :rtype: float
+        """
+        if self.fRate <= 0:
+            return 0.0
+
+        with self.oLock:
+            fNow = monotonic()
+            self.fTokens = min(self.iBurst, self.fTokens +
+                               (fNow - self.fTime) * self.fRate)
+            self.fTime = fNow
+            self.fTokens -= iTokens
+            fWait = -self.fTokens / self.fRate if self.fTokens < 0 else 0.0
+
+        if fWait:
+            sleep(fWait)
+
+        return fWait
+
+
+class GBIFClient:
+    """ Sends requests to GBIF API.
+
+    *Methods*
+        * get -- Sends GET request and returns the response.
+        * get_json -- Sends GET request and returns decoded JSON.
+        * post_json -- Sends POST request with JSON and returns decoded JSON.
+        * fetch_json -- Gets decoded JSON through the cache.
+        * iter_json -- Yields the elements of a list while it is read.
+        * close -- Closes all connections.
+    """
+
+    def __init__(self, sBaseURL=GBIF_API, fRate=5.0, iBurst=5, iRetries=5,
+                 fBackoff=0.5, fTimeout=30.0, iPoolSize=10, oCache=None,
+                 bOffline=False):
+        """ Initiating a class.
+
+        :param sBaseURL: The root of GBIF API.
+        :type sBaseURL: str
+        :param fRate: Maximal number of requests per second.
+        :type fRate: float
+        :param iBurst: Number of requests that can be sent at once.
+        :type iBurst: int
+        :param iRetries: Number of repeats of a failed request.
+        :type iRetries: int
+        :param fBackoff: The first pause before a repeat in seconds, every
+            next pause is twice longer.
+        :type fBackoff: float
+        :param fTimeout: Timeout of a request in seconds.
+        :type fTimeout: float
+        :param iPoolSize: Number of connections kept alive.
+        :type iPoolSize: int
+        :param oCache: The cache of responses, by default nothing is cached.
+        :type oCache: ResponseCache or None
+        :param bOffline: If True, the network isn't used, the answers are
+            taken only from the cache, even expired.
+        :type bOffline: bool
+        """
+        self.sBaseURL = sBaseURL.rstrip('/') + '/'
+        self.oBucket = TokenBucket(fRate, iBurst)
+        self.iRetries = iRetries
+        self.fBackoff = fBackoff
+        self.fTimeout = fTimeout
+        self.oCache = oCache
+        self.bOffline = bOffline
+        self.oSession = requests.Session()
+        oAdapter = HTTPAdapter(pool_connections=iPoolSize,
+                               pool_maxsize=iPoolSize)
+        self.oSession.mount('http://', oAdapter)
+        self.oSession.mount('https://', oAdapter)
+
+    @classmethod
+    def from_config(cls, oConfig, sSection='GBIF'):
+        """ Creates a client with parameters from a configuration file.
+
+        :param oConfig: The configuration.
+        :type oConfig: ConfigParser
+        :param sSection: The section with parameters of the client.
+        :type sSection: str
+        :return: The client.
+        :rtype: GBIFClient
+        """
+        oCache = None
+        sCacheFile = oConfig.get(sSection, 'cache_file', fallback='')
+        if sCacheFile:
+            oCache = ResponseCache(
+                sCacheFile,
+                oConfig.getfloat(sSection, 'cache_ttl', fallback=604800.0),
+                oConfig.getint(sSection, 'cache_size',
+                               fallback=256) * 1024 * 1024)
+
+        return cls(oConfig.get(sSection, 'base_url', fallback=GBIF_API),
+                   oConfig.getfloat(sSection, 'rate', fallback=5.0),
+                   oConfig.getint(sSection, 'burst', fallback=5),
+                   oConfig.getint(sSection, 'retries', fallback=5),
+                   oConfig.getfloat(sSection, 'backoff', fallback=0.5),
+                   oConfig.getfloat(sSection, 'timeout', fallback=30.0),
+                   oConfig.getint(sSection, 'pool_size', fallback=10),
+                   oCache,
+                   oConfig.getboolean(sSection, 'offline', fallback=False))
+
+    def get_url(self, sPath):
+        """ Makes the full URL from the path.
+
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :return: The URL.
+        :rtype: str
+        """
+        if sPath.startswith(('http://', 'https://')):
+            return sPath
+
+        return self.sBaseURL + sPath.lstrip('/')
+
+    def get_endpoint(self, sURL):
+        """ Gets the name of the endpoint of the URL for the metrics, the
+        keys in the path are replaced by '{key}'.
+
+        :param sURL: The URL.
+        :type sURL: str
+        :return: The endpoint, for example 'species/{key}/children'.
+        :rtype: str
+        """
+        sPath = sURL.split('?', 1)[0]
+        if sPath.startswith(self.sBaseURL):
+            sPath = sPath[len(self.sBaseURL):]
+        else:
+            sPath = sPath.split('://', 1)[-1].partition('/')[2]
+
+        return RE_PATH_KEY.sub('{key}', '/' + sPath.strip('/'))[1:]
+
+    def request(self, sMethod, sPath, **kwargs):
+        """ Sends a request, waiting for the rate limiter before every
+        attempt and repeating it after network errors and answers with
+        RETRY_STATUSES.
+
+        :param sMethod: HTTP method.
+        :type sMethod: str
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :return: The response, or None if all attempts failed.
+        :rtype: requests.Response or None
+        """
+        sURL = self.get_url(sPath)
+        kwargs.setdefault('timeout', self.fTimeout)
+        oMetrics = metrics_get()
+        sEndpoint = f'http.{self.get_endpoint(sURL)}'
+        for iAttempt in range(self.iRetries + 1):
+            oMetrics.observe('http.wait', self.oBucket.acquire())
+            fPause = self.fBackoff * 2 ** iAttempt
+            try:
+                with oMetrics.timer(sEndpoint):
+                    oResponse = self.oSession.request(sMethod, sURL,
+                                                      **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                oMetrics.count('http.retries')
+                logging.warning(f'Request to {sURL} failed: {e}')
+            else:
+                if oResponse.status_code not in RETRY_STATUSES:
+                    return oResponse
+
+                sRetryAfter = oResponse.headers.get('Retry-After', '')
+                if sRetryAfter.isdigit():
+                    fPause = max(fPause, int(sRetryAfter))
+                oMetrics.count('http.retries')
+                logging.warning(f'Request to {sURL} got '
+                                f'{oResponse.status_code}')
+                oResponse.close()
+
+            if iAttempt < self.iRetries:
+                sleep(fPause)
+
+        oMetrics.count('errors.http')
+        logging.error(f'Request to {sURL} failed after '
+                      f'{self.iRetries + 1} attempts.')
+        return
+
+    def get(self, sPath, dParams=None, **kwargs):
+        """ Sends GET request.
+
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :param dParams: Parameters of the query.
+        :type dParams: dict or None
+        :return: The response, or None if all attempts failed.
+        :rtype: requests.Response or None
+        """
+        return self.request('GET', sPath, params=dParams, **kwargs)
+
+    def get_json(self, sPath, dParams=None):
+        """ Sends GET request and decodes the answer.
+
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :param dParams: Parameters of the query.
+        :type dParams: dict or None
+        :return: Decoded JSON, or None if the request failed.
+        :rtype: dict or list or None
+        """
+        return self.fetch_json('GET', sPath, dParams)
+
+    def post_json(self, sPath, oBody):
+        """ Sends POST request with JSON body and decodes the answer.
+
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :param oBody: The body of the request.
+        :type oBody: dict or list
+        :return: Decoded JSON, or None if the request failed.
+        :rtype: dict or list or None
+        """
+        return self.fetch_json('POST', sPath, oBody=oBody)
+
+    def fetch_json(self, sMethod, sPath, dParams=None, oBody=None):
+        """ Gets decoded JSON of the request. A fresh record of the cache is
+        returned without the network, an expired one is checked by a
+        conditional request and returned if the server answers 304 or
+        can't be reached.
+
+        :param sMethod: HTTP method.
+        :type sMethod: str
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :param dParams: Parameters of the query.
+        :type dParams: dict or None
+        :param oBody: The body of the request, it is sent as JSON.
+        :type oBody: dict or list or None
+        :return: Decoded JSON, or None if the request failed.
+        :rtype: dict or list or None
+        """
+        sURL = self.get_url(sPath)
+        if self.oCache is None:
+            if self.bOffline:
+                logging.warning(f'Offline mode without cache: {sURL}')
+                return
+
+            return self.decode(self.request(sMethod, sURL, params=dParams,
+                                            json=oBody))
+
+        sKey = http_cache_key(sMethod, sURL, dParams, oBody)
+        oEntry = self.oCache.get(sKey)
+        if oEntry is not None and (self.bOffline or not oEntry.expired):
+            metrics_get().count('cache.hit')
+            return self.loads(oEntry.body, sURL)
+        metrics_get().count('cache.miss' if oEntry is None else
+                            'cache.expired')
+        if self.bOffline:
+            logging.info(f'{sURL} is not in the cache.')
+            return
+
+        dHeaders = {}
+        if oEntry is not None and oEntry.etag:
+            dHeaders['If-None-Match'] = oEntry.etag
+        if oEntry is not None and oEntry.lastModified:
+            dHeaders['If-Modified-Since'] = oEntry.lastModified
+        oResponse = self.request(sMethod, sURL, params=dParams, json=oBody,
+                                 headers=dHeaders)
+        if oEntry is not None and (oResponse is None or
+                                   oResponse.status_code == 304):
+            if oResponse is not None:
+                metrics_get().count('cache.revalidated')
+                self.oCache.refresh(sKey)
+            return self.loads(oEntry.body, sURL)
+
+        oData = self.decode(oResponse)
+        if oData is not None:
+            self.oCache.put(sKey, sURL, oResponse.content,
+                            oResponse.headers.get('ETag'),
+                            oResponse.headers.get('Last-Modified'))
+
+        return oData
+
+    def iter_json(self, sPath, dParams=None, sField='results', dRest=None):
+        """ Sends GET request and yields the elements of a list of the
+        answer while the body is downloaded. The cache is used as by
+        fetch_json(), a response is put in the cache after it was read.
+
+        :param sPath: The path relative to the root of API, or a full URL.
+        :type sPath: str
+        :param dParams: Parameters of the query.
+        :type dParams: dict or None
+        :param sField: The name of the list in the answer.
+        :type sField: str
+        :param dRest: The dictionary that gets the other fields of the
+            answer.
+        :type dRest: dict or None
+        :return: Decoded elements of the list.
+        :rtype: Iterator
+        :raise ConnectionError: If the request failed or the answer isn't an
+            object with the list, the elements yielded before are not all.
+        """
+        sURL = self.get_url(sPath)
+        sKey = None
+        oEntry = None
+        if self.oCache is not None:
+            sKey = http_cache_key('GET', sURL, dParams)
+            oEntry = self.oCache.get(sKey)
+        if oEntry is not None and (self.bOffline or not oEntry.expired):
+            metrics_get().count('cache.hit')
+            yield from self.iter_body((oEntry.body,), sURL, sField, dRest)
+            return
+        if self.oCache is not None:
+            metrics_get().count('cache.miss' if oEntry is None else
+                                'cache.expired')
+        if self.bOffline:
+            raise ConnectionError(f'{sURL} is not in the cache.')
+
+        dHeaders = {}
+        if oEntry is not None and oEntry.etag:
+            dHeaders['If-None-Match'] = oEntry.etag
+        if oEntry is not None and oEntry.lastModified:
+            dHeaders['If-Modified-Since'] = oEntry.lastModified
+        oResponse = self.request('GET', sURL, params=dParams,
+                                 headers=dHeaders, stream=True)
+        if oEntry is not None and (oResponse is None or
+                                   oResponse.status_code == 304):
+            if oResponse is not None:
+                oResponse.close()
+                metrics_get().count('cache.revalidated')
+                self.oCache.refresh(sKey)
+            yield from self.iter_body((oEntry.body,), sURL, sField, dRest)
+            return
+        if oResponse is None:
+            raise ConnectionError(f'No answer from {sURL}.')
+
+        with oResponse:
+            if not oResponse.ok:
+                raise ConnectionError(f'Request to {oResponse.url} got '
+                                      f'{oResponse.status_code}')
+
+            lBody = [] if self.oCache is not None else None
+            yield from self.iter_body(
+                self.iter_chunks(oResponse, lBody), oResponse.url, sField,
+                dRest)
+
+        if lBody is not None:
+            self.oCache.put(sKey, sURL, b''.join(lBody),
+                            oResponse.headers.get('ETag'),
+                            oResponse.headers.get('Last-Modified'))
+
+    @staticmethod
+    def iter_chunks(oResponse, lBody=None):
+        """ Reads the body of a streamed response by chunks.
+
+        :param oResponse: The response.
+        :type oResponse: requests.Response
+        :param lBody: The list that gets the chunks for the cache.
+        :type lBody: list or None
+        :return: The chunks.
+        :rtype: Iterator[bytes]
+        """
+        for bChunk in oResponse.iter_content(CHUNK_SIZE):
+            if lBody is not None:
+                lBody.append(bChunk)
+            yield bChunk
+
+    @staticmethod
+    def iter_body(iChunks, sURL, sField, dRest):
+        """ Decodes the elements of the list, a wrong or broken body is a
+        failed answer.
+
+        :param iChunks: Chunks of the body.
+        :type iChunks: Iterable[bytes]
+        :param sURL: The URL of the request, for the log.
+        :type sURL: str
+        :param sField: The name of the list.
+        :type sField: str
+        :param dRest: The dictionary that gets the other fields.
+        :type dRest: dict or None
+        :return: Decoded elements of the list.
+        :rtype: Iterator
+        """
+        try:
+            yield from json_stream_items(iChunks, sField, dRest)
+        except requests.RequestException as e:
+            logging.error(f'Reading of {sURL} failed: {e}')
+            raise ConnectionError(f'Reading of {sURL} failed: {e}') from e
+        except ValueError as e:
+            logging.error(f'Wrong JSON from {sURL}: {e}')
+            raise ConnectionError(f'Wrong JSON from {sURL}: {e}') from e
+
+    @staticmethod
+    def loads(bBody, sURL):
+        """ Decodes JSON of a cached response.
+
+        :param bBody: The body of the response.
+        :type bBody: bytes
+        :param sURL: The URL of the request, for the log.
+        :type sURL: str
+        :return: Decoded JSON, or None.
+        :rtype: dict or list or None
+        """
+        try:
+            return json.loads(bBody)
+        except ValueError as e:
+            logging.error(f'Wrong JSON in the cache for {sURL}: {e}')
+            return
+
+    @staticmethod
+    def decode(oResponse):
+        """ Decodes JSON of the response if it is successful.
+
+        :param oResponse: The response.
+        :type oResponse: requests.Response or None
+        :return: Decoded JSON, or None.
+        :rtype: dict or list or None
+        """
+        if oResponse is None:
+            return
+
+        if not oResponse.ok:
+            logging.error(f'Request to {oResponse.url} got '
+                          f'{oResponse.status_code}')
+            return
+
+        try:
+            return oResponse.json()
+        except ValueError as e:
+            logging.error(f'Wrong JSON from {oResponse.url}: {e}')
+            return
+
+    def close(self):
+        """ Closes all connections of the pool and the cache. """
+        self.oSession.close()
+        if self.oCache is not None:
+            self.oCache.close()
+
+
+_oClient = None
+_oClientLock = threading.Lock()
+
+
+def gbif_get_client():
+    """ Gets the client that is shared by all functions working with GBIF.
+    It is created with default parameters at the first call.
+
+    :return: The client.
+    :rtype: GBIFClient
+    """
+    global _oClient
+    with _oClientLock:
+        if _oClient is None:
+            _oClient = GBIFClient()
+
+    return _oClient
+
+
+def gbif_set_client(oClient):
+    """ Replaces the shared client, for example, by a client with
+    parameters from the configuration file.
+
+    :param oClient: The new client.
+    :type oClient: GBIFClient
+    :return: The former client.
+    :rtype: GBIFClient or None
+    """
+    global _oClient
+    with _oClientLock:
+        oOld, _oClient = _oClient, oClient
+
+    return oOld
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,240 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module keeps what the gbif update knows about every gbif key, so a
+later update fetches only what has changed.
+
+For every key the table GBIFMeta keeps the taxon's ID, the hash of its
+normalized record and, for the taxa whose listings were fetched, the hash
+of the record with the number of descendants, the version of the gbif
+dataset and the time of the fetch. An update uses them so:
+    * a taxon fetched from the same dataset version not long ago isn't
+      requested at all;
+    * if the record and the number of descendants of a taxon didn't
+      change, its children and synonyms aren't requested;
+    * a record with the same hash isn't written again.
+
+Class:
+    Meta
+    GBIFMeta(oConnector, fMaxAge=2592000.0)
+
+Using:
+    oMeta = GBIFMeta(oConnector)
+    oMeta.load()
+    if not oMeta.is_current(sKey, sVersion):
+        ...
+        lAnswer = oMeta.filter_changed(lAnswer)
+        oMeta.save(dIDs, lAnswer)
+"""
+
+import hashlib
+import json
+import logging
+from collections import namedtuple
+from sqlite3 import DatabaseError
+from time import time
+
+# What is known about a gbif key.
+Meta = namedtuple('Meta', 'taxonID, recordHash, subtreeHash, '
+                          'datasetVersion, fetched')
+
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS GBIFMeta (
+    gbifKey        TEXT    PRIMARY KEY,
+    taxonID        INTEGER,
+    recordHash     TEXT,
+    subtreeHash    TEXT,
+    datasetVersion TEXT,
+    fetched        REAL
+);
+"""
+
+
+class GBIFMeta:
+    """ Fetch metadata of gbif keys kept in the database.
+
+    *Methods*
+        * load -- Reads all metadata.
+        * get_hash -- Counts the hash of a normalized record.
+        * is_current -- Checks if a taxon was fetched from the version.
+        * is_unchanged -- Checks if the listings of a taxon are the same.
+        * filter_changed -- Leaves the records that changed.
+        * save -- Writes metadata of the saved records.
+    """
+
+    def __init__(self, oConnector, fMaxAge=2592000.0):
+        """ Initiating a class, the table is created if it doesn't exist.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param fMaxAge: After so many seconds a taxon is fetched again even
+            if the dataset version is the same, 30 days by default.
+        :type fMaxAge: float
+        """
+        self.oConnector = oConnector
+        self.fMaxAge = fMaxAge
+        self.dMeta = {}
+        self.oConnector.execute_script(META_SCHEMA)
+
+    def load(self):
+        """ Reads all metadata with one query. The metadata are read from
+        the worker threads later, so the database isn't used by them.
+
+        :return: Number of the known keys.
+        :rtype: int
+        """
+        oCursor = self.oConnector.execute_query(
+            'SELECT gbifKey, taxonID, recordHash, subtreeHash, '
+            'datasetVersion, fetched FROM GBIFMeta;')
+        if oCursor:
+            self.dMeta = {sKey: Meta(*tRow) for sKey, *tRow in oCursor}
+
+        return len(self.dMeta)
+
+    @staticmethod
+    def get_hash(dAnswer, bSubtree=False):
+        """ Counts the hash of a normalized record.
+
+        :param dAnswer: The record as gbif_parser_taxon() makes it.
+        :type dAnswer: dict
+        :param bSubtree: If True, the number of descendants is counted too,
+            otherwise it is left out.
+        :type bSubtree: bool
+        :return: The hash.
+        :rtype: str
+        """
+        dRecord = dict(dAnswer)
+        if not bSubtree:
+            dRecord.pop('descendants', None)
+        sRecord = json.dumps(dRecord, sort_keys=True, default=str)
+
+        return hashlib.sha1(sRecord.encode('utf-8')).hexdigest()
+
+    def is_current(self, oKey, sVersion):
+        """ Checks if the taxon and its listings were fetched from the
+        dataset version and not too long ago.
+
+        :param oKey: A gbif key.
+        :type oKey: str or int
+        :param sVersion: The version of the dataset, None if unknown.
+        :type sVersion: str or None
+        :return: True if the taxon needn't be fetched.
+        :rtype: bool
+        """
+        oMeta = self.dMeta.get(str(oKey))
+        return bool(sVersion and oMeta and oMeta.subtreeHash and
+                    oMeta.datasetVersion == sVersion and
+                    time() - (oMeta.fetched or 0) < self.fMaxAge)
+
+    def is_unchanged(self, oKey, dInfo):
+        """ Checks if the record of the taxon with the number of its
+        descendants is the same, so its listings needn't be fetched.
+
+        :param oKey: A gbif key.
+        :type oKey: str or int
+        :param dInfo: The new normalized record of the taxon.
+        :type dInfo: dict or None
+        :return: True if the listings are the same.
+        :rtype: bool
+        """
+        oMeta = self.dMeta.get(str(oKey))
+        return bool(dInfo and oMeta and dInfo.get('descendants') is not None
+                    and oMeta.subtreeHash == self.get_hash(dInfo, True))
+
+    def filter_changed(self, lAnswer):
+        """ Leaves the records whose hashes differ from the saved ones.
+
+        :param lAnswer: Normalized records.
+        :type lAnswer: list[dict]
+        :return: The changed and new records.
+        :rtype: list[dict]
+        """
+        lChanged = []
+        for dAnswer in lAnswer:
+            oMeta = self.dMeta.get(str(dAnswer['id']))
+            if not oMeta or oMeta.recordHash != self.get_hash(dAnswer):
+                lChanged.append(dAnswer)
+
+        return lChanged
+
+    def save(self, dIDs, lAnswer, lFetched=(), sVersion=None):
+        """ Writes the hashes of the saved records, and for the taxa whose
+        listings were fetched also the version and the time. It is called
+        after the records are written, and the hash of a record that isn't
+        in dIDs is not changed, so a record that wasn't written is compared
+        with the old hash the next time.
+
+        :param dIDs: Dictionary of the gbif key and the taxon's ID of the
+            saved records.
+        :type dIDs: dict[str, int]
+        :param lAnswer: The saved records.
+        :type lAnswer: list[dict]
+        :param lFetched: Pairs of the gbif key and the record of the taxa
+            whose listings were fetched.
+        :type lFetched: Iterable[tuple[str, dict|None]]
+        :param sVersion: The version of the dataset.
+        :type sVersion: str or None
+        :return: True if the metadata are written.
+        :rtype: bool
+        """
+        fNow = time()
+        lRows = []
+        for dAnswer in lAnswer:
+            sRecord = str(dAnswer['id'])
+            if sRecord not in dIDs:
+                continue
+            oMeta = self.dMeta.get(sRecord) or Meta(None, None, None, None,
+                                                    None)
+            oMeta = oMeta._replace(taxonID=dIDs[sRecord],
+                                   recordHash=self.get_hash(dAnswer))
+            self.dMeta[sRecord] = oMeta
+            lRows.append((sRecord, *oMeta))
+        for sKey, dInfo in lFetched:
+            if not sKey or not dInfo:
+                continue
+            sKey = str(sKey)
+            oMeta = self.dMeta.get(sKey) or Meta(None, None, None, None,
+                                                 None)
+            sHash = self.get_hash(dInfo) if sKey in dIDs else oMeta.recordHash
+            oMeta = oMeta._replace(taxonID=dIDs.get(sKey, oMeta.taxonID),
+                                   recordHash=sHash,
+                                   subtreeHash=self.get_hash(dInfo, True),
+                                   datasetVersion=sVersion, fetched=fNow)
+            self.dMeta[sKey] = oMeta
+            lRows.append((sKey, *oMeta))
+
+        if not lRows:
+            return True
+
+        oConnection = self.oConnector.oConnector
+        try:
+            oConnection.executemany(
+                'INSERT OR REPLACE INTO GBIFMeta (gbifKey, taxonID, '
+                'recordHash, subtreeHash, datasetVersion, fetched) '
+                'VALUES (?, ?, ?, ?, ?, ?);', lRows)
+        except DatabaseError as e:
+            oConnection.rollback()
+            logging.exception(f'Cannot save metadata of gbif keys: {e}')
+            return False
+
+        oConnection.commit()
+        return True
+
+
+if __name__ == '__main__':
+    pass
@@ -20,65 +20,68 @@
 in gbif .
 
 function:
-    gbif_get_children(sGBIF_id)
+    gbif_get_children(sGBIF_id, oRegistry=None)
+    gbif_get_dataset_version(sDatasetKey=GBIF_BACKBONE)
     gbif_get_id_from_gbif(sName, sLevel='species')
-    gbif_get_id(oConnector, sName, sLevelEn)
-    gbif_get_many(sURL, sGBIF_id)
+    gbif_get_id(oConnector, iTaxonID, sName, sLevelEn)
+    gbif_get_many(sURL, sGBIF_id, oRegistry=None)
     gbif_get_status_id(oConnector, sStatus)
-    gbif_get_synonyms(sGBIF_id)
+    gbif_get_synonyms(sGBIF_id, oRegistry=None)
     gbif_get_taxon_info(sGBIF_id, sLevel='species')
-    gbif_get_update(oConnector, iLevel)
+    gbif_get_update(oConnector, iLevel, iWorkers=8)
     gbif_is_lichen(dTaxon)
+    gbif_iter_many(sURL, sGBIF_id, iLimit=PAGE_LIMIT, oRegistry=None)
     gbif_parser_name(sString)
+    gbif_parser_names(lStrings)
+    gbif_parser_taxa(lData)
     gbif_parser_taxon(dData)
     gbif_parsing_answer(oConnector, lAnswer, sType)
+    gbif_parsing_name(dResponse, sString)
     gbif_parsing_species(oConnector, dAnswer)
     gbif_save_species(oConnector, dAnswer, iLevel)
     gbif_update(oConnector, dAnswer, iTaxonID)
 """
 
+import logging
 import re
-import requests
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full, Queue
 
-from pygbif import species
+from mli.lib.gbif_client import gbif_get_client
+from mli.lib.lichen_groups import lichen_get_groups
+from mli.lib.name_parser import name_split
 from mli.lib.sql import SQL
 from mli.lib.str import str_sep_name_taxon
 
+# ID of GBIF in DBSources table.
+GBIF_SOURCE_ID = 12
+
+# Key of GBIF Backbone Taxonomy dataset.
+GBIF_BACKBONE = 'd7dddbf4-2cf0-4f39-9b2a-bb099caae36c'
+
+# Statuses of gbif that are written differently in TaxonStatuses table.
+GBIF_STATUSES = {'doubtful': 'doubful'}
+
+# Number of records requested by one page.
+PAGE_LIMIT = 1000
+
+# Number of names sent to the name parser by one request.
+NAME_BATCH = 100
+
+# Names that were already parsed.
+_dParsedNames = {}
+
 
 def gbif_is_lichen(dTaxon):
-    """ Checks if the taxon is a lichen.
+    """ Checks if the taxon is a lichen by the shared LichenGroups.
 
     :param dTaxon: Filed 'result' of answer from gbif.
     :type dTaxon: dict
     :return: True if taxon is lichen, and False if opposite.
     :rtype: bool
     """
-    if 'class' in dTaxon and (dTaxon['class'] == 'Lecanoromycetes' or
-                              dTaxon['class'] == 'Arthoniomycetes' or
-                              dTaxon['class'] == 'Lichinomycetes'):
-        return True
-
-    if 'order' in dTaxon and (dTaxon['order'] == 'Pyrenulales' or
-                              dTaxon['order'] == 'Verrucariales'):
-        return True
-
-    if 'family' in dTaxon and (dTaxon['family'] == 'Abrothallaceae' or
-                               dTaxon['family'] == 'Aphanopsidaceae' or
-                               dTaxon['family'] == 'Arthopyreniaceae' or
-                               dTaxon['family'] == 'Coniocybaceae' or
-                               dTaxon['family'] == 'Naetrocymbaceae' or
-                               dTaxon['family'] == 'Sphinctrinaceae' or
-                               dTaxon['family'] == 'Strigulaceae' or
-                               dTaxon['family'] == 'Thelocarpaceae'):
-        return True
-
-    if 'genus' in dTaxon and (dTaxon['genus'] == 'Dictyonema' or
-                              dTaxon['genus'] == 'Lichenomphalia' or
-                              dTaxon['genus'] == 'Multiclavula'):
-        return True
-
-    return False
+    return lichen_get_groups().is_lichen(dTaxon)
 
 
 def gbif_get_id_from_gbif(sName, sLevel='species'):
@@ -95,21 +98,18 @@ def gbif_get_id_from_gbif(sName, sLevel='species'):
         return
 
     sLevel = sLevel.upper()
+    sCanonical = name_split(str_sep_name_taxon(sName))[0]
     PARAMS = {
-        'q': sName,
+        'q': sCanonical,
     }
-    URL = 'https://api.gbif.org/v1/species/suggest'
-    oSession = requests.Session()
-    oRequest = oSession.get(url=URL, params=PARAMS)
-    lData = oRequest.json()
-    sleep(0.5)
+    lData = gbif_get_client().get_json('species/suggest', PARAMS)
     if not lData:
         return
 
     for dData in lData:
         if gbif_is_lichen(dData) and dData['rank'] == sLevel and \
-                dData['canonicalName'] == str_sep_name_taxon(sName)[0]:
-            return lData[0]['key']
+                dData.get('canonicalName') == sCanonical:
+            return dData['key']
 
     return
 
@@ -128,84 +128,175 @@ def gbif_get_taxon_info(sGBIF_id, sLevel='species'):
         return
 
     sLevel = sLevel.upper()
-    URL = f'https://api.gbif.org/v1/species/{sGBIF_id}'
-    oSession = requests.Session()
-    oRequest = oSession.get(url=URL)
-    dData = oRequest.json()
-    sleep(0.5)
-    if dData['rank'] == sLevel:
-        return gbif_parser_taxon(dData)
+    dData = gbif_get_client().get_json(f'species/{sGBIF_id}')
+    if dData and dData['rank'] == sLevel:
+        return gbif_parser_taxa([dData])[0]
 
     return
 
 
-def gbif_get_synonyms(sGBIF_id):
+def gbif_get_dataset_version(sDatasetKey=GBIF_BACKBONE):
+    """ Gets the version of a dataset, it changes when the dataset is
+    published again.
+
+    :param sDatasetKey: A key of the dataset in gbif.
+    :type sDatasetKey: str
+    :return: The date of publishing, or None if it isn't known.
+    :rtype: str or None
+    """
+    dData = gbif_get_client().get_json(f'dataset/{sDatasetKey}')
+    if not isinstance(dData, dict):
+        return
+
+    return dData.get('pubDate') or dData.get('modified')
+
+
+def gbif_get_synonyms(sGBIF_id, oRegistry=None):
     """ Generates an api link for obtaining synonyms from the server and
         returns a normalized response.
 
     :param sGBIF_id: A key ID of taxon in gbif.
     :type: str
+    :param oRegistry: The keys seen by the update, the known taxa are
+        skipped.
+    :type oRegistry: GBIFRegistry or None
     :return: A normalized response.
     :rtype: list[dict[str, bool, str, str, str, str, str, int]|None]
     """
-    sURL = f'https://api.gbif.org/v1/species/{sGBIF_id}/synonyms'
-    return gbif_get_many(sURL, sGBIF_id)
+    sURL = f'species/{sGBIF_id}/synonyms'
+    return gbif_get_many(sURL, sGBIF_id, oRegistry)
 
 
-def gbif_get_children(sGBIF_id):
+def gbif_get_children(sGBIF_id, oRegistry=None):
     """ Generates an api link for obtaining children from the server and
         returns a normalized response.
 
     :param sGBIF_id: A key ID of taxon in gbif.
     :type: str
+    :param oRegistry: The keys seen by the update, the known taxa are
+        skipped.
+    :type oRegistry: GBIFRegistry or None
     :return: A normalized response.
     :rtype: list[dict[str, bool, str, str, str, str, str, int]|None]
     """
-    sURL = f'https://api.gbif.org/v1/species/{sGBIF_id}/children'
-    return gbif_get_many(sURL, sGBIF_id)
+    sURL = f'species/{sGBIF_id}/children'
+    return gbif_get_many(sURL, sGBIF_id, oRegistry)
 
 
-def gbif_get_many(sURL, sGBIF_id):
+def gbif_get_many(sURL, sGBIF_id, oRegistry=None):
     """ Generates an api link for obtaining children from the server and
         returns a normalized response.
 
-    :param sURL: An URL for sending to gbif server.
+    :param sURL: A path of API or an URL for sending to gbif server.
     :type sURL: str
     :param sGBIF_id: A key ID of taxon in gbif.
     :type: str
+    :param oRegistry: The keys seen by the update, the known taxa are
+        skipped.
+    :type oRegistry: GBIFRegistry or None
     :return: A normalized response.
     :rtype: list[dict[str, bool, str, str, str, str, str, int]|None]
     """
     if not sGBIF_id:
         return
 
-    bEndOfRecords = False
-    iOffset = 0
-    lAnswer = []
-    oSession = requests.Session()
-    while not bEndOfRecords:
-        PARAMS = {
-            'limit': 1000,
-            'offset': iOffset
-        }
-        oRequest = oSession.get(url=sURL, params=PARAMS)
-        dJSON = oRequest.json()
-        sleep(0.5)
-        if type(dJSON) == str:
-            return
-
-        bEndOfRecords = dJSON['endOfRecords']
-        iOffset = iOffset + 1000
-        lData = dJSON['results']
-        if not lData and bEndOfRecords:
-            return lAnswer
-        if not lData:
-            return
-
-        for dData in lData:
-            lAnswer.append(gbif_parser_taxon(dData))
-
-    return lAnswer
+    try:
+        return list(gbif_iter_many(sURL, sGBIF_id, oRegistry=oRegistry))
+    except ConnectionError:
+        return
+
+
+def gbif_iter_many(sURL, sGBIF_id, iLimit=PAGE_LIMIT, oRegistry=None):
+    """ Pages through a list of the server and yields normalized records.
+    The pages are read in the background one after another and their
+    records are decoded while they are downloaded, so the names of the
+    first records are parsed while the rest of the page is downloaded. The
+    records wait in a short queue, which keeps the memory small for any
+    page.
+
+    :param sURL: A path of API or an URL for sending to gbif server.
+    :type sURL: str
+    :param sGBIF_id: A key ID of taxon in gbif.
+    :type: str
+    :param iLimit: Number of records requested by one page.
+    :type iLimit: int
+    :param oRegistry: The keys seen by the update, the records of the known
+        taxa are not normalized and not yielded.
+    :type oRegistry: GBIFRegistry or None
+    :return: Normalized records one by one.
+    :rtype: Iterator[dict[str, bool, str, str, str, str, str, int]]
+    :raise ConnectionError: If a page was not received, the records yielded
+        before it are not the full list.
+    """
+    if not sGBIF_id:
+        return
+
+    oClient = gbif_get_client()
+    oQueue = Queue(NAME_BATCH)
+    oStop = threading.Event()
+
+    def put(oItem):
+        while not oStop.is_set():
+            try:
+                oQueue.put(oItem, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def read():
+        iOffset = 0
+        try:
+            while True:
+                dRest = {}
+                iCount = 0
+                for dData in oClient.iter_json(
+                        sURL, {'limit': iLimit, 'offset': iOffset},
+                        'results', dRest):
+                    if not put(dData):
+                        return
+                    iCount += 1
+                # The end of the page, the records of it are parsed.
+                if not put(iCount):
+                    return
+                if dRest.get('endOfRecords', True):
+                    break
+                if not iCount:
+                    raise ConnectionError(f'Empty page of {sURL} at '
+                                          f'{iOffset}.')
+                iOffset = iOffset + iLimit
+        except Exception as e:
+            put(e)
+        else:
+            put(None)
+
+    iSkipped = 0
+    with ThreadPoolExecutor(max_workers=1) as oPool:
+        oPool.submit(read)
+        try:
+            lData = []
+            while True:
+                oItem = oQueue.get()
+                if isinstance(oItem, dict):
+                    if oRegistry and oRegistry.is_known(oItem['key']):
+                        iSkipped += 1
+                    else:
+                        lData.append(oItem)
+                    # The names are parsed by batches, a batch is full or
+                    # its page is read.
+                    if len(lData) < NAME_BATCH:
+                        continue
+                if lData:
+                    yield from gbif_parser_taxa(lData)
+                    lData = []
+                if isinstance(oItem, Exception):
+                    raise oItem
+                if oItem is None:
+                    break
+        finally:
+            oStop.set()
+            if oRegistry:
+                oRegistry.count('parsed', iSkipped)
 
 
 def gbif_parser_taxon(dData):
@@ -230,11 +321,29 @@ def gbif_parser_taxon(dData):
                'parent': sParent,
                'name': sName,
                'author': sAuthor,
-               'year': iYear}
+               'year': iYear,
+               'descendants': dData.get('numDescendants')}
 
     return dAnswer
 
 
+def gbif_parser_taxa(lData):
+    """ Selects the necessary information from a page of the server
+    response. All names of the page are parsed by one batch beforehand.
+
+    :param lData: Records of taxa from the server.
+    :type lData: list[dict]
+    :return: Selections from the records.
+    :rtype: list[dict[str, bool, str, str, str, str, str, int]]
+    """
+    lNames = [dData['scientificName'] for dData in lData]
+    lNames.extend(dData['accepted'] for dData in lData
+                  if dData.get('synonym') and dData.get('accepted'))
+    gbif_parser_names(lNames)
+
+    return [gbif_parser_taxon(dData) for dData in lData]
+
+
 def gbif_parser_name(sString):
     """ Parsing a name of the taxon separating the canonical name from the
     name of the author and year, if possible.
@@ -242,38 +351,78 @@ def gbif_parser_name(sString):
     :param sString: A string with a name of the taxon.
     :type sString: str
     :return: A canonical name, an author name and a naming year of the taxon.
-    :rtype: list[str, str, int]
+    :rtype: tuple[str, str, int]
     """
-    lResponse = species.name_parser([sString])
-    sName = ''
-    sAuthor = ''
-    iYear = None
-    for dResponse in lResponse:
-        if 'canonicalName' in dResponse:
-            sName = dResponse['canonicalName']
-        else:
-            sName = dResponse['scientificName']
-        if 'bracketAuthorship' in dResponse:
-            sAuthor = f'({dResponse["bracketAuthorship"]}) '
-        if 'authorship' in dResponse:
-            sAuthor = f'{sAuthor}{dResponse["authorship"]}'
-        if 'year' in dResponse and type(dResponse['year']) == int:
-            iYear = int(dResponse['year'])
+    return gbif_parser_names([sString])[sString]
+
 
-        if not sAuthor:
-            sAuthor = None
+def gbif_parser_names(lStrings):
+    """ Parsing names of taxa. The names which were not parsed before are
+    sent to the server by batches of NAME_BATCH names, the answers are
+    remembered, so a name is sent only once. If the server doesn't answer,
+    for example in the offline mode, the names are parsed locally.
+
+    :param lStrings: Strings with names of taxa.
+    :type lStrings: list[str]
+    :return: Dictionary of the string and its canonical name, author name
+        and naming year.
+    :rtype: dict[str, tuple[str, str, int]]
+    """
+    lNew = list(dict.fromkeys(sString for sString in lStrings
+                              if sString not in _dParsedNames))
+    oClient = gbif_get_client()
+    for iStart in range(0, len(lNew), NAME_BATCH):
+        lBatch = lNew[iStart:iStart + NAME_BATCH]
+        lResponse = oClient.post_json('parser/name', lBatch)
+        if not isinstance(lResponse, list) or \
+                len(lResponse) != len(lBatch):
+            # The answer can't be matched with the names, so they are
+            # parsed locally and will be asked again.
+            continue
+
+        for sString, dResponse in zip(lBatch, lResponse):
+            _dParsedNames[sString] = gbif_parsing_name(dResponse, sString)
+
+    return {sString: _dParsedNames.get(sString) or name_split(sString)
+            for sString in lStrings}
+
+
+def gbif_parsing_name(dResponse, sString):
+    """ Takes a canonical name, an author name and a naming year from the
+    answer of the name parser.
+
+    :param dResponse: The answer for one name.
+    :type dResponse: dict
+    :param sString: The parsed string, it is used if the answer has no name.
+    :type sString: str
+    :return: A canonical name, an author name and a naming year of the taxon.
+    :rtype: tuple[str, str, int]
+    """
+    if not isinstance(dResponse, dict):
+        return sString, None, None
 
-        sleep(0.7)
+    sName = dResponse.get('canonicalName') or \
+        dResponse.get('scientificName') or sString
+    sAuthor = ''
+    iYear = None
+    if 'bracketAuthorship' in dResponse:
+        sAuthor = f'({dResponse["bracketAuthorship"]}) '
+    if 'authorship' in dResponse:
+        sAuthor = f'{sAuthor}{dResponse["authorship"]}'
+    if 'year' in dResponse and str(dResponse['year']).isdigit():
+        iYear = int(dResponse['year'])
 
-        return sName, sAuthor, iYear
+    return sName, sAuthor or None, iYear
 
 
-def gbif_get_id(oConnector, sName, sLevelEn):
+def gbif_get_id(oConnector, iTaxonID, sName, sLevelEn):
     """ Checks if the taxon's id exists in the database, and if it doesn't,
     it gets it from the site.
 
     :param oConnector: An instance of the sqlite database api class.
     :type oConnector: SQL
+    :param iTaxonID: ID of the taxon in the database.
+    :type iTaxonID: int
     :param sName: A name of the taxon.
     :type sName: str
     :param sLevelEn: A name of the taxon rank in english language.
@@ -281,9 +430,9 @@ def gbif_get_id(oConnector, sName, sLevelEn):
     :return: ID taxon in gbif.
     :rtype: int
     """
-    sGBIF_id = oConnector.sql_get_id('DBIndexes', 'taxon_index',
-                                     'id_taxon, id_source',
-                                     (sName, 12,))
+    sGBIF_id = oConnector.sql_get_id('DBIndexes', 'taxonIndex',
+                                     'taxonID, sourceID',
+                                     (iTaxonID, GBIF_SOURCE_ID,))
     if not sGBIF_id:
         sGBIF_id = gbif_get_id_from_gbif(sName, sLevelEn)
 
@@ -304,53 +453,28 @@ def gbif_parsing_answer(oConnector, lAnswer, sType):
     """
     if lAnswer:
         for dAnswer in lAnswer:
-            print(f'{sType}: {dAnswer["parent"]} - {dAnswer["name"]}')
+            logging.info(f'{sType}: {dAnswer["parent"]} - '
+                         f'{dAnswer["name"]}')
             gbif_parsing_species(oConnector, dAnswer)
 
 
-def gbif_get_update(oConnector, iLevel):
+def gbif_get_update(oConnector, iLevel, iWorkers=8):
     """ Allows you to select all names from the database by level, start
     getting data from gbif and enter information into the database.
 
+    The data of several taxa is requested in parallel, see GBIFSync.
+
     :param oConnector: An instance of the sqlite database api class.
     :type oConnector: SQL
     :param iLevel: ID of a rank in database.
     :type iLevel: int
+    :param iWorkers: Number of taxa requested at the same time.
+    :type iWorkers: int
     :return: None
     """
-    lRows = oConnector.get_all_by_level(iLevel)
-    sLevelEn = oConnector.get_level_name('level_en_name', iLevel)[0][0]
-    if lRows:
-        for sRow in lRows:
-            bBreak = oConnector.sql_get_id('UpdateTaxonGBIF',
-                                           'id', 'id_taxon_sp', (sRow[0],))
-            if bBreak:
-                continue
-
-            sGBIF_id = gbif_get_id(oConnector, sRow[1], sLevelEn)
-
-            dAnswer = gbif_get_taxon_info(sGBIF_id, sLevelEn)
-            if dAnswer:
-                print(f'Name: {sRow[0]}\t{sRow[1]}')
-                gbif_parsing_species(oConnector, dAnswer)
-
-            lAnswer = gbif_get_children(sGBIF_id)
-            gbif_parsing_answer(oConnector, lAnswer, 'Children')
+    from mli.lib.gbif_sync import GBIFSync
 
-            oConnector.insert_row('UpdateTaxonGBIF', 'id_taxon_sp', (sRow[0],))
-
-        lRows = oConnector.get_all_by_level(iLevel)
-        for sRow in lRows:
-            bBreak = oConnector.sql_get_id('UpdateTaxonGBIF',
-                                           'id', 'id_taxon_sn', (sRow[0],))
-            if bBreak:
-                continue
-
-            sGBIF_id = gbif_get_id(oConnector, sRow[1], sLevelEn)
-            lAnswer = gbif_get_synonyms(sGBIF_id)
-
-            gbif_parsing_answer(oConnector, lAnswer, 'Synonym')
-            oConnector.insert_row('UpdateTaxonGBIF', 'id_taxon_sn', (sRow[0],))
+    GBIFSync(oConnector, iWorkers).update(iLevel)
 
 
 def gbif_parsing_species(oConnector, dAnswer):
@@ -360,7 +484,8 @@ def gbif_parsing_species(oConnector, dAnswer):
     :type oConnector: SQL
     :param dAnswer: A dictionary with information about the taxon.
     :type dAnswer: dict[str, bool, str, str, str, str, str, int]
-    :return: None
+    :return: The taxon's ID in database, or None if the taxon is skipped.
+    :rtype: int or None
     """
     # Exclude taxa with type name SH1169675.09FU
     if bool(re.search(r'\d', dAnswer['name'])):
@@ -369,26 +494,32 @@ def gbif_parsing_species(oConnector, dAnswer):
     if dAnswer['rank'] == 'UNRANKED':
         return
 
-    iLevel = oConnector.get_level_id('level_en_name',
-                                     (dAnswer['rank'].lower(),))[0][0]
+    iLevel = oConnector.get_rank_id('rankName', dAnswer['rank'].lower())
+    if not iLevel:
+        return
 
-    bContinue = oConnector.sql_get_id('Taxon', 'id_taxon',
-                                      'id_level, taxon_lat_name, author',
-                                      (iLevel, dAnswer['name'],
-                                       dAnswer['author'],))
-    if not bContinue:
-        bContinue = gbif_save_species(oConnector, dAnswer, iLevel)
+    oCursor = oConnector.execute_query(
+        'SELECT taxonID FROM Taxa WHERE rankID=? AND canonicalName=? '
+        "AND IFNULL(authorship, '')=?;",
+        (iLevel, dAnswer['name'], dAnswer['author'] or '',))
+    tRow = oCursor.fetchone() if oCursor else None
+    if not tRow:
+        iTaxonID = gbif_save_species(oConnector, dAnswer, iLevel)
     else:
-        gbif_update(oConnector, dAnswer, bContinue)
-
-    bID = oConnector.sql_get_id('DBIndexes', 'id_db_index',
-                                'id_taxon', (bContinue,))
-    if not bID:
-        tValues = (bContinue, 12, dAnswer['id'],)
+        iTaxonID = tRow[0]
+        gbif_update(oConnector, dAnswer, iTaxonID)
+
+    bID = oConnector.sql_get_id('DBIndexes', 'dbIndexID',
+                                'taxonID, sourceID',
+                                (iTaxonID, GBIF_SOURCE_ID,))
+    if iTaxonID and not bID:
+        tValues = (iTaxonID, GBIF_SOURCE_ID, str(dAnswer['id']),)
         oConnector.insert_row('DBIndexes',
-                              'id_taxon, id_source, taxon_index',
+                              'taxonID, sourceID, taxonIndex',
                               tValues)
 
+    return iTaxonID
+
 
 def gbif_save_species(oConnector, dAnswer, iLevel):
     """ Saving information about the taxon in database.
@@ -402,16 +533,23 @@ def gbif_save_species(oConnector, dAnswer, iLevel):
     :return: The taxon's ID in database.
     :rtype: int or bool
     """
-    print(f'Insert row - {dAnswer["name"]}')
+    logging.info(f'Insert row - {dAnswer["name"]}')
     iStatus = gbif_get_status_id(oConnector, dAnswer['tax_status'])
     iParent = oConnector.get_id_by_name_status((dAnswer['parent'], 1,))
+    sSciName = dAnswer['name']
+    if dAnswer['author']:
+        sSciName = f'{sSciName} {dAnswer["author"]}'
 
-    sColumns = 'id_level, id_main_taxon, ' \
-               'taxon_lat_name, author, year, id_status'
-    tValues = (iLevel, iParent, dAnswer['name'],
-               dAnswer['author'], dAnswer['year'], iStatus,)
+    sColumns = 'scientificName, canonicalName, authorship, ' \
+               'yearPublishing, rankID'
+    tValues = (sSciName, dAnswer['name'], dAnswer['author'],
+               dAnswer['year'], iLevel,)
+    iTaxonID = oConnector.insert_row('Taxa', sColumns, tValues)
+    if iTaxonID:
+        oConnector.insert_row('TaxonTree', 'taxonID, mainTaxonID, statusID',
+                              (iTaxonID, iParent or None, iStatus or None,))
 
-    return oConnector.insert_row('Taxon', sColumns, tValues)
+    return iTaxonID
 
 
 def gbif_get_status_id(oConnector, sStatus):
@@ -425,8 +563,8 @@ def gbif_get_status_id(oConnector, sStatus):
     :rtype: int or bool
     """
     sStatus = sStatus.lower().replace('_', ' ')
-    return oConnector.sql_get_id('TaxonStatus', 'id_status',
-                                 'status_name', (sStatus,))
+    sStatus = GBIF_STATUSES.get(sStatus, sStatus)
+    return oConnector.get_status_id(sStatus, 'statusName')
 
 
 def gbif_update(oConnector, dAnswer, iTaxonID):
@@ -441,21 +579,20 @@ def gbif_update(oConnector, dAnswer, iTaxonID):
     :return: None
     """
     sName = dAnswer['name']
-    lContinue = oConnector.sql_get_values('Taxon',
-                                          'author, year, id_status, '
-                                          'id_main_taxon',
-                                          'taxon_lat_name', (sName,))
+    lContinue = oConnector.sql_get_values('Taxa',
+                                          'authorship, yearPublishing',
+                                          'taxonID', (iTaxonID,))
 
     if not lContinue[0][0] and dAnswer['author'] and \
             dAnswer['tax_status'] == 'ACCEPTED':
-        oConnector.update('Taxon', 'author', 'id_taxon',
+        oConnector.update('Taxa', 'authorship', 'taxonID',
                           (dAnswer['author'], iTaxonID,))
-        print(f'Enter author: {sName} - {dAnswer["author"]}')
+        logging.info(f'Enter author: {sName} - {dAnswer["author"]}')
 
     if dAnswer['year'] and not lContinue[0][1]:
-        oConnector.update('Taxon', 'year', 'id_taxon',
+        oConnector.update('Taxa', 'yearPublishing', 'taxonID',
                           (dAnswer['year'], iTaxonID,))
-        print(f'Enter year: {sName} - {dAnswer["year"]}')
+        logging.info(f'Enter year: {sName} - {dAnswer["year"]}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,238 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module keeps the gbif keys which were seen by one update, so every
+key is requested and written at most once per run.
+
+A key comes to the update in several ways: as a taxon of the rank, as a
+child of its parent, as a synonym, and from the lookup by name. The
+registry is filled with the keys of DBIndexes at the start, then it
+remembers the lookups, the listings already requested and the keys already
+written. The requests and the writes which were not made are counted.
+
+The registry is used from the worker threads, so it is guarded by a lock.
+
+Class:
+    GBIFRegistry()
+
+Using:
+    oRegistry = GBIFRegistry()
+    dKeys = oRegistry.load(oConnector)
+    if oRegistry.claim(sKey, 'children'):
+        lChildren = gbif_get_children(sKey, oRegistry)
+    lAnswer = oRegistry.filter_new(lChildren)
+    oRegistry.add_saved(gbif_upsert(oConnector, lAnswer))
+    print(oRegistry.get_stats())
+"""
+
+import threading
+
+from mli.lib.gbif_parser import GBIF_SOURCE_ID, gbif_get_id_from_gbif
+
+# Names of the counters of saved requests and writes.
+REGISTRY_COUNTERS = ('seeded', 'lookups', 'info', 'lists', 'parsed',
+                     'written', 'fresh', 'subtrees', 'unchanged')
+
+
+class GBIFRegistry:
+    """ The gbif keys seen by one update. """
+
+    def __init__(self):
+        """ Initializes an empty registry. """
+        self.oLock = threading.Lock()
+        self.dKeys = {}
+        self.setKnown = set()
+        self.setSaved = set()
+        self.setClaims = set()
+        self.dLookups = {}
+        self.dCounters = dict.fromkeys(REGISTRY_COUNTERS, 0)
+
+    def count(self, sCounter, iCount=1):
+        """ Adds to a counter of saved requests or writes.
+
+        :param sCounter: A name of the counter from REGISTRY_COUNTERS.
+        :type sCounter: str
+        :param iCount: What is added.
+        :type iCount: int
+        :return: None
+        """
+        with self.oLock:
+            self.dCounters[sCounter] += iCount
+
+    def load(self, oConnector):
+        """ Reads the known gbif keys of the taxa with one query.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :return: Dictionary of the taxon's ID in database and its gbif key.
+        :rtype: dict[int, str]
+        """
+        oCursor = oConnector.execute_query(
+            'SELECT taxonID, taxonIndex FROM DBIndexes WHERE sourceID=?;',
+            (GBIF_SOURCE_ID,))
+        if oCursor:
+            with self.oLock:
+                self.dKeys = {iID: str(sKey)
+                              for iID, sKey in oCursor.fetchall()}
+                self.setKnown = set(self.dKeys.values())
+                self.dCounters['seeded'] = len(self.setKnown)
+
+        return self.dKeys
+
+    def lookup(self, iTaxonID, sName, sRank):
+        """ Gets the gbif key of the taxon. The key is asked from gbif only
+        if it isn't in DBIndexes and the name wasn't looked up before.
+
+        :param iTaxonID: ID of the taxon in the database.
+        :type iTaxonID: int
+        :param sName: A name of the taxon.
+        :type sName: str
+        :param sRank: A name of the taxon rank in english language.
+        :type sRank: str
+        :return: The gbif key or None.
+        :rtype: str or None
+        """
+        with self.oLock:
+            sKey = self.dKeys.get(iTaxonID) or \
+                self.dLookups.get((sName, sRank))
+            if sKey:
+                self.dCounters['lookups'] += 1
+                return sKey
+
+        sKey = gbif_get_id_from_gbif(sName, sRank)
+        if not sKey:
+            return
+
+        sKey = str(sKey)
+        with self.oLock:
+            self.dLookups[(sName, sRank)] = sKey
+
+        return sKey
+
+    def is_known(self, oKey):
+        """ Checks if the key is in the database or was written by the run.
+
+        :param oKey: A gbif key.
+        :type oKey: str or int
+        :return: True if the key is known.
+        :rtype: bool
+        """
+        sKey = str(oKey)
+        with self.oLock:
+            return sKey in self.setKnown or sKey in self.setSaved
+
+    def is_saved(self, oKey, sCounter=None):
+        """ Checks if the key was written by the run.
+
+        :param oKey: A gbif key.
+        :type oKey: str or int
+        :param sCounter: A counter which is increased if the key was written.
+        :type sCounter: str or None
+        :return: True if the key was written.
+        :rtype: bool
+        """
+        with self.oLock:
+            bSaved = str(oKey) in self.setSaved
+            if bSaved and sCounter:
+                self.dCounters[sCounter] += 1
+
+        return bSaved
+
+    def claim(self, oKey, sList):
+        """ Claims a listing of the key, for example 'children' or
+        'synonyms'. Only the first claim of the run is successful.
+
+        :param oKey: A gbif key.
+        :type oKey: str or int
+        :param sList: A name of the listing.
+        :type sList: str
+        :return: True if the listing should be requested.
+        :rtype: bool
+        """
+        tClaim = (str(oKey), sList)
+        with self.oLock:
+            if tClaim in self.setClaims:
+                self.dCounters['lists'] += 1
+                return False
+
+            self.setClaims.add(tClaim)
+            return True
+
+    def release(self, oKey):
+        """ Takes back the claims of the key, its listings were not received
+        or not saved and will be requested again.
+
+        :param oKey: A gbif key.
+        :type oKey: str or int
+        :return: None
+        """
+        sKey = str(oKey)
+        with self.oLock:
+            self.setClaims = {tClaim for tClaim in self.setClaims
+                              if tClaim[0] != sKey}
+
+    def filter_new(self, lAnswer):
+        """ Leaves the records which were not written by the run, each key
+        once.
+
+        :param lAnswer: Normalized records of taxa, None is skipped.
+        :type lAnswer: list[dict|None]
+        :return: The records to write.
+        :rtype: list[dict]
+        """
+        lNew = []
+        setPage = set()
+        with self.oLock:
+            for dAnswer in lAnswer:
+                if not dAnswer:
+                    continue
+                sKey = str(dAnswer['id'])
+                if sKey in self.setSaved or sKey in setPage:
+                    self.dCounters['written'] += 1
+                    continue
+                setPage.add(sKey)
+                lNew.append(dAnswer)
+
+        return lNew
+
+    def add_saved(self, lKeys):
+        """ Remembers the written keys.
+
+        :param lKeys: The gbif keys.
+        :type lKeys: Iterable[str|int]
+        :return: None
+        """
+        with self.oLock:
+            self.setSaved.update(str(oKey) for oKey in lKeys or ())
+
+    def get_stats(self):
+        """ Gets the counters, 'requests' is the sum of the saved requests.
+
+        :return: Dictionary of the counter name and its value.
+        :rtype: dict[str, int]
+        """
+        with self.oLock:
+            dStats = dict(self.dCounters)
+
+        dStats['requests'] = dStats['lookups'] + dStats['info'] + \
+            dStats['lists']
+        return dStats
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,276 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module updates taxa of the database from gbif concurrently.
+
+The network requests of several taxa (the key lookup, the taxon info, the
+children and the synonyms) are made by a pool of threads at the same time,
+the shared gbif client holds one rate limit for all of them. The answers
+are written to the database by the calling thread only, so the connection
+is never used by two threads. The work goes through a Pipeline: the taxa
+fetched meanwhile are written by batches, one transaction for a batch.
+
+The taxa of a rank are kept in a JobQueue named 'gbif:<rank ID>'. An
+interrupted update continues from the jobs that are not done, and a failed
+taxon is tried again later with a growing pause.
+
+Every update has a GBIFRegistry of the gbif keys, so a key reached as a
+taxon of the rank, a child or a synonym is requested and written once.
+
+Class:
+    GBIFSync(oConnector, iWorkers=8, oClient=None)
+"""
+
+import logging
+import os
+
+from mli.lib.gbif_client import gbif_get_client, gbif_set_client
+from mli.lib.gbif_meta import GBIFMeta
+from mli.lib.gbif_parser import gbif_get_children, \
+    gbif_get_dataset_version, gbif_get_synonyms, gbif_get_taxon_info
+from mli.lib.gbif_registry import GBIFRegistry
+from mli.lib.gbif_upsert import gbif_upsert
+from mli.lib.job_queue import JobQueue
+from mli.lib.metrics import metrics_get
+from mli.lib.pipeline import Pipeline
+
+
+class GBIFSync:
+    """ Fetches the data of the taxa from gbif in several threads and saves
+    it in the database from one thread. """
+
+    def __init__(self, oConnector, iWorkers=8, oClient=None):
+        """ Initializes the crawler.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param iWorkers: Number of taxa requested at the same time.
+        :type iWorkers: int
+        :param oClient: The gbif client, by default the shared client.
+        :type oClient: GBIFClient or None
+        """
+        self.oConnector = oConnector
+        self.iWorkers = max(1, iWorkers)
+        self.oClient = oClient
+        # How many taxa may wait for saving, the memory stays bounded.
+        self.iWindow = self.iWorkers * 2
+        # The longest wait of a fetched taxon for its batch in seconds.
+        self.fInterval = 0.5
+        self.oRegistry = GBIFRegistry()
+        # The metadata of the keys, it is read by update().
+        self.oMeta = None
+        self.sVersion = None
+        self.bFull = True
+
+    def load_keys(self):
+        """ Starts a new registry of the keys from the known gbif keys of
+        the taxa.
+
+        :return: Dictionary of the taxon's ID in database and its gbif key.
+        :rtype: dict[int, str]
+        """
+        self.oRegistry = GBIFRegistry()
+        return self.oRegistry.load(self.oConnector)
+
+    def fetch(self, iTaxonID, sName, sRank):
+        """ Gets all data of the taxon from gbif. Runs in a worker thread and
+        doesn't touch the database.
+
+        :param iTaxonID: ID of the taxon in the database.
+        :type iTaxonID: int
+        :param sName: A name of the taxon.
+        :type sName: str
+        :param sRank: A name of the taxon rank in english language.
+        :type sRank: str
+        :return: The taxon's ID, its gbif key, its info, its children and
+            its synonyms.
+        :rtype: tuple
+        """
+        oRegistry = self.oRegistry
+        sGBIF_id = oRegistry.lookup(iTaxonID, sName, sRank)
+        if not sGBIF_id:
+            return iTaxonID, None, None, None, None
+
+        bIncremental = self.oMeta is not None and not self.bFull
+        if bIncremental and self.oMeta.is_current(sGBIF_id, self.sVersion):
+            oRegistry.count('fresh')
+            oRegistry.count('info')
+            oRegistry.count('lists', 2)
+            return iTaxonID, sGBIF_id, None, [], []
+
+        dInfo = None
+        if not oRegistry.is_saved(sGBIF_id, 'info'):
+            dInfo = gbif_get_taxon_info(sGBIF_id, sRank)
+        if bIncremental and self.oMeta.is_unchanged(sGBIF_id, dInfo):
+            oRegistry.count('subtrees')
+            oRegistry.count('lists', 2)
+            return iTaxonID, sGBIF_id, dInfo, [], []
+
+        lChildren = []
+        lSynonyms = []
+        try:
+            if oRegistry.claim(sGBIF_id, 'children'):
+                lChildren = gbif_get_children(sGBIF_id, oRegistry)
+            if oRegistry.claim(sGBIF_id, 'synonyms'):
+                lSynonyms = gbif_get_synonyms(sGBIF_id, oRegistry)
+            # An empty list is a valid answer, None is a failed request.
+            if lChildren is None or lSynonyms is None:
+                raise ConnectionError(f'No answer for gbif key {sGBIF_id}.')
+        except Exception:
+            oRegistry.release(sGBIF_id)
+            raise
+
+        return iTaxonID, sGBIF_id, dInfo, lChildren, lSynonyms
+
+    def save(self, lResults):
+        """ Writes the data of several taxa in the database by one
+        transaction. The parents are looked up after the insert, so the
+        children and the synonyms find the taxon itself. The keys written
+        before by the run and the records which didn't change since the
+        last update are skipped.
+
+        :param lResults: The results of fetch().
+        :type lResults: list[tuple]
+        :return: None
+        """
+        lAnswer = []
+        lFetched = []
+        for _, sGBIF_id, dInfo, lChildren, lSynonyms in lResults:
+            lAnswer.append(dInfo)
+            lAnswer.extend(lChildren or [])
+            lAnswer.extend(lSynonyms or [])
+            lFetched.append((sGBIF_id, dInfo))
+        lAnswer = self.oRegistry.filter_new(lAnswer)
+        lChanged = lAnswer
+        if self.oMeta is not None and not self.bFull:
+            lChanged = self.oMeta.filter_changed(lAnswer)
+            self.oRegistry.count('unchanged', len(lAnswer) - len(lChanged))
+        dIDs = gbif_upsert(self.oConnector, lChanged)
+        if dIDs is None:
+            for tResult in lResults:
+                self.oRegistry.release(tResult[1])
+            raise RuntimeError('Taxa of ' + ', '.join(
+                str(tResult[0]) for tResult in lResults) + ' are not saved.')
+
+        self.oRegistry.add_saved([dAnswer['id'] for dAnswer in lAnswer])
+        if self.oMeta is not None:
+            # The data are saved already, so the update goes on even if the
+            # metadata aren't, the taxa are fetched again the next time.
+            self.oMeta.save(dIDs, lChanged, lFetched, self.sVersion)
+
+    def get_queue(self, iLevel):
+        """ Gets the queue of jobs of the rank.
+
+        :param iLevel: ID of a rank in database.
+        :type iLevel: int
+        :return: The queue.
+        :rtype: JobQueue
+        """
+        return JobQueue(self.oConnector, f'gbif:{iLevel}')
+
+    def update(self, iLevel, bRecover=True, fProgress=None, bFull=False):
+        """ Updates all taxa of the rank. If the previous update of the rank
+        was not finished, it is continued, otherwise all taxa of the rank
+        are queued again.
+
+        :param iLevel: ID of a rank in database.
+        :type iLevel: int
+        :param bRecover: If True, the jobs left running by a killed update
+            are taken at once. Set it to False if other processes are
+            updating the same rank now.
+        :type bRecover: bool
+        :param fProgress: The function that is called after every taxon
+            with the arguments: number of the processed taxa, done or
+            failed, and number of the taxa that were waiting at the start.
+        :type fProgress: callable or None
+        :param bFull: If True, all taxa are fetched and written again even
+            if they didn't change since the last update.
+        :type bFull: bool
+        :return: Number of the taxa processed by this call.
+        :rtype: int
+        """
+        lRank = self.oConnector.get_rank_name('rankName', iLevel)
+        if not lRank:
+            return 0
+
+        sRank = lRank[0][0]
+        self.oConnector.create_indexes()
+        oQueue = self.get_queue(iLevel)
+        if bRecover:
+            oQueue.recover()
+        dCount = oQueue.count()
+        if not dCount['pending'] and not dCount['running']:
+            oCursor = self.oConnector.get_all_by_rank(iLevel)
+            if not oCursor:
+                return 0
+            oQueue.clear()
+            oQueue.add(oCursor.fetchall())
+            dCount = oQueue.count()
+        iTotal = dCount['pending'] + dCount['running']
+        metrics_get().gauge('gbif_sync.jobs', iTotal)
+        self.load_keys()
+
+        oOldClient = None
+        if self.oClient:
+            oOldClient = gbif_set_client(self.oClient)
+        else:
+            gbif_get_client()
+        self.oMeta = GBIFMeta(self.oConnector)
+        self.oMeta.load()
+        self.bFull = bFull
+        sWorker = f'gbif_sync:{os.getpid()}'
+
+        def lease():
+            while True:
+                lJobs = oQueue.lease(self.iWindow, sWorker)
+                if not lJobs:
+                    return
+                yield from lJobs
+
+        def write(lBatch):
+            self.save([tResult for _, tResult in lBatch])
+            oQueue.done_many([oJob.jobID for oJob, _ in lBatch])
+
+        def fail(oJob, oError):
+            logging.error(f'Update of {oJob.payload} failed: {oError}')
+            oQueue.fail(oJob.jobID, f'{type(oError).__name__}: {oError}')
+
+        def progress(iDone, iFailed):
+            if fProgress:
+                fProgress(iDone + iFailed, iTotal)
+
+        oPipeline = Pipeline(
+            write, lambda oJob: self.fetch(oJob.taxonID, oJob.payload, sRank),
+            iFetchers=self.iWorkers, iBatch=self.iWorkers,
+            fInterval=self.fInterval, iWindow=self.iWindow, fFail=fail,
+            fProgress=progress, sName='gbif_sync')
+        try:
+            self.sVersion = None if bFull else gbif_get_dataset_version()
+            dStats = oPipeline.run(lease())
+        finally:
+            if self.oClient:
+                gbif_set_client(oOldClient)
+        iCount = dStats['written']
+
+        logging.info(f'GBIF update of {sRank}: {iCount} taxa, saved '
+                     f'{self.oRegistry.get_stats()}.')
+        return iCount
+
+
+if __name__ == '__main__':
+    pass
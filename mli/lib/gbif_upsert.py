@@ -0,0 +1,215 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module saves a page of taxa answered by gbif into the database with a
+few set-based statements in one transaction, instead of several queries and
+a commit for every taxon.
+
+The page is loaded into the temporal table GBIFPage, where ranks, statuses,
+known taxa and parents are resolved by UPDATE ... FROM. Then the new taxa
+are inserted into Taxa and TaxonTree, known taxa get the rank, the status
+and the parent of the page, their empty authors and years are filled, and
+gbif keys are added to DBIndexes. A taxon is known if its
+gbif key is in DBIndexes or it has the same rank, name and authors, as in
+gbif_parsing_species(). The authors are compared by name_norm(), so 'Th. Fr.'
+and 'Th.Fr.' are the same.
+
+Function:
+    gbif_upsert(oConnector, lAnswer)
+
+Using:
+    lAnswer = [dInfo] + gbif_get_children(sKey) + gbif_get_synonyms(sKey)
+    dIDs = gbif_upsert(oConnector, lAnswer)
+"""
+
+import logging
+import re
+from sqlite3 import DatabaseError
+
+from mli.lib.gbif_parser import GBIF_SOURCE_ID, GBIF_STATUSES
+from mli.lib.metrics import metrics_get
+
+RE_DIGIT = re.compile(r'\d')
+
+PAGE_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS GBIFPage (
+    gbifKey        TEXT    PRIMARY KEY,
+    scientificName TEXT,
+    canonicalName  TEXT,
+    authorship     TEXT,
+    yearPublishing INTEGER,
+    rankName       TEXT,
+    statusName     TEXT,
+    parentName     TEXT,
+    rankID         INTEGER,
+    statusID       INTEGER,
+    taxonID        INTEGER,
+    parentID       INTEGER,
+    isNew          INTEGER DEFAULT 0
+);
+DELETE FROM GBIFPage;
+"""
+
+# The statements are run in this order after the page is loaded.
+UPSERT_SQL = (
+    # Ranks and statuses.
+    'UPDATE GBIFPage SET rankID=TaxonRanks.rankID FROM TaxonRanks '
+    'WHERE TaxonRanks.rankName=GBIFPage.rankName;',
+    'DELETE FROM GBIFPage WHERE rankID IS NULL;',
+    'UPDATE GBIFPage SET statusID=TaxonStatuses.statusID FROM TaxonStatuses '
+    'WHERE TaxonStatuses.statusName=GBIFPage.statusName;',
+    # Known taxa: by the gbif key, then by the rank, the name and authors.
+    'UPDATE GBIFPage SET taxonID=DBIndexes.taxonID FROM DBIndexes '
+    'WHERE DBIndexes.sourceID=:source '
+    'AND DBIndexes.taxonIndex=GBIFPage.gbifKey;',
+    'UPDATE GBIFPage SET taxonID=Taxa.taxonID FROM Taxa '
+    'WHERE GBIFPage.taxonID IS NULL AND Taxa.rankID=GBIFPage.rankID '
+    'AND Taxa.canonicalName=GBIFPage.canonicalName '
+    "AND name_norm(IFNULL(Taxa.authorship, ''))="
+    "name_norm(IFNULL(GBIFPage.authorship, ''));",
+    # New taxa get IDs after the last one, equal names get one ID.
+    'UPDATE GBIFPage SET taxonID=New.taxonID, isNew=1 FROM ('
+    'SELECT gbifKey, (SELECT IFNULL(MAX(taxonID), 0) FROM Taxa) + '
+    "DENSE_RANK() OVER (ORDER BY rankID, canonicalName, "
+    "IFNULL(authorship, '')) AS taxonID "
+    'FROM GBIFPage WHERE taxonID IS NULL) AS New '
+    'WHERE New.gbifKey=GBIFPage.gbifKey;',
+    'INSERT INTO Taxa (taxonID, scientificName, canonicalName, authorship, '
+    'yearPublishing, rankID) '
+    'SELECT taxonID, scientificName, canonicalName, authorship, '
+    'yearPublishing, rankID FROM GBIFPage WHERE isNew GROUP BY taxonID;',
+    'INSERT INTO TaxonTree (taxonID, statusID) '
+    'SELECT taxonID, statusID FROM GBIFPage WHERE isNew GROUP BY taxonID;',
+    # Parents are looked up after the insert, so they can be on the page.
+    'UPDATE GBIFPage SET parentID=('
+    'SELECT MIN(Taxa.taxonID) FROM Taxa '
+    'JOIN TaxonTree AS Main ON Main.taxonID=Taxa.taxonID '
+    'WHERE Taxa.canonicalName=GBIFPage.parentName AND Main.statusID=1 '
+    'AND Taxa.taxonID<>GBIFPage.taxonID);',
+    'UPDATE TaxonTree SET mainTaxonID=GBIFPage.parentID '
+    'FROM GBIFPage WHERE GBIFPage.isNew '
+    'AND TaxonTree.taxonID=GBIFPage.taxonID;',
+    # Known taxa follow gbif if their rank, status or parent changed. The
+    # status and the parent are kept if the new ones aren't in the database.
+    'UPDATE Taxa SET rankID=GBIFPage.rankID '
+    'FROM GBIFPage WHERE NOT GBIFPage.isNew '
+    'AND Taxa.taxonID=GBIFPage.taxonID AND Taxa.rankID<>GBIFPage.rankID;',
+    'UPDATE TaxonTree SET '
+    'statusID=IFNULL(GBIFPage.statusID, TaxonTree.statusID), '
+    'mainTaxonID=IFNULL(GBIFPage.parentID, TaxonTree.mainTaxonID) '
+    'FROM GBIFPage WHERE NOT GBIFPage.isNew '
+    'AND TaxonTree.taxonID=GBIFPage.taxonID '
+    'AND (TaxonTree.statusID IS NOT '
+    'IFNULL(GBIFPage.statusID, TaxonTree.statusID) '
+    'OR TaxonTree.mainTaxonID IS NOT '
+    'IFNULL(GBIFPage.parentID, TaxonTree.mainTaxonID));',
+    # Known taxa get authors of accepted names and years they miss.
+    'UPDATE Taxa SET '
+    "authorship=CASE WHEN IFNULL(Taxa.authorship, '')='' "
+    "AND GBIFPage.statusName='accepted' "
+    'THEN IFNULL(GBIFPage.authorship, Taxa.authorship) '
+    'ELSE Taxa.authorship END, '
+    "yearPublishing=CASE WHEN IFNULL(Taxa.yearPublishing, '')='' "
+    'THEN IFNULL(GBIFPage.yearPublishing, Taxa.yearPublishing) '
+    'ELSE Taxa.yearPublishing END '
+    'FROM GBIFPage WHERE NOT GBIFPage.isNew '
+    'AND Taxa.taxonID=GBIFPage.taxonID;',
+    'INSERT INTO DBIndexes (taxonID, sourceID, taxonIndex) '
+    'SELECT taxonID, :source, MIN(gbifKey) FROM GBIFPage '
+    'WHERE NOT EXISTS (SELECT 1 FROM DBIndexes '
+    'WHERE DBIndexes.taxonID=GBIFPage.taxonID '
+    'AND DBIndexes.sourceID=:source) GROUP BY taxonID;',
+)
+
+
+def gbif_upsert_row(dAnswer):
+    """ Turns a normalized gbif answer into a row of GBIFPage.
+
+    :param dAnswer: A dictionary with information about the taxon.
+    :type dAnswer: dict[str, bool, str, str, str, str, str, int]
+    :return: The row, or None if the taxon is skipped.
+    :rtype: tuple or None
+    """
+    # Exclude taxa with type name SH1169675.09FU and with missing rank.
+    if not dAnswer or RE_DIGIT.search(dAnswer['name']) or \
+            dAnswer['rank'] == 'UNRANKED':
+        return
+
+    sSciName = dAnswer['name']
+    if dAnswer['author']:
+        sSciName = f'{sSciName} {dAnswer["author"]}'
+    sStatus = (dAnswer['tax_status'] or '').lower().replace('_', ' ')
+
+    return (str(dAnswer['id']), sSciName, dAnswer['name'], dAnswer['author'],
+            dAnswer['year'], dAnswer['rank'].lower(),
+            GBIF_STATUSES.get(sStatus, sStatus), dAnswer['parent'],)
+
+
+def gbif_upsert(oConnector, lAnswer):
+    """ Saves a page of taxa in one transaction.
+
+    :param oConnector: An instance of the sqlite database api class.
+    :type oConnector: SQL
+    :param lAnswer: Dictionaries with information about taxa, as
+        gbif_parser_taxon() makes them.
+    :type lAnswer: list[dict[str, bool, str, str, str, str, str, int]]
+    :return: Dictionary of the gbif key and the taxon's ID in database, or
+        None if the page was not saved.
+    :rtype: dict[str, int] or None
+    """
+    lRows = list(filter(None, map(gbif_upsert_row, lAnswer or [])))
+    if not lRows:
+        return {}
+
+    oConnection = oConnector.oConnector
+    dParams = {'source': GBIF_SOURCE_ID}
+    dRows = {}
+    try:
+        oConnection.executescript(PAGE_SCHEMA)
+        oConnection.executemany(
+            'INSERT INTO GBIFPage (gbifKey, scientificName, canonicalName, '
+            'authorship, yearPublishing, rankName, statusName, parentName) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (gbifKey) DO UPDATE SET '
+            'scientificName=excluded.scientificName, '
+            'canonicalName=excluded.canonicalName, '
+            'authorship=excluded.authorship, '
+            'yearPublishing=excluded.yearPublishing, '
+            'rankName=excluded.rankName, statusName=excluded.statusName, '
+            'parentName=excluded.parentName;', lRows)
+        for sSQL in UPSERT_SQL:
+            oCursor = oConnection.execute(
+                sSQL, dParams if ':source' in sSQL else ())
+            if sSQL.startswith('INSERT INTO '):
+                dRows[sSQL.split()[2]] = oCursor.rowcount
+        dIDs = dict(oConnection.execute(
+            'SELECT gbifKey, taxonID FROM GBIFPage;').fetchall())
+    except DatabaseError as e:
+        oConnection.rollback()
+        logging.exception(f'Cannot save the page of gbif taxa: {e}')
+        return
+
+    oConnection.commit()
+    oMetrics = metrics_get()
+    for sTable, iCount in dRows.items():
+        oMetrics.add_rows(sTable, iCount)
+    return dIDs
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,281 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module provides a persistent cache of HTTP responses in a SQLite file.
+
+A response is stored by a key made from the method, the URL, the parameters
+and the body of the request. Every record has the expiry time, the ETag and
+the Last-Modified headers of the response, so an expired record can be
+checked by a conditional request. The total size of the bodies is bounded,
+the least recently used records are deleted first. The time of the last use
+is kept in memory and written together with the next response, so reading
+the cache doesn't write to the file.
+
+Function:
+    http_cache_key(sMethod, sURL, dParams=None, oBody=None)
+
+Class:
+    ResponseCache(sFileDB, fTTL=604800.0, iMaxSize=268435456)
+
+Using:
+    oCache = ResponseCache('cache/gbif.db')
+    sKey = http_cache_key('GET', sURL, dParams)
+    oEntry = oCache.get(sKey)
+    if oEntry is None or oEntry.expired:
+        oCache.put(sKey, sURL, bBody, sETag, sLastModified)
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+from os import makedirs, path
+from time import time
+
+CacheEntry = namedtuple('CacheEntry',
+                        'body, etag, lastModified, expired')
+
+# How many times of use are kept in memory before they are written.
+USED_FLUSH_SIZE = 1024
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Responses (
+    cacheKey     TEXT    PRIMARY KEY,
+    url          TEXT    NOT NULL,
+    body         BLOB    NOT NULL,
+    etag         TEXT,
+    lastModified TEXT,
+    expires      REAL    NOT NULL,
+    used         REAL    NOT NULL,
+    size         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS Responses_used ON Responses (used);
+"""
+
+
+def http_cache_key(sMethod, sURL, dParams=None, oBody=None):
+    """ Makes the key of a request. The order of the parameters doesn't
+    change the key.
+
+    :param sMethod: HTTP method.
+    :type sMethod: str
+    :param sURL: The URL of the request.
+    :type sURL: str
+    :param dParams: Parameters of the query.
+    :type dParams: dict or None
+    :param oBody: The body of the request, it is encoded in JSON.
+    :type oBody: dict or list or None
+    :return: The key.
+    :rtype: str
+    """
+    sKey = json.dumps([sMethod.upper(), sURL, sorted((dParams or {}).items()),
+                       oBody], sort_keys=True, default=str)
+    return hashlib.sha1(sKey.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """ Keeps responses in a SQLite file. The object can be used by several
+    threads.
+
+    *Methods*
+        * get -- Gets a record by the key.
+        * put -- Saves a response.
+        * refresh -- Prolongs a record that the server confirmed.
+        * evict -- Deletes the least recently used records over the bound.
+        * flush -- Writes the times of use that are kept in memory.
+        * clear -- Deletes all records.
+        * close -- Writes the times of use and closes the file.
+    """
+
+    def __init__(self, sFileDB, fTTL=604800.0, iMaxSize=268435456):
+        """ Initiating a class.
+
+        :param sFileDB: The file of the cache, or ':memory:'.
+        :type sFileDB: str
+        :param fTTL: How many seconds a record is fresh.
+        :type fTTL: float
+        :param iMaxSize: Maximal total size of the bodies in bytes.
+        :type iMaxSize: int
+        """
+        self.fTTL = fTTL
+        self.iMaxSize = iMaxSize
+        self.oLock = threading.Lock()
+        # The times of use by the keys, which aren't written yet.
+        self.dUsed = {}
+        sDir = path.dirname(sFileDB)
+        if sFileDB != ':memory:' and sDir:
+            makedirs(sDir, exist_ok=True)
+        self.oConnection = sqlite3.connect(sFileDB, check_same_thread=False)
+        self.oConnection.executescript(CACHE_SCHEMA)
+        self.iSize = self.oConnection.execute(
+            'SELECT IFNULL(SUM(size), 0) FROM Responses;').fetchone()[0]
+
+    def __len__(self):
+        with self.oLock:
+            return self.oConnection.execute(
+                'SELECT Count(*) FROM Responses;').fetchone()[0]
+
+    def get(self, sKey):
+        """ Gets a record by the key and marks it as used. The time of use
+        is written later by flush().
+
+        :param sKey: The key of the request.
+        :type sKey: str
+        :return: The record, or None if there is no record.
+        :rtype: CacheEntry or None
+        """
+        fNow = time()
+        with self.oLock:
+            tRow = self.oConnection.execute(
+                'SELECT body, etag, lastModified, expires FROM Responses '
+                'WHERE cacheKey=?;', (sKey,)).fetchone()
+            if tRow is None:
+                return
+
+            self.dUsed[sKey] = fNow
+            if len(self.dUsed) >= USED_FLUSH_SIZE:
+                self._flush()
+
+        return CacheEntry(tRow[0], tRow[1], tRow[2], tRow[3] <= fNow)
+
+    def put(self, sKey, sURL, bBody, sETag=None, sLastModified=None):
+        """ Saves a response and deletes old records if the cache is too
+        big.
+
+        :param sKey: The key of the request.
+        :type sKey: str
+        :param sURL: The URL of the request.
+        :type sURL: str
+        :param bBody: The body of the response.
+        :type bBody: bytes
+        :param sETag: ETag header of the response.
+        :type sETag: str or None
+        :param sLastModified: Last-Modified header of the response.
+        :type sLastModified: str or None
+        :return: None
+        """
+        fNow = time()
+        with self.oLock:
+            try:
+                tRow = self.oConnection.execute(
+                    'SELECT size FROM Responses WHERE cacheKey=?;',
+                    (sKey,)).fetchone()
+                self.dUsed.pop(sKey, None)
+                self._write_used()
+                self.oConnection.execute(
+                    'INSERT OR REPLACE INTO Responses (cacheKey, url, body, '
+                    'etag, lastModified, expires, used, size) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?);',
+                    (sKey, sURL, bBody, sETag, sLastModified,
+                     fNow + self.fTTL, fNow, len(bBody),))
+                self.oConnection.commit()
+            except sqlite3.Error as e:
+                logging.error(f'Cannot cache the response of {sURL}: {e}')
+                return
+
+            self.iSize += len(bBody) - (tRow[0] if tRow else 0)
+            self._evict()
+
+    def refresh(self, sKey):
+        """ Makes a record fresh again, when the server answered that the
+        response isn't changed.
+
+        :param sKey: The key of the request.
+        :type sKey: str
+        :return: None
+        """
+        fNow = time()
+        with self.oLock:
+            self.dUsed.pop(sKey, None)
+            self.oConnection.execute(
+                'UPDATE Responses SET expires=?, used=? WHERE cacheKey=?;',
+                (fNow + self.fTTL, fNow, sKey,))
+            self.oConnection.commit()
+
+    def evict(self):
+        """ Deletes the least recently used records until the total size is
+        in the bound.
+
+        :return: None
+        """
+        with self.oLock:
+            self._flush()
+            self._evict()
+
+    def flush(self):
+        """ Writes the times of use that are kept in memory by one
+        transaction.
+
+        :return: None
+        """
+        with self.oLock:
+            self._flush()
+
+    def _flush(self):
+        try:
+            self._write_used()
+            self.oConnection.commit()
+        except sqlite3.Error as e:
+            logging.error(f'Cannot save the times of use of the cache: {e}')
+
+    def _write_used(self):
+        if self.dUsed:
+            self.oConnection.executemany(
+                'UPDATE Responses SET used=? WHERE cacheKey=?;',
+                [(fUsed, sKey,) for sKey, fUsed in self.dUsed.items()])
+            self.dUsed = {}
+
+    def _evict(self):
+        while self.iSize > self.iMaxSize:
+            lRows = self.oConnection.execute(
+                'SELECT cacheKey, size FROM Responses '
+                'ORDER BY used LIMIT 64;').fetchall()
+            if not lRows:
+                self.iSize = 0
+                break
+
+            for sKey, iSize in lRows:
+                self.oConnection.execute(
+                    'DELETE FROM Responses WHERE cacheKey=?;', (sKey,))
+                self.iSize -= iSize
+                if self.iSize <= self.iMaxSize:
+                    break
+            self.oConnection.commit()
+
+    def clear(self):
+        """ Deletes all records.
+
+        :return: None
+        """
+        with self.oLock:
+            self.dUsed = {}
+            self.oConnection.execute('DELETE FROM Responses;')
+            self.oConnection.commit()
+            self.iSize = 0
+
+    def close(self):
+        """ Writes the times of use and closes the file of the cache. """
+        with self.oLock:
+            self._flush()
+            self.oConnection.close()
+
+
+if __name__ == '__main__':
+    pass
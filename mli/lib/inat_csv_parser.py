@@ -16,38 +16,143 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+
+""" The module imports links to iNaturalist from a CSV file with the columns
+'Name' and 'ID' separated by ';', where ID is the link to the taxon on
+iNaturalist. The link is added to the accepted taxon with the same name if
+the taxon has no link yet.
+
+The rows are loaded by batches into the temporary table INatRows, then the
+names are resolved to the accepted taxa by one join and the missing links
+are inserted by one statement, all in one transaction. If a name is in the
+file several times, the first row with a link is taken.
+
+Function:
+    inat_get_file(oConnector, sFileCSV, fProgress=None, iBatch=10000)
+    inat_parse_row(dRow)
+    inat_parser(oConnector, oData, fProgress=None, iBatch=10000)
+
+Using:
+    iCount = inat_get_file(oConnector, 'db/inat.csv')
+"""
+
 import csv
+import logging
+from itertools import islice
+from sqlite3 import DatabaseError
+
+from mli.lib.metrics import metrics_get
+
+# ID of iNaturalist in DBSources table.
+INAT_SOURCE_ID = 1
+
+INAT_URL = 'https://www.inaturalist.org/taxa/'
+
+INAT_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS INatRows (
+    rowID         INTEGER PRIMARY KEY,
+    canonicalName TEXT,
+    inatID        TEXT
+);
+CREATE INDEX IF NOT EXISTS INatRows_canonicalName
+    ON INatRows (canonicalName, rowID);
+DELETE FROM INatRows;
+"""
 
-from mli.lib.sql import SQL
+# The accepted taxon of a name is the first one, as in
+# get_id_by_name_status(). The bare inatID is taken from the row of
+# MIN(rowID).
+INAT_INSERT_SQL = (
+    'INSERT INTO DBIndexes (taxonID, sourceID, taxonIndex) '
+    'SELECT taxonID, :source, inatID FROM ('
+    'SELECT Accepted.taxonID, INatRows.inatID, MIN(INatRows.rowID) '
+    'FROM INatRows JOIN ('
+    'SELECT Taxa.canonicalName, MIN(Taxa.taxonID) AS taxonID FROM Taxa '
+    'JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID '
+    'WHERE TaxonTree.statusID=1 GROUP BY Taxa.canonicalName) AS Accepted '
+    'ON Accepted.canonicalName=INatRows.canonicalName '
+    "WHERE INatRows.inatID!='' AND NOT EXISTS (SELECT 1 FROM DBIndexes "
+    'WHERE DBIndexes.taxonID=Accepted.taxonID '
+    'AND DBIndexes.sourceID=:source) '
+    'GROUP BY Accepted.taxonID);')
 
 
-def inat_get_file(oConnector):
-    with open('../../db/inat.csv', newline='') as fCSVFile:
+def inat_get_file(oConnector, sFileCSV, fProgress=None, iBatch=10000):
+    """ Imports the links from the file.
+
+    :param oConnector: An instance of the sqlite database api class.
+    :type oConnector: SQL
+    :param sFileCSV: The path of the CSV file.
+    :type sFileCSV: str
+    :param fProgress: The function that is called after every batch with the
+        number of read rows.
+    :type fProgress: callable or None
+    :param iBatch: Number of rows loaded by one statement.
+    :type iBatch: int
+    :return: Number of the added links, or False if they were not added.
+    :rtype: int or bool
+    """
+    with open(sFileCSV, encoding='utf-8-sig', newline='') as fCSVFile:
         oData = csv.DictReader(fCSVFile, delimiter=';')
-        inat_parser(oConnector, oData)
-
-
-def inat_parser(oConnector, oData):
-    for lRow in oData:
-        sName, sIDiNat = lRow['Name'], lRow['ID']
-
-        iTaxonID = 0
-        tAnswer = oConnector.sql_get_values('Taxon', 'id_taxon',
-                                            'taxon_name, id_status',
-                                            (sName, 1,))
-        if tAnswer:
-            iTaxonID = tAnswer[0][0]
-
-        iID = oConnector.sql_get_values('DBIndexes', 'id_db_index',
-                                        'id_taxon, id_source',
-                                        (iTaxonID, 1))
-        iIDiNat = sIDiNat.replace('https://www.inaturalist.org/taxa/', '')
-        print(sName)
-
-        if iTaxonID and not iID:
-            oConnector.insert_row('DBIndexes',
-                                  'id_taxon, id_source, taxon_index',
-                                  (iTaxonID, 1, iIDiNat,))
+        return inat_parser(oConnector, oData, fProgress, iBatch)
+
+
+def inat_parse_row(dRow):
+    """ Takes the name and the iNaturalist's ID of a row.
+
+    :param dRow: A row with 'Name' and 'ID'.
+    :type dRow: dict[str, str]
+    :return: The name and the ID.
+    :rtype: tuple[str, str]
+    """
+    return (dRow['Name'] or '').strip(), \
+        (dRow['ID'] or '').strip().replace(INAT_URL, '')
+
+
+def inat_parser(oConnector, oData, fProgress=None, iBatch=10000):
+    """ Adds the links of the rows to the database by one transaction.
+
+    :param oConnector: An instance of the sqlite database api class.
+    :type oConnector: SQL
+    :param oData: The rows with 'Name' and 'ID'.
+    :type oData: Iterable[dict[str, str]]
+    :param fProgress: The function that is called after every batch with the
+        number of read rows.
+    :type fProgress: callable or None
+    :param iBatch: Number of rows loaded by one statement.
+    :type iBatch: int
+    :return: Number of the added links, or False if they were not added.
+    :rtype: int or bool
+    """
+    oConnection = oConnector.oConnector
+    oMetrics = metrics_get()
+    oRows = map(inat_parse_row, oData)
+    iRead = 0
+    try:
+        oConnection.executescript(INAT_SCHEMA)
+        while True:
+            lRows = list(islice(oRows, iBatch))
+            if not lRows:
+                break
+            with oMetrics.timer('inat.load'):
+                oConnection.executemany(
+                    'INSERT INTO INatRows (canonicalName, inatID) '
+                    'VALUES (?, ?);', lRows)
+            iRead += len(lRows)
+            if fProgress:
+                fProgress(iRead)
+        with oMetrics.timer('inat.write'):
+            iCount = oConnection.execute(
+                INAT_INSERT_SQL, {'source': INAT_SOURCE_ID}).rowcount
+        oConnection.execute('DELETE FROM INatRows;')
+    except DatabaseError as e:
+        oConnection.rollback()
+        logging.exception(f'Cannot add the links to iNaturalist: {e}')
+        return False
+
+    oConnection.commit()
+    oMetrics.add_rows('DBIndexes', iCount)
+    return iCount
 
 
 if __name__ == '__main__':
@@ -0,0 +1,314 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module provides a persistent queue of jobs in the database. A job is
+the work on one taxon, for example its update from gbif. Every job keeps
+its state ('pending', 'running', 'done' or 'failed'), the number of
+attempts, the time of the next attempt and the text of the last error.
+
+A worker leases jobs: they become 'running' until the lease time is over.
+If the worker dies, the jobs are leased again when the lease is over, so an
+interrupted work is continued and a done job is never repeated. Several
+workers, also in other processes with their own connections, can lease jobs
+from one queue, a job is given to one worker only.
+
+Class:
+    Job
+    JobQueue(oConnector, sQueue, iMaxAttempts=5, fBackoff=60.0,
+             fLease=600.0)
+
+Using:
+    oQueue = JobQueue(oConnector, 'gbif:21')
+    oQueue.add([(iTaxonID, None) for iTaxonID in lTaxa])
+    for oJob in oQueue.lease(10):
+        try:
+            do_something(oJob.taxonID)
+        except Exception as e:
+            oQueue.fail(oJob.jobID, str(e))
+        else:
+            oQueue.done(oJob.jobID)
+"""
+
+import json
+import logging
+from collections import namedtuple
+from sqlite3 import DatabaseError
+from time import time
+
+# A leased job.
+Job = namedtuple('Job', 'jobID, taxonID, payload, attempts')
+
+JOB_STATES = ('pending', 'running', 'done', 'failed')
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS SyncJobs (
+    jobID      INTEGER PRIMARY KEY,
+    queue      TEXT    NOT NULL,
+    taxonID    INTEGER NOT NULL,
+    payload    TEXT,
+    state      TEXT    NOT NULL DEFAULT 'pending',
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    nextTry    REAL    NOT NULL DEFAULT 0,
+    leaseUntil REAL,
+    worker     TEXT,
+    error      TEXT,
+    updated    REAL,
+    UNIQUE (queue, taxonID)
+);
+CREATE INDEX IF NOT EXISTS SyncJobs_queue_state
+    ON SyncJobs (queue, state, nextTry);
+"""
+
+
+class JobQueue:
+    """ A queue of jobs on taxa kept in the database.
+
+    *Methods*
+        * add -- Adds jobs that are not in the queue yet.
+        * lease -- Takes jobs for a worker.
+        * done -- Marks a job as done.
+        * done_many -- Marks several jobs as done.
+        * fail -- Marks a job as failed, it is tried again later.
+        * recover -- Returns all running jobs to the queue.
+        * retry_failed -- Gives all failed jobs new attempts.
+        * count -- Counts jobs by their states.
+        * get_errors -- Gets failed jobs with their errors.
+        * clear -- Deletes the jobs of the queue.
+    """
+
+    def __init__(self, oConnector, sQueue, iMaxAttempts=5, fBackoff=60.0,
+                 fLease=600.0):
+        """ Initiating a class, the table of jobs is created if it doesn't
+        exist.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param sQueue: The name of the queue.
+        :type sQueue: str
+        :param iMaxAttempts: After so many attempts a job is failed for
+            good.
+        :type iMaxAttempts: int
+        :param fBackoff: The pause in seconds before the second attempt,
+            every next pause is twice longer.
+        :type fBackoff: float
+        :param fLease: How many seconds a job belongs to a worker.
+        :type fLease: float
+        """
+        self.oConnector = oConnector
+        self.sQueue = sQueue
+        self.iMaxAttempts = iMaxAttempts
+        self.fBackoff = fBackoff
+        self.fLease = fLease
+        self.oConnector.execute_script(JOB_SCHEMA)
+
+    def commit(self, oCursor):
+        """ Commits the change made by the cursor.
+
+        :param oCursor: The cursor of the query, or False if it failed.
+        :type oCursor: sqlite3.Cursor or bool
+        :return: Number of changed rows.
+        :rtype: int
+        """
+        if not oCursor:
+            self.oConnector.oConnector.rollback()
+            return 0
+
+        self.oConnector.oConnector.commit()
+        return oCursor.rowcount
+
+    def add(self, lItems):
+        """ Adds jobs to the queue. A taxon that is already in the queue
+        isn't added again, whatever its state is.
+
+        :param lItems: Tuples of the taxon's ID and a payload string.
+        :type lItems: list[tuple[int, str|None]]
+        :return: Number of added jobs.
+        :rtype: int
+        """
+        fNow = time()
+        try:
+            oCursor = self.oConnector.oConnector.executemany(
+                'INSERT OR IGNORE INTO SyncJobs '
+                '(queue, taxonID, payload, updated) VALUES (?, ?, ?, ?);',
+                ((self.sQueue, iTaxonID, sPayload, fNow,)
+                 for iTaxonID, sPayload in lItems))
+        except DatabaseError as e:
+            logging.exception(f'Cannot add jobs to {self.sQueue}: {e}')
+            oCursor = False
+
+        return self.commit(oCursor)
+
+    def lease(self, iCount=1, sWorker=''):
+        """ Takes jobs which are pending and whose time has come, and jobs
+        whose lease is over. The lease of a job is an attempt. A job whose
+        lease is over after iMaxAttempts attempts is failed for good by the
+        same statement instead of being leased again.
+
+        :param iCount: Maximal number of jobs.
+        :type iCount: int
+        :param sWorker: The name of the worker, for the information.
+        :type sWorker: str
+        :return: The leased jobs sorted by their IDs.
+        :rtype: list[Job]
+        """
+        sExhausted = "state='running' AND attempts>=?1"
+        sSQL = 'UPDATE SyncJobs SET ' \
+               f"state=CASE WHEN {sExhausted} THEN 'failed' " \
+               "ELSE 'running' END, " \
+               f'attempts=CASE WHEN {sExhausted} THEN attempts ' \
+               'ELSE attempts+1 END, ' \
+               f'leaseUntil=CASE WHEN {sExhausted} THEN NULL ' \
+               'ELSE ?2+?3 END, ' \
+               f'worker=CASE WHEN {sExhausted} THEN worker ELSE ?4 END, ' \
+               f'error=CASE WHEN {sExhausted} THEN ?5 ELSE error END, ' \
+               'updated=?2 ' \
+               'WHERE jobID IN (SELECT jobID FROM SyncJobs WHERE queue=?6 ' \
+               "AND (state='pending' AND nextTry<=?2 " \
+               "OR state='running' AND leaseUntil<?2) " \
+               'ORDER BY nextTry, jobID LIMIT ?7) ' \
+               'RETURNING jobID, taxonID, payload, attempts, state;'
+        lJobs = []
+        while iCount > 0:
+            fNow = time()
+            oCursor = self.oConnector.execute_query(
+                sSQL, (self.iMaxAttempts, fNow, self.fLease, sWorker,
+                       'The lease is over after the last attempt.',
+                       self.sQueue, iCount,))
+            lRows = oCursor.fetchall() if oCursor else []
+            self.commit(oCursor)
+            lLeased = [Job(*tRow[:4]) for tRow in lRows
+                       if tRow[4] == 'running']
+            lJobs.extend(lLeased)
+            # The failed jobs took places of the jobs to lease.
+            if len(lLeased) == len(lRows):
+                break
+            iCount -= len(lLeased)
+
+        return sorted(lJobs)
+
+    def done(self, iJobID):
+        """ Marks a job as done.
+
+        :param iJobID: ID of the job.
+        :type iJobID: int
+        :return: True if the job was changed.
+        :rtype: bool
+        """
+        return bool(self.commit(self.oConnector.execute_query(
+            "UPDATE SyncJobs SET state='done', leaseUntil=NULL, "
+            'error=NULL, updated=? WHERE jobID=?;', (time(), iJobID,))))
+
+    def done_many(self, lJobIDs):
+        """ Marks several jobs as done by one transaction.
+
+        :param lJobIDs: IDs of the jobs.
+        :type lJobIDs: list[int]
+        :return: Number of the changed jobs.
+        :rtype: int
+        """
+        if not lJobIDs:
+            return 0
+
+        return self.commit(self.oConnector.execute_query(
+            "UPDATE SyncJobs SET state='done', leaseUntil=NULL, "
+            'error=NULL, updated=? '
+            'WHERE jobID IN (SELECT value FROM json_each(?));',
+            (time(), json.dumps(list(lJobIDs)),)))
+
+    def fail(self, iJobID, sError):
+        """ Marks a failed attempt of the job. The job is tried again after
+        a pause growing exponentially, or it is failed for good after
+        iMaxAttempts attempts.
+
+        :param iJobID: ID of the job.
+        :type iJobID: int
+        :param sError: The text of the error.
+        :type sError: str
+        :return: True if the job was changed.
+        :rtype: bool
+        """
+        fNow = time()
+        return bool(self.commit(self.oConnector.execute_query(
+            'UPDATE SyncJobs SET '
+            "state=CASE WHEN attempts>=? THEN 'failed' ELSE 'pending' END, "
+            'nextTry=?+?*(1<<MAX(attempts-1, 0)), leaseUntil=NULL, '
+            'error=?, updated=? WHERE jobID=?;',
+            (self.iMaxAttempts, fNow, self.fBackoff, sError, fNow,
+             iJobID,))))
+
+    def recover(self):
+        """ Returns all running jobs of the queue to the pending state. It
+        is used at the start, when no other worker can be running.
+
+        :return: Number of returned jobs.
+        :rtype: int
+        """
+        return self.commit(self.oConnector.execute_query(
+            "UPDATE SyncJobs SET state='pending', leaseUntil=NULL "
+            "WHERE queue=? AND state='running';", (self.sQueue,)))
+
+    def retry_failed(self):
+        """ Gives all failed jobs of the queue new attempts.
+
+        :return: Number of jobs.
+        :rtype: int
+        """
+        return self.commit(self.oConnector.execute_query(
+            "UPDATE SyncJobs SET state='pending', attempts=0, nextTry=0 "
+            "WHERE queue=? AND state='failed';", (self.sQueue,)))
+
+    def count(self):
+        """ Counts jobs of the queue by their states.
+
+        :return: Dictionary of the state and the number of jobs.
+        :rtype: dict[str, int]
+        """
+        dCount = dict.fromkeys(JOB_STATES, 0)
+        oCursor = self.oConnector.execute_query(
+            'SELECT state, Count(*) FROM SyncJobs WHERE queue=? '
+            'GROUP BY state;', (self.sQueue,))
+        if oCursor:
+            dCount.update(oCursor.fetchall())
+
+        return dCount
+
+    def get_errors(self):
+        """ Gets failed jobs with the text of their last errors.
+
+        :return: Tuples of the taxon's ID, the number of attempts and the
+            error.
+        :rtype: list[tuple[int, int, str]]
+        """
+        oCursor = self.oConnector.execute_query(
+            'SELECT taxonID, attempts, error FROM SyncJobs '
+            "WHERE queue=? AND state='failed' ORDER BY jobID;",
+            (self.sQueue,))
+        return oCursor.fetchall() if oCursor else []
+
+    def clear(self):
+        """ Deletes all jobs of the queue.
+
+        :return: Number of deleted jobs.
+        :rtype: int
+        """
+        return self.commit(self.oConnector.execute_query(
+            'DELETE FROM SyncJobs WHERE queue=?;', (self.sQueue,)))
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,199 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module decodes a JSON object from a stream of bytes, yielding the
+elements of one of its lists as soon as they are read. So a page of gbif
+is used while it is downloaded, and the page isn't kept in the memory
+twice: as the body and as the decoded object.
+
+Every element and every other field of the object is decoded by
+json.JSONDecoder.raw_decode(), only the punctuation between them is read
+here. A number or a word which ends with the read text is decoded again
+with the next chunk, so a value cut by the chunk is never taken.
+
+Function:
+    json_stream_items(iChunks, sField='results', dRest=None)
+
+Class:
+    JSONStream(iChunks)
+
+Using:
+    dRest = {}
+    for dRecord in json_stream_items(oResponse.iter_content(65536),
+                                     'results', dRest):
+        print(dRecord['key'])
+    print(dRest['endOfRecords'])
+"""
+
+import codecs
+import json
+import re
+
+RE_SPACE = re.compile(r'[ \t\n\r]*')
+
+
+class JSONStream:
+    """ Reads JSON values one by one from chunks of bytes.
+
+    *Methods*
+        * fill -- Reads the next chunk.
+        * peek -- Gets the next character after the spaces.
+        * expect -- Takes one of the expected characters.
+        * value -- Decodes the next value.
+    """
+
+    def __init__(self, iChunks):
+        """ Initiating a class.
+
+        :param iChunks: Chunks of the UTF-8 text.
+        :type iChunks: Iterable[bytes]
+        """
+        self.iChunks = iter(iChunks)
+        self.oText = codecs.getincrementaldecoder('utf-8')()
+        self.oDecoder = json.JSONDecoder()
+        self.sBuffer = ''
+        self.iPos = 0
+        self.bEnd = False
+
+    def fill(self):
+        """ Reads the next chunk, the read part of the buffer is dropped.
+
+        :return: False if there is nothing more to read.
+        :rtype: bool
+        """
+        if self.bEnd:
+            return False
+
+        bChunk = next(self.iChunks, None)
+        if bChunk is None:
+            self.bEnd = True
+            sText = self.oText.decode(b'', final=True)
+        else:
+            sText = self.oText.decode(bChunk)
+        self.sBuffer = self.sBuffer[self.iPos:] + sText
+        self.iPos = 0
+        return True
+
+    def peek(self):
+        """ Skips the spaces and gets the next character.
+
+        :return: The character, or an empty string at the end.
+        :rtype: str
+        """
+        while True:
+            self.iPos = RE_SPACE.match(self.sBuffer, self.iPos).end()
+            if self.iPos < len(self.sBuffer):
+                return self.sBuffer[self.iPos]
+            if not self.fill():
+                return ''
+
+    def expect(self, sChars):
+        """ Takes the next character, it must be one of the expected.
+
+        :param sChars: The expected characters.
+        :type sChars: str
+        :return: The character.
+        :rtype: str
+        :raise ValueError: If there is another character or the end.
+        """
+        sChar = self.peek()
+        if not sChar or sChar not in sChars:
+            raise ValueError(f'Expecting one of {sChars!r} in JSON, got '
+                             f'{sChar or "the end"!r}.')
+
+        self.iPos += 1
+        return sChar
+
+    def value(self):
+        """ Decodes the next value.
+
+        :return: The value.
+        :rtype: object
+        :raise ValueError: If the value is wrong or not finished.
+        """
+        self.peek()
+        while True:
+            try:
+                oValue, iEnd = self.oDecoder.raw_decode(self.sBuffer,
+                                                        self.iPos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+
+            # A number or a word may go on in the next chunk.
+            if iEnd == len(self.sBuffer) and \
+                    self.sBuffer[iEnd - 1] not in '"]}' and self.fill():
+                continue
+
+            self.iPos = iEnd
+            return oValue
+
+
+def json_stream_items(iChunks, sField='results', dRest=None):
+    """ Yields the elements of a list of a JSON object while the object is
+    read.
+
+    :param iChunks: Chunks of the UTF-8 text of the object.
+    :type iChunks: Iterable[bytes]
+    :param sField: The name of the list.
+    :type sField: str
+    :param dRest: The dictionary that gets the other fields of the object.
+    :type dRest: dict or None
+    :return: The elements of the list.
+    :rtype: Iterator
+    :raise ValueError: If the text isn't an object with the list.
+    """
+    oStream = JSONStream(iChunks)
+    oStream.expect('{')
+    bFound = False
+    if oStream.peek() == '}':
+        oStream.iPos += 1
+    else:
+        while True:
+            sKey = oStream.value()
+            if not isinstance(sKey, str):
+                raise ValueError(f'Wrong key {sKey!r} in JSON.')
+
+            oStream.expect(':')
+            if sKey == sField and oStream.peek() == '[':
+                bFound = True
+                oStream.iPos += 1
+                if oStream.peek() == ']':
+                    oStream.iPos += 1
+                else:
+                    while True:
+                        yield oStream.value()
+                        if oStream.expect(',]') == ']':
+                            break
+            else:
+                oValue = oStream.value()
+                if dRest is not None:
+                    dRest[sKey] = oValue
+
+            if oStream.expect(',}') == '}':
+                break
+
+    if oStream.peek():
+        raise ValueError('Extra data after JSON object.')
+    if not bFound:
+        raise ValueError(f'No list {sField!r} in JSON object.')
+
+
+if __name__ == '__main__':
+    pass
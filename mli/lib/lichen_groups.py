@@ -0,0 +1,273 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module decides which taxa of gbif are lichens by the groups kept as
+data.
+
+A group is a class, an order, a family or a genus, which is lichenized or
+not. The rules are checked from the genus up to the class, and the lowest
+group found decides, so a genus of fungi in a lichen order or a lichen
+genus in a class of fungi is an exception of the higher group. The groups
+are kept in the table LichenGroups, which is filled by DEFAULT_GROUPS at
+the first use, and the section [Lichens] of the configuration file adds to
+them:
+    [Lichens]
+    genus = Dictyonema, Lichenomphalia
+    not_genus = Some fungus
+
+The decisions are remembered by the names of the four groups, so a taxon
+of a known combination is checked by one dictionary lookup.
+
+Function:
+    lichen_get_groups()
+    lichen_set_groups(oGroups)
+
+Class:
+    LichenGroups(dLichens=None, dFungi=None)
+
+Using:
+    oGroups = LichenGroups.from_db(oConnector, oConfig)
+    lichen_set_groups(oGroups)
+    lLichens = list(oGroups.filter_lichens(lRecords))
+"""
+
+import logging
+import threading
+from sqlite3 import DatabaseError
+
+# The ranks of the groups from the lowest.
+LICHEN_RANKS = ('genus', 'family', 'order', 'class')
+
+# The lichenized groups known before the table is filled.
+DEFAULT_GROUPS = {
+    'class': ('Arthoniomycetes', 'Lecanoromycetes', 'Lichinomycetes'),
+    'order': ('Pyrenulales', 'Verrucariales'),
+    'family': ('Abrothallaceae', 'Aphanopsidaceae', 'Arthopyreniaceae',
+               'Coniocybaceae', 'Naetrocymbaceae', 'Sphinctrinaceae',
+               'Strigulaceae', 'Thelocarpaceae'),
+    'genus': ('Dictyonema', 'Lichenomphalia', 'Multiclavula'),
+}
+
+LICHEN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS LichenGroups (
+    rankName   TEXT    NOT NULL,
+    groupName  TEXT    NOT NULL,
+    lichenized INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (rankName, groupName)
+);
+"""
+
+
+class LichenGroups:
+    """ The lichenized groups and the exceptions.
+
+    *Methods*
+        * from_db -- Reads the groups from the database and the config.
+        * add_config -- Adds the groups of the configuration file.
+        * decide -- Finds the lowest group that is lichenized or not.
+        * is_lichen -- Checks if a taxon is a lichen.
+        * filter_lichens -- Leaves the lichens of many records.
+    """
+
+    def __init__(self, dLichens=None, dFungi=None):
+        """ Initiating a class.
+
+        :param dLichens: Dictionary of a rank and the names of its
+            lichenized groups, DEFAULT_GROUPS by default.
+        :type dLichens: dict[str, Iterable[str]] or None
+        :param dFungi: Dictionary of a rank and the names of its groups that
+            aren't lichens.
+        :type dFungi: dict[str, Iterable[str]] or None
+        """
+        if dLichens is None:
+            dLichens = DEFAULT_GROUPS
+        dFungi = dFungi or {}
+        self.dLichens = {sRank: frozenset(dLichens.get(sRank, ()))
+                         for sRank in LICHEN_RANKS}
+        self.dFungi = {sRank: frozenset(dFungi.get(sRank, ()))
+                       for sRank in LICHEN_RANKS}
+        # The decisions by the names of the genus, the family, the order and
+        # the class.
+        self.dKnown = {}
+
+    @classmethod
+    def from_db(cls, oConnector, oConfig=None, sSection='Lichens'):
+        """ Reads the groups from the table LichenGroups, the table is
+        created and filled by DEFAULT_GROUPS if it is empty.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param oConfig: The configuration with more groups.
+        :type oConfig: ConfigParser or None
+        :param sSection: The section of the groups.
+        :type sSection: str
+        :return: The groups.
+        :rtype: LichenGroups
+        """
+        oConnection = oConnector.oConnector
+        try:
+            oConnection.executescript(LICHEN_SCHEMA)
+            if not oConnection.execute(
+                    'SELECT 1 FROM LichenGroups LIMIT 1;').fetchone():
+                oConnection.executemany(
+                    'INSERT INTO LichenGroups (rankName, groupName) '
+                    'VALUES (?, ?);',
+                    [(sRank, sName) for sRank, tNames in
+                     DEFAULT_GROUPS.items() for sName in tNames])
+                oConnection.commit()
+            lRows = oConnection.execute(
+                'SELECT rankName, groupName, lichenized '
+                'FROM LichenGroups;').fetchall()
+        except DatabaseError as e:
+            oConnection.rollback()
+            logging.exception(f'Cannot read the lichen groups: {e}')
+            lRows = []
+
+        dLichens = {sRank: set() for sRank in LICHEN_RANKS}
+        dFungi = {sRank: set() for sRank in LICHEN_RANKS}
+        for sRank, sName, bLichenized in lRows:
+            sRank = sRank.lower()
+            if sRank in dLichens:
+                (dLichens if bLichenized else dFungi)[sRank].add(sName)
+        if not lRows:
+            dLichens = None
+
+        oGroups = cls(dLichens, dFungi)
+        if oConfig is not None:
+            oGroups.add_config(oConfig, sSection)
+
+        return oGroups
+
+    def add_config(self, oConfig, sSection='Lichens'):
+        """ Adds the groups of the configuration file. The option of a rank
+        names the lichenized groups, the option 'not_' with the rank names
+        the groups that aren't lichens, the names are separated by commas.
+
+        :param oConfig: The configuration.
+        :type oConfig: ConfigParser
+        :param sSection: The section of the groups.
+        :type sSection: str
+        :return: None
+        """
+        if not oConfig.has_section(sSection):
+            return
+
+        for sRank in LICHEN_RANKS:
+            for dGroups, sOption in ((self.dLichens, sRank),
+                                     (self.dFungi, f'not_{sRank}')):
+                sNames = oConfig.get(sSection, sOption, fallback='')
+                setNames = {sName.strip() for sName in sNames.split(',')
+                            if sName.strip()}
+                if setNames:
+                    dGroups[sRank] = dGroups[sRank] | setNames
+        self.dKnown = {}
+
+    def decide(self, tGroups):
+        """ Finds the lowest group that is lichenized or not.
+
+        :param tGroups: The names of the genus, the family, the order and
+            the class.
+        :type tGroups: tuple
+        :return: True if the taxon is a lichen.
+        :rtype: bool
+        """
+        for sRank, sName in zip(LICHEN_RANKS, tGroups):
+            if not sName:
+                continue
+            if sName in self.dFungi[sRank]:
+                return False
+            if sName in self.dLichens[sRank]:
+                return True
+
+        return False
+
+    def is_lichen(self, dTaxon):
+        """ Checks if the taxon is a lichen.
+
+        :param dTaxon: A record of gbif or a row of the backbone with the
+            fields 'genus', 'family', 'order' and 'class'.
+        :type dTaxon: dict
+        :return: True if taxon is lichen, and False if opposite.
+        :rtype: bool
+        """
+        tGroups = (dTaxon.get('genus'), dTaxon.get('family'),
+                   dTaxon.get('order'), dTaxon.get('class'))
+        bLichen = self.dKnown.get(tGroups)
+        if bLichen is None:
+            bLichen = self.dKnown[tGroups] = self.decide(tGroups)
+
+        return bLichen
+
+    def filter_lichens(self, iRecords):
+        """ Leaves the lichens of the records, the records are read one by
+        one, so the rows of a whole archive can be passed.
+
+        :param iRecords: Records of gbif or rows of the backbone.
+        :type iRecords: Iterable[dict]
+        :return: The lichens.
+        :rtype: Iterator[dict]
+        """
+        dKnown = self.dKnown
+        fDecide = self.decide
+        for dTaxon in iRecords:
+            tGroups = (dTaxon.get('genus'), dTaxon.get('family'),
+                       dTaxon.get('order'), dTaxon.get('class'))
+            bLichen = dKnown.get(tGroups)
+            if bLichen is None:
+                bLichen = dKnown[tGroups] = fDecide(tGroups)
+            if bLichen:
+                yield dTaxon
+
+
+_oGroups = None
+_oGroupsLock = threading.Lock()
+
+
+def lichen_get_groups():
+    """ Gets the groups that are shared by all functions selecting lichens.
+    They are created by DEFAULT_GROUPS at the first call.
+
+    :return: The groups.
+    :rtype: LichenGroups
+    """
+    global _oGroups
+    with _oGroupsLock:
+        if _oGroups is None:
+            _oGroups = LichenGroups()
+
+    return _oGroups
+
+
+def lichen_set_groups(oGroups):
+    """ Replaces the shared groups, for example, by the groups of the
+    database.
+
+    :param oGroups: The new groups.
+    :type oGroups: LichenGroups
+    :return: The former groups.
+    :rtype: LichenGroups or None
+    """
+    global _oGroups
+    with _oGroupsLock:
+        oOld, _oGroups = _oGroups, oGroups
+
+    return oOld
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,403 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module collects the metrics of the imports and the updates, so it
+can be seen whether a slow run waits for the network, the parsing or
+sqlite.
+
+There are four kinds of metrics:
+    * counters, for example 'cache.hit' or 'errors.http';
+    * histograms of durations in seconds, for example 'http.species/{key}'
+      or 'gbif_sync.write', they keep the number of values in buckets, so
+      the percentiles are known without keeping the values;
+    * gauges, for example 'gbif_sync.waiting', the last and the largest
+      value;
+    * rows written to every table, with the rate per second of the run.
+
+The names of the network are 'http.<endpoint>' and 'http.wait' for the
+rate limiter, a Pipeline named 'name' has 'name.fetch', 'name.parse' and
+'name.write'. The counters starting with 'errors.' are the errors.
+
+All functions of a run share one instance, which is used by the threads
+of the pipeline and of the gbif client at the same time, so it is guarded
+by a lock.
+
+Function:
+    metrics_get()
+    metrics_set(oMetrics)
+
+Class:
+    Histogram(tBounds=METRIC_BUCKETS)
+    Metrics()
+
+Using:
+    oMetrics = Metrics()
+    metrics_set(oMetrics)
+    with oMetrics.timer('gbif_sync.write'):
+        gbif_upsert(oConnector, lAnswer)
+    oMetrics.add_rows('Taxa', 20)
+    print(oMetrics.get_summary())
+    oMetrics.dump('metrics.json')
+"""
+
+import json
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from os import makedirs, path
+from time import monotonic, time
+
+# The upper bounds of the buckets of durations in seconds.
+METRIC_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                  1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The percentiles of a histogram in the summary and the dump.
+METRIC_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """ Counts values in buckets with upper bounds. The values above the last
+    bound are counted in the last bucket, which has no bound.
+
+    *Methods*
+        * add -- Counts a value.
+        * get_percentile -- Estimates a percentile by the buckets.
+        * get_stats -- Gets the numbers of the histogram.
+    """
+
+    def __init__(self, tBounds=METRIC_BUCKETS):
+        """ Initiating a class.
+
+        :param tBounds: The upper bounds of the buckets in ascending order.
+        :type tBounds: tuple[float]
+        """
+        self.tBounds = tuple(tBounds)
+        self.lCounts = [0] * (len(self.tBounds) + 1)
+        self.iCount = 0
+        self.fSum = 0.0
+        self.fMin = None
+        self.fMax = None
+
+    def add(self, fValue):
+        """ Counts a value.
+
+        :param fValue: The value.
+        :type fValue: float
+        :return: None
+        """
+        self.lCounts[bisect_left(self.tBounds, fValue)] += 1
+        self.iCount += 1
+        self.fSum += fValue
+        if self.fMin is None or fValue < self.fMin:
+            self.fMin = fValue
+        if self.fMax is None or fValue > self.fMax:
+            self.fMax = fValue
+
+    def get_percentile(self, fPart):
+        """ Estimates a percentile as the upper bound of the bucket where it
+        is, but not more than the largest value.
+
+        :param fPart: The part of the values, for example 0.9.
+        :type fPart: float
+        :return: The percentile, or None if there are no values.
+        :rtype: float or None
+        """
+        if not self.iCount:
+            return
+
+        iRank = max(1, round(fPart * self.iCount))
+        iSeen = 0
+        for fBound, iCount in zip(self.tBounds, self.lCounts):
+            iSeen += iCount
+            if iSeen >= iRank:
+                return min(fBound, self.fMax)
+
+        return self.fMax
+
+    def get_stats(self):
+        """ Gets the numbers of the histogram.
+
+        :return: The count, the sum, the least, the mean and the largest
+            values, the percentiles 'p50', 'p90', 'p99' and the counts of
+            the buckets by their bounds.
+        :rtype: dict
+        """
+        dStats = {'count': self.iCount, 'sum': self.fSum, 'min': self.fMin,
+                  'mean': self.fSum / self.iCount if self.iCount else None,
+                  'max': self.fMax}
+        for fPart in METRIC_PERCENTILES:
+            dStats[f'p{round(fPart * 100)}'] = self.get_percentile(fPart)
+        lBounds = [str(fBound) for fBound in self.tBounds] + ['inf']
+        dStats['buckets'] = dict(zip(lBounds, self.lCounts))
+
+        return dStats
+
+
+class Metrics:
+    """ The counters, the histograms, the gauges and the written rows of a
+    run.
+
+    *Methods*
+        * count -- Adds to a counter.
+        * observe -- Adds a duration to a histogram.
+        * timer -- Measures the duration of a block.
+        * gauge -- Sets a gauge.
+        * add_rows -- Counts the rows written to a table.
+        * get_stats -- Gets all metrics as a dictionary.
+        * get_summary -- Gets the main metrics as a short text.
+        * dump -- Writes all metrics into a JSON file.
+    """
+
+    def __init__(self):
+        """ Initiating a class. """
+        self.oLock = threading.Lock()
+        self.fStart = monotonic()
+        self.fStarted = time()
+        self.dCounters = {}
+        self.dHistograms = {}
+        # The name of a gauge -> [the last value, the largest value].
+        self.dGauges = {}
+        self.dRows = {}
+
+    def count(self, sName, iCount=1):
+        """ Adds to a counter.
+
+        :param sName: The name of the counter.
+        :type sName: str
+        :param iCount: What is added.
+        :type iCount: int
+        :return: None
+        """
+        with self.oLock:
+            self.dCounters[sName] = self.dCounters.get(sName, 0) + iCount
+
+    def observe(self, sName, fValue):
+        """ Adds a duration to a histogram.
+
+        :param sName: The name of the histogram.
+        :type sName: str
+        :param fValue: The duration in seconds.
+        :type fValue: float
+        :return: None
+        """
+        with self.oLock:
+            oHistogram = self.dHistograms.get(sName)
+            if oHistogram is None:
+                oHistogram = self.dHistograms[sName] = Histogram()
+            oHistogram.add(fValue)
+
+    @contextmanager
+    def timer(self, sName):
+        """ Measures the duration of a block, also if it raises.
+
+        :param sName: The name of the histogram.
+        :type sName: str
+        :return: None
+        """
+        fStart = monotonic()
+        try:
+            yield
+        finally:
+            self.observe(sName, monotonic() - fStart)
+
+    def gauge(self, sName, fValue):
+        """ Sets a gauge, for example the size of a queue.
+
+        :param sName: The name of the gauge.
+        :type sName: str
+        :param fValue: The current value.
+        :type fValue: float
+        :return: None
+        """
+        with self.oLock:
+            lGauge = self.dGauges.get(sName)
+            if lGauge is None:
+                self.dGauges[sName] = [fValue, fValue]
+            else:
+                lGauge[0] = fValue
+                lGauge[1] = max(lGauge[1], fValue)
+
+    def add_rows(self, sTable, iCount):
+        """ Counts the rows written to a table.
+
+        :param sTable: The name of the table.
+        :type sTable: str
+        :param iCount: Number of the rows.
+        :type iCount: int
+        :return: None
+        """
+        if iCount and iCount > 0:
+            with self.oLock:
+                self.dRows[sTable] = self.dRows.get(sTable, 0) + iCount
+
+    def get_stats(self):
+        """ Gets all metrics.
+
+        :return: The start time, the duration, the counters, the histograms,
+            the gauges, the rows of the tables with their rate, the cache
+            hit rate and the number of errors.
+        :rtype: dict
+        """
+        with self.oLock:
+            fTime = monotonic() - self.fStart
+            dCounters = dict(self.dCounters)
+            dHistograms = {sName: oHistogram.get_stats() for sName, oHistogram
+                           in sorted(self.dHistograms.items())}
+            dGauges = {sName: {'last': lGauge[0], 'max': lGauge[1]}
+                       for sName, lGauge in sorted(self.dGauges.items())}
+            dRows = dict(self.dRows)
+
+        iHits = dCounters.get('cache.hit', 0) + \
+            dCounters.get('cache.revalidated', 0)
+        # An expired record is a hit if the server says it's the same.
+        iLookups = dCounters.get('cache.hit', 0) + \
+            dCounters.get('cache.miss', 0) + dCounters.get('cache.expired', 0)
+        return {
+            'started': self.fStarted,
+            'time': fTime,
+            'counters': dict(sorted(dCounters.items())),
+            'histograms': dHistograms,
+            'gauges': dGauges,
+            'rows': {sTable: {'count': iCount,
+                              'rate': iCount / fTime if fTime else 0.0}
+                     for sTable, iCount in sorted(dRows.items())},
+            'cache_hit_rate': iHits / iLookups if iLookups else None,
+            'errors': sum(iCount for sName, iCount in dCounters.items()
+                          if sName.startswith('errors.')),
+        }
+
+    def get_summary(self, bDetail=False):
+        """ Gets the main metrics as a text: the requests and their median
+        time, the wait of the rate limiter, the cache hit rate, the time of
+        the stages, the rows per second and the errors.
+
+        :param bDetail: If True, every endpoint, stage, queue and table is
+            written on its own line.
+        :type bDetail: bool
+        :return: The text.
+        :rtype: str
+        """
+        dStats = self.get_stats()
+        dHistograms = dStats['histograms']
+        dWait = dHistograms.get('http.wait')
+        dHTTP = {sName[5:]: dValue for sName, dValue in dHistograms.items()
+                 if sName.startswith('http.') and sName != 'http.wait'}
+        dStages = {sName: dValue for sName, dValue in dHistograms.items()
+                   if not sName.startswith('http.')}
+        iRequests = sum(dValue['count'] for dValue in dHTTP.values())
+        fHTTP = sum(dValue['sum'] for dValue in dHTTP.values())
+        iRows = sum(dValue['count'] for dValue in dStats['rows'].values())
+
+        lParts = []
+        if iRequests:
+            lParts.append(f'http {iRequests} req '
+                          f'{1000 * fHTTP / iRequests:.0f} ms avg')
+        if dWait and dWait['sum']:
+            lParts.append(f'wait {dWait["sum"]:.1f} s')
+        if dStats['cache_hit_rate'] is not None:
+            lParts.append(f'cache {100 * dStats["cache_hit_rate"]:.0f}%')
+        for sName, dValue in dStages.items():
+            lParts.append(f'{sName} {dValue["sum"]:.1f} s')
+        if iRows:
+            lParts.append(f'rows {iRows / dStats["time"]:.0f}/s')
+        lParts.append(f'errors {dStats["errors"]}')
+        sSummary = ', '.join(lParts)
+        if not bDetail:
+            return sSummary
+
+        lLines = [sSummary]
+        for sName, dValue in sorted(dHTTP.items()) + sorted(dStages.items()):
+            lLines.append(
+                f'  {sName}: {dValue["count"]} x, {dValue["sum"]:.2f} s, '
+                f'p50 {1000 * dValue["p50"]:.0f} ms, '
+                f'p90 {1000 * dValue["p90"]:.0f} ms, '
+                f'max {1000 * dValue["max"]:.0f} ms')
+        for sName, dValue in dStats['gauges'].items():
+            lLines.append(f'  {sName}: last {dValue["last"]}, '
+                          f'max {dValue["max"]}')
+        for sTable, dValue in dStats['rows'].items():
+            lLines.append(f'  rows {sTable}: {dValue["count"]}, '
+                          f'{dValue["rate"]:.1f}/s')
+        for sName, iCount in dStats['counters'].items():
+            lLines.append(f'  {sName}: {iCount}')
+
+        return '\n'.join(lLines)
+
+    def dump(self, sFile, dExtra=None):
+        """ Writes all metrics into a JSON file, the directory is created if
+        it is missing.
+
+        :param sFile: The path of the file.
+        :type sFile: str
+        :param dExtra: More values of the run, for example the command.
+        :type dExtra: dict or None
+        :return: True if the file is written, otherwise False.
+        :rtype: bool
+        """
+        dStats = self.get_stats()
+        dStats.update(dExtra or {})
+        try:
+            sDir = path.dirname(sFile)
+            if sDir:
+                makedirs(sDir, exist_ok=True)
+            with open(sFile, 'w', encoding='utf-8') as fFile:
+                json.dump(dStats, fFile, indent=2)
+        except OSError as e:
+            logging.error(f'Cannot write the metrics to {sFile}: {e}')
+            return False
+
+        return True
+
+
+_oMetrics = None
+_oMetricsLock = threading.Lock()
+
+
+def metrics_get():
+    """ Gets the metrics that are shared by all functions of the run. They
+    are created at the first call.
+
+    :return: The metrics.
+    :rtype: Metrics
+    """
+    global _oMetrics
+    with _oMetricsLock:
+        if _oMetrics is None:
+            _oMetrics = Metrics()
+
+    return _oMetrics
+
+
+def metrics_set(oMetrics):
+    """ Replaces the shared metrics, for example, by new ones for a run.
+
+    :param oMetrics: The new metrics.
+    :type oMetrics: Metrics
+    :return: The former metrics.
+    :rtype: Metrics or None
+    """
+    global _oMetrics
+    with _oMetricsLock:
+        oOld, _oMetrics = _oMetrics, oMetrics
+
+    return oOld
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,299 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module provides a local parser of scientific names of botany and
+mycology, so a name is split into parts without GBIF name parser. The
+fields of the result are named as in the answer of GBIF parser, and the
+authors are normalized in the same way: 'Th. Fr.' becomes 'Th.Fr.'.
+
+The parser understands uninomials, binomials and trinomials, infrageneric
+and infraspecific ranks, named hybrids and hybrid formulas, bracket
+authors, 'ex' and 'in' authors, years, nomenclatural notes and 'sensu'.
+
+Function:
+    name_parse(sString)
+    name_parse_authorship(sString)
+    name_split(sString)
+
+Using:
+    oName = name_parse('Xanthoria parietina (L.) Th. Fr., 1860')
+    oName.canonicalName    # 'Xanthoria parietina'
+    oName.authorship       # 'Th.Fr.'
+    oName.bracketAuthorship    # 'L.'
+    oName.year             # '1860'
+"""
+
+import re
+from collections import namedtuple
+
+ParsedName = namedtuple(
+    'ParsedName',
+    'scientificName, type, genusOrAbove, infraGeneric, specificEpithet, '
+    'infraSpecificEpithet, rankMarker, notho, authorship, '
+    'bracketAuthorship, year, bracketYear, nomStatus, sensu, '
+    'canonicalName, canonicalNameWithMarker')
+
+# Rank markers that stand before an infraspecific epithet.
+INFRASPECIFIC_RANKS = {
+    'subsp.': 'subsp.', 'ssp.': 'subsp.', 'subsp': 'subsp.',
+    'ssp': 'subsp.', 'nothosubsp.': 'nothosubsp.', 'var.': 'var.',
+    'var': 'var.', 'nothovar.': 'nothovar.', 'subvar.': 'subvar.',
+    'f.': 'f.', 'fo.': 'f.', 'forma': 'f.', 'fma.': 'f.',
+    'subf.': 'subf.', 'morph.': 'morph.'}
+
+# Rank markers that stand before an infrageneric name.
+INFRAGENERIC_RANKS = {
+    'subgen.': 'subgen.', 'subg.': 'subgen.', 'sect.': 'sect.',
+    'subsect.': 'subsect.', 'ser.': 'ser.', 'subser.': 'subser.'}
+
+# Markers of names with an uncertain or missing epithet.
+INFORMAL_MARKERS = frozenset(('cf.', 'aff.', 'sp.', 'spp.', 'indet.'))
+
+# Lowercase words that belong to authors and can't be epithets.
+AUTHOR_WORDS = frozenset((
+    'ex', 'in', 'et', 'and', '&', 'al.', 'de', 'del', 'della', 'van', 'von',
+    'der', 'den', 'da', 'du', 'la', 'le', 'les', 'ter', 'zu', 'y', 'f.',
+    'fil.', 'emend.', 'sensu', 'auct.', 'non', 'nec', 'nom.', 'comb.',
+    'stat.', 'sp.', 'nov.', 's.', 'l.', 'str.', 'lat.'))
+
+HYBRID_SIGN = '×'
+
+RE_SPACES = re.compile(r'\s+')
+RE_RANK_PREFIX = re.compile(r'^\(\w+\)\s+')
+RE_HYBRID_FORMULA = re.compile(r'\s[×xX]\s(?=[A-Z×])')
+# The sign may stand before an epithet without a space, but the letter x
+# can't, it would be the beginning of the epithet.
+RE_HYBRID_SIGN = re.compile(
+    r'(^|\s)(?:[×xX](?:\s(?=[A-Za-z])|(?=[A-Z]))|×(?=[a-zà-ÿ]))')
+RE_GENUS = re.compile(r"^[A-Z][a-zà-ÿ']+(?:-[A-Za-zà-ÿ][a-zà-ÿ']*)*$")
+RE_EPITHET = re.compile(r'^[a-zà-ÿ][a-zà-ÿ-]*$')
+RE_SUBGENUS = re.compile(r'^\(([A-Z][a-z-]+)\)$')
+RE_OTU = re.compile(r'^[A-Z]{2,3}\d+\.\d+[A-Z]{0,2}$')
+RE_NOM_STATUS = re.compile(
+    r'[,\s]*\b((?:nom|comb|stat|sp|gen)\.\s*'
+    r'(?:nov|illeg|inval|nud|cons|rej|superfl|dub|ambig|prov)\.?'
+    r'(?:\s*(?:prop|nov)\.)?)\s*$')
+RE_SENSU = re.compile(
+    r'[,\s]*\b((?:sensu|auct\.|non|nec)\s.*|auct\.|s\.\s?(?:l|str|lat)\.)'
+    r'\s*$')
+RE_YEAR = re.compile(r'(?:^|[,\s])\s*[(\[]?(1[5-9]\d\d|20\d\d)[a-z]?[)\]]?$')
+RE_CITATION = re.compile(r'\s+in\s+[^,]*\d.*$')
+RE_INITIALS = re.compile(r'\.\s+(?=[A-ZÀ-Þ]|f\.|fil\.)')
+RE_AMPERSAND = re.compile(r'\s*&\s*')
+
+
+def name_parse_authorship(sString):
+    """ Splits an authorship string into the authors, the year, the bracket
+    authors and their year.
+
+    :param sString: Authorship, for example '(L., 1758) Th. Fr. 1860'.
+    :type sString: str
+    :return: The authors, the year, the bracket authors, the bracket year,
+        the nomenclatural status and the 'sensu' part.
+    :rtype: tuple[str|None, str|None, str|None, str|None, str|None,
+        str|None]
+    """
+    sAuthor = RE_SPACES.sub(' ', sString or '').strip(' ,')
+    sNomStatus = sSensu = sYear = sBracket = sBracketYear = None
+
+    bChanged = True
+    while sAuthor and bChanged:
+        bChanged = False
+        oMatch = RE_NOM_STATUS.search(sAuthor)
+        if oMatch:
+            sNomStatus = oMatch.group(1)
+            sAuthor = sAuthor[:oMatch.start()].rstrip(' ,')
+            bChanged = True
+        oMatch = RE_SENSU.search(sAuthor)
+        if oMatch:
+            sSensu = oMatch.group(1)
+            sAuthor = sAuthor[:oMatch.start()].rstrip(' ,')
+            bChanged = True
+
+    if sAuthor.startswith('('):
+        iEnd = sAuthor.find(')')
+        if iEnd > 0:
+            sBracket = sAuthor[1:iEnd].strip(' ,')
+            sAuthor = sAuthor[iEnd + 1:].strip(' ,')
+            oMatch = RE_YEAR.search(sBracket)
+            if oMatch:
+                sBracketYear = oMatch.group(1)
+                sBracket = sBracket[:oMatch.start()].strip(' ,')
+
+    oMatch = RE_YEAR.search(sAuthor)
+    if oMatch:
+        sYear = oMatch.group(1)
+        sAuthor = sAuthor[:oMatch.start()].strip(' ,')
+    # 'in Lichenologist 8: 1976' is the publication, not an author.
+    sAuthor = RE_CITATION.sub('', sAuthor)
+
+    return (name_norm_authors(sAuthor), sYear, name_norm_authors(sBracket),
+            sBracketYear, sNomStatus, sSensu)
+
+
+def name_norm_authors(sAuthor):
+    """ Normalizes authors as GBIF does: no spaces after initials and one
+    space around '&'.
+
+    :param sAuthor: Authors.
+    :type sAuthor: str or None
+    :return: Normalized authors, or None if the string is empty.
+    :rtype: str or None
+    """
+    if not sAuthor:
+        return
+
+    sAuthor = RE_INITIALS.sub('.', sAuthor)
+    return RE_AMPERSAND.sub(' & ', sAuthor)
+
+
+def name_parse(sString):
+    """ Parses a scientific name.
+
+    :param sString: A scientific name, it can begin with '(rank)'.
+    :type sString: str
+    :return: Parts of the name. If the name can't be parsed, canonicalName is
+        None and type is 'NO_NAME', 'OTU' or 'HYBRID_FORMULA'.
+    :rtype: ParsedName
+    """
+    sName = RE_SPACES.sub(' ', sString or '').strip()
+    sName = RE_RANK_PREFIX.sub('', sName)
+    dName = dict.fromkeys(ParsedName._fields)
+    dName['scientificName'] = sString
+    dName['type'] = 'SCIENTIFIC'
+
+    if RE_OTU.match(sName):
+        dName['type'] = 'OTU'
+        return ParsedName(**dName)
+    if RE_HYBRID_FORMULA.search(sName):
+        dName['type'] = 'HYBRID_FORMULA'
+        return ParsedName(**dName)
+
+    lTokens = RE_HYBRID_SIGN.sub(f'\\1{HYBRID_SIGN} ', sName).split(' ')
+    iLen = len(lTokens)
+    i = 0
+    if lTokens[0] == HYBRID_SIGN:
+        dName['notho'] = 'GENERIC'
+        i = 1
+    if i >= iLen or not RE_GENUS.match(lTokens[i]):
+        dName['type'] = 'NO_NAME'
+        return ParsedName(**dName)
+
+    dName['genusOrAbove'] = lTokens[i]
+    lCanonical = [lTokens[i]]
+    lMarked = [lTokens[i]]
+    i += 1
+
+    def is_epithet(j):
+        """ Checks if the token j is an epithet and not a part of authors.
+        """
+        if j >= iLen or not RE_EPITHET.match(lTokens[j]):
+            return False
+        if lTokens[j] in AUTHOR_WORDS:
+            return False
+
+        return True
+
+    # Infrageneric name: 'Cladonia (Cladina) arbuscula' or
+    # 'Cladonia subgen. Cladina'.
+    if i < iLen:
+        oMatch = RE_SUBGENUS.match(lTokens[i])
+        sMarker = INFRAGENERIC_RANKS.get(lTokens[i].lower())
+        if oMatch and is_epithet(i + 1):
+            dName['infraGeneric'] = oMatch.group(1)
+            i += 1
+        elif sMarker and i + 1 < iLen and RE_GENUS.match(lTokens[i + 1]):
+            dName['infraGeneric'] = lTokens[i + 1]
+            dName['rankMarker'] = sMarker
+            lCanonical = [lTokens[i + 1]]
+            lMarked.extend((sMarker, lTokens[i + 1]))
+            i += 2
+
+    # Species: 'Salix × rubens', 'Lecanora cf. muralis', 'Lecanora sp.'.
+    if i < iLen and not dName['rankMarker']:
+        if lTokens[i] in ('cf.', 'aff.') and is_epithet(i + 1):
+            dName['type'] = 'INFORMAL'
+            i += 1
+        elif lTokens[i] in INFORMAL_MARKERS:
+            dName['type'] = 'INFORMAL'
+            dName['rankMarker'] = 'sp.'
+            i = iLen
+        if i < iLen and lTokens[i] == HYBRID_SIGN and is_epithet(i + 1):
+            dName['notho'] = 'SPECIFIC'
+            i += 1
+        if is_epithet(i):
+            dName['specificEpithet'] = lTokens[i]
+            lCanonical.append(lTokens[i])
+            lMarked.append(lTokens[i])
+            i += 1
+
+    # Infraspecific epithet, the last one is taken, the authors of the
+    # species before it are dropped.
+    if dName['specificEpithet']:
+        iLast = None
+        if is_epithet(i):
+            iLast = i
+            dName['infraSpecificEpithet'] = lTokens[i]
+        for j in range(i, iLen - 1):
+            sMarker = INFRASPECIFIC_RANKS.get(lTokens[j])
+            if sMarker and is_epithet(j + 1):
+                iLast = j + 1
+                dName['rankMarker'] = sMarker
+                dName['infraSpecificEpithet'] = lTokens[j + 1]
+        if iLast is not None:
+            lCanonical.append(dName['infraSpecificEpithet'])
+            if dName['rankMarker']:
+                lMarked.append(dName['rankMarker'])
+            lMarked.append(dName['infraSpecificEpithet'])
+            i = iLast + 1
+            if dName['rankMarker'] and \
+                    dName['rankMarker'].startswith('notho'):
+                dName['notho'] = 'INFRASPECIFIC'
+
+    (dName['authorship'], dName['year'], dName['bracketAuthorship'],
+     dName['bracketYear'], dName['nomStatus'],
+     dName['sensu']) = name_parse_authorship(' '.join(lTokens[i:]))
+
+    dName['canonicalName'] = ' '.join(lCanonical)
+    dName['canonicalNameWithMarker'] = ' '.join(lMarked)
+    return ParsedName(**dName)
+
+
+def name_split(sString):
+    """ Parses a name into the canonical name, the authors with the bracket
+    authors and the year, as gbif_parser_name() does.
+
+    :param sString: A scientific name.
+    :type sString: str
+    :return: A canonical name, an author name and a naming year of the taxon.
+    :rtype: tuple[str, str|None, int|None]
+    """
+    oName = name_parse(sString)
+    if oName.canonicalName is None:
+        return sString, None, None
+
+    sAuthor = oName.authorship or ''
+    if oName.bracketAuthorship:
+        sAuthor = f'({oName.bracketAuthorship}) {sAuthor}'.strip()
+    iYear = int(oName.year) if oName.year else None
+
+    return oName.canonicalName, sAuthor or None, iYear
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,373 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module runs an import as a pipeline of stages, so the network, the
+parsing and the database work at the same time.
+
+An item goes through three stages:
+    * fetch -- a pool of threads, for example requests to gbif;
+    * parse -- another pool of threads, for example the names parsing;
+    * write -- the thread that runs the pipeline. The results are written
+      by batches: when iBatch results have come or fInterval seconds have
+      passed since the first result of the batch.
+
+The connection of sqlite can't be used by other threads, so the calling
+thread is the only writer, and it also takes the items from the source,
+which may be a cursor of the same database. A stage without a function is
+skipped, and a stage with no threads is run by the thread of the stage
+before it.
+
+Not more than iWindow items are in the stages at once, so the source is
+read as fast as the results are written, and the memory stays bounded. An
+item whose result is None is skipped. A failed item is given to fFail and
+the pipeline goes on. If a batch can't be written, its items are written
+one by one, so only the failed ones are lost, or, without bSplit, the
+pipeline stops. An exception of the source, the writer or fFail stops the
+pipeline: the items not started yet are dropped, the started ones are
+waited for, but the results which were not written stay unwritten.
+
+The time of the stages is kept in the shared Metrics as '<name>.fetch',
+'<name>.parse' and '<name>.write', the items in the stages and the results
+waiting for the writer as the gauges '<name>.active' and '<name>.waiting'
+at every batch, and the failed items as 'errors.<name>'. If the writer
+waits for the results, the network or the parsing is slow, and if the
+results wait for the writer, the database is.
+
+Class:
+    Pipeline(fWrite, fFetch=None, fParse=None, iFetchers=8, iParsers=0,
+             iBatch=100, fInterval=1.0, iWindow=None, fFail=None,
+             fProgress=None, bSplit=True, sName='pipeline')
+
+Using:
+    oPipeline = Pipeline(save_rows, fetch_page, iBatch=500)
+    dStats = oPipeline.run(lKeys)
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
+from time import monotonic
+
+from mli.lib.metrics import metrics_get
+
+# The counters of a run.
+PIPELINE_COUNTERS = ('read', 'skipped', 'written', 'failed', 'batches',
+                     'split')
+
+# The end of the source.
+END = object()
+
+
+class Pipeline:
+    """ Fetches and parses items in threads and writes their results by
+    batches from the calling thread.
+
+    *Methods*
+        * run -- Passes all items of the source through the stages.
+        * run_inline -- Runs all stages in the calling thread.
+        * write -- Writes a batch, the items of a failed batch one by one.
+    """
+
+    def __init__(self, fWrite, fFetch=None, fParse=None, iFetchers=8,
+                 iParsers=0, iBatch=100, fInterval=1.0, iWindow=None,
+                 fFail=None, fProgress=None, bSplit=True,
+                 sName='pipeline'):
+        """ Initiating a class.
+
+        :param fWrite: The function that writes a list of (item, result).
+        :type fWrite: callable
+        :param fFetch: The function that gets the data of an item, without
+            it the item is the data.
+        :type fFetch: callable or None
+        :param fParse: The function that makes the result of the data,
+            without it the data is the result.
+        :type fParse: callable or None
+        :param iFetchers: Number of threads of the fetch stage, with zero
+            the calling thread fetches.
+        :type iFetchers: int
+        :param iParsers: Number of threads of the parse stage, with zero
+            the fetching thread parses.
+        :type iParsers: int
+        :param iBatch: The most results written by one call of fWrite.
+        :type iBatch: int
+        :param fInterval: The longest time in seconds which a result waits
+            for writing, None if only the size of the batch matters.
+        :type fInterval: float or None
+        :param iWindow: The most items in the stages at once, by default
+            twice the number of the threads and at least one batch.
+        :type iWindow: int or None
+        :param fFail: The function that gets an item and its exception if
+            the item failed, by default the error is logged.
+        :type fFail: callable or None
+        :param fProgress: The function that is called after every written
+            or failed item with the numbers of the written and failed
+            items.
+        :type fProgress: callable or None
+        :param bSplit: If True, the items of a failed batch are written one
+            by one, otherwise the exception of the batch stops the
+            pipeline.
+        :type bSplit: bool
+        :param sName: The name of the pipeline in the metrics.
+        :type sName: str
+        """
+        self.fWrite = fWrite
+        self.fFetch = fFetch
+        self.fParse = fParse
+        self.iFetchers = max(0, iFetchers) if fFetch else 0
+        self.iParsers = max(0, iParsers) if fParse else 0
+        self.iBatch = max(1, iBatch)
+        self.fInterval = fInterval
+        self.iWindow = iWindow or max(
+            2 * (self.iFetchers + self.iParsers), self.iBatch)
+        self.fFail = fFail
+        self.fProgress = fProgress
+        self.bSplit = bSplit
+        self.sName = sName
+        self.dStats = dict.fromkeys(PIPELINE_COUNTERS, 0)
+
+    def run(self, iItems):
+        """ Passes all items of the source through the stages.
+
+        :param iItems: The source of items.
+        :type iItems: Iterable
+        :return: Numbers of the read, skipped, written and failed items, of
+            the written batches and of the batches written one by one.
+        :rtype: dict[str, int]
+        """
+        self.dStats = dict.fromkeys(PIPELINE_COUNTERS, 0)
+        if not self.iFetchers and not self.iParsers:
+            return self.run_inline(iItems)
+
+        oMetrics = metrics_get()
+        sParse = f'{self.sName}.parse'
+        sFetch = f'{self.sName}.fetch'
+        oItems = iter(iItems)
+        # All items in the stages have a place in the queue, so the threads
+        # never wait for it.
+        oResults = Queue(self.iWindow)
+        oStop = threading.Event()
+        oFetchers = ThreadPoolExecutor(self.iFetchers) \
+            if self.iFetchers else None
+        oParsers = ThreadPoolExecutor(self.iParsers) \
+            if self.iParsers else None
+
+        def parse(oItem, oData):
+            if oStop.is_set():
+                return
+            fStart = monotonic()
+            try:
+                oData = self.fParse(oData)
+            except Exception as e:
+                oResults.put((oItem, None, e))
+            else:
+                oResults.put((oItem, oData, None))
+            finally:
+                oMetrics.observe(sParse, monotonic() - fStart)
+
+        def fetch(oItem):
+            if oStop.is_set():
+                return
+            fStart = monotonic()
+            try:
+                oData = self.fFetch(oItem) if self.fFetch else oItem
+            except Exception as e:
+                oResults.put((oItem, None, e))
+                return
+            finally:
+                if self.fFetch:
+                    oMetrics.observe(sFetch, monotonic() - fStart)
+            if oParsers is not None:
+                oParsers.submit(parse, oItem, oData)
+            elif self.fParse:
+                parse(oItem, oData)
+            else:
+                oResults.put((oItem, oData, None))
+
+        iActive = 0
+        bSource = True
+        lBatch = []
+        fBatch = 0.0
+        try:
+            while True:
+                while bSource and iActive < self.iWindow:
+                    oItem = next(oItems, END)
+                    if oItem is END:
+                        bSource = False
+                        break
+                    self.dStats['read'] += 1
+                    iActive += 1
+                    if oFetchers is not None:
+                        oFetchers.submit(fetch, oItem)
+                    else:
+                        fetch(oItem)
+                if not iActive:
+                    break
+
+                fTimeout = None
+                if lBatch and self.fInterval is not None:
+                    fTimeout = max(0.0, fBatch + self.fInterval - monotonic())
+                try:
+                    oItem, oData, oError = oResults.get(timeout=fTimeout)
+                except Empty:
+                    self.gauge(iActive, oResults.qsize())
+                    self.write(lBatch)
+                    lBatch = []
+                    continue
+
+                iActive -= 1
+                if oError is not None:
+                    self.fail(oItem, oError)
+                    continue
+                if oData is None:
+                    self.dStats['skipped'] += 1
+                    continue
+                if not lBatch:
+                    fBatch = monotonic()
+                lBatch.append((oItem, oData))
+                if len(lBatch) >= self.iBatch:
+                    self.gauge(iActive, oResults.qsize())
+                    self.write(lBatch)
+                    lBatch = []
+
+            self.write(lBatch)
+        finally:
+            oStop.set()
+            for oPool in (oFetchers, oParsers):
+                if oPool is not None:
+                    oPool.shutdown(wait=True, cancel_futures=True)
+
+        return dict(self.dStats)
+
+    def run_inline(self, iItems):
+        """ Passes all items through the stages in the calling thread, an
+        item is fetched, parsed and put in the batch before the next one is
+        read.
+
+        :param iItems: The source of items.
+        :type iItems: Iterable
+        :return: The numbers of the run, as run() returns.
+        :rtype: dict[str, int]
+        """
+        oMetrics = metrics_get()
+        sParse = f'{self.sName}.parse'
+        sFetch = f'{self.sName}.fetch'
+        fFetch = self.fFetch
+        fParse = self.fParse
+        dStats = self.dStats
+        lBatch = []
+        fBatch = 0.0
+        for oItem in iItems:
+            dStats['read'] += 1
+            oData = oItem
+            try:
+                if fFetch:
+                    fStart = monotonic()
+                    oData = fFetch(oItem)
+                    oMetrics.observe(sFetch, monotonic() - fStart)
+                if fParse:
+                    fStart = monotonic()
+                    oData = fParse(oData)
+                    oMetrics.observe(sParse, monotonic() - fStart)
+            except Exception as e:
+                self.fail(oItem, e)
+                continue
+
+            if oData is None:
+                dStats['skipped'] += 1
+                continue
+            if not lBatch:
+                fBatch = monotonic()
+            lBatch.append((oItem, oData))
+            if len(lBatch) >= self.iBatch or self.fInterval is not None \
+                    and monotonic() - fBatch >= self.fInterval:
+                self.write(lBatch)
+                lBatch = []
+
+        self.write(lBatch)
+        return dict(dStats)
+
+    def gauge(self, iActive, iWaiting):
+        """ Keeps the numbers of the items in the stages and of the results
+        waiting for the writer, when a batch is written.
+
+        :param iActive: Number of the items in the stages.
+        :type iActive: int
+        :param iWaiting: Number of the results in the queue.
+        :type iWaiting: int
+        :return: None
+        """
+        oMetrics = metrics_get()
+        oMetrics.gauge(f'{self.sName}.active', iActive)
+        oMetrics.gauge(f'{self.sName}.waiting', iWaiting)
+
+    def write(self, lBatch):
+        """ Writes a batch. If the batch fails, its items are written one by
+        one, and the items that fail again are given to fFail. Without
+        bSplit the exception is raised.
+
+        :param lBatch: Pairs of an item and its result.
+        :type lBatch: list[tuple]
+        :return: None
+        """
+        if not lBatch:
+            return
+
+        try:
+            with metrics_get().timer(f'{self.sName}.write'):
+                self.fWrite(lBatch)
+        except Exception as e:
+            if not self.bSplit:
+                raise
+            if len(lBatch) == 1:
+                self.fail(lBatch[0][0], e)
+                return
+            logging.warning(f'A batch of {len(lBatch)} items is not '
+                            f'written, they are written one by one: {e}')
+            self.dStats['split'] += 1
+            for tPair in lBatch:
+                self.write([tPair])
+            return
+
+        self.dStats['batches'] += 1
+        self.dStats['written'] += len(lBatch)
+        if self.fProgress:
+            self.fProgress(self.dStats['written'], self.dStats['failed'])
+
+    def fail(self, oItem, oError):
+        """ Gives a failed item to fFail.
+
+        :param oItem: The item.
+        :type oItem: object
+        :param oError: The exception of the item.
+        :type oError: Exception
+        :return: None
+        """
+        self.dStats['failed'] += 1
+        metrics_get().count(f'errors.{self.sName}')
+        if self.fFail:
+            self.fFail(oItem, oError)
+        else:
+            logging.error(f'Item {oItem!r} failed: '
+                          f'{type(oError).__name__}: {oError}')
+        if self.fProgress:
+            self.fProgress(self.dStats['written'], self.dStats['failed'])
+
+
+if __name__ == '__main__':
+    pass
@@ -25,17 +25,56 @@ Function:
 
 Class:
     SQL
+    TaxonPage
 
 Using:
     Foo = SQL(_DataBaseFile_)
 """
 
+import hashlib
 import logging
+import os
 import sqlite3
+from collections import namedtuple
 from sqlite3 import DatabaseError
 
 from mli.lib.log import start_logging
-from mli.lib.str import str_get_file_patch
+from mli.lib.metrics import metrics_get
+from mli.lib.str import str_get_file_patch, str_norm_name
+
+
+# Indexes that are needed for lookups of taxa by name and through the tree.
+INDEXES = {'DBIndexes_taxonID': 'DBIndexes (taxonID)',
+           'Taxa_canonicalName': 'Taxa (canonicalName)',
+           'Taxa_canonicalNameNorm': 'Taxa (canonicalNameNorm)',
+           'Taxa_scientificName': 'Taxa (scientificName)',
+           'Taxa_scientificNameNorm': 'Taxa (scientificNameNorm)',
+           'TaxonTree_mainTaxonID': 'TaxonTree (mainTaxonID)',
+           'TaxonTree_taxonID': 'TaxonTree (taxonID)'}
+
+# Columns that were added by later versions, they are added by
+# create_columns() to a database made before.
+COLUMNS = {'Images': (('imageHash', 'TEXT'),),
+           'Taxa': (('canonicalNameNorm', 'TEXT'),
+                    ('scientificNameNorm', 'TEXT'))}
+
+# Columns of Taxa with the names normalized by name_norm(). The function is
+# registered only in SQL class, so the columns are kept by temp triggers of
+# its connections and are plain text for any other tool.
+NORM_COLUMNS = (('canonicalNameNorm', 'canonicalName'),
+                ('scientificNameNorm', 'scientificName'))
+
+# Tables whose rows belong to a taxon by taxonID, except TaxonTree.
+TAXON_TABLES = ('DBIndexes', 'Images', 'LocalNames', 'MorphClassTaxon',
+                'PartColors', 'PartProperties', 'PartSizes', 'PlacesOfLive',
+                'SubstratesOfTaxon')
+
+# All data that is shown on the taxon card.
+TaxonPage = namedtuple('TaxonPage', [
+    'taxonID', 'scientificName', 'canonicalName', 'authorship',
+    'yearPublishing', 'rankID', 'rankName', 'statusID', 'statusName',
+    'mainTaxonID', 'mainName', 'mainAuthorship',
+    'synonyms', 'children', 'dbLinks'])
 
 
 def check_connect_db(oConnector, sBasePath, sDBDir):
@@ -69,6 +108,8 @@ def check_connect_db(oConnector, sBasePath, sDBDir):
                 oConnector.execute_script(sql_script)
                 break
 
+    oConnector.create_indexes()
+
 
 def get_columns(sColumns, sConj='AND'):
     """ The function of parsing a string, accepts a list of table columns
@@ -122,11 +163,14 @@ class SQL:
       # Standard methods.
         * __init__ -- Method initializes a cursor of sqlite database.
         * __del__ -- Method closes the cursor of sqlite database.
+        * close -- Method closes the connection in the thread that made it.
       # Low level methods.
         * export_db -- Method exports from db to sql script.
+        * backup -- Method copies the database into another file online.
         * execute_script -- Method imports from slq script to db.
         * execute_query -- Method execute sql_search query.
         * insert_row -- Method inserts a record in the database table.
+        * insert_many -- Method inserts many records by one statement.
         * delete_row -- Method deletes a row from the table.
         * update -- Method updates value(s) in record of the database table.
         * select -- Method does selection from the table.
@@ -135,6 +179,16 @@ class SQL:
         * sql_get_all: Method gets all records in database table.
         * sql_count: Method counts number of records in database table.
         * sql_table_clean: Method cleans up the table.
+        * create_columns: Method adds columns that don't exist yet.
+        * create_indexes: Method creates indexes that don't exist yet.
+      # Image store.
+        * image_insert: Inserts an image file by chunks.
+        * image_import_dir: Inserts all images of a directory.
+        * image_iter: Reads an image by chunks.
+        * image_read: Reads a whole image into memory.
+        * image_hash: Counts a content hash of an image.
+        * image_get_hash: Gets the stored content hash of an image.
+        * image_delete: Deletes an image.
     """
 
     # Standard methods
@@ -145,20 +199,76 @@ class SQL:
         :type sFileDB: str
         """
         self.logging = start_logging()
+        self.sFileDB = sFileDB
+        self.bClosed = False
         try:
             self.oConnector = sqlite3.connect(sFileDB)
         except DatabaseError as e:
             self.logging.exception(f"An error has occurred: {e}.\n"
                                    f"String of query: {sFileDB}\n")
+        else:
+            self.oConnector.create_function('name_norm', 1, str_norm_name,
+                                            deterministic=True)
+            self.create_norm_triggers()
 
     def __del__(self):
-        """ Closes connection with the database. """
+        """ Closes connection with the database, if it isn't closed yet. """
+        if not self.bClosed:
+            self.close()
+
+    def close(self):
+        """ Closes connection with the database. The connection can be used
+        only by the thread that made it, so a thread that makes its own
+        connection closes it itself and doesn't leave it to the garbage
+        collector, which may run in any thread.
+        """
+        self.bClosed = True
         self.oConnector.close()
 
     # Low methods level
     def export_db(self):
-        """ Method exports from db to sql script. """
-        return self.oConnector.iterdump()
+        """ Method exports from db to sql script. Indexes on name_norm(),
+        which are left in a database made by older version, are skipped,
+        because the script can't be run without the function.
+        """
+        return (sLine for sLine in self.oConnector.iterdump()
+                if not (sLine.startswith('CREATE INDEX')
+                        and 'name_norm(' in sLine))
+
+    def backup(self, sTarget, iPages=64, fProgress=None, fSleep=0.05):
+        """ Method copies the database into another file while it is in use.
+
+        The copying is done by the sqlite backup API in steps of iPages
+        pages. The source is locked only while a step is running, so other
+        connections can write to the database between steps. If a step
+        can't lock the database because it is busy or locked, sqlite waits
+        fSleep seconds before it tries again.
+
+        :param sTarget: Path to the file of the backup.
+        :type sTarget: str
+        :param iPages: Number of pages copied at one step.
+        :type iPages: int
+        :param fProgress: The function that is called after every step with
+            the arguments: status, remaining pages and total pages.
+        :type fProgress: callable or None
+        :param fSleep: Pause in seconds before a step is repeated when the
+            database is busy or locked.
+        :type fSleep: float
+        :return: True if the backup is successful, otherwise False.
+        :rtype: bool
+        """
+        oTarget = sqlite3.connect(sTarget)
+        try:
+            self.oConnector.backup(oTarget, pages=iPages,
+                                   progress=fProgress, sleep=fSleep)
+        except DatabaseError as e:
+            logging.exception(f'An error has occurred: {e}.\n'
+                              f'Backup file: {sTarget}\n')
+            return False
+        finally:
+            oTarget.close()
+
+        return True
 
     def execute_script(self, sSQL):
         """ Method executes sql script.
@@ -225,10 +335,41 @@ class SQL:
         oCursor = self.execute_query(sqlString, tValues)
         if oCursor:
             self.oConnector.commit()
+            metrics_get().add_rows(sTable, 1)
             return oCursor.lastrowid
 
         return False
 
+    def insert_many(self, sTable, sColumns, lValues, bCommit=True):
+        """ Inserts many records in the database table by one statement.
+
+        :param sTable: Table name as string.
+        :type sTable: str
+        :param sColumns: Columns names of the table by where needs inserting.
+        :type sColumns: str
+        :param lValues: Tuples of values for inserting.
+        :type lValues: list[tuple] or collections.abc.Iterable[tuple]
+        :param bCommit: If False, the transaction isn't committed, so many
+            calls can be committed at once.
+        :type bCommit: bool
+        :return: Number of inserted rows if the insert was successful.
+            Otherwise, False.
+        :rtype: int or bool
+        """
+        sSQL = ("?, " * len(sColumns.split(", ")))[:-2]
+        sqlString = f'INSERT INTO {sTable} ({sColumns}) VALUES ({sSQL})'
+        try:
+            oCursor = self.oConnector.executemany(sqlString, lValues)
+        except DatabaseError as e:
+            logging.exception(f'An error has occurred: {e}.\n'
+                              f'String of query: {sqlString}\n')
+            return False
+
+        if bCommit:
+            self.oConnector.commit()
+        metrics_get().add_rows(sTable, oCursor.rowcount)
+        return oCursor.rowcount
+
     def delete_row(self, sTable, sColumns=None, tValues=None):
         """ Deletes row in the database table by value(s).
 
@@ -415,6 +556,99 @@ class SQL:
 
         return True
 
+    def create_columns(self):
+        """ Adds columns from COLUMNS that don't exist in the tables, for
+        example, in a database that was made by older version.
+
+        :return: True, if execution is successful. Otherwise, False.
+        :rtype: bool
+        """
+        sSQL = ''
+        for sTable, tColumns in COLUMNS.items():
+            oCursor = self.execute_query(f'PRAGMA table_info({sTable});')
+            if not oCursor:
+                return False
+
+            setExist = {tRow[1] for tRow in oCursor.fetchall()}
+            if not setExist:
+                continue
+            sSQL += ''.join(f'ALTER TABLE {sTable} ADD COLUMN {sName} {sType};'
+                            for sName, sType in tColumns
+                            if sName not in setExist)
+
+        return self.execute_script(sSQL) if sSQL else True
+
+    def create_indexes(self):
+        """ Creates indexes from INDEXES that don't exist in the database,
+        for example, in a database that was made by older version. The
+        missing columns are added before.
+
+        :return: True, if execution is successful. Otherwise, False.
+        :rtype: bool
+        """
+        if not self.create_columns() or not self.create_norm_triggers() \
+                or not self.update_norm_names():
+            return False
+
+        # Indexes on name_norm() of older version have the same names.
+        oCursor = self.execute_query(
+            "SELECT name FROM sqlite_master WHERE type='index' "
+            "AND sql LIKE '%name_norm(%';")
+        if not oCursor:
+            return False
+
+        sSQL = ''.join(f'DROP INDEX {tRow[0]};' for tRow in oCursor.fetchall())
+        sSQL += ''.join(f'CREATE INDEX IF NOT EXISTS {sName} ON {sOn};'
+                        for sName, sOn in INDEXES.items())
+        return self.execute_script(sSQL)
+
+    def create_norm_triggers(self):
+        """ Creates temp triggers that write the normalized names into the
+        columns from NORM_COLUMNS, when a taxon is inserted or its names are
+        changed. Nothing is done if the table Taxa has no such columns yet.
+
+        :return: True, if execution is successful. Otherwise, False.
+        :rtype: bool
+        """
+        oCursor = self.execute_query('PRAGMA table_info(Taxa);')
+        if not oCursor:
+            return False
+
+        setExist = {tRow[1] for tRow in oCursor.fetchall()}
+        if not all(sNorm in setExist for sNorm, _ in NORM_COLUMNS):
+            return True
+
+        sSet = ', '.join(f'{sNorm}=name_norm(NEW.{sName})'
+                         for sNorm, sName in NORM_COLUMNS)
+        sNames = ', '.join(sName for _, sName in NORM_COLUMNS)
+        sSQL = ''.join(f'CREATE TEMP TRIGGER IF NOT EXISTS Taxa_norm_{sName} '
+                       f'AFTER {sEvent} ON main.Taxa BEGIN '
+                       f'UPDATE Taxa SET {sSet} '
+                       'WHERE taxonID=NEW.taxonID; END;'
+                       for sName, sEvent in (
+                           ('insert', 'INSERT'),
+                           ('update', f'UPDATE OF {sNames}')))
+        return self.execute_script(sSQL)
+
+    def update_norm_names(self, bAll=False):
+        """ Writes the normalized names into the columns from NORM_COLUMNS
+        of taxa that don't have them, for example, taxa that were inserted
+        by another tool.
+
+        :param bAll: If True, the names of all taxa are normalized again.
+        :type bAll: bool
+        :return: True, if execution is successful. Otherwise, False.
+        :rtype: bool
+        """
+        sSet = ', '.join(f'{sNorm}=name_norm({sName})'
+                         for sNorm, sName in NORM_COLUMNS)
+        sSQL = f'UPDATE Taxa SET {sSet}'
+        if not bAll:
+            sSQL += ' WHERE ' + ' OR '.join(
+                f'({sNorm} IS NULL AND {sName} IS NOT NULL)'
+                for sNorm, sName in NORM_COLUMNS)
+        return self.execute_script(f'{sSQL};')
+
     # Top API level
     def get_all_by_rank(self, iRank):
         return self.execute_query(
@@ -423,36 +657,61 @@ class SQL:
             'ORDER BY scientificName ASC', (iRank,))
 
     def get_garbage(self):
-        sSQL = "SELECT scientificName, COUNT(*) c " \
-               "FROM Taxa GROUP BY scientificName HAVING c > 1"
+        sSQL = "SELECT scientificName, rankID, COUNT(*) c " \
+               "FROM Taxa GROUP BY scientificName, rankID HAVING c > 1"
         lRow = self.execute_query(sSQL).fetchall()
         if lRow:
             return lRow
 
         return False
 
-    def del_garbage(self, sSource='GBIF'):
-        lGarbage = self.get_garbage()
-        if lGarbage:
-            for lRow in lGarbage:
-                sAuthor = lRow[1]
-                lDelete = self.sql_get_values('Taxa', 'taxonID',
-                                              'scientificName',
-                                              (lRow[0],))
-                if not lDelete:
-                    lDelete = self.execute_query('SELECT taxonID FROM Taxa '
-                                                 f'WHERE scientificName=? '
-                                                 f'AND author is NULL ',
-                                                 (lRow[0],)).fetchall()
-                iSource = self.get_source_id(sSource)
-                if lDelete and iSource:
-                    while len(lDelete) > 1:
-                        iID = self.sql_get_id('DBIndexes', 'id_db_index',
-                                              'id_taxon, id_source',
-                                              (lDelete[-1][0], iSource,))
-                        self.delete_row('DBIndexes', 'id_db_index', (iID,))
-                        self.delete_row('Taxa', 'taxonID', lDelete[-1])
-                        lDelete.pop(-1)
+    def del_garbage(self):
+        """ Merges taxa with the same name and rank into the taxon with the
+        lowest ID. The rows of other tables are moved to it, its children and
+        synonyms are kept, and only the first index of every source is left.
+
+        :return: Number of the deleted taxa, or False if an error occurred.
+        :rtype: int or bool
+        """
+        setTables = {tRow[0] for tRow in self.execute_query(
+            "SELECT name FROM sqlite_master WHERE type='table';").fetchall()}
+        lSQL = ['UPDATE TaxonTree SET mainTaxonID=D.keepID '
+                'FROM TaxaDuplicates AS D '
+                'WHERE TaxonTree.mainTaxonID=D.taxonID;',
+                'DELETE FROM TaxonTree '
+                'WHERE taxonID IN (SELECT taxonID FROM TaxaDuplicates);']
+        lSQL.extend(f'UPDATE {sTable} SET taxonID=D.keepID '
+                    f'FROM TaxaDuplicates AS D '
+                    f'WHERE {sTable}.taxonID=D.taxonID;'
+                    for sTable in TAXON_TABLES if sTable in setTables)
+        lSQL.extend(['DELETE FROM DBIndexes '
+                     'WHERE taxonID IN (SELECT keepID FROM TaxaDuplicates) '
+                     'AND EXISTS (SELECT 1 FROM DBIndexes AS First '
+                     'WHERE First.taxonID=DBIndexes.taxonID '
+                     'AND First.sourceID=DBIndexes.sourceID '
+                     'AND First.dbIndexID<DBIndexes.dbIndexID);',
+                     'DELETE FROM Taxa '
+                     'WHERE taxonID IN (SELECT taxonID FROM TaxaDuplicates);'])
+        try:
+            self.oConnector.executescript(
+                'CREATE TEMP TABLE IF NOT EXISTS TaxaDuplicates ('
+                'taxonID INTEGER PRIMARY KEY, keepID INTEGER); '
+                'DELETE FROM TaxaDuplicates;')
+            iCount = self.oConnector.execute(
+                'INSERT INTO TaxaDuplicates (taxonID, keepID) '
+                'SELECT taxonID, keepID FROM ('
+                'SELECT taxonID, MIN(taxonID) OVER ('
+                'PARTITION BY scientificName, rankID) AS keepID FROM Taxa) '
+                'WHERE taxonID<>keepID;').rowcount
+            for sSQL in lSQL:
+                self.oConnector.execute(sSQL)
+        except DatabaseError as e:
+            self.oConnector.rollback()
+            logging.exception(f'Cannot merge duplicated taxa: {e}')
+            return False
+
+        self.oConnector.commit()
+        return iCount
 
     def get_id_by_name_author(self, tValue, sTable='Taxa'):
         if tValue[1]:
@@ -463,12 +722,16 @@ class SQL:
                                    'scientificName', (tValue[0],))
 
     def get_id_by_name_status(self, tValue):
-        return self.execute_query(
-            'SELECT Taxa.TaxonID FROM Taxa'
-            'JOIN TaxonTree ON TaxonTree.TaxonID=Taxa.TaxonID'
-            'JOIN TaxonStatuses ON TaxonStatuses.statusID=TaxonTree.statusID'
-            'WHERE Taxa.scientificName=? '
-            'AND TaxonStatuses.statusID=?;', tValue)
+        oCursor = self.execute_query(
+            'SELECT Taxa.taxonID FROM Taxa '
+            'JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID '
+            'WHERE Taxa.canonicalName=? '
+            'AND TaxonTree.statusID=?;', tValue)
+        tRow = oCursor.fetchone() if oCursor else None
+        if tRow:
+            return tRow[0]
+
+        return False
 
     def get_color_id(self, sColumn, sValue):
         return self.sql_get_id('Colors', 'colorID', sColumn, (sValue,))
@@ -482,7 +745,7 @@ class SQL:
         return self.sql_get_id('TaxonRanks', 'rankID', sColumns, (sValues,))
 
     def get_rank_name(self, sColumns, iValues):
-        return self.sql_get_values('TaxonRank', sColumns,
+        return self.sql_get_values('TaxonRanks', sColumns,
                                    'rankID', (iValues,))
 
     def get_taxon_rank(self, sSciName):
@@ -551,8 +814,39 @@ class SQL:
     def get_taxon_id(self, sSciName, sAuthor=''):
         if sAuthor:
             sSciName = f'{sSciName} {sAuthor}'
-        return self.sql_get_id('Taxa', 'TaxonID',
-                               'scientificName', (sSciName,))
+        iTaxonID = self.sql_get_id('Taxa', 'TaxonID',
+                                   'scientificName', (sSciName,))
+        if iTaxonID:
+            return iTaxonID
+
+        return self.get_taxon_id_norm(sSciName)
+
+    def get_taxon_id_norm(self, sSciName):
+        """ Looks for the taxon by the normalized scientific name, so that
+        the case, diacritics, spaces and the form of the author string don't
+        matter. The lookup uses the index on scientificNameNorm.
+
+        :param sSciName: A scientific name of the taxon.
+        :type sSciName: str
+        :return: ID of the taxon, or False if it isn't found.
+        :rtype: int or bool
+        """
+        return self.sql_get_id('Taxa', 'taxonID', 'scientificNameNorm',
+                               (str_norm_name(sSciName),))
+
+    def get_taxa_by_canonical_name(self, sName):
+        """ Looks for all taxa with the canonical name, whatever the authors
+        are. The lookup uses the index on canonicalNameNorm.
+
+        :param sName: A canonical name of the taxon.
+        :type sName: str
+        :return: Rows with taxonID, scientificName and rankID.
+        :rtype: list[tuple[int, str, int]]
+        """
+        sSQL = 'SELECT taxonID, scientificName, rankID FROM Taxa ' \
+               'WHERE canonicalNameNorm=? ' \
+               'ORDER BY rankID ASC, scientificName ASC;'
+        return self.execute_query(sSQL, (str_norm_name(sName),)).fetchall()
 
     def get_taxon_children(self, iID, sStatus):
         sSQL = 'SELECT TaxonRanks.rankName, Taxa.canonicalName, ' \
@@ -587,6 +881,58 @@ class SQL:
                'WHERE DBIndexes.taxonID=?;'
         return self.execute_query(sSQL, (iID,)).fetchall()
 
+    def get_taxon_page(self, aValue):
+        """ Gets all data for the taxon card by two queries: the first one
+        gets the taxon with its rank, status and main taxon, the second one
+        gets its synonyms, children and links to other databases.
+
+        :param aValue: ID or scientific name of the taxon.
+        :type aValue: int or str
+        :return: Data of the taxon card, or None if the taxon isn't found.
+        :rtype: TaxonPage or None
+        """
+        sWhere = 'Taxa.taxonID' if type(aValue) is int else \
+            'Taxa.scientificName'
+        sSQL = 'SELECT Taxa.taxonID, Taxa.scientificName, ' \
+               'Taxa.canonicalName, Taxa.authorship, Taxa.yearPublishing, ' \
+               'Taxa.rankID, TaxonRanks.rankName, ' \
+               'TaxonTree.statusID, TaxonStatuses.statusLocalName, ' \
+               'TaxonTree.mainTaxonID, MainTaxa.canonicalName, ' \
+               'MainTaxa.authorship ' \
+               'FROM Taxa ' \
+               'LEFT JOIN TaxonRanks ON Taxa.rankID=TaxonRanks.rankID ' \
+               'LEFT JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID ' \
+               'LEFT JOIN TaxonStatuses ' \
+               'ON TaxonTree.statusID=TaxonStatuses.statusID ' \
+               'LEFT JOIN Taxa MainTaxa ' \
+               'ON MainTaxa.taxonID=TaxonTree.mainTaxonID ' \
+               f'WHERE {sWhere}=? LIMIT 1;'
+        oCursor = self.execute_query(sSQL, (aValue,))
+        tTaxon = oCursor.fetchone() if oCursor else None
+        if not tTaxon:
+            return
+
+        sSQL = 'SELECT CASE WHEN TaxonTree.statusID=1 ' \
+               'THEN 2 ELSE 1 END AS part, ' \
+               'TaxonRanks.rankName, Taxa.canonicalName, Taxa.authorship, ' \
+               'Taxa.rankID AS rank, Taxa.scientificName AS name ' \
+               'FROM TaxonTree ' \
+               'JOIN Taxa ON TaxonTree.taxonID=Taxa.taxonID ' \
+               'JOIN TaxonRanks ON Taxa.rankID=TaxonRanks.rankID ' \
+               'WHERE TaxonTree.mainTaxonID=:id ' \
+               'UNION ALL ' \
+               'SELECT 3, DBSources.sourceAbbr, DBSources.indexLink, ' \
+               'DBIndexes.taxonIndex, NULL, NULL ' \
+               'FROM DBIndexes ' \
+               'JOIN DBSources ON DBIndexes.sourceID=DBSources.sourceID ' \
+               'WHERE DBIndexes.taxonID=:id ' \
+               'ORDER BY part, rank, name;'
+        dParts = {1: [], 2: [], 3: []}
+        for tRow in self.execute_query(sSQL, {'id': tTaxon[0]}):
+            dParts[tRow[0]].append(tRow[1:4])
+
+        return TaxonPage(*tTaxon, dParts[1], dParts[2], dParts[3])
+
     def get_taxon_info(self, sName):
         sSQL = 'SELECT MainTaxa.taxonID, ' \
                'MTaxonRanks.rankLocalName AS MainTaxonRank, ' \
@@ -623,3 +969,145 @@ class SQL:
                                     iYear, PublishedIn, iRank,))
         self.insert_row('TaxonTree', 'taxonID, mainTaxonID, statusID',
                         (iTaxonID, iMainTax, iStatus,))
+
+    # Image store
+    def image_insert(self, iTaxonID, sFile, iChunk=65536, bCommit=True):
+        """ Inserts an image file into Images table. The file is never read
+        into memory entirely, it is written into the blob by chunks, and its
+        sha1 hash is counted on the way and stored in imageHash.
+
+        :param iTaxonID: ID of the taxon which is on the image.
+        :type iTaxonID: int
+        :param sFile: Path to the image file.
+        :type sFile: str
+        :param iChunk: Size of the chunk in bytes.
+        :type iChunk: int
+        :param bCommit: Commit the transaction after inserting.
+        :type bCommit: bool
+        :return: ID of the inserted image, or False if it fails.
+        :rtype: int or bool
+        """
+        iSize = os.path.getsize(sFile)
+        oCursor = self.execute_query('INSERT INTO Images (taxonID, image) '
+                                     'VALUES (?, zeroblob(?))',
+                                     (iTaxonID, iSize,))
+        if not oCursor:
+            return False
+
+        iImageID = oCursor.lastrowid
+        oHash = hashlib.sha1()
+        with open(sFile, 'rb') as fImage, \
+                self.oConnector.blobopen('Images', 'image', iImageID) as oBlob:
+            for bChunk in iter(lambda: fImage.read(iChunk), b''):
+                oBlob.write(bChunk)
+                oHash.update(bChunk)
+        self.oConnector.execute('UPDATE Images SET imageHash=? '
+                                'WHERE imagesID=?;',
+                                (oHash.hexdigest(), iImageID,))
+
+        if bCommit:
+            self.oConnector.commit()
+
+        return iImageID
+
+    def image_import_dir(self, iTaxonID, sDir,
+                         tExt=('.jpg', '.jpeg', '.png', '.tif', '.tiff')):
+        """ Inserts all images of the directory in one transaction.
+
+        :param iTaxonID: ID of the taxon which is on the images.
+        :type iTaxonID: int
+        :param sDir: The directory with images.
+        :type sDir: str
+        :param tExt: Extensions of files that are considered images.
+        :type tExt: tuple[str]
+        :return: IDs of the inserted images.
+        :rtype: list[int]
+        """
+        lImages = []
+        for sFile in sorted(os.listdir(sDir)):
+            sPath = os.path.join(sDir, sFile)
+            if os.path.isfile(sPath) and sFile.lower().endswith(tExt):
+                iImageID = self.image_insert(iTaxonID, sPath, bCommit=False)
+                if iImageID:
+                    lImages.append(iImageID)
+
+        self.oConnector.commit()
+        return lImages
+
+    def image_iter(self, iImageID, iChunk=65536):
+        """ Reads an image by chunks.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :param iChunk: Size of the chunk in bytes.
+        :type iChunk: int
+        :return: Generator of chunks of the image.
+        :rtype: Iterator[bytes]
+        """
+        with self.oConnector.blobopen('Images', 'image', iImageID,
+                                      readonly=True) as oBlob:
+            for bChunk in iter(lambda: oBlob.read(iChunk), b''):
+                yield bChunk
+
+    def image_read(self, iImageID):
+        """ Reads a whole image into memory, for example, to decode it.
+        Use image_iter() to read a large image by chunks.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :return: The image.
+        :rtype: bytes
+        """
+        with self.oConnector.blobopen('Images', 'image', iImageID,
+                                      readonly=True) as oBlob:
+            return oBlob.read()
+
+    def image_hash(self, iImageID):
+        """ Counts sha1 hash of an image by chunks.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :return: Hex digest of the image.
+        :rtype: str
+        """
+        oHash = hashlib.sha1()
+        for bChunk in self.image_iter(iImageID):
+            oHash.update(bChunk)
+
+        return oHash.hexdigest()
+
+    def image_get_hash(self, iImageID):
+        """ Gets the content hash of an image from imageHash. If it isn't
+        stored, for example, the image was inserted by older version or its
+        blob was written directly and imageHash was set to NULL, the hash is
+        counted by chunks and stored.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :return: Hex digest of the image, or None if there is no image.
+        :rtype: str or None
+        """
+        oCursor = self.execute_query('SELECT imageHash FROM Images '
+                                     'WHERE imagesID=?;', (iImageID,))
+        tRow = oCursor.fetchone() if oCursor else None
+        if tRow is None:
+            return
+        if tRow[0]:
+            return tRow[0]
+
+        sHash = self.image_hash(iImageID)
+        if not self.update('Images', 'imageHash', 'imagesID',
+                           (sHash, iImageID,)):
+            return
+
+        return sHash
+
+    def image_delete(self, iImageID):
+        """ Deletes an image.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :return: True if the deletion is successful, otherwise False.
+        :rtype: bool
+        """
+        return self.delete_row('Images', 'imagesID', (iImageID,))
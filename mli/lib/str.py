@@ -20,6 +20,8 @@
 The module contains a collection of functions for solving routine tasks with
 strings.
 """
+import re
+import unicodedata
 from os.path import join, normcase, split
 from gettext import gettext as _
 
@@ -111,6 +113,36 @@ def str_sep_name_taxon(sString):
     return sString
 
 
+def str_norm_name(sName):
+    """ Normalizes a taxon name or an author string for comparison. Case,
+    diacritics, extra whitespace, spaces between initials, the hybrid sign
+    and the conjunction of authors ('&', 'et', 'and') are unified, so
+    'Xanthoria parietina (L.) Th. Fr.' and 'xanthoria  parietina (L.) Th.Fr.'
+    give the same string.
+
+    The function is registered in the database as name_norm().
+
+    :param sName: A name or an author string.
+    :type sName: str or None
+    :return: The normalized string.
+    :rtype: str or None
+    """
+    if not sName:
+        return sName
+
+    sName = unicodedata.normalize('NFKD', sName)
+    sName = ''.join(sChar for sChar in sName
+                    if not unicodedata.combining(sChar))
+    sName = re.sub(r'\.\s+(?=[A-Z])', '.', sName)
+    sName = ' '.join(sName.casefold().split())
+    sName = re.sub(r'\s(?:&|et|and)\s', ' & ', sName)
+    sName = re.sub(r'(^|\s)(?:\u00d7\s*|x\s)(?=\w)', '\\1\u00d7', sName)
+    sName = re.sub(r'\s*,\s*', ', ', sName)
+    sName = re.sub(r'\(\s+', '(', sName)
+
+    return re.sub(r'\s+\)', ')', sName)
+
+
 class HTMLDoc:
     def __init__(self):
         """ Класс содержит методы разбора и оставления строк для формирования
@@ -0,0 +1,516 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module makes the HTML document 'taxon card' and keeps made cards in
+a cache. The cache is kept in memory and, optionally, in TaxonCards table of
+the database. Cards are invalidated by triggers when the taxon, its synonyms,
+children or links to other databases are changed, whoever changes them.
+
+The memory cache keeps iMaxCards cards, the least recently used card is
+forgotten first. prewarm() makes the cards of the subtree of a taxon in a
+background thread, which only reads the database. The subtree is walked
+level by level, up to iMaxCards taxa, so the cache doesn't forget the cards
+it has just made. Taxa asked for while the thread works are queued for it.
+The made cards are written to TaxonCards by the connection of the cache in
+one transaction, so the cache never sees its own writes as changes of
+another connection.
+
+Function:
+    get_lang()
+
+Class:
+    TaxonCard(oConnector, sNoData='')
+    TaxonCardCache(oConnector, fRender=None, sLang=None, bPersistent=False,
+                   iMaxCards=CARD_CACHE_SIZE)
+
+Using:
+    oCache = TaxonCardCache(oConnector, bPersistent=True)
+    sHTML = oCache.get_card(iTaxonID)
+    oCache.prewarm(iTaxonID)
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+from gettext import gettext as _
+
+from mli.lib.sql import SQL
+from mli.lib.str import HTMLDoc
+
+# The number of cards in memory by default.
+CARD_CACHE_SIZE = 1000
+
+# Taxa which cards show the row of the table. The row is named X, the
+# placeholder is replaced by OLD or NEW in triggers.
+DEPENDENT_CARDS = {
+    'Taxa': 'SELECT X.taxonID AS taxonID '
+            'UNION SELECT mainTaxonID FROM TaxonTree '
+            'WHERE TaxonTree.taxonID=X.taxonID '
+            'UNION SELECT taxonID FROM TaxonTree '
+            'WHERE TaxonTree.mainTaxonID=X.taxonID '
+            'AND TaxonTree.statusID<>1',
+    'TaxonTree': 'SELECT X.taxonID AS taxonID UNION SELECT X.mainTaxonID',
+    'DBIndexes': 'SELECT X.taxonID AS taxonID',
+}
+
+
+def get_lang():
+    """ Gets the language of messages in the same order as gettext does.
+
+    :return: The language code or 'C' if it isn't set.
+    :rtype: str
+    """
+    for sVar in ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG'):
+        sLang = os.environ.get(sVar)
+        if sLang:
+            return sLang.split(':')[0].split('.')[0]
+
+    return 'C'
+
+
+class TaxonCard:
+    """ Makes the HTML document 'taxon card' from the database. """
+
+    def __init__(self, oConnector, sNoData=''):
+        """ Initiating a class.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param sNoData: The string that is shown when there is no data.
+        :type sNoData: str
+        """
+        self.oConnector = oConnector
+        self.sNoData = sNoData or _('Нет данных.')
+        self.oHTML = None
+
+    def get_html(self, aValue):
+        """ Makes the card of the taxon.
+
+        :param aValue: ID or scientific name of the taxon.
+        :type aValue: int or str
+        :return: HTML document.
+        :rtype: str
+        """
+        self.oHTML = HTMLDoc()
+        oPage = self.oConnector.get_taxon_page(aValue)
+        if oPage is None:
+            self.oHTML.set_no_data(self.sNoData)
+            return self.oHTML.get_doc()
+
+        self.oHTML.set_title_doc(oPage.rankName, oPage.canonicalName,
+                                 oPage.authorship)
+
+        bAccepted = oPage.statusID == 1
+        if oPage.statusID is not None and not bAccepted:
+            self.oHTML.set_is_synonym(oPage.canonicalName, oPage.authorship,
+                                      oPage.mainName, oPage.mainAuthorship)
+
+        self.oHTML.set_title_chart(_('Статус:'))
+        if oPage.statusName:
+            self.oHTML.set_string(oPage.statusName)
+        else:
+            self.oHTML.set_no_data(self.sNoData)
+
+        if bAccepted:
+            self.get_accepted_taxon_info(oPage)
+
+        self.get_taxon_db_links(oPage)
+        self.get_taxon_ref_links(oPage)
+
+        return self.oHTML.get_doc()
+
+    def get_accepted_taxon_info(self, oPage):
+        self.oHTML.set_title_chart(_('Синонимы:'))
+        self.get_name(oPage.synonyms)
+
+        self.oHTML.set_title_chart(_("Описание:"))
+        self.oHTML.set_no_data(self.sNoData)
+
+        self.oHTML.set_title_chart(_('Дочерние таксоны:'))
+        self.get_name(oPage.children)
+
+    def get_name(self, tValues):
+        if tValues:
+            for sRank, sNameSyn, sAuthor in tValues:
+                self.oHTML.set_rang_name(sRank, sNameSyn, sAuthor)
+        else:
+            self.oHTML.set_no_data(self.sNoData)
+
+    def get_taxon_db_links(self, oPage):
+        self.oHTML.set_title_chart(_("Ссылки в других базах данных:"))
+        if oPage.dbLinks:
+            for sSource, sLink, sIndex in oPage.dbLinks:
+                self.oHTML.set_link(sSource, sLink, sIndex)
+        else:
+            self.oHTML.set_no_data(self.sNoData)
+
+        if oPage.rankID <= 21:
+            sLink = r'https://lichenportal.org/cnalh/taxa/index.php?taxon='
+            self.oHTML.set_link('LichenPortal', sLink, oPage.canonicalName)
+
+    def get_taxon_ref_links(self, oPage):
+        self.oHTML.set_title_chart(_('Ссылки на источники:'))
+        self.oHTML.set_no_data(self.sNoData)
+
+
+def render_card(oConnector, iTaxonID):
+    """ Makes the card of the taxon by TaxonCard class.
+
+    :param oConnector: An instance of the sqlite database api class.
+    :type oConnector: SQL
+    :param iTaxonID: ID of the taxon.
+    :type iTaxonID: int
+    :return: HTML document.
+    :rtype: str
+    """
+    return TaxonCard(oConnector).get_html(iTaxonID)
+
+
+class TaxonCardCache:
+    """ Keeps made taxon cards for each taxon and language.
+
+    *Methods*
+        * get_card -- Gets the card of the taxon.
+        * has_card -- Checks if the card of the taxon is in memory.
+        * invalidate -- Forgets the card of the taxon.
+        * clear -- Forgets all cards.
+        * flush -- Writes the cards made by prewarm into the table.
+        * prewarm -- Makes cards of the subtree in a background thread.
+    """
+
+    def __init__(self, oConnector, fRender=None, sLang=None,
+                 bPersistent=False, iMaxCards=CARD_CACHE_SIZE):
+        """ Initiating a class.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param fRender: The function that takes a connector and ID of the
+            taxon and returns the card. By default, TaxonCard is used.
+        :type fRender: callable or None
+        :param sLang: The language of cards. By default, the language of
+            messages.
+        :type sLang: str or None
+        :param bPersistent: Keep cards in TaxonCards table of the database.
+        :type bPersistent: bool
+        :param iMaxCards: The most cards that are kept in memory.
+        :type iMaxCards: int
+        """
+        self.oConnector = oConnector
+        self.fRender = fRender or render_card
+        self.sLang = sLang or get_lang()
+        self.bPersistent = bPersistent
+        self.iMaxCards = max(1, iMaxCards)
+        self.dCards = OrderedDict()
+        self.dVersions = {}
+        # The cards made by prewarm that aren't written to the table yet.
+        self.lPending = []
+        # It changes when all cards in memory are forgotten.
+        self.iGeneration = 0
+        self.oLock = threading.Lock()
+        self.oPrewarm = None
+        # Taxa which subtrees wait for the prewarm thread.
+        self.qPrewarm = deque()
+
+        self.oConnector.oConnector.create_function(
+            'taxon_card_invalidate', 1, self.invalidate)
+        self.create_triggers()
+        self.iDataVersion = self.get_data_version()
+
+    def create_triggers(self):
+        """ Creates temporary triggers that clean the memory cache after
+        changes made by this connection, and, for the persistent cache,
+        the table and triggers that clean it after any changes.
+        """
+        self.oConnector.create_indexes()
+        lSQL = []
+        if self.bPersistent:
+            lSQL.append('CREATE TABLE IF NOT EXISTS TaxonCards ('
+                        'taxonID INTEGER, lang TEXT, html TEXT, '
+                        'PRIMARY KEY (taxonID, lang));')
+
+        for sTable, sDepends in DEPENDENT_CARDS.items():
+            for sEvent, lRows in (('INSERT', ['NEW']),
+                                  ('UPDATE', ['OLD', 'NEW']),
+                                  ('DELETE', ['OLD'])):
+                sSelect = ' UNION '.join(sDepends.replace('X.', f'{sRow}.')
+                                         for sRow in lRows)
+                sName = f'TaxonCards_{sTable}_{sEvent.lower()}'
+                lSQL.append(f'CREATE TEMP TRIGGER IF NOT EXISTS {sName} '
+                            f'AFTER {sEvent} ON {sTable} BEGIN '
+                            'SELECT taxon_card_invalidate(taxonID) '
+                            f'FROM ({sSelect}); END;')
+                if self.bPersistent:
+                    lSQL.append(f'CREATE TRIGGER IF NOT EXISTS {sName} '
+                                f'AFTER {sEvent} ON {sTable} BEGIN '
+                                'DELETE FROM TaxonCards WHERE taxonID IN '
+                                f'({sSelect}); END;')
+
+        self.oConnector.execute_script('\n'.join(lSQL))
+
+    def get_data_version(self):
+        """ Gets the number that changes when another connection commits
+        changes to the database.
+
+        :rtype: int
+        """
+        return self.oConnector.execute_query(
+            'PRAGMA data_version').fetchone()[0]
+
+    def check_data_version(self):
+        """ Forgets cards in memory if the database was changed by another
+        connection, because it isn't known which cards were affected. The
+        persistent cache is cleaned by its triggers, so it's kept.
+        """
+        iDataVersion = self.get_data_version()
+        if iDataVersion != self.iDataVersion:
+            self.iDataVersion = iDataVersion
+            with self.oLock:
+                self.dCards.clear()
+                self.lPending.clear()
+                self.iGeneration += 1
+
+    def put_card(self, tKey, sHTML):
+        """ Keeps the card in memory and forgets the least recently used
+        cards over iMaxCards. It must be called under the lock.
+
+        :param tKey: ID of the taxon and the language.
+        :type tKey: tuple
+        :param sHTML: HTML document.
+        :type sHTML: str
+        """
+        self.dCards[tKey] = sHTML
+        self.dCards.move_to_end(tKey)
+        while len(self.dCards) > self.iMaxCards:
+            self.dCards.popitem(last=False)
+
+    def has_card(self, iTaxonID):
+        """ Checks if the card of the taxon is in memory.
+
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        :return: True if the card is in memory.
+        :rtype: bool
+        """
+        self.check_data_version()
+        with self.oLock:
+            return (iTaxonID, self.sLang) in self.dCards
+
+    def get_card(self, iTaxonID):
+        """ Gets the card of the taxon from the cache or makes it.
+
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        :return: HTML document.
+        :rtype: str
+        """
+        self.check_data_version()
+        self.flush()
+        tKey = (iTaxonID, self.sLang)
+        with self.oLock:
+            sHTML = self.dCards.get(tKey)
+            if sHTML is not None:
+                self.dCards.move_to_end(tKey)
+                return sHTML
+
+        if self.bPersistent:
+            sHTML = self.oConnector.sql_get_id('TaxonCards', 'html',
+                                               'taxonID, lang', tKey)
+        if not sHTML:
+            sHTML = self.fRender(self.oConnector, iTaxonID)
+            self.save_card(self.oConnector, iTaxonID, sHTML)
+            self.iDataVersion = self.get_data_version()
+
+        with self.oLock:
+            self.put_card(tKey, sHTML)
+
+        return sHTML
+
+    def save_card(self, oConnector, iTaxonID, sHTML):
+        """ Writes the card into TaxonCards table if the cache is persistent.
+
+        :param oConnector: A connector which is used in the current thread.
+        :type oConnector: SQL
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        :param sHTML: HTML document.
+        :type sHTML: str
+        """
+        if self.bPersistent:
+            oConnector.execute_query('INSERT OR REPLACE INTO TaxonCards '
+                                     '(taxonID, lang, html) VALUES (?, ?, ?)',
+                                     (iTaxonID, self.sLang, sHTML,))
+            oConnector.oConnector.commit()
+
+    def flush(self):
+        """ Writes the cards made by prewarm into TaxonCards table by one
+        transaction of the connection of the cache.
+
+        :return: Number of written cards.
+        :rtype: int
+        """
+        with self.oLock:
+            lPending, self.lPending = self.lPending, []
+        if not lPending or not self.bPersistent:
+            return 0
+
+        self.oConnector.oConnector.executemany(
+            'INSERT OR REPLACE INTO TaxonCards (taxonID, lang, html) '
+            'VALUES (?, ?, ?)', [(iID, self.sLang, sHTML)
+                                 for iID, sHTML in lPending])
+        self.oConnector.oConnector.commit()
+        return len(lPending)
+
+    def invalidate(self, iTaxonID):
+        """ Forgets cards of the taxon in all languages. It's called by
+        triggers, but can be called directly too.
+
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        """
+        with self.oLock:
+            self.dVersions[iTaxonID] = self.dVersions.get(iTaxonID, 0) + 1
+            for tKey in [tKey for tKey in self.dCards if tKey[0] == iTaxonID]:
+                del self.dCards[tKey]
+            self.lPending = [tCard for tCard in self.lPending
+                             if tCard[0] != iTaxonID]
+
+    def clear(self):
+        """ Forgets all cards in memory and in the table. """
+        with self.oLock:
+            for iTaxonID in {tKey[0] for tKey in self.dCards}:
+                self.dVersions[iTaxonID] = self.dVersions.get(iTaxonID, 0) + 1
+            self.dCards.clear()
+            self.lPending.clear()
+            self.iGeneration += 1
+
+        if self.bPersistent:
+            self.oConnector.delete_row('TaxonCards')
+
+    def get_subtree(self, oConnector, iTaxonID):
+        """ Gets IDs of the taxon and of all taxa below it: its children,
+        synonyms and their descendants. The subtree is walked level by
+        level, so the nearest taxa come first, and no more than iMaxCards
+        taxa are taken.
+
+        :param oConnector: A connector which is used in the current thread.
+        :type oConnector: SQL
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        :return: IDs of taxa.
+        :rtype: list[int]
+        """
+        sSQL = 'WITH RECURSIVE Subtree(taxonID) AS (SELECT ?1 ' \
+               'UNION SELECT TaxonTree.taxonID FROM TaxonTree ' \
+               'JOIN Subtree ON TaxonTree.mainTaxonID=Subtree.taxonID) ' \
+               'SELECT taxonID FROM Subtree LIMIT ?2;'
+        return [tRow[0] for tRow in oConnector.execute_query(
+            sSQL, (iTaxonID, self.iMaxCards,)).fetchall()]
+
+    def prewarm_subtree(self, oConnector, iTaxonID):
+        """ Makes cards of the subtree of the taxon that are not in the
+        cache yet, the cards in the cache are marked as recently used. The
+        connector is only read, the cards are kept in memory and are given
+        to flush() for the table.
+
+        A card is kept only if its taxon wasn't invalidated and the cache
+        wasn't cleared while the card was being made.
+
+        :param oConnector: A connector which is used in the current thread.
+        :type oConnector: SQL
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        :return: Number of made cards.
+        :rtype: int
+        """
+        iMade = 0
+        for iID in self.get_subtree(oConnector, iTaxonID):
+            tKey = (iID, self.sLang)
+            with self.oLock:
+                if tKey in self.dCards:
+                    self.dCards.move_to_end(tKey)
+                    continue
+                iVersion = self.dVersions.get(iID, 0)
+                iGeneration = self.iGeneration
+
+            sHTML = self.fRender(oConnector, iID)
+            with self.oLock:
+                if self.dVersions.get(iID, 0) != iVersion or \
+                        self.iGeneration != iGeneration:
+                    continue
+                self.put_card(tKey, sHTML)
+                self.lPending.append((iID, sHTML))
+            iMade += 1
+
+        return iMade
+
+    def prewarm(self, iTaxonID, bWait=False):
+        """ Makes cards of the subtree of the taxon in a background thread
+        with its own connection to the database. If the thread is already
+        working, the taxon is queued for it. A database in memory can't be
+        shared between connections, so for it the work is done in the
+        current thread.
+
+        :param iTaxonID: ID of the taxon.
+        :type iTaxonID: int
+        :param bWait: Wait for the end of the work.
+        :type bWait: bool
+        :return: The thread that does the work, or None.
+        :rtype: threading.Thread or None
+        """
+        if self.oConnector.sFileDB == ':memory:':
+            self.prewarm_subtree(self.oConnector, iTaxonID)
+            self.flush()
+            return
+
+        with self.oLock:
+            if iTaxonID not in self.qPrewarm:
+                self.qPrewarm.append(iTaxonID)
+            oPrewarm = self.oPrewarm
+            if oPrewarm is None:
+                oPrewarm = threading.Thread(target=self.run_prewarm,
+                                            daemon=True)
+                self.oPrewarm = oPrewarm
+                oPrewarm.start()
+
+        if bWait:
+            oPrewarm.join()
+
+        return oPrewarm
+
+    def run_prewarm(self):
+        """ Makes cards of the queued subtrees until the queue is empty. It
+        is the work of the prewarm thread.
+        """
+        oConnector = SQL(self.oConnector.sFileDB)
+        try:
+            while True:
+                with self.oLock:
+                    if not self.qPrewarm:
+                        self.oPrewarm = None
+                        return
+                    iTaxonID = self.qPrewarm.popleft()
+                self.prewarm_subtree(oConnector, iTaxonID)
+        finally:
+            with self.oLock:
+                if self.oPrewarm is threading.current_thread():
+                    self.oPrewarm = None
+            oConnector.close()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,209 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module provides an on-disk cache of image thumbnails. A thumbnail is
+kept in a file which name consists of the image ID and the content hash of
+the image, so a changed image never gets an old thumbnail. The hash is
+stored in the Images row when the image is inserted, so a gallery reads
+only the hashes of its images, and an image is read only to make its
+thumbnail.
+
+The module doesn't depend on any graphic library, the function which makes
+a thumbnail is given by the caller. For example, with PyQt:
+
+    .. code-block::
+
+        def scale(bImage, iSize):
+            oImage = QImage.fromData(bImage)
+            oImage = oImage.scaled(iSize, iSize,
+                                   Qt.AspectRatioMode.KeepAspectRatio)
+            oBuffer = QBuffer()
+            oBuffer.open(QIODevice.OpenModeFlag.WriteOnly)
+            oImage.save(oBuffer, 'PNG')
+            return bytes(oBuffer.data())
+
+        oCache = ThumbnailCache(oConnector, 'cache/thumbnails', scale)
+        sFile = oCache.get_thumbnail(iImageID)
+
+Class:
+    ThumbnailCache(oConnector, sCacheDir, fScale, iSize=128, sExt='png')
+"""
+
+import os
+import threading
+
+from mli.lib.str import str_get_file_patch
+
+
+class ThumbnailCache:
+    """ Keeps thumbnails of images from Images table in a directory.
+
+    *Methods*
+        * get_thumbnail -- Gets a path to the thumbnail of an image.
+        * get_thumbnails -- Gets paths to thumbnails of several images.
+        * invalidate -- Forgets the known hash of an image.
+        * clean -- Deletes thumbnails of images which don't exist.
+    """
+
+    def __init__(self, oConnector, sCacheDir, fScale, iSize=128, sExt='png'):
+        """ Initiating a class.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param sCacheDir: The directory where thumbnails are stored.
+        :type sCacheDir: str
+        :param fScale: The function that takes bytes of the image and the
+            size, and returns bytes of the thumbnail.
+        :type fScale: callable
+        :param iSize: The maximal size of a side of the thumbnail.
+        :type iSize: int
+        :param sExt: The extension of thumbnail files.
+        :type sExt: str
+        """
+        self.oConnector = oConnector
+        self.sCacheDir = sCacheDir
+        self.fScale = fScale
+        self.iSize = iSize
+        self.sExt = sExt
+        self.dHashes = {}
+        self.oLock = threading.Lock()
+        os.makedirs(sCacheDir, exist_ok=True)
+
+    def get_file_name(self, iImageID, sHash):
+        """ Gets the path to the thumbnail file.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :param sHash: The content hash of the image.
+        :type sHash: str
+        :return: The path to the thumbnail.
+        :rtype: str
+        """
+        return str_get_file_patch(self.sCacheDir,
+                                  f'{iImageID}-{self.iSize}-{sHash}.'
+                                  f'{self.sExt}')
+
+    def get_hash(self, iImageID):
+        """ Gets the content hash of the image. The hash is read from the
+        database once and is remembered until invalidate() is called.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :return: The hash of the image or None if there is no such image.
+        :rtype: str or None
+        """
+        with self.oLock:
+            sHash = self.dHashes.get(iImageID)
+        if sHash is None:
+            sHash = self.oConnector.image_get_hash(iImageID)
+            if sHash is not None:
+                with self.oLock:
+                    self.dHashes[iImageID] = sHash
+
+        return sHash
+
+    def get_thumbnail(self, iImageID):
+        """ Gets a path to the thumbnail of the image, making it if it
+        doesn't exist yet.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        :return: The path to the thumbnail or None if there is no such
+            image.
+        :rtype: str or None
+        """
+        sHash = self.get_hash(iImageID)
+        if sHash is None:
+            return None
+
+        sFile = self.get_file_name(iImageID, sHash)
+        if os.path.isfile(sFile):
+            return sFile
+
+        bThumbnail = self.fScale(self.oConnector.image_read(iImageID),
+                                 self.iSize)
+        with self.oLock:
+            self.remove_old(iImageID)
+            sPart = f'{sFile}.part'
+            with open(sPart, 'wb') as fThumbnail:
+                fThumbnail.write(bThumbnail)
+            os.replace(sPart, sFile)
+
+        return sFile
+
+    def get_thumbnails(self, lImageID):
+        """ Gets paths to thumbnails of several images.
+
+        :param lImageID: IDs of images.
+        :type lImageID: list[int]
+        :return: Dictionary where keys are IDs and values are paths or None
+            for missing images.
+        :rtype: dict[int, str or None]
+        """
+        return {iImageID: self.get_thumbnail(iImageID)
+                for iImageID in lImageID}
+
+    def invalidate(self, iImageID=None):
+        """ Forgets the known hash of the image, so it is read again on
+        the next request. Without arguments, it forgets all hashes.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int or None
+        """
+        with self.oLock:
+            if iImageID is None:
+                self.dHashes.clear()
+            else:
+                self.dHashes.pop(iImageID, None)
+
+    def remove_old(self, iImageID):
+        """ Deletes all thumbnails of the image of this size.
+
+        :param iImageID: ID of the image.
+        :type iImageID: int
+        """
+        sPrefix = f'{iImageID}-{self.iSize}-'
+        for sFile in os.listdir(self.sCacheDir):
+            if sFile.startswith(sPrefix):
+                os.remove(str_get_file_patch(self.sCacheDir, sFile))
+
+    def clean(self):
+        """ Deletes thumbnails of images which are no longer in the database
+        and forgets their hashes.
+
+        :return: Number of deleted files.
+        :rtype: int
+        """
+        oCursor = self.oConnector.execute_query('SELECT imagesID FROM Images')
+        setImages = {str(tRow[0]) for tRow in oCursor}
+        with self.oLock:
+            for iImageID in [iImageID for iImageID in self.dHashes
+                             if str(iImageID) not in setImages]:
+                del self.dHashes[iImageID]
+
+        iDeleted = 0
+        for sFile in os.listdir(self.sCacheDir):
+            if sFile.split('-')[0] not in setImages:
+                os.remove(str_get_file_patch(self.sCacheDir, sFile))
+                iDeleted += 1
+
+        return iDeleted
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,353 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module imports vernacular names into LocalNames from the files of
+other databases: VernacularName.tsv of a GBIF archive and the CSV files of
+the names of iNaturalist, also inside a zip archive.
+
+A taxon of a row is found by its key in the database of the file, which
+must be in DBIndexes, for example the gbif key with GBIF_SOURCE_ID. The
+language is resolved by LangMap, which keeps all codes of Langs and the
+names of LangVariants in memory, so 'en', 'eng', 'en-GB' and 'English'
+are the same language. A name is added once for a taxon and a language:
+the names are compared without the case and extra spaces, with the names
+already in the database and in the file.
+
+The file is read row by row and the names are inserted by a Pipeline in
+batches, one transaction for a batch, so a file of millions of rows takes
+little memory and an interrupted import keeps the written batches.
+
+Function:
+    vernacular_iter_file(sFile)
+    vernacular_norm_name(sName)
+
+Class:
+    LangMap(dLangs=None)
+    VernacularImporter(oConnector, iSourceID, oLangs=None, iBatch=10000,
+                       fProgress=None)
+
+Using:
+    oImporter = VernacularImporter(oConnector, GBIF_SOURCE_ID)
+    dCount = oImporter.load_file('VernacularName.tsv')
+"""
+
+import csv
+import io
+import logging
+import re
+import zipfile
+
+from mli.lib.dwca import dwca_get_meta, dwca_iter_rows, dwca_term
+from mli.lib.pipeline import Pipeline
+
+# The counters of an import.
+VERNACULAR_COUNTERS = ('read', 'names', 'duplicates', 'no_taxon', 'no_lang',
+                       'empty', 'failed')
+
+RE_SPACES = re.compile(r'\s+')
+
+# A comment of a language name: 'Chinese (Traditional)'.
+RE_LANG_NOTE = re.compile(r'\s*[(\[].*$')
+
+
+def vernacular_norm_name(sName):
+    """ Removes extra spaces of a name.
+
+    :param sName: A vernacular name.
+    :type sName: str or None
+    :return: The name, an empty string if there is no name.
+    :rtype: str
+    """
+    return RE_SPACES.sub(' ', sName or '').strip()
+
+
+def vernacular_iter_file(sFile):
+    """ Reads the rows of vernacular names of a file. A zip archive gives
+    the rows of all its files of vernacular names, a file with tabs in the
+    header line is read as TSV, otherwise as CSV. The fields are named by
+    the short terms of Darwin Core, empty values are None.
+
+    :param sFile: The path of the file.
+    :type sFile: str
+    :return: Dictionaries of the field and the value.
+    :rtype: collections.abc.Iterator[dict[str, str|None]]
+    """
+    if zipfile.is_zipfile(sFile):
+        with zipfile.ZipFile(sFile) as oZip:
+            for sRowType, oFile in dwca_get_meta(oZip).items():
+                if sRowType.lower().startswith('vernacularname'):
+                    yield from dwca_iter_rows(oZip, oFile)
+        return
+
+    with open(sFile, encoding='utf-8-sig', newline='') as fFile:
+        sHeader = fFile.readline()
+        if '\t' in sHeader:
+            oReader = csv.reader(fFile, delimiter='\t',
+                                 quoting=csv.QUOTE_NONE)
+            lFields = sHeader.rstrip('\r\n').split('\t')
+        else:
+            sDelimiter = ';' if sHeader.count(';') > sHeader.count(',') \
+                else ','
+            oReader = csv.reader(fFile, delimiter=sDelimiter)
+            lFields = next(csv.reader(io.StringIO(sHeader),
+                                      delimiter=sDelimiter))
+        lFields = [dwca_term(sField.strip()) for sField in lFields]
+        for lValues in oReader:
+            if lValues:
+                yield {sField: sValue or None
+                       for sField, sValue in zip(lFields, lValues)}
+
+
+class LangMap:
+    """ Finds the language of Langs by a code or a name.
+
+    *Methods*
+        * from_db -- Reads the codes of Langs and the names of LangVariants.
+        * resolve -- Finds the language by a code or a name.
+    """
+
+    def __init__(self, dLangs=None):
+        """ Initiating a class.
+
+        :param dLangs: Dictionary of a code or a name in lower case and the
+            language's ID in Langs.
+        :type dLangs: dict[str, int] or None
+        """
+        self.dLangs = dict(dLangs or {})
+        # The resolved codes as they are written in the files.
+        self.dKnown = {}
+
+    def __len__(self):
+        return len(self.dLangs)
+
+    @classmethod
+    def from_db(cls, oConnector):
+        """ Reads the codes of ISO 639 and the names of the languages of
+        Langs and the variants of the names of LangVariants. A code goes
+        before a name, and a name of Langs before a variant.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :return: The map.
+        :rtype: LangMap
+        """
+        dLangs = {}
+        oCursor = oConnector.execute_query(
+            'SELECT langID, iso_639_1, iso_639_2, iso_639_3, iso_639_5, lang '
+            'FROM Langs ORDER BY langID;')
+        lRows = oCursor.fetchall() if oCursor else []
+        for iLang, *lCodes, _ in lRows:
+            # ISO 639-2 can have two codes: 'deu / ger'.
+            for sCode in '/'.join(filter(None, lCodes)).split('/'):
+                if sCode.strip():
+                    dLangs.setdefault(sCode.strip().lower(), iLang)
+        for iLang, *_, sLang in lRows:
+            if sLang:
+                dLangs.setdefault(sLang.strip().lower(), iLang)
+
+        oCursor = oConnector.execute_query(
+            'SELECT langID, lang FROM LangVariants ORDER BY langVariantID;')
+        for iLang, sLang in oCursor.fetchall() if oCursor else []:
+            if sLang:
+                dLangs.setdefault(sLang.strip().lower(), iLang)
+
+        return cls(dLangs)
+
+    def resolve(self, sLang):
+        """ Finds the language by a code or a name. A tag with a region or a
+        script, as 'en-GB' or 'zh_Hant', is found by its language, and a
+        name with a comment, as 'Chinese (Traditional)', by the name.
+
+        :param sLang: A code or a name of the language.
+        :type sLang: str or None
+        :return: ID of the language in Langs, or None if it isn't known.
+        :rtype: int or None
+        """
+        if not sLang:
+            return
+
+        try:
+            return self.dKnown[sLang]
+        except KeyError:
+            pass
+
+        sKey = sLang.strip().lower().replace('_', '-')
+        iLang = self.dLangs.get(sKey)
+        if iLang is None:
+            iLang = self.dLangs.get(sKey.split('-', 1)[0]) or \
+                self.dLangs.get(RE_LANG_NOTE.sub('', sKey))
+        self.dKnown[sLang] = iLang
+
+        return iLang
+
+
+class VernacularImporter:
+    """ Inserts vernacular names of the taxa of a database into LocalNames.
+
+    *Methods*
+        * load_file -- Imports the names of a file.
+        * load_rows -- Imports the names of rows.
+        * parse -- Makes the values of LocalNames of a row.
+        * write -- Inserts a batch by one transaction.
+    """
+
+    def __init__(self, oConnector, iSourceID, oLangs=None, iBatch=10000,
+                 fProgress=None):
+        """ Initiating a class.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param iSourceID: ID of the database of the file in DBSources, the
+            taxa are found by their keys of it in DBIndexes.
+        :type iSourceID: int
+        :param oLangs: The languages, by default they are read from the
+            database.
+        :type oLangs: LangMap or None
+        :param iBatch: Number of names inserted by one transaction.
+        :type iBatch: int
+        :param fProgress: The function that is called after every batch
+            with the number of the inserted and failed names.
+        :type fProgress: callable or None
+        """
+        self.oConnector = oConnector
+        self.iSourceID = iSourceID
+        self.oLangs = oLangs or LangMap.from_db(oConnector)
+        self.iBatch = iBatch
+        self.fProgress = fProgress
+        self.dKeys = {}
+        self.setNames = set()
+        self.dCount = dict.fromkeys(VERNACULAR_COUNTERS, 0)
+
+    def load_index(self):
+        """ Reads the keys of the taxa of the database and the names that
+        are in LocalNames already.
+
+        :return: None
+        """
+        oCursor = self.oConnector.execute_query(
+            'SELECT taxonIndex, taxonID FROM DBIndexes WHERE sourceID=?;',
+            (self.iSourceID,))
+        self.dKeys = {str(sKey): iTaxonID for sKey, iTaxonID
+                      in (oCursor.fetchall() if oCursor else [])}
+        oCursor = self.oConnector.execute_query(
+            'SELECT taxonID, langID, localName FROM LocalNames;')
+        self.setNames = {
+            (iTaxonID, iLang, vernacular_norm_name(sName).casefold())
+            for iTaxonID, iLang, sName in (oCursor or [])}
+
+    def load_file(self, sFile):
+        """ Imports the names of a file, see vernacular_iter_file().
+
+        :param sFile: The path of the file.
+        :type sFile: str
+        :return: The numbers of the import, or False if the file can't be
+            read.
+        :rtype: dict[str, int] or bool
+        """
+        try:
+            return self.load_rows(vernacular_iter_file(sFile))
+        except (OSError, UnicodeError, csv.Error, KeyError, ValueError,
+                zipfile.BadZipFile) as e:
+            logging.exception(f'Cannot import names from {sFile}: {e}')
+            return False
+
+    def load_rows(self, iRows):
+        """ Imports the names of rows with the taxon's key in 'taxonID' or
+        'id', the name in 'vernacularName' and the language in 'language'
+        or, as in the files of iNaturalist, in 'lexicon'.
+
+        :param iRows: The rows.
+        :type iRows: Iterable[dict[str, str|None]]
+        :return: Numbers of the read rows, the inserted names, the names
+            already known, the rows without a known taxon, without a known
+            language, without a name, and the failed names.
+        :rtype: dict[str, int]
+        """
+        self.dCount = dict.fromkeys(VERNACULAR_COUNTERS, 0)
+        self.load_index()
+
+        def progress(iDone, iFailed):
+            if self.fProgress:
+                self.fProgress(iDone + iFailed)
+
+        oPipeline = Pipeline(self.write, fParse=self.parse,
+                             iBatch=self.iBatch, fInterval=None,
+                             fProgress=progress, sName='vernacular')
+        dStats = oPipeline.run(iRows)
+        self.dCount['read'] = dStats['read']
+        self.dCount['names'] = dStats['written']
+        self.dCount['failed'] = dStats['failed']
+
+        return dict(self.dCount)
+
+    def parse(self, dRow):
+        """ Makes the values of LocalNames of a row.
+
+        :param dRow: A row of a file.
+        :type dRow: dict[str, str|None]
+        :return: The taxon's ID, the language's ID and the name, or None if
+            the row is skipped.
+        :rtype: tuple or None
+        """
+        sName = vernacular_norm_name(dRow.get('vernacularName'))
+        if not sName:
+            self.dCount['empty'] += 1
+            return
+
+        sKey = dRow.get('taxonID') or dRow.get('id') or ''
+        # iNaturalist can give a link instead of the key.
+        iTaxonID = self.dKeys.get(sKey.strip().rstrip('/').rsplit('/')[-1])
+        if not iTaxonID:
+            self.dCount['no_taxon'] += 1
+            return
+
+        iLang = self.oLangs.resolve(dRow.get('language')) or \
+            self.oLangs.resolve(dRow.get('lexicon'))
+        if not iLang:
+            self.dCount['no_lang'] += 1
+            return
+
+        tName = (iTaxonID, iLang, sName.casefold())
+        if tName in self.setNames:
+            self.dCount['duplicates'] += 1
+            return
+
+        self.setNames.add(tName)
+        return iTaxonID, iLang, sName
+
+    def write(self, lBatch):
+        """ Inserts a batch of names by one transaction.
+
+        :param lBatch: Pairs of a row and the values of LocalNames.
+        :type lBatch: list[tuple]
+        :return: None
+        """
+        lValues = [tValues for _, tValues in lBatch]
+        oConnection = self.oConnector.oConnector
+        iCount = self.oConnector.insert_many(
+            'LocalNames', 'taxonID, langID, localName', lValues,
+            bCommit=False)
+        if iCount is False:
+            oConnection.rollback()
+            raise RuntimeError(f'{len(lValues)} names are not inserted.')
+
+        oConnection.commit()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,491 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" The module imports the keys of the taxa in other databases, the sources
+of DBSources, into DBIndexes from their exports: CSV, TSV, the files of
+NCBI and Open Tree of Life with the separator '\\t|\\t', JSON Lines and
+Darwin Core archives.
+
+A source is described by XRefSource, which is kept in XREF_SOURCES as data:
+the columns of the name, of the key and of the authors, which are tried in
+turn after the common ones, and the separator and the header of a file
+without them. The names of the columns are compared in lower case and
+without the namespace, so 'col:ID', 'ID' and 'http://.../taxonID' are
+found by 'id' and 'taxonid'. A key given as a link of the source, a URL
+or a URN is cut to the key.
+
+The rows are read one by one and written by a Pipeline in batches, one
+transaction for a batch. A batch is loaded into the temporary table
+XRefRows and its names are found by one statement in XRefTaxa, which keeps
+the scientific and the canonical names of all taxa, the accepted taxon
+goes first. The name with the authors is tried before the canonical name
+parsed from it. The links of the found taxa are inserted by one statement,
+the taxa that have a link to the source already keep it or, with bUpdate,
+get the new key. A taxon takes the first row of the file only. The names
+which are not found are given to fUnmatched for a report.
+
+Function:
+    xref_iter_file(sFile, oSource=None)
+    xref_norm_field(sField)
+    xref_norm_index(sIndex, sLink='')
+
+Class:
+    XRefImporter(oConnector, oSource, bUpdate=False, iBatch=10000,
+                 fProgress=None, fUnmatched=None)
+
+Using:
+    oImporter = XRefImporter(oConnector, XREF_SOURCES['ncbi'])
+    dCount = oImporter.load_file('names.dmp')
+"""
+
+import csv
+import io
+import json
+import logging
+import re
+import zipfile
+from collections import namedtuple
+from sqlite3 import DatabaseError
+
+from mli.lib.dwca import dwca_get_meta, dwca_iter_rows, dwca_term
+from mli.lib.metrics import metrics_get
+from mli.lib.name_parser import name_parse
+from mli.lib.pipeline import Pipeline
+
+# The description of the exports of a source: ID in DBSources, the columns
+# of the name, of the key and of the authors in lower case, the separator
+# of the fields, None if it is found by the header, the names of the
+# columns of a file without a header, and a dictionary of a column and the
+# value of the rows that are imported.
+XRefSource = namedtuple('XRefSource', 'sourceID, names, indexes, authors, '
+                                      'delimiter, fields, filter',
+                        defaults=((), (), (), None, None, None))
+
+# The columns that are tried after the columns of a source.
+XREF_NAMES = ('scientificname', 'canonicalname', 'name')
+XREF_INDEXES = ('taxonid', 'id')
+XREF_AUTHORS = ('scientificnameauthorship', 'authorship')
+
+# The separator of the dumps of NCBI and Open Tree of Life.
+XREF_DMP = '\t|\t'
+
+XREF_SOURCES = {
+    'inat': XRefSource(1, indexes=('taxon_id',)),
+    'ebid': XRefSource(2),
+    'dyntaxa': XRefSource(3),
+    'svampeatlas': XRefSource(4, ('fullname',), ('_id',), ('author',)),
+    'col': XRefSource(5),
+    'auslichen': XRefSource(6, indexes=('scientificnameid',)),
+    'ausfungi': XRefSource(7, indexes=('scientificnameid',)),
+    'ott': XRefSource(8, indexes=('uid',), delimiter=XREF_DMP),
+    'ncbi': XRefSource(9, ('name_txt',), ('tax_id',), delimiter=XREF_DMP,
+                       fields=('tax_id', 'name_txt', 'unique_name',
+                               'name_class'),
+                       filter={'name_class': 'scientific name'}),
+    'mycobank': XRefSource(10, ('taxon name',), ('mycobank #',),
+                           ('authors',)),
+    'if': XRefSource(11, ('name of fungus',), ('record number',),
+                     ('authors',)),
+    'gbif': XRefSource(12, ('canonicalname',), ('key',)),
+    'eol': XRefSource(13, ('canonical', 'scientific_name'), ('page_id',)),
+    'plantarium': XRefSource(14),
+}
+
+# The row types of the taxa in a Darwin Core archive.
+XREF_ROW_TYPES = ('taxon', 'nameusage')
+
+# The counters of an import.
+XREF_COUNTERS = ('read', 'matched', 'added', 'updated', 'known',
+                 'duplicates', 'unmatched', 'empty', 'skipped', 'failed')
+
+XREF_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS XRefTaxa (
+    name    TEXT PRIMARY KEY,
+    taxonID INTEGER
+) WITHOUT ROWID;
+CREATE TEMP TABLE IF NOT EXISTS XRefRows (
+    rowID         INTEGER PRIMARY KEY,
+    name          TEXT,
+    canonicalName TEXT,
+    taxonIndex    TEXT,
+    taxonID       INTEGER
+);
+CREATE INDEX IF NOT EXISTS XRefRows_taxonID ON XRefRows (taxonID);
+CREATE TEMP TABLE IF NOT EXISTS XRefDone (
+    taxonID INTEGER PRIMARY KEY
+);
+DELETE FROM XRefTaxa;
+DELETE FROM XRefRows;
+DELETE FROM XRefDone;
+"""
+
+# A name is taken by the accepted taxon first, then by the first taxon.
+XREF_TAXA_SQL = (
+    'INSERT OR IGNORE INTO XRefTaxa (name, taxonID) '
+    'SELECT name, taxonID FROM ('
+    'SELECT Taxa.scientificName AS name, Taxa.taxonID, '
+    'IFNULL(TaxonTree.statusID!=1, 1) AS other FROM Taxa '
+    'LEFT JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID '
+    'UNION ALL '
+    'SELECT Taxa.canonicalName, Taxa.taxonID, '
+    'IFNULL(TaxonTree.statusID!=1, 1) FROM Taxa '
+    'LEFT JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID) '
+    "WHERE name IS NOT NULL AND name!='' ORDER BY other, taxonID;")
+
+XREF_MATCH_SQL = (
+    'UPDATE XRefRows SET taxonID=IFNULL('
+    '(SELECT taxonID FROM XRefTaxa WHERE XRefTaxa.name=XRefRows.name), '
+    '(SELECT taxonID FROM XRefTaxa '
+    'WHERE XRefTaxa.name=XRefRows.canonicalName));')
+
+# Leaves the first row of a taxon that has no row in the batches before.
+XREF_DEDUP_SQL = (
+    'DELETE FROM XRefRows WHERE taxonID IS NULL '
+    'OR taxonID IN (SELECT taxonID FROM XRefDone) '
+    'OR rowID NOT IN (SELECT MIN(rowID) FROM XRefRows GROUP BY taxonID);')
+
+XREF_UPDATE_SQL = (
+    'UPDATE DBIndexes SET taxonIndex=(SELECT taxonIndex FROM XRefRows '
+    'WHERE XRefRows.taxonID=DBIndexes.taxonID) '
+    'WHERE sourceID=:source AND taxonIndex IS NOT (SELECT taxonIndex '
+    'FROM XRefRows WHERE XRefRows.taxonID=DBIndexes.taxonID) '
+    'AND taxonID IN (SELECT taxonID FROM XRefRows);')
+
+XREF_INSERT_SQL = (
+    'INSERT INTO DBIndexes (taxonID, sourceID, taxonIndex) '
+    'SELECT taxonID, :source, taxonIndex FROM XRefRows '
+    'WHERE NOT EXISTS (SELECT 1 FROM DBIndexes '
+    'WHERE DBIndexes.taxonID=XRefRows.taxonID '
+    'AND DBIndexes.sourceID=:source) ORDER BY rowID;')
+
+RE_SPACES = re.compile(r'\s+')
+
+# A canonical name, which isn't parsed.
+RE_CANONICAL = re.compile(r'[A-Z][a-z-]+(?: [a-z-]+){0,2}')
+
+# The key at the end of a link or a URN.
+RE_INDEX_TAIL = re.compile(r'[^/:=#?]+$')
+
+
+def xref_norm_field(sField):
+    """ Makes the name of a column as it is in XRefSource: 'taxonid' from
+    'http://rs.tdwg.org/dwc/terms/taxonID' and 'id' from 'col:ID'.
+
+    :param sField: The name of the column.
+    :type sField: str
+    :return: The short name in lower case.
+    :rtype: str
+    """
+    return dwca_term(sField.strip()).rsplit(':', 1)[-1].strip().lower()
+
+
+def xref_norm_index(sIndex, sLink=''):
+    """ Takes the key of a taxon from a value of a file. The link of the
+    source is removed, and the last part of other links and of URNs is
+    taken.
+
+    :param sIndex: The key, the link of the taxon or its URN.
+    :type sIndex: str or int or None
+    :param sLink: The link of the source in DBSources.
+    :type sLink: str
+    :return: The key, an empty string if there is no key.
+    :rtype: str
+    """
+    if sIndex is None:
+        return ''
+
+    sIndex = str(sIndex).strip()
+    if sLink and sIndex.startswith(sLink):
+        return sIndex[len(sLink):].strip('/')
+    if '://' in sIndex or sIndex[:4].lower() == 'urn:':
+        oMatch = RE_INDEX_TAIL.search(sIndex.rstrip('/'))
+        return oMatch.group() if oMatch else ''
+
+    return sIndex
+
+
+def xref_split_dmp(sLine, sDelimiter):
+    """ Splits a line of a dump of NCBI, which also ends with a separator.
+
+    :param sLine: The line.
+    :type sLine: str
+    :param sDelimiter: The separator of the fields.
+    :type sDelimiter: str
+    :return: The values.
+    :rtype: list[str]
+    """
+    sLine = sLine.rstrip('\r\n')
+    sEnd = sDelimiter.rstrip()
+    if sLine.endswith(sEnd):
+        sLine = sLine[:-len(sEnd)]
+
+    return sLine.split(sDelimiter)
+
+
+def xref_iter_file(sFile, oSource=None):
+    """ Reads the rows of the taxa of a file. A zip archive gives the rows
+    of its files of the taxa, a file '.jsonl' or '.ndjson' is read as JSON
+    Lines, other files as text with the separator of the source or, if it
+    has none, with tabs, ';' or ',' as the header line has most. The
+    columns are named by xref_norm_field(), empty values are None.
+
+    :param sFile: The path of the file.
+    :type sFile: str
+    :param oSource: The source of the file.
+    :type oSource: XRefSource or None
+    :return: Dictionaries of the column and the value.
+    :rtype: collections.abc.Iterator[dict]
+    """
+    oSource = oSource or XRefSource(None)
+    if zipfile.is_zipfile(sFile):
+        with zipfile.ZipFile(sFile) as oZip:
+            for sRowType, oFile in dwca_get_meta(oZip).items():
+                if sRowType.lower() in XREF_ROW_TYPES:
+                    for dRow in dwca_iter_rows(oZip, oFile):
+                        yield {xref_norm_field(sField): sValue
+                               for sField, sValue in dRow.items()}
+        return
+
+    with open(sFile, encoding='utf-8-sig', newline='') as fFile:
+        if sFile.lower().endswith(('.jsonl', '.ndjson')):
+            for sLine in fFile:
+                if sLine.strip():
+                    yield {xref_norm_field(sField): oValue
+                           for sField, oValue in json.loads(sLine).items()}
+            return
+
+        sHeader = '' if oSource.fields else fFile.readline()
+        sDelimiter = oSource.delimiter
+        if sDelimiter is None:
+            sDelimiter = max('\t;,', key=sHeader.count) \
+                if sHeader.strip() else '\t'
+        if len(sDelimiter) > 1:
+            lFields = oSource.fields or xref_split_dmp(sHeader, sDelimiter)
+            oReader = (xref_split_dmp(sLine, sDelimiter) for sLine in fFile)
+        elif sDelimiter == '\t':
+            lFields = oSource.fields or sHeader.rstrip('\r\n').split('\t')
+            oReader = csv.reader(fFile, delimiter='\t',
+                                 quoting=csv.QUOTE_NONE)
+        else:
+            lFields = oSource.fields or next(
+                csv.reader(io.StringIO(sHeader), delimiter=sDelimiter))
+            oReader = csv.reader(fFile, delimiter=sDelimiter)
+        lFields = [xref_norm_field(sField) for sField in lFields]
+        for lValues in oReader:
+            if lValues and lValues != ['']:
+                yield {sField: sValue or None
+                       for sField, sValue in zip(lFields, lValues)}
+
+
+class XRefImporter:
+    """ Inserts the keys of the taxa in a database of DBSources into
+    DBIndexes.
+
+    *Methods*
+        * load_index -- Reads the names of the taxa and the link of the
+          source.
+        * load_file -- Imports the keys of a file.
+        * load_rows -- Imports the keys of rows.
+        * parse -- Takes the name and the key of a row.
+        * write -- Finds the taxa of a batch and writes their keys.
+    """
+
+    def __init__(self, oConnector, oSource, bUpdate=False, iBatch=10000,
+                 fProgress=None, fUnmatched=None):
+        """ Initiating a class.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param oSource: The source of the keys.
+        :type oSource: XRefSource
+        :param bUpdate: If True, a taxon that has a key of the source gets
+            the key of the file, otherwise it keeps its key.
+        :type bUpdate: bool
+        :param iBatch: Number of rows written by one transaction.
+        :type iBatch: int
+        :param fProgress: The function that is called after every batch
+            with the number of the written and failed rows.
+        :type fProgress: callable or None
+        :param fUnmatched: The function that gets the name and the key of
+            every row whose taxon isn't found.
+        :type fUnmatched: callable or None
+        """
+        self.oConnector = oConnector
+        self.oSource = oSource
+        self.bUpdate = bUpdate
+        self.iBatch = iBatch
+        self.fProgress = fProgress
+        self.fUnmatched = fUnmatched
+        self.tNames = tuple(oSource.names) + XREF_NAMES
+        self.tIndexes = tuple(oSource.indexes) + XREF_INDEXES
+        self.tAuthors = tuple(oSource.authors) + XREF_AUTHORS
+        self.dFilter = dict(oSource.filter or {})
+        self.sLink = ''
+        self.dCount = dict.fromkeys(XREF_COUNTERS, 0)
+
+    def load_index(self):
+        """ Fills XRefTaxa by the names of the taxa and reads the link of
+        the source.
+
+        :return: None
+        """
+        oConnection = self.oConnector.oConnector
+        oConnection.executescript(XREF_SCHEMA)
+        oConnection.execute(XREF_TAXA_SQL)
+        oConnection.commit()
+        oCursor = self.oConnector.execute_query(
+            'SELECT indexLink FROM DBSources WHERE sourceID=?;',
+            (self.oSource.sourceID,))
+        tRow = oCursor.fetchone() if oCursor else None
+        self.sLink = (tRow[0] or '') if tRow else ''
+
+    def load_file(self, sFile):
+        """ Imports the keys of a file, see xref_iter_file().
+
+        :param sFile: The path of the file.
+        :type sFile: str
+        :return: The numbers of the import, or False if the file can't be
+            read.
+        :rtype: dict[str, int] or bool
+        """
+        try:
+            return self.load_rows(xref_iter_file(sFile, self.oSource))
+        except (OSError, UnicodeError, csv.Error, KeyError, ValueError,
+                zipfile.BadZipFile) as e:
+            logging.exception(f'Cannot import keys from {sFile}: {e}')
+            return False
+
+    def load_rows(self, iRows):
+        """ Imports the keys of rows.
+
+        :param iRows: The rows with the columns in lower case.
+        :type iRows: Iterable[dict]
+        :return: Numbers of the read rows, the rows with a found taxon, the
+            added and the updated keys, the keys that were in DBIndexes,
+            the rows of a taxon that has a row before, the rows without a
+            found taxon, without a name or a key, the rows left by the
+            filter of the source, and the failed rows.
+        :rtype: dict[str, int]
+        """
+        self.dCount = dict.fromkeys(XREF_COUNTERS, 0)
+        try:
+            self.load_index()
+        except DatabaseError as e:
+            self.oConnector.oConnector.rollback()
+            logging.exception(f'Cannot read the names of the taxa: {e}')
+            return False
+
+        def progress(iDone, iFailed):
+            if self.fProgress:
+                self.fProgress(iDone + iFailed)
+
+        oPipeline = Pipeline(self.write, fParse=self.parse,
+                             iBatch=self.iBatch, fInterval=None,
+                             fProgress=progress, sName='xref')
+        dStats = oPipeline.run(iRows)
+        self.dCount['read'] = dStats['read']
+        self.dCount['failed'] = dStats['failed']
+        metrics_get().add_rows('DBIndexes', self.dCount['added'])
+
+        return dict(self.dCount)
+
+    def parse(self, dRow):
+        """ Takes the name and the key of a row. The name is joined with
+        the authors if they are in their own column, and the canonical name
+        is parsed from it.
+
+        :param dRow: A row of a file.
+        :type dRow: dict
+        :return: The name, the canonical name and the key, or None if the
+            row is skipped.
+        :rtype: tuple[str, str, str] or None
+        """
+        for sField, sValue in self.dFilter.items():
+            if dRow.get(sField) != sValue:
+                self.dCount['skipped'] += 1
+                return
+
+        sName = next(filter(None, map(dRow.get, self.tNames)), None)
+        sIndex = xref_norm_index(
+            next(filter(None, map(dRow.get, self.tIndexes)), None),
+            self.sLink)
+        sName = RE_SPACES.sub(' ', str(sName or '')).strip()
+        if not sName or not sIndex:
+            self.dCount['empty'] += 1
+            return
+
+        sAuthor = RE_SPACES.sub(' ', str(next(
+            filter(None, map(dRow.get, self.tAuthors)), ''))).strip()
+        if sAuthor and not sName.endswith(sAuthor):
+            sName = f'{sName} {sAuthor}'
+
+        if RE_CANONICAL.fullmatch(sName):
+            return sName, sName, sIndex
+
+        return sName, name_parse(sName).canonicalName or sName, sIndex
+
+    def write(self, lBatch):
+        """ Finds the taxa of a batch and writes their keys by one
+        transaction.
+
+        :param lBatch: Pairs of a row and the name, the canonical name and
+            the key.
+        :type lBatch: list[tuple]
+        :return: None
+        """
+        oConnection = self.oConnector.oConnector
+        dSource = {'source': self.oSource.sourceID}
+        try:
+            oConnection.executemany(
+                'INSERT INTO XRefRows (name, canonicalName, taxonIndex) '
+                'VALUES (?, ?, ?);', [tValues for _, tValues in lBatch])
+            oConnection.execute(XREF_MATCH_SQL)
+            iMatched = oConnection.execute(
+                'SELECT COUNT(*) FROM XRefRows '
+                'WHERE taxonID IS NOT NULL;').fetchone()[0]
+            lUnmatched = []
+            if self.fUnmatched:
+                lUnmatched = oConnection.execute(
+                    'SELECT name, taxonIndex FROM XRefRows '
+                    'WHERE taxonID IS NULL ORDER BY rowID;').fetchall()
+            iRows = len(lBatch) - oConnection.execute(
+                XREF_DEDUP_SQL).rowcount
+            iUpdated = oConnection.execute(
+                XREF_UPDATE_SQL, dSource).rowcount if self.bUpdate else 0
+            iAdded = oConnection.execute(XREF_INSERT_SQL, dSource).rowcount
+            oConnection.execute('INSERT INTO XRefDone (taxonID) '
+                                'SELECT taxonID FROM XRefRows;')
+            oConnection.execute('DELETE FROM XRefRows;')
+        except DatabaseError as e:
+            oConnection.rollback()
+            raise RuntimeError(f'{len(lBatch)} keys are not written: {e}')
+
+        oConnection.commit()
+        self.dCount['matched'] += iMatched
+        self.dCount['unmatched'] += len(lBatch) - iMatched
+        self.dCount['duplicates'] += iMatched - iRows
+        self.dCount['added'] += iAdded
+        self.dCount['updated'] += iUpdated
+        self.dCount['known'] += iRows - iAdded - iUpdated
+        metrics_get().count('xref.unmatched', len(lBatch) - iMatched)
+        for sName, sIndex in lUnmatched:
+            self.fUnmatched(sName, sIndex)
+
+
+if __name__ == '__main__':
+    pass
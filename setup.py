@@ -42,7 +42,8 @@ setup(
     license="GPL 3.0",
     entry_points={
         "console_scripts": [
-            "mli = mli:__main__"]},
+            "mli = mli:__main__",
+            "mli-sync = mli.cli:main"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Environment :: X11 Applications :: Qt",
@@ -0,0 +1,63 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the start of the command line interface: the import of
+mli.cli in a new interpreter. The exit status is 1 if the time is over its
+budget.
+
+Using:
+    python bench_cli.py [--repeat 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from os import path
+
+ROOT_DIR = path.join(path.dirname(path.abspath(__file__)), '..')
+
+# The budget of the import in seconds.
+BUDGET = 0.1
+
+CODE = ('import time\n'
+        'fStart = time.perf_counter()\n'
+        'import mli.cli\n'
+        'print(time.perf_counter() - fStart)\n')
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('--repeat', type=int, default=5)
+    oArgs = oParser.parse_args()
+
+    lTimes = []
+    for _ in range(oArgs.repeat):
+        oResult = subprocess.run([sys.executable, '-c', CODE],
+                                 capture_output=True, text=True, check=True,
+                                 env=dict(os.environ, PYTHONPATH=ROOT_DIR))
+        lTimes.append(float(oResult.stdout))
+
+    fTime = min(lTimes)
+    print(f'Import of mli.cli: {fTime * 1000:.1f} ms (best of '
+          f'{len(lTimes)}), budget {BUDGET * 1000:.0f} ms')
+    return int(fTime >= BUDGET)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the gbif client. It measures how long a burst of requests
+waits for the rate limit, and how soon the first record of a page comes
+while the page is downloaded. The exit status is 1 if a time is over its
+budget.
+
+Using:
+    python bench_gbif_client.py
+"""
+
+import logging
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from time import perf_counter
+
+from mli.lib.gbif_client import GBIFClient, TokenBucket
+from ut_gbif_client import FlakyHandler
+
+# The budgets of the measured times in seconds.
+BURST_BUDGET = 0.05
+STREAM_BUDGET = 0.15
+
+
+def bench_burst(iRepeat=20):
+    """ Gets the longest time of taking a full burst of tokens. """
+    fWorst = 0.0
+    for _ in range(iRepeat):
+        oBucket = TokenBucket(50, 5)
+        fStart = perf_counter()
+        for _ in range(5):
+            oBucket.acquire()
+        fWorst = max(fWorst, perf_counter() - fStart)
+
+    return fWorst
+
+
+def bench_stream(iRepeat=5):
+    """ Gets the longest time before the first record of a page that is
+    sent by chunks with pauses. """
+    oServer = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    threading.Thread(target=oServer.serve_forever, daemon=True).start()
+    oClient = GBIFClient(f'http://127.0.0.1:{oServer.server_port}/', fRate=0)
+    fWorst = 0.0
+    try:
+        for _ in range(iRepeat):
+            fStart = perf_counter()
+            oRecords = oClient.iter_json('stream/2', None, 'results')
+            next(oRecords)
+            fWorst = max(fWorst, perf_counter() - fStart)
+            list(oRecords)
+    finally:
+        oClient.close()
+        oServer.shutdown()
+        oServer.server_close()
+
+    return fWorst
+
+
+def main():
+    logging.disable(logging.WARNING)
+    fBurst = bench_burst()
+    fStream = bench_stream()
+    print(f'Burst of 5 tokens: {fBurst * 1000:.3f} ms, '
+          f'budget {BURST_BUDGET * 1000:.0f} ms')
+    print(f'First record:      {fStream * 1000:.3f} ms, '
+          f'budget {STREAM_BUDGET * 1000:.0f} ms')
+    return int(fBurst >= BURST_BUDGET or fStream >= STREAM_BUDGET)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the gbif update end to end. A synthetic family of lichens
+is written in a database and served by the stand-in of GBIF API, then
+gbif_get_update() finds and saves all its species, their synonyms and
+varieties.
+
+Using:
+    python bench_gbif_sync.py [--genera 20] [--species 20] [--synonyms 2]
+                              [--children 1] [--workers 8] [--latency 0.02]
+                              [--rate 0] [--errors 0] [path/to/mli.db]
+"""
+
+import argparse
+import logging
+from os import path
+from time import perf_counter
+
+from gbif_server import GBIFServer, GBIFTaxonomy
+from mli.lib import gbif_sync
+from mli.lib.gbif_client import GBIFClient, gbif_set_client
+from mli.lib.gbif_parser import gbif_get_update
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+
+class WriteTimer:
+    """ Measures the time of gbif_upsert() calls made by the update. """
+
+    def __init__(self, fUpsert):
+        self.fUpsert = fUpsert
+        self.fTime = 0.0
+        self.iCalls = 0
+
+    def __call__(self, *args, **kwargs):
+        fStart = perf_counter()
+        try:
+            return self.fUpsert(*args, **kwargs)
+        finally:
+            self.fTime += perf_counter() - fStart
+            self.iCalls += 1
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('database', nargs='?', help='a copy of mli.db')
+    oParser.add_argument('--genera', type=int, default=20)
+    oParser.add_argument('--species', type=int, default=20)
+    oParser.add_argument('--synonyms', type=int, default=2)
+    oParser.add_argument('--children', type=int, default=1)
+    oParser.add_argument('--workers', type=int, default=8)
+    oParser.add_argument('--latency', type=float, default=0.02,
+                         help='seconds before every answer')
+    oParser.add_argument('--rate', type=float, default=0,
+                         help='requests per second of the server')
+    oParser.add_argument('--errors', type=float, default=0,
+                         help='share of answers 503')
+    oArgs = oParser.parse_args()
+    logging.disable(logging.WARNING)
+
+    oConnector = SQL(oArgs.database or ':memory:')
+    if not oArgs.database:
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+    oTaxonomy = GBIFTaxonomy.synthetic(oArgs.genera, oArgs.species,
+                                       oArgs.synonyms, oArgs.children)
+    oTaxonomy.seed(oConnector, bClear=True)
+    iTaxa = oConnector.sql_count('Taxa')
+
+    oServer = GBIFServer(oTaxonomy, fLatency=oArgs.latency,
+                         fRate=oArgs.rate, fErrors=oArgs.errors)
+    oClient = GBIFClient(oServer.start(), fRate=0, iRetries=5,
+                         fBackoff=0.01, iPoolSize=oArgs.workers * 2)
+    oOldClient = gbif_set_client(oClient)
+    oTimer = WriteTimer(gbif_sync.gbif_upsert)
+    gbif_sync.gbif_upsert = oTimer
+    try:
+        fStart = perf_counter()
+        gbif_get_update(oConnector, 21, oArgs.workers)
+        fTime = perf_counter() - fStart
+    finally:
+        gbif_sync.gbif_upsert = oTimer.fUpsert
+        gbif_set_client(oOldClient)
+        oClient.close()
+        oServer.stop()
+
+    dStats = oServer.get_stats()
+    iRecords = dStats.get('records', 0) + dStats.get('species', 0)
+    print(f'Taxa of gbif:  {len(oTaxonomy)}')
+    print(f'Time:          {fTime:.2f} s')
+    print(f'Records:       {iRecords}, {iRecords / fTime:.0f} per second')
+    print(f'New taxa:      {oConnector.sql_count("Taxa") - iTaxa}')
+    print(f'Requests:      {dStats["requests"]}, 429: '
+          f'{dStats.get("limited", 0)}, 503: {dStats.get("errors", 0)}')
+    print('By endpoint:   ' + ', '.join(
+        f'{sName} {iCount}' for sName, iCount in sorted(dStats.items())
+        if sName not in ('requests', 'records', 'limited', 'errors')))
+    print(f'DB write time: {oTimer.fTime:.2f} s by {oTimer.iCalls} pages, '
+          f'{oTimer.fTime / fTime:.0%} of the time')
+
+
+if __name__ == '__main__':
+    main()
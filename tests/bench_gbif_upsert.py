@@ -0,0 +1,65 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of saving a page of new gbif taxa by gbif_upsert(). The taxa
+are written, so only a copy of mli.db may be given. The exit status is 1 if
+the time is over its budget.
+
+Using:
+    python bench_gbif_upsert.py [path/to/copy/of/mli.db]
+"""
+
+import logging
+import sys
+from os import path
+from time import perf_counter
+
+from mli.lib.gbif_upsert import gbif_upsert
+from mli.lib.sql import SQL
+from ut_gbif_upsert import answer
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+# The budget of a page of 1000 children in seconds.
+BUDGET = 0.5
+
+
+def main(sFileDB=None):
+    logging.disable(logging.WARNING)
+    oConnector = SQL(sFileDB or ':memory:')
+    if not sFileDB:
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+    oConnector.create_indexes()
+
+    lAnswer = [answer(2000000 + i, f'Aabaarnia n{chr(97 + i % 26)}'
+                                   f'{chr(97 + i // 26 % 26)}'
+                                   f'{chr(97 + i // 676)}', 'Nyl.')
+               for i in range(1000)]
+    fStart = perf_counter()
+    dIDs = gbif_upsert(oConnector, lAnswer)
+    fTime = perf_counter() - fStart
+
+    print(f'Saved taxa: {len(dIDs or {})}')
+    print(f'Time:       {fTime:.3f} s, budget {BUDGET:.3f} s')
+    return int(fTime >= BUDGET)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,82 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the import of iNaturalist links from an export, where half
+of the rows have names of the database and half are unknown. The exit
+status is 1 if the time is over its budget.
+
+Using:
+    python bench_inat.py [--rows 200000]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+from os import path
+from time import perf_counter
+
+from mli.lib.inat_csv_parser import INAT_SOURCE_ID, INAT_URL, inat_parser
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+# The budget of 200000 rows in seconds.
+BUDGET = 5.0
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('--rows', type=int, default=200000)
+    oArgs = oParser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as sDir:
+        oConnector = SQL(path.join(sDir, 'mli.db'))
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        oConnector.execute_query('DELETE FROM DBIndexes WHERE sourceID=?;',
+                                 (INAT_SOURCE_ID,))
+        oConnector.oConnector.commit()
+        lNames = [tRow[0] for tRow in oConnector.execute_query(
+            'SELECT Taxa.canonicalName FROM Taxa '
+            'JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID '
+            'WHERE TaxonTree.statusID=1 GROUP BY Taxa.canonicalName '
+            'LIMIT 5000;').fetchall()]
+
+        def rows():
+            for iRow in range(oArgs.rows):
+                sName = lNames[iRow % len(lNames)]
+                yield {'Name': sName if iRow < oArgs.rows // 2
+                       else f'Not {iRow}',
+                       'ID': f'{INAT_URL}{iRow}'}
+
+        fStart = perf_counter()
+        iCount = inat_parser(oConnector, rows())
+        fTime = perf_counter() - fStart
+        oConnector.close()
+
+    fBudget = BUDGET * oArgs.rows / 200000
+    print(f'Rows:   {oArgs.rows}, links {iCount}')
+    print(f'Time:   {fTime:.3f} s, budget {fBudget:.3f} s')
+    return int(fTime >= fBudget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of selecting lichens from rows of the gbif backbone. The exit
+status is 1 if the time is over its budget.
+
+Using:
+    python bench_lichen_groups.py [--rows 1000000]
+"""
+
+import argparse
+import sys
+from time import perf_counter
+
+from mli.lib.lichen_groups import LichenGroups
+from ut_lichen_groups import taxon
+
+# The budget of a million rows in seconds.
+BUDGET = 2.0
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('--rows', type=int, default=1000000)
+    oArgs = oParser.parse_args()
+
+    lGroups = [taxon('Lecanoromycetes', 'Lecanorales', 'Lecanoraceae',
+                     'Lecanora'),
+               taxon('Agaricomycetes', 'Agaricales', 'Hygrophoraceae',
+                     'Hygrocybe'),
+               taxon('Eurotiomycetes', 'Verrucariales', 'Verrucariaceae',
+                     'Verrucaria'),
+               taxon('Sordariomycetes', 'Hypocreales', 'Nectriaceae')]
+    lRows = [dict(lGroups[iRow % 4], taxonID=iRow)
+             for iRow in range(oArgs.rows)]
+
+    fStart = perf_counter()
+    iLichens = sum(1 for _ in LichenGroups().filter_lichens(lRows))
+    fTime = perf_counter() - fStart
+    fBudget = BUDGET * oArgs.rows / 1000000
+
+    print(f'Rows:    {oArgs.rows}, lichens {iLichens}')
+    print(f'Time:    {fTime:.3f} s, budget {fBudget:.3f} s')
+    return int(fTime >= fBudget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
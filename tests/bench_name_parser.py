@@ -0,0 +1,60 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the offline name parser on names of bulk import. The exit
+status is 1 if the time is over its budget.
+
+Using:
+    python bench_name_parser.py [--names 10000]
+"""
+
+import argparse
+import sys
+from time import perf_counter
+
+from mli.lib.name_parser import name_parse
+
+# The budget of 10000 names in seconds.
+BUDGET = 1.0
+
+NAMES = ['Xanthoria parietina (L.) Th. Fr., 1860',
+         'Peltigera canina (L.) Willd. f. ulorrhiza (Flörke) Hue',
+         'Aglaopisma De Notaris ex Baglietto, 1856',
+         'Lecanora muralis (Schreb.) Rabenh.']
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('--names', type=int, default=10000)
+    oArgs = oParser.parse_args()
+
+    lNames = NAMES * (oArgs.names // len(NAMES))
+    fStart = perf_counter()
+    for sName in lNames:
+        name_parse(sName)
+    fTime = perf_counter() - fStart
+    fBudget = BUDGET * len(lNames) / 10000
+
+    print(f'Names:  {len(lNames)}')
+    print(f'Time:   {fTime:.3f} s, budget {fBudget:.3f} s')
+    print(f'Speed:  {len(lNames) / fTime:.0f} names per second')
+    return int(fTime >= fBudget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
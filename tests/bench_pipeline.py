@@ -0,0 +1,63 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the writer of the pipeline. It measures how long a fetched
+item waits for its batch, when the next item is slow, and the fInterval of
+the pipeline is 0.05 s. The exit status is 1 if the time is over its budget.
+
+Using:
+    python bench_pipeline.py
+"""
+
+import sys
+import time
+
+from mli.lib.pipeline import Pipeline
+
+# The budget of the wait of the first item in seconds.
+BUDGET = 0.25
+
+
+def bench_interval(iRepeat=5):
+    """ Gets the longest time from the start to the write of the first
+    item. """
+    fWorst = 0.0
+    for _ in range(iRepeat):
+        lTimes = []
+
+        def fetch(iItem):
+            time.sleep(0.3 if iItem else 0)
+            return iItem
+
+        oPipeline = Pipeline(lambda lBatch: lTimes.append(time.monotonic()),
+                             fetch, iFetchers=1, iBatch=100, fInterval=0.05)
+        fStart = time.monotonic()
+        oPipeline.run(range(2))
+        fWorst = max(fWorst, lTimes[0] - fStart)
+
+    return fWorst
+
+
+def main():
+    fTime = bench_interval()
+    print(f'First write: {fTime * 1000:.1f} ms, budget {BUDGET * 1000:.0f} ms')
+    return int(fTime >= BUDGET)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
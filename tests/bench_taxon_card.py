@@ -0,0 +1,113 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of making taxon cards. It compares the former way, when a card
+was made by eight separate queries, with the card made from one
+get_taxon_page() call.
+
+Using:
+    python bench_taxon_card.py [path/to/mli.db]
+"""
+
+import sys
+from gettext import gettext as _
+from os import path
+from time import perf_counter
+
+from mli.lib.sql import INDEXES, SQL
+from mli.lib.str import HTMLDoc
+from mli.lib.taxon_card import TaxonCard
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+
+def legacy_card(oConnector, sSciName):
+    """ Makes the card the way TaxonBrowser did it before get_taxon_page. """
+    sNoData = _('Нет данных.')
+    oHTML = HTMLDoc()
+    iStatusID, sStatusName = oConnector.get_status_taxon(sSciName)
+    iLevelID, sRankName = oConnector.get_taxon_rank(sSciName)
+    iTaxonID = oConnector.get_taxon_id(sSciName)
+    sName, sAuthor = oConnector.get_name_author(iTaxonID)[0]
+    oHTML.set_title_doc(sRankName, sName, sAuthor)
+    if iStatusID != 1:
+        sMainName, sMainAuthor = oConnector.get_main_taxon(iTaxonID)
+        oHTML.set_is_synonym(sName, sAuthor, sMainName, sMainAuthor)
+
+    oHTML.set_title_chart(_('Статус:'))
+    oHTML.set_string(sStatusName)
+    if iStatusID == 1:
+        oHTML.set_title_chart(_('Синонимы:'))
+        for tRow in oConnector.get_synonyms(iTaxonID):
+            oHTML.set_rang_name(*tRow)
+        oHTML.set_title_chart(_('Описание:'))
+        oHTML.set_no_data(sNoData)
+        oHTML.set_title_chart(_('Дочерние таксоны:'))
+        for tRow in oConnector.get_taxon_children(iTaxonID, sStatusName):
+            oHTML.set_rang_name(*tRow)
+
+    oHTML.set_title_chart(_('Ссылки в других базах данных:'))
+    for tRow in oConnector.get_taxon_db_link(iTaxonID):
+        oHTML.set_link(*tRow)
+    oHTML.set_title_chart(_('Ссылки на источники:'))
+    oHTML.set_no_data(sNoData)
+
+    return oHTML.get_doc()
+
+
+def bench(fCard, lNames, iRepeat=3):
+    """ Gets the best mean time of making a card in milliseconds. """
+    fBest = None
+    for _ in range(iRepeat):
+        fStart = perf_counter()
+        for sName in lNames:
+            fCard(sName)
+        fTime = (perf_counter() - fStart) * 1000 / len(lNames)
+        fBest = fTime if fBest is None else min(fBest, fTime)
+
+    return fBest
+
+
+def main(sFileDB=None):
+    oConnector = SQL(sFileDB or ':memory:')
+    if not sFileDB:
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+
+    lNames = [tRow[0] for tRow in oConnector.execute_query(
+        'SELECT Taxa.scientificName FROM Taxa '
+        'JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID '
+        'GROUP BY Taxa.scientificName HAVING COUNT(*)=1').fetchall()]
+
+    for sIndex in INDEXES:
+        oConnector.execute_query(f'DROP INDEX IF EXISTS {sIndex}')
+    fNoIndex = bench(lambda sName: legacy_card(oConnector, sName), lNames)
+
+    oConnector.create_indexes()
+    fBefore = bench(lambda sName: legacy_card(oConnector, sName), lNames)
+    fAfter = bench(lambda sName: TaxonCard(oConnector).get_html(sName),
+                   lNames)
+    print(f'Cards: {len(lNames)}')
+    print(f'Eight queries, no indexes: {fNoIndex:.3f} ms per card')
+    print(f'Eight queries:             {fBefore:.3f} ms per card')
+    print(f'get_taxon_page():          {fAfter:.3f} ms per card')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
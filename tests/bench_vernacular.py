@@ -0,0 +1,77 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the bulk import of vernacular names into a database file.
+The exit status is 1 if the time is over its budget.
+
+Using:
+    python bench_vernacular.py [--rows 200000]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+from os import path
+from time import perf_counter
+
+from mli.lib.sql import SQL
+from mli.lib.vernacular import VernacularImporter
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+# The budget of 200000 rows in seconds.
+BUDGET = 10.0
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('--rows', type=int, default=200000)
+    oArgs = oParser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as sDir:
+        oConnector = SQL(path.join(sDir, 'mli.db'))
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        oConnector.insert_many('DBIndexes', 'taxonID, sourceID, taxonIndex',
+                               [(iTaxonID, 12, f'k{iTaxonID}')
+                                for iTaxonID in range(1, 2001)])
+
+        def rows():
+            for iRow in range(oArgs.rows):
+                yield {'taxonID': f'k{iRow % 2000 + 1}',
+                       'vernacularName': f'Name {iRow % (oArgs.rows // 2)}',
+                       'language': ('en', 'de', 'ru', 'fr')[iRow % 4]}
+
+        fStart = perf_counter()
+        dCount = VernacularImporter(oConnector, 12,
+                                    iBatch=5000).load_rows(rows())
+        fTime = perf_counter() - fStart
+        oConnector.close()
+
+    fBudget = BUDGET * oArgs.rows / 200000
+    print(f'Rows:   {oArgs.rows}, names {dCount["names"]}, '
+          f'duplicates {dCount["duplicates"]}')
+    print(f'Time:   {fTime:.3f} s, budget {fBudget:.3f} s')
+    return int(fTime >= fBudget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" Benchmark of the import of the keys of another database from an NCBI
+names.dmp file with all names of the database and many unknown names. The
+exit status is 1 if the time is over its budget.
+
+Using:
+    python bench_xref.py [--rows 200000]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+from os import path
+from time import perf_counter
+
+from mli.lib.sql import SQL
+from mli.lib.xref import XREF_SOURCES, XRefImporter
+from ut_xref import DIGITS
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+# The budget of 200000 rows in seconds.
+BUDGET = 10.0
+
+
+def main():
+    oParser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    oParser.add_argument('--rows', type=int, default=200000)
+    oArgs = oParser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as sDir:
+        oConnector = SQL(path.join(sDir, 'mli.db'))
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        lNames = [tRow[0] for tRow in oConnector.execute_query(
+            'SELECT canonicalName FROM Taxa;').fetchall()]
+        sFile = path.join(sDir, 'names.dmp')
+        with open(sFile, 'w', encoding='utf-8') as fFile:
+            for iRow in range(oArgs.rows):
+                sName = lNames[iRow] if iRow < len(lNames) else \
+                    'Incognita ' + str(iRow).translate(DIGITS)
+                fFile.write(f'{iRow}\t|\t{sName}\t|\t\t|\t'
+                            f'scientific name\t|\n')
+
+        fStart = perf_counter()
+        dCount = XRefImporter(oConnector,
+                              XREF_SOURCES['ncbi']).load_file(sFile)
+        fTime = perf_counter() - fStart
+        oConnector.close()
+
+    fBudget = BUDGET * oArgs.rows / 200000
+    print(f'Rows:   {dCount["read"]}, added {dCount["added"]}, '
+          f'unmatched {dCount["unmatched"]}')
+    print(f'Time:   {fTime:.3f} s, budget {fBudget:.3f} s')
+    return int(fTime >= fBudget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
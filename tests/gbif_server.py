@@ -0,0 +1,520 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" A stand-in of GBIF API for tests and benchmarks, so the gbif pipeline
+runs without api.gbif.org. The server is made by the standard library and
+answers in threads:
+    GET  /species/suggest?q=...
+    GET  /species/{key}
+    GET  /species/{key}/children?limit=...&offset=...
+    GET  /species/{key}/synonyms?limit=...&offset=...
+    GET  /dataset/{key}
+    GET  /parser/name?name=...
+    POST /parser/name
+
+The taxa are taken from recorded answers of gbif (a JSON list of species
+records) or made as a synthetic taxonomy of any size. The names are parsed
+by mli.lib.name_parser. The latency of every answer, the rate limit (the
+answer 429) and the share of failed answers (503) are set by parameters.
+
+Class:
+    GBIFTaxonomy()
+    GBIFServer(oTaxonomy, fLatency=0.0, fRate=0.0, iBurst=10, fErrors=0.0,
+               iSeed=0)
+
+Using:
+    oServer = GBIFServer(GBIFTaxonomy.synthetic(iGenera=5), fLatency=0.01)
+    gbif_set_client(GBIFClient(oServer.start(), fRate=0))
+    ...
+    oServer.stop()
+"""
+
+import json
+import random
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.parse import parse_qs, urlparse
+
+from mli.lib.name_parser import name_parse
+
+# The most records of one page, as in gbif.
+MAX_LIMIT = 1000
+
+SYLLABLES = ('ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ru',
+             'sa', 'te', 'vi', 'zo')
+AUTHORS = ('Ach.', 'Nyl.', '(Ach.) Nyl.', 'Th. Fr.', 'Müll. Arg.',
+           '(L.) Th. Fr.', 'Zahlbr.', 'Körb.')
+CLASSIFICATION = {'kingdom': 'Fungi', 'phylum': 'Ascomycota',
+                  'class': 'Lecanoromycetes', 'order': 'Lecanorales'}
+
+
+def synthetic_word(iNumber):
+    """ Makes a word of latin syllables, different for every number. """
+    sWord = ''
+    while True:
+        iNumber, iRest = divmod(iNumber, len(SYLLABLES))
+        sWord = sWord + SYLLABLES[iRest]
+        if not iNumber:
+            break
+        iNumber = iNumber - 1
+
+    return sWord
+
+
+class GBIFTaxonomy:
+    """ The taxa answered by the server. """
+
+    def __init__(self):
+        """ Initializes an empty taxonomy. """
+        self.dTaxa = {}
+        self.dChildren = defaultdict(list)
+        self.dSynonyms = defaultdict(list)
+        self.lNames = []
+        self.bSorted = True
+        # The publishing date of the dataset, a new one is a new version.
+        self.sVersion = '2023-08-28'
+
+    def __len__(self):
+        return len(self.dTaxa)
+
+    def add(self, dRecord):
+        """ Adds a species record as gbif returns it. The record is a child
+        of its parentKey, or a synonym of its acceptedKey.
+
+        :param dRecord: The record.
+        :type dRecord: dict
+        :return: None
+        """
+        iKey = dRecord['key']
+        self.dTaxa[iKey] = dRecord
+        if dRecord.get('synonym'):
+            self.dSynonyms[dRecord.get('acceptedKey')].append(iKey)
+        elif dRecord.get('parentKey'):
+            self.dChildren[dRecord['parentKey']].append(iKey)
+        self.lNames.append((dRecord.get('canonicalName', '').lower(), iKey))
+        self.bSorted = False
+
+    def get(self, iKey):
+        """ Gets the record with the number of its descendants, as gbif
+        answers it.
+
+        :param iKey: The gbif key.
+        :type iKey: int
+        :return: The record, or None if the key is unknown.
+        :rtype: dict or None
+        """
+        if iKey not in self.dTaxa:
+            return
+
+        iDescendants = 0
+        lKeys = [iKey]
+        while lKeys:
+            lChildren = self.dChildren.get(lKeys.pop(), [])
+            iDescendants += len(lChildren)
+            lKeys.extend(lChildren)
+
+        return dict(self.dTaxa[iKey], numDescendants=iDescendants)
+
+    def suggest(self, sQuery, iLimit=20):
+        """ Finds the records whose canonical names start with the query.
+
+        :param sQuery: The beginning of a name.
+        :type sQuery: str
+        :param iLimit: The most records.
+        :type iLimit: int
+        :return: The records.
+        :rtype: list[dict]
+        """
+        if not self.bSorted:
+            self.lNames.sort()
+            self.bSorted = True
+
+        sQuery = sQuery.lower()
+        lAnswer = []
+        iIndex = bisect_left(self.lNames, (sQuery, 0))
+        while iIndex < len(self.lNames) and len(lAnswer) < iLimit and \
+                self.lNames[iIndex][0].startswith(sQuery):
+            lAnswer.append(self.dTaxa[self.lNames[iIndex][1]])
+            iIndex += 1
+
+        return lAnswer
+
+    @classmethod
+    def from_file(cls, sFile):
+        """ Loads recorded answers of gbif.
+
+        :param sFile: A JSON file with a list of species records, or with
+            an answer of a listing (the records are in 'results').
+        :type sFile: str
+        :return: The taxonomy.
+        :rtype: GBIFTaxonomy
+        """
+        with open(sFile, encoding='utf-8') as fJSON:
+            oData = json.load(fJSON)
+        if isinstance(oData, dict):
+            oData = oData['results']
+
+        oTaxonomy = cls()
+        for dRecord in oData:
+            oTaxonomy.add(dRecord)
+
+        return oTaxonomy
+
+    @classmethod
+    def synthetic(cls, iGenera=10, iSpecies=10, iSynonyms=2, iChildren=1):
+        """ Makes a family of lichens with made up names.
+
+        :param iGenera: Number of genera.
+        :type iGenera: int
+        :param iSpecies: Number of species in every genus.
+        :type iSpecies: int
+        :param iSynonyms: Number of synonyms of every species.
+        :type iSynonyms: int
+        :param iChildren: Number of varieties of every species.
+        :type iChildren: int
+        :return: The taxonomy.
+        :rtype: GBIFTaxonomy
+        """
+        oTaxonomy = cls()
+        dFamily = dict(CLASSIFICATION, key=100, rank='FAMILY',
+                       scientificName='Lecanoraceae Körb.',
+                       canonicalName='Lecanoraceae', authorship='Körb.',
+                       taxonomicStatus='ACCEPTED', synonym=False)
+        oTaxonomy.add(dFamily)
+        iKey = dFamily['key']
+        for iGenus in range(iGenera):
+            iKey += 1
+            sGenus = synthetic_word(iGenus).capitalize() + 'ia'
+            dGenus = oTaxonomy.make(iKey, sGenus, 'GENUS', iGenus, dFamily)
+            for iSpec in range(iSpecies):
+                iKey += 1
+                sSpecies = f'{sGenus} {synthetic_word(iSpec)}a'
+                dSpecies = oTaxonomy.make(iKey, sSpecies, 'SPECIES',
+                                          iGenus + iSpec, dGenus)
+                for iChild in range(iChildren):
+                    iKey += 1
+                    sEpithet = f'{synthetic_word(iChild)}is'
+                    oTaxonomy.make(iKey, f'{sSpecies} {sEpithet}', 'VARIETY',
+                                   iChild, dSpecies,
+                                   f'{sSpecies} var. {sEpithet}')
+                for iSyn in range(iSynonyms):
+                    iKey += 1
+                    sEpithet = synthetic_word(
+                        iSpecies + iSpec * iSynonyms + iSyn)
+                    oTaxonomy.make(iKey, f'{sGenus} {sEpithet}a', 'SPECIES',
+                                   iSyn, dSpecies, bSynonym=True)
+
+        return oTaxonomy
+
+    def make(self, iKey, sName, sRank, iAuthor, dParent, sMarked=None,
+             bSynonym=False):
+        """ Makes a record and adds it. A synonym gets the parent as the
+        accepted taxon.
+
+        :param iKey: The gbif key.
+        :type iKey: int
+        :param sName: The canonical name.
+        :type sName: str
+        :param sRank: The rank as gbif writes it.
+        :type sRank: str
+        :param iAuthor: A number choosing the authors and the status.
+        :type iAuthor: int
+        :param dParent: The record of the parent or the accepted taxon.
+        :type dParent: dict
+        :param sMarked: The name with the rank marker, if it differs.
+        :type sMarked: str or None
+        :param bSynonym: If True, the record is a synonym.
+        :type bSynonym: bool
+        :return: The record.
+        :rtype: dict
+        """
+        sAuthor = AUTHORS[iAuthor % len(AUTHORS)]
+        sSciName = f'{sMarked or sName} {sAuthor}'
+        if iAuthor % 3 == 0:
+            sSciName = f'{sSciName}, {1800 + iKey % 200}'
+        dRecord = dict(CLASSIFICATION, key=iKey, scientificName=sSciName,
+                       canonicalName=sName, authorship=sAuthor, rank=sRank,
+                       taxonomicStatus='ACCEPTED', synonym=bSynonym)
+        if bSynonym:
+            dRecord.update(
+                acceptedKey=dParent['key'],
+                accepted=dParent['scientificName'],
+                parentKey=dParent.get('parentKey'),
+                parent=dParent.get('parent'),
+                taxonomicStatus=('HOMOTYPIC_SYNONYM', 'HETEROTYPIC_SYNONYM',
+                                 'SYNONYM')[iAuthor % 3])
+        else:
+            dRecord.update(parentKey=dParent['key'],
+                           parent=dParent['canonicalName'])
+        self.add(dRecord)
+
+        return dRecord
+
+    def seed(self, oConnector, sRank='SPECIES', bClear=False):
+        """ Writes the accepted taxa down to the rank in the database without
+        gbif keys, so an update has to find all of them.
+
+        :param oConnector: An instance of the sqlite database api class.
+        :type oConnector: SQL
+        :param sRank: The lowest rank which is written.
+        :type sRank: str
+        :param bClear: If True, the taxa of the rank and lower ranks are
+            deleted from the database before, so an update of the rank
+            requests only the synthetic ones.
+        :type bClear: bool
+        :return: Number of the written taxa.
+        :rtype: int
+        """
+        dRanks = dict(oConnector.execute_query(
+            'SELECT UPPER(rankName), rankID FROM TaxonRanks;').fetchall())
+        iID = oConnector.execute_query(
+            'SELECT IFNULL(MAX(taxonID), 0) FROM Taxa;').fetchone()[0]
+        if bClear:
+            oConnector.execute_script(
+                'PRAGMA foreign_keys=OFF; '
+                'DELETE FROM TaxonTree WHERE taxonID IN (SELECT taxonID '
+                f'FROM Taxa WHERE rankID>={dRanks[sRank]}); '
+                f'DELETE FROM Taxa WHERE rankID>={dRanks[sRank]}; '
+                'PRAGMA foreign_keys=ON;')
+        dIDs = {}
+        lTaxa = []
+        lTree = []
+        for dRecord in self.dTaxa.values():
+            iRank = dRanks.get(dRecord['rank'])
+            if dRecord.get('synonym') or not iRank or iRank > dRanks[sRank]:
+                continue
+            iID += 1
+            dIDs[dRecord['key']] = iID
+            lTaxa.append((iID, dRecord['scientificName'],
+                          dRecord['canonicalName'], dRecord['authorship'],
+                          iRank,))
+            lTree.append((iID, dIDs.get(dRecord.get('parentKey')), 1,))
+
+        oConnector.insert_many(
+            'Taxa', 'taxonID, scientificName, canonicalName, authorship, '
+                    'rankID', lTaxa, bCommit=False)
+        oConnector.insert_many('TaxonTree', 'taxonID, mainTaxonID, statusID',
+                               lTree)
+        return len(lTaxa)
+
+
+class GBIFHandler(BaseHTTPRequestHandler):
+    """ Answers the requests as gbif. """
+    protocol_version = 'HTTP/1.1'
+    # The headers and the body are sent separately, without it every
+    # answer on a kept alive connection waits for the delayed ACK.
+    disable_nagle_algorithm = True
+
+    def send_json(self, iStatus, oData=None):
+        bBody = json.dumps(oData).encode() if oData is not None else b''
+        self.send_response(iStatus)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(bBody)))
+        self.end_headers()
+        self.wfile.write(bBody)
+
+    def check(self, sEndpoint):
+        """ Counts the request, waits the latency and gives the status of
+        an injected failure, or None if the request should be answered. """
+        oServer = self.server
+        oServer.count(sEndpoint)
+        if oServer.fLatency:
+            sleep(oServer.fLatency)
+        if not oServer.take_token():
+            oServer.count('limited')
+            return 429
+        if oServer.is_error():
+            oServer.count('errors')
+            return 503
+
+    def do_GET(self):
+        oURL = urlparse(self.path)
+        lPath = [sPart for sPart in oURL.path.split('/') if sPart]
+        if lPath[:1] == ['v1']:
+            lPath = lPath[1:]
+        dQuery = {sName: lValues[-1]
+                  for sName, lValues in parse_qs(oURL.query).items()}
+        oTaxonomy = self.server.oTaxonomy
+
+        if lPath == ['parser', 'name']:
+            self.answer('parser', lambda: self.parse(
+                parse_qs(oURL.query).get('name', [])))
+        elif lPath == ['species', 'suggest']:
+            self.answer('suggest', lambda: oTaxonomy.suggest(
+                dQuery.get('q', ''), int(dQuery.get('limit', 20))))
+        elif len(lPath) == 2 and lPath[0] == 'species' and \
+                lPath[1].isdigit():
+            self.answer('species', lambda: oTaxonomy.get(int(lPath[1])))
+        elif len(lPath) == 3 and lPath[0] == 'species' and \
+                lPath[1].isdigit() and lPath[2] in ('children', 'synonyms'):
+            dLists = oTaxonomy.dChildren if lPath[2] == 'children' else \
+                oTaxonomy.dSynonyms
+            self.answer(lPath[2], lambda: self.page(
+                dLists.get(int(lPath[1]), []), dQuery))
+        elif len(lPath) == 2 and lPath[0] == 'dataset':
+            self.answer('dataset', lambda: {
+                'key': lPath[1], 'pubDate': oTaxonomy.sVersion})
+        else:
+            self.answer('other', lambda: None)
+
+    def do_POST(self):
+        bBody = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path.rstrip('/').endswith('/parser/name'):
+            self.answer('parser', lambda: self.parse(json.loads(bBody)))
+        else:
+            self.answer('other', lambda: None)
+
+    def answer(self, sEndpoint, fAnswer):
+        iStatus = self.check(sEndpoint)
+        if iStatus:
+            self.send_json(iStatus)
+            return
+
+        oData = fAnswer()
+        if oData is None:
+            self.send_json(404)
+        else:
+            self.send_json(200, oData)
+
+    def page(self, lKeys, dQuery):
+        """ Makes a page of a listing. """
+        iOffset = int(dQuery.get('offset', 0))
+        iLimit = min(int(dQuery.get('limit', 20)), MAX_LIMIT)
+        lResults = [self.server.oTaxonomy.get(iKey)
+                    for iKey in lKeys[iOffset:iOffset + iLimit]]
+        self.server.count('records', len(lResults))
+
+        return {'offset': iOffset, 'limit': iLimit, 'results': lResults,
+                'endOfRecords': iOffset + iLimit >= len(lKeys)}
+
+    @staticmethod
+    def parse(lNames):
+        """ Parses the names as the name parser of gbif. """
+        lAnswer = []
+        for sName in lNames:
+            dName = {sField: oValue for sField, oValue
+                     in name_parse(sName)._asdict().items() if oValue}
+            dName['parsed'] = 'canonicalName' in dName
+            lAnswer.append(dName)
+
+        return lAnswer
+
+    def log_message(self, *args):
+        pass
+
+
+class GBIFServer(ThreadingHTTPServer):
+    """ The stand-in server. """
+    daemon_threads = True
+
+    def __init__(self, oTaxonomy, fLatency=0.0, fRate=0.0, iBurst=10,
+                 fErrors=0.0, iSeed=0):
+        """ Initializes the server on a free local port.
+
+        :param oTaxonomy: The taxa.
+        :type oTaxonomy: GBIFTaxonomy
+        :param fLatency: The pause before every answer in seconds.
+        :type fLatency: float
+        :param fRate: Number of requests per second which are answered, the
+            others get 429. Zero is no limit.
+        :type fRate: float
+        :param iBurst: Number of requests answered at once.
+        :type iBurst: int
+        :param fErrors: The share of requests answered by 503.
+        :type fErrors: float
+        :param iSeed: The seed of the failures.
+        :type iSeed: int
+        """
+        super().__init__(('127.0.0.1', 0), GBIFHandler)
+        self.oTaxonomy = oTaxonomy
+        self.fLatency = fLatency
+        self.fRate = fRate
+        self.iBurst = iBurst
+        self.fErrors = fErrors
+        self.oRandom = random.Random(iSeed)
+        self.oLock = threading.Lock()
+        self.oCounter = Counter()
+        self.fTokens = float(iBurst)
+        self.fTime = monotonic()
+        self.oThread = None
+
+    def get_url(self):
+        return f'http://127.0.0.1:{self.server_port}/v1/'
+
+    def start(self):
+        """ Starts answering in a thread.
+
+        :return: The root of the API.
+        :rtype: str
+        """
+        self.oThread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self.oThread.start()
+
+        return self.get_url()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, sName, iCount=1):
+        with self.oLock:
+            self.oCounter[sName] += iCount
+
+    def get_stats(self):
+        """ Gets the number of requests of every endpoint, 'requests' of
+        all, 'records' of the listed records, 'limited' of the answers 429
+        and 'errors' of the answers 503.
+
+        :rtype: dict[str, int]
+        """
+        with self.oLock:
+            dStats = dict(self.oCounter)
+        dStats['requests'] = sum(
+            iCount for sName, iCount in dStats.items()
+            if sName not in ('records', 'limited', 'errors'))
+
+        return dStats
+
+    def take_token(self):
+        if not self.fRate:
+            return True
+
+        with self.oLock:
+            fNow = monotonic()
+            self.fTokens = min(self.iBurst, self.fTokens +
+                               (fNow - self.fTime) * self.fRate)
+            self.fTime = fNow
+            if self.fTokens < 1:
+                return False
+            self.fTokens -= 1
+            return True
+
+    def is_error(self):
+        if not self.fErrors:
+            return False
+
+        with self.oLock:
+            return self.oRandom.random() < self.fErrors
+
+
+if __name__ == '__main__':
+    pass
@@ -19,9 +19,27 @@
 """ The main module for UnitTest. Runs all tests for the program. """
 import unittest
 
+from ut_backup import TestBackup
+from ut_cli import TestCLI
+from ut_gbif_backbone import TestGBIFBackbone
+from ut_gbif_client import TestGBIFClient
+from ut_gbif_server import TestGBIFServer
+from ut_gbif_sync import TestGBIFSync
+from ut_gbif_upsert import TestGBIFUpsert
+from ut_images import TestImages
+from ut_inat import TestINat
+from ut_job_queue import TestJobQueue
+from ut_json_stream import TestJSONStream
+from ut_lichen_groups import TestLichenGroups
+from ut_metrics import TestMetrics
+from ut_name_parser import TestNameParser
 from ut_pep8 import TestPEP8
+from ut_pipeline import TestPipeline
 from ut_sql import TestSQLite
 from ut_str import TestStr
+from ut_taxon_card import TestTaxonCard
+from ut_vernacular import TestVernacular
+from ut_xref import TestXRef
 
 
 def suite():
@@ -32,6 +50,7 @@ def suite():
     oSuite = unittest.TestSuite()
     oSuite.addTest(unittest.makeSuite(TestPEP8))
     oSuite.addTest(TestStr('test_str_sep_name_taxon'))
+    oSuite.addTest(TestStr('test_str_norm_name'))
     oSuite.addTest(TestSQLite('test_sql_get_columns'))
     oSuite.addTest(TestSQLite('test_sql__init__'))
     oSuite.addTest(TestSQLite('test_sql_execute'))
@@ -43,6 +62,69 @@ def suite():
     oSuite.addTest(TestSQLite('test_sql_sql_get_id'))
     oSuite.addTest(TestSQLite('test_sql_sql_table_clean'))
     oSuite.addTest(TestSQLite('test_sql_export_db'))
+    oSuite.addTest(TestBackup('test_backup_db'))
+    oSuite.addTest(TestBackup('test_backup_rotate'))
+    oSuite.addTest(TestImages('test_image_insert'))
+    oSuite.addTest(TestImages('test_image_import_dir'))
+    oSuite.addTest(TestImages('test_thumbnail_cache'))
+    oSuite.addTest(TestTaxonCard('test_taxon_page'))
+    oSuite.addTest(TestTaxonCard('test_card_cache'))
+    oSuite.addTest(TestTaxonCard('test_card_invalidate'))
+    oSuite.addTest(TestTaxonCard('test_card_persistent'))
+    oSuite.addTest(TestTaxonCard('test_card_prewarm'))
+    oSuite.addTest(TestTaxonCard('test_card_lru'))
+    oSuite.addTest(TestGBIFClient('test_token_bucket'))
+    oSuite.addTest(TestGBIFClient('test_client_retry'))
+    oSuite.addTest(TestGBIFClient('test_client_fail'))
+    oSuite.addTest(TestGBIFClient('test_response_cache'))
+    oSuite.addTest(TestGBIFClient('test_client_cache'))
+    oSuite.addTest(TestGBIFClient('test_client_stream'))
+    oSuite.addTest(TestGBIFSync('test_sync_update'))
+    oSuite.addTest(TestGBIFSync('test_parser_names'))
+    oSuite.addTest(TestGBIFSync('test_sync_resume'))
+    oSuite.addTest(TestGBIFSync('test_iter_many'))
+    oSuite.addTest(TestGBIFSync('test_sync_dedup'))
+    oSuite.addTest(TestJobQueue('test_queue_lease'))
+    oSuite.addTest(TestJobQueue('test_queue_fail'))
+    oSuite.addTest(TestJobQueue('test_queue_recover'))
+    oSuite.addTest(TestJobQueue('test_queue_lease_exhausted'))
+    oSuite.addTest(TestNameParser('test_name_parse_corpus'))
+    oSuite.addTest(TestNameParser('test_name_split_db'))
+    oSuite.addTest(TestGBIFBackbone('test_dwca_meta'))
+    oSuite.addTest(TestGBIFBackbone('test_backbone_import'))
+    oSuite.addTest(TestGBIFUpsert('test_upsert_page'))
+    oSuite.addTest(TestGBIFUpsert('test_upsert_many'))
+    oSuite.addTest(TestGBIFUpsert('test_upsert_norm_names'))
+    oSuite.addTest(TestGBIFServer('test_server_api'))
+    oSuite.addTest(TestGBIFServer('test_server_faults'))
+    oSuite.addTest(TestGBIFServer('test_server_sync'))
+    oSuite.addTest(TestGBIFServer('test_server_incremental'))
+    oSuite.addTest(TestGBIFServer('test_server_changes'))
+    oSuite.addTest(TestCLI('test_cli_imports'))
+    oSuite.addTest(TestCLI('test_cli_commands'))
+    oSuite.addTest(TestCLI('test_cli_sync'))
+    oSuite.addTest(TestLichenGroups('test_lichen_rules'))
+    oSuite.addTest(TestLichenGroups('test_lichen_db'))
+    oSuite.addTest(TestLichenGroups('test_lichen_filter'))
+    oSuite.addTest(TestJSONStream('test_stream_chunks'))
+    oSuite.addTest(TestJSONStream('test_stream_errors'))
+    oSuite.addTest(TestPipeline('test_pipeline_stages'))
+    oSuite.addTest(TestPipeline('test_pipeline_interval'))
+    oSuite.addTest(TestPipeline('test_pipeline_failures'))
+    oSuite.addTest(TestPipeline('test_pipeline_stop'))
+    oSuite.addTest(TestMetrics('test_metrics_histogram'))
+    oSuite.addTest(TestMetrics('test_metrics_threads'))
+    oSuite.addTest(TestMetrics('test_metrics_dump'))
+    oSuite.addTest(TestMetrics('test_metrics_sources'))
+    oSuite.addTest(TestVernacular('test_vernacular_langs'))
+    oSuite.addTest(TestVernacular('test_vernacular_gbif'))
+    oSuite.addTest(TestVernacular('test_vernacular_inat'))
+    oSuite.addTest(TestVernacular('test_vernacular_bulk'))
+    oSuite.addTest(TestINat('test_inat_import'))
+    oSuite.addTest(TestINat('test_inat_many'))
+    oSuite.addTest(TestXRef('test_xref_files'))
+    oSuite.addTest(TestXRef('test_xref_import'))
+    oSuite.addTest(TestXRef('test_xref_many'))
 
     return oSuite
 
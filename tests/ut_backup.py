@@ -0,0 +1,81 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+
+from mli.lib.backup import backup_db, backup_get_list, backup_rotate
+from mli.lib.sql import SQL
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestBackup('test_backup_db'))
+    oSuite.addTest(TestBackup('test_backup_rotate'))
+
+    return oSuite
+
+
+class TestBackup(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database with some rows for backup. """
+        self.oTempDir = tempfile.TemporaryDirectory()
+        self.sFileDB = os.path.join(self.oTempDir.name, 'mli.db')
+        self.sBackupDir = os.path.join(self.oTempDir.name, 'backup')
+        oConnector = SQL(self.sFileDB)
+        oConnector.execute_script('CREATE TABLE Colors (colorID INTEGER '
+                                  'PRIMARY KEY, colorName TEXT);')
+        for i in range(2000):
+            oConnector.insert_row('Colors', 'colorName', (f'color {i}',))
+        del oConnector
+
+    def tearDown(self):
+        self.oTempDir.cleanup()
+
+    def test_backup_db(self):
+        """ Check if backup_db copies the database and reports progress. """
+        lProgress = []
+        sBackup = backup_db(self.sFileDB, self.sBackupDir, iPages=1,
+                            fProgress=lambda i, n: lProgress.append((i, n)))
+        self.assertTrue(os.path.isfile(sBackup))
+        self.assertGreater(len(lProgress), 1)
+        self.assertEqual(lProgress[-1][0], lProgress[-1][1])
+
+        oBackup = SQL(sBackup)
+        self.assertEqual(oBackup.sql_count('Colors'), 2000)
+        del oBackup
+
+        sMissing = os.path.join(self.sBackupDir, 'missing.db')
+        self.assertIsNone(backup_db(sMissing, self.sBackupDir))
+        self.assertFalse(os.path.exists(sMissing))
+
+    def test_backup_rotate(self):
+        """ Check if only the newest backups are kept. """
+        lBackups = [backup_db(self.sFileDB, self.sBackupDir, iKeep=2)
+                    for _ in range(4)]
+        self.assertEqual(backup_get_list(self.sFileDB, self.sBackupDir),
+                         lBackups[-2:])
+
+        self.assertEqual(backup_rotate(self.sFileDB, self.sBackupDir, 1),
+                         lBackups[-2:-1])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
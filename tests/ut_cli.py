@@ -0,0 +1,207 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from os import path
+
+from gbif_server import GBIFServer, GBIFTaxonomy
+from mli import cli
+from mli.lib import gbif_parser
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+ROOT_DIR = path.join(path.dirname(path.abspath(__file__)), '..')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestCLI('test_cli_imports'))
+    oSuite.addTest(TestCLI('test_cli_commands'))
+    oSuite.addTest(TestCLI('test_cli_sync'))
+
+    return oSuite
+
+
+class TestCLI(unittest.TestCase):
+    def setUp(self):
+        """ Makes a database and a configuration in a temporal directory. """
+        logging.disable(logging.CRITICAL)
+        self.oDir = tempfile.TemporaryDirectory()
+        self.sFileDB = path.join(self.oDir.name, 'mli.db')
+        self.oConnector = SQL(self.sFileDB)
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        self.sConfig = path.join(self.oDir.name, 'config.ini')
+        self.write_config('')
+
+    def tearDown(self):
+        self.oConnector.close()
+        self.oDir.cleanup()
+
+    def write_config(self, sGBIF):
+        with open(self.sConfig, 'w') as fConfig:
+            fConfig.write(f'[DB]\ndb_path = {self.sFileDB}\ndb_dir = db\n\n'
+                          f'[GBIF]\n{sGBIF}')
+
+    def run_cli(self, *args):
+        """ Runs the command and gets its status, output and report. """
+        oOut, oErr = StringIO(), StringIO()
+        with redirect_stdout(oOut), redirect_stderr(oErr):
+            iStatus = cli.main(['--config', self.sConfig, *args])
+
+        return iStatus, oOut.getvalue(), oErr.getvalue()
+
+    def test_cli_imports(self):
+        """ Check if the interface starts without Qt and the network. """
+        sCode = ('import sys\n'
+                 'from mli.cli import main\n'
+                 f'main(["--config", {self.sConfig!r}, "-q", "reindex"])\n'
+                 'print(sorted(sModule for sModule in sys.modules\n'
+                 '             if sModule.split(".")[0] in\n'
+                 '             ("PyQt6", "requests", "mli")))\n')
+        oResult = subprocess.run([sys.executable, '-c', sCode],
+                                 cwd=self.oDir.name, capture_output=True,
+                                 text=True, env=dict(os.environ,
+                                                     PYTHONPATH=ROOT_DIR))
+        self.assertEqual(oResult.returncode, 0, oResult.stderr)
+        self.assertEqual(oResult.stdout.strip(), str(
+            ['mli', 'mli.cli', 'mli.lib', 'mli.lib.config', 'mli.lib.log',
+             'mli.lib.metrics', 'mli.lib.sql', 'mli.lib.str']))
+
+    def test_cli_commands(self):
+        """ Check if dedup, export, reindex and the imports work on the
+        database. """
+        iStatus, sOut, _ = self.run_cli('dedup', '--dry-run')
+        self.assertEqual(iStatus, 0)
+        self.assertIn('Lithographa\t15\t2', sOut)
+        iTaxa = self.oConnector.sql_count('Taxa')
+        iStatus, _, sErr = self.run_cli('-q', 'dedup')
+        self.assertEqual(iStatus, 0)
+        self.assertIn('deleted 9 taxa', sErr)
+        self.assertEqual(self.oConnector.sql_count('Taxa'), iTaxa - 9)
+        self.assertFalse(self.oConnector.get_garbage())
+
+        sFileSQL = path.join(self.oDir.name, 'dump.sql')
+        self.assertEqual(self.run_cli('-q', 'export', sFileSQL)[0], 0)
+        oCopy = SQL(':memory:')
+        with open(sFileSQL, encoding='utf-8') as fScript:
+            self.assertTrue(oCopy.execute_script(fScript.read()))
+        self.assertEqual(oCopy.sql_count('Taxa'), iTaxa - 9)
+
+        self.oConnector.execute_query('DROP INDEX Taxa_canonicalName;')
+        self.assertEqual(self.run_cli('-q', 'reindex')[0], 0)
+        self.assertTrue(self.oConnector.sql_get_id(
+            'sqlite_master', 'name', 'name', ('Taxa_canonicalName',)))
+
+        sFileCSV = path.join(self.oDir.name, 'inat.csv')
+        with open(sFileCSV, 'w') as fCSV:
+            fCSV.write('Name;ID\n'
+                       'Aabaarnia siphulicola;'
+                       'https://www.inaturalist.org/taxa/1234\n'
+                       'Nothing;https://www.inaturalist.org/taxa/1\n')
+        iStatus, _, sErr = self.run_cli('-q', 'inat', sFileCSV)
+        self.assertEqual(iStatus, 0)
+        self.assertIn('rows: 2', sErr)
+        self.assertEqual(self.oConnector.sql_get_id(
+            'DBIndexes', 'taxonIndex', 'taxonID, sourceID', (2705, 1,)),
+            '1234')
+
+        sFileCSV = path.join(self.oDir.name, 'names.csv')
+        with open(sFileCSV, 'w') as fCSV:
+            fCSV.write('id,vernacularName,language,lexicon\n'
+                       '1234,Siphula lichen,,English\n'
+                       '1234,Siphula lichen,en,English\n')
+        iStatus, _, sErr = self.run_cli('-q', 'names', '-s', 'inat',
+                                        sFileCSV)
+        self.assertEqual(iStatus, 0)
+        self.assertIn('names: 1 in ', sErr)
+        self.assertIn('read 2 rows, known 1', sErr)
+        self.assertEqual(self.oConnector.sql_get_id(
+            'LocalNames', 'localName', 'taxonID, langID', (2705, 122,)),
+            'Siphula lichen')
+        self.assertEqual(self.run_cli('names', sFileCSV + '.no')[0], 1)
+
+        sFileTSV = path.join(self.oDir.name, 'mycobank.tsv')
+        sFileReport = path.join(self.oDir.name, 'unmatched.txt')
+        with open(sFileTSV, 'w') as fTSV:
+            fTSV.write('Name\tNumber\n'
+                       'Aabaarnia siphulicola\t560001\n'
+                       'Nothing\t1\n')
+        iStatus, _, sErr = self.run_cli('-q', 'xref', 'MycoBank', sFileTSV,
+                                        '-i', 'Number', '-r', sFileReport)
+        self.assertEqual(iStatus, 0)
+        self.assertIn('added 1 links', sErr)
+        self.assertIn('unmatched 1', sErr)
+        self.assertEqual(self.oConnector.sql_get_id(
+            'DBIndexes', 'taxonIndex', 'taxonID, sourceID', (2705, 10,)),
+            '560001')
+        with open(sFileReport, encoding='utf-8') as fReport:
+            self.assertEqual(fReport.read(), 'Nothing\t1\n')
+        self.assertEqual(self.run_cli('xref', 'nothing', sFileTSV)[0], 1)
+
+        self.assertEqual(self.run_cli('sync', 'nothing')[0], 1)
+        self.assertEqual(cli.main(['--db', path.join(self.oDir.name, 'no'),
+                                   '--config', self.sConfig, 'reindex']), 1)
+
+    def test_cli_sync(self):
+        """ Check if sync updates a rank from the configured server. """
+        oTaxonomy = GBIFTaxonomy.synthetic(iGenera=2, iSpecies=3)
+        oTaxonomy.seed(self.oConnector, bClear=True)
+        iTaxa = self.oConnector.sql_count('Taxa')
+        gbif_parser._dParsedNames.clear()
+        oServer = GBIFServer(oTaxonomy)
+        self.write_config(f'base_url = {oServer.start()}\nrate = 0\n'
+                          f'retries = 1\nbackoff = 0.01\n')
+        sFileMetrics = path.join(self.oDir.name, 'run', 'metrics.json')
+        try:
+            iStatus, _, sErr = self.run_cli('--metrics', sFileMetrics,
+                                            'sync', 'species', '-w', '2')
+        finally:
+            oServer.stop()
+
+        self.assertEqual(iStatus, 0)
+        self.assertIn('taxa: 6 in ', sErr)
+        self.assertIn('updated 6, waiting 0, failed 0', sErr)
+        self.assertIn('\nmetrics: http ', sErr)
+        self.assertIn('  species/{key}/children: 6 x', sErr)
+        self.assertEqual(self.oConnector.sql_count('Taxa'), iTaxa + 18)
+
+        with open(sFileMetrics) as fMetrics:
+            dMetrics = json.load(fMetrics)
+        self.assertEqual(dMetrics['command'], 'sync')
+        self.assertEqual(dMetrics['status'], 0)
+        self.assertEqual(dMetrics['errors'], 0)
+        self.assertEqual(
+            dMetrics['histograms']['http.species/{key}/synonyms']['count'], 6)
+        self.assertIn('gbif_sync.write', dMetrics['histograms'])
+        self.assertEqual(dMetrics['rows']['Taxa']['count'], 18)
+        self.assertEqual(dMetrics['gauges']['gbif_sync.jobs']['last'], 6)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
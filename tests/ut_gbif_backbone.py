@@ -0,0 +1,193 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import tempfile
+import unittest
+import zipfile
+from os import path
+
+from mli.lib.dwca import dwca_get_meta, dwca_iter_rows
+from mli.lib.gbif_backbone import BackboneImporter
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+META = """<?xml version="1.0" encoding="utf-8"?>
+<archive xmlns="http://rs.tdwg.org/dwc/text/" metadata="eml.xml">
+  <core encoding="utf-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n"
+        fieldsEnclosedBy="" ignoreHeaderLines="1"
+        rowType="http://rs.tdwg.org/dwc/terms/Taxon">
+    <files><location>Taxon.tsv</location></files>
+    <id index="0"/>
+    <field index="0" term="http://rs.tdwg.org/dwc/terms/taxonID"/>
+    <field index="1" term="http://rs.tdwg.org/dwc/terms/parentNameUsageID"/>
+    <field index="2"
+           term="http://rs.tdwg.org/dwc/terms/acceptedNameUsageID"/>
+    <field index="3" term="http://rs.tdwg.org/dwc/terms/scientificName"/>
+    <field index="4"
+           term="http://rs.tdwg.org/dwc/terms/scientificNameAuthorship"/>
+    <field index="5" term="http://rs.gbif.org/terms/1.0/canonicalName"/>
+    <field index="6" term="http://rs.tdwg.org/dwc/terms/taxonRank"/>
+    <field index="7" term="http://rs.tdwg.org/dwc/terms/taxonomicStatus"/>
+    <field index="8" term="http://rs.tdwg.org/dwc/terms/class"/>
+    <field index="9" term="http://rs.tdwg.org/dwc/terms/family"/>
+    <field term="http://rs.tdwg.org/dwc/terms/kingdom" default="Fungi"/>
+  </core>
+  <extension encoding="utf-8" fieldsTerminatedBy="\\t"
+             ignoreHeaderLines="1"
+             rowType="http://rs.gbif.org/terms/1.0/VernacularName">
+    <files><location>VernacularName.tsv</location></files>
+    <coreid index="0"/>
+    <field index="1" term="http://rs.tdwg.org/dwc/terms/vernacularName"/>
+    <field index="2" term="http://purl.org/dc/terms/language"/>
+  </extension>
+  <extension encoding="utf-8" fieldsTerminatedBy="\\t"
+             ignoreHeaderLines="1"
+             rowType="http://rs.gbif.org/terms/1.0/Identifier">
+    <files><location>Identifier.tsv</location></files>
+    <coreid index="0"/>
+    <field index="1" term="http://purl.org/dc/terms/identifier"/>
+  </extension>
+</archive>
+"""
+
+TAXA = [
+    ('taxonID', 'parentNameUsageID', 'acceptedNameUsageID', 'scientificName',
+     'scientificNameAuthorship', 'canonicalName', 'taxonRank',
+     'taxonomicStatus', 'class', 'family'),
+    ('9000001', '313', '', 'Testaceae Nyl.', 'Nyl.', 'Testaceae', 'family',
+     'accepted', 'Arthoniomycetes', 'Testaceae'),
+    ('9000002', '9000001', '', 'Testia Nyl.', 'Nyl.', 'Testia', 'genus',
+     'accepted', 'Arthoniomycetes', 'Testaceae'),
+    ('9000003', '9000002', '', 'Testia alba (Ach.) Nyl., 1860',
+     '(Ach.) Nyl., 1860', 'Testia alba', 'species', 'accepted',
+     'Arthoniomycetes', 'Testaceae'),
+    ('9000004', '9000002', '9000003', 'Testia nigra Ach.', 'Ach.',
+     'Testia nigra', 'species', 'homotypic synonym', 'Arthoniomycetes',
+     'Testaceae'),
+    ('9000005', '186', '', 'Agaricus bisporus (J.E.Lange) Imbach',
+     '(J.E.Lange) Imbach', 'Agaricus bisporus', 'species', 'accepted',
+     'Agaricomycetes', 'Agaricaceae'),
+    ('9000006', '9000002', '', 'SH1169675.09FU', '', 'SH1169675.09FU',
+     'unranked', 'accepted', 'Arthoniomycetes', ''),
+    ('313', '95', '', 'Arthoniomycetes', '', 'Arthoniomycetes', 'class',
+     'accepted', 'Arthoniomycetes', ''),
+]
+
+VERNACULAR = [
+    ('taxonID', 'vernacularName', 'language'),
+    ('9000003', 'White test lichen', 'en'),
+    ('9000003', 'White test lichen', 'en'),
+    ('9000003', 'Weiße Testflechte', 'ger'),
+    ('9000005', 'Button mushroom', 'en'),
+]
+
+IDENTIFIERS = [
+    ('taxonID', 'identifier'),
+    ('9000003', 'https://www.indexfungorum.org/names/NamesRecord.asp?'
+                'RecordID=12345'),
+    ('9000003', 'https://example.org/taxon/1'),
+]
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestGBIFBackbone('test_dwca_meta'))
+    oSuite.addTest(TestGBIFBackbone('test_backbone_import'))
+
+    return oSuite
+
+
+def write_tsv(oZip, sName, lRows):
+    oZip.writestr(sName, ''.join('\t'.join(tRow) + '\n' for tRow in lRows))
+
+
+class TestGBIFBackbone(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database and an archive. """
+        logging.disable(logging.CRITICAL)
+        self.oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        self.oTempDir = tempfile.TemporaryDirectory()
+        self.sZip = path.join(self.oTempDir.name, 'backbone.zip')
+        with zipfile.ZipFile(self.sZip, 'w') as oZip:
+            oZip.writestr('meta.xml', META)
+            write_tsv(oZip, 'Taxon.tsv', TAXA)
+            write_tsv(oZip, 'VernacularName.tsv', VERNACULAR)
+            write_tsv(oZip, 'Identifier.tsv', IDENTIFIERS)
+
+    def tearDown(self):
+        del self.oConnector
+        self.oTempDir.cleanup()
+
+    def test_dwca_meta(self):
+        """ Check if the archive is described by meta.xml and read. """
+        with zipfile.ZipFile(self.sZip) as oZip:
+            dFiles = dwca_get_meta(oZip)
+            self.assertEqual(set(dFiles),
+                             {'Taxon', 'VernacularName', 'Identifier'})
+            lRows = list(dwca_iter_rows(oZip, dFiles['Taxon']))
+
+        self.assertEqual(len(lRows), len(TAXA) - 1)
+        self.assertEqual(lRows[3]['acceptedNameUsageID'], '9000003')
+        self.assertIsNone(lRows[0]['acceptedNameUsageID'])
+        self.assertEqual(lRows[0]['kingdom'], 'Fungi')
+        self.assertEqual(lRows[0]['id'], '9000001')
+
+    def test_backbone_import(self):
+        """ Check if lichens are imported with their tree, names and links.
+        """
+        oImporter = BackboneImporter(self.oConnector, self.sZip, iBatch=2)
+        self.assertEqual(oImporter.load(),
+                         {'taxa': 4, 'tree': 4, 'names': 2, 'links': 1})
+
+        dKeys = oImporter.dKeys
+        self.assertNotIn('9000005', dKeys)
+        self.assertNotIn('9000006', dKeys)
+        self.assertEqual(dKeys['313'], 7)
+        self.assertEqual(self.oConnector.sql_get_values(
+            'Taxa', 'scientificName, canonicalName, authorship, '
+                    'yearPublishing, rankID', 'taxonID',
+            (dKeys['9000003'],)),
+            [('Testia alba (Ach.) Nyl., 1860', 'Testia alba', '(Ach.) Nyl.',
+              1860, 21)])
+        for sKey, sMain, iStatus in (('9000001', '313', 1),
+                                     ('9000002', '9000001', 1),
+                                     ('9000004', '9000003', 5)):
+            self.assertEqual(self.oConnector.sql_get_values(
+                'TaxonTree', 'mainTaxonID, statusID', 'taxonID',
+                (dKeys[sKey],)), [(dKeys[sMain], iStatus)])
+
+        self.assertEqual(len(self.oConnector.sql_get_values(
+            'LocalNames', 'localName', 'taxonID', (dKeys['9000003'],))), 2)
+        self.assertEqual(self.oConnector.sql_get_id(
+            'DBIndexes', 'taxonIndex', 'taxonID, sourceID',
+            (dKeys['9000003'], 11,)), '12345')
+
+        # The second import finds all taxa in the database.
+        oImporter = BackboneImporter(self.oConnector, self.sZip)
+        self.assertEqual(oImporter.load(),
+                         {'taxa': 0, 'tree': 0, 'names': 0, 'links': 0})
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,252 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+
+from mli.lib.gbif_client import GBIFClient, TokenBucket
+from mli.lib.http_cache import ResponseCache, http_cache_key
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestGBIFClient('test_token_bucket'))
+    oSuite.addTest(TestGBIFClient('test_client_retry'))
+    oSuite.addTest(TestGBIFClient('test_client_fail'))
+    oSuite.addTest(TestGBIFClient('test_response_cache'))
+    oSuite.addTest(TestGBIFClient('test_client_cache'))
+    oSuite.addTest(TestGBIFClient('test_client_stream'))
+
+    return oSuite
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """ Answers 503 to the first two requests of every path. """
+    dCalls = {}
+    # '/stream/1' waits for the event after the first record, and keeps
+    # if the event came.
+    oRelease = threading.Event()
+    lReleased = []
+
+    def do_GET(self):
+        iCall = self.dCalls.get(self.path, 0) + 1
+        self.dCalls[self.path] = iCall
+        if self.path.startswith('/cached'):
+            self.send_cached()
+            return
+        if self.path.startswith('/stream'):
+            self.send_stream()
+            return
+
+        if iCall <= 2 or self.path.startswith('/broken'):
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        bBody = json.dumps({'path': self.path, 'call': iCall}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(bBody)))
+        self.end_headers()
+        self.wfile.write(bBody)
+
+    def send_cached(self):
+        """ Answers with ETag and 304 if the client has the same one. """
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        bBody = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(bBody)))
+        self.end_headers()
+        self.wfile.write(bBody)
+
+    def send_stream(self):
+        """ Answers a page by chunks with pauses, the body of '/stream/cut'
+        is not finished. The rest of '/stream/1' is sent when the client
+        has got the first record. """
+        self.protocol_version = 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        lParts = ['{"offset": 0, "results": [']
+        lParts.extend(f'{"," if iKey else ""}{{"key": {iKey}}}'
+                      for iKey in range(5))
+        if not self.path.startswith('/stream/cut'):
+            lParts.append('], "endOfRecords": true}')
+        for iPart, sPart in enumerate(lParts):
+            bPart = sPart.encode()
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(bPart), bPart))
+            self.wfile.flush()
+            if iPart == 1 and self.path.startswith('/stream/1'):
+                self.lReleased.append(self.oRelease.wait(5))
+            sleep(0.05)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGBIFClient(unittest.TestCase):
+    def setUp(self):
+        """ Starts a local server. """
+        logging.disable(logging.CRITICAL)
+        FlakyHandler.dCalls = {}
+        FlakyHandler.oRelease = threading.Event()
+        FlakyHandler.lReleased = []
+        self.oServer = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        threading.Thread(target=self.oServer.serve_forever,
+                         daemon=True).start()
+        self.sURL = f'http://127.0.0.1:{self.oServer.server_port}/'
+
+    def tearDown(self):
+        self.oServer.shutdown()
+        self.oServer.server_close()
+
+    def test_token_bucket(self):
+        """ Check if the bucket lets a burst through and then keeps the
+        rate. """
+        oBucket = TokenBucket(50, 5)
+        fStart = monotonic()
+        self.assertEqual([oBucket.acquire() for _ in range(5)], [0.0] * 5)
+        for _ in range(10):
+            oBucket.acquire()
+        self.assertGreater(monotonic() - fStart, 0.15)
+
+        self.assertEqual(TokenBucket(0).acquire(), 0.0)
+
+    def test_client_retry(self):
+        """ Check if the client repeats requests answered with 503. """
+        oClient = GBIFClient(self.sURL, fRate=0, fBackoff=0.01)
+        dData = oClient.get_json('species/5', {'limit': 1})
+        self.assertEqual(dData, {'path': '/species/5?limit=1', 'call': 3})
+        oClient.close()
+
+    def test_client_fail(self):
+        """ Check if the client gives up after all attempts. """
+        oClient = GBIFClient(self.sURL, fRate=0, iRetries=2, fBackoff=0.01)
+        self.assertIsNone(oClient.get_json('broken'))
+        self.assertEqual(FlakyHandler.dCalls['/broken'], 3)
+        oClient.close()
+
+    def test_response_cache(self):
+        """ Check if the cache keeps the size bound by deleting the least
+        recently used records, and if the times of use are written in
+        batches. """
+        self.assertEqual(http_cache_key('GET', 'u', {'a': 1, 'b': 2}),
+                         http_cache_key('GET', 'u', {'b': 2, 'a': 1}))
+        self.assertNotEqual(http_cache_key('GET', 'u', {'a': 1}),
+                            http_cache_key('POST', 'u', {'a': 1}))
+
+        oCache = ResponseCache(':memory:', fTTL=60, iMaxSize=30)
+        oCache.put('a', 'u', b'1' * 10)
+        oCache.put('b', 'u', b'2' * 10)
+        oCache.put('c', 'u', b'3' * 10)
+        fUsed = oCache.oConnection.execute(
+            "SELECT used FROM Responses WHERE cacheKey='a';").fetchone()[0]
+        self.assertEqual(oCache.get('a').body, b'1' * 10)
+        # The time of use is written with the next response, not by get().
+        self.assertFalse(oCache.oConnection.in_transaction)
+        self.assertEqual(oCache.oConnection.execute(
+            "SELECT used FROM Responses WHERE cacheKey='a';").fetchone()[0],
+            fUsed)
+        self.assertIn('a', oCache.dUsed)
+        oCache.put('d', 'u', b'4' * 10)
+        self.assertFalse(oCache.dUsed)
+        self.assertIsNone(oCache.get('b'))
+        self.assertEqual(len(oCache), 3)
+        self.assertFalse(oCache.get('a').expired)
+
+        oCache.fTTL = -1
+        oCache.put('a', 'u', b'5')
+        self.assertTrue(oCache.get('a').expired)
+        oCache.close()
+
+    def test_client_cache(self):
+        """ Check if the client uses the cache, conditional requests and the
+        offline mode. """
+        oCache = ResponseCache(':memory:', fTTL=60)
+        oClient = GBIFClient(self.sURL, fRate=0, oCache=oCache)
+        dData = {'path': '/cached/1?q=a'}
+        self.assertEqual(oClient.get_json('cached/1', {'q': 'a'}), dData)
+        self.assertEqual(oClient.get_json('cached/1', {'q': 'a'}), dData)
+        self.assertEqual(FlakyHandler.dCalls['/cached/1?q=a'], 1)
+
+        oCache.fTTL = -1
+        oCache.refresh(http_cache_key('GET', self.sURL + 'cached/1',
+                                      {'q': 'a'}))
+        oCache.fTTL = 60
+        self.assertEqual(oClient.get_json('cached/1', {'q': 'a'}), dData)
+        self.assertEqual(FlakyHandler.dCalls['/cached/1?q=a'], 2)
+
+        oClient.bOffline = True
+        self.assertEqual(oClient.get_json('cached/1', {'q': 'a'}), dData)
+        self.assertIsNone(oClient.get_json('cached/2'))
+        self.assertEqual(FlakyHandler.dCalls['/cached/1?q=a'], 2)
+        self.assertNotIn('/cached/2', FlakyHandler.dCalls)
+        oClient.close()
+
+    def test_client_stream(self):
+        """ Check if the records of a page come while it is read, and a
+        read page is taken from the cache. """
+        oCache = ResponseCache(':memory:', fTTL=60)
+        oClient = GBIFClient(self.sURL, fRate=0, oCache=oCache)
+        dRest = {}
+        fStart = monotonic()
+        oRecords = oClient.iter_json('stream/1', {'limit': 5}, 'results',
+                                     dRest)
+        self.assertEqual(next(oRecords), {'key': 0})
+        FlakyHandler.oRelease.set()
+        self.assertEqual([dData['key'] for dData in oRecords], [1, 2, 3, 4])
+        self.assertGreater(monotonic() - fStart, 0.2)
+        # The first record came before the server sent the rest.
+        self.assertEqual(FlakyHandler.lReleased, [True])
+        self.assertEqual(dRest, {'offset': 0, 'endOfRecords': True})
+
+        dRest = {}
+        self.assertEqual(len(list(oClient.iter_json(
+            'stream/1', {'limit': 5}, 'results', dRest))), 5)
+        self.assertTrue(dRest['endOfRecords'])
+        self.assertEqual(FlakyHandler.dCalls['/stream/1?limit=5'], 1)
+
+        lKeys = []
+        with self.assertRaises(ConnectionError):
+            for dData in oClient.iter_json('stream/cut'):
+                lKeys.append(dData['key'])
+        self.assertEqual(lKeys, [0, 1, 2, 3, 4])
+        self.assertIsNone(oCache.get(http_cache_key(
+            'GET', self.sURL + 'stream/cut')))
+        with self.assertRaises(ConnectionError):
+            list(GBIFClient(self.sURL, fRate=0, iRetries=0).iter_json(
+                'broken'))
+        oClient.close()
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,246 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import unittest
+from os import path
+
+import requests
+
+from gbif_server import GBIFServer, GBIFTaxonomy
+from mli.lib import gbif_parser
+from mli.lib.gbif_client import GBIFClient, gbif_set_client
+from mli.lib.gbif_parser import gbif_get_update, gbif_parser_taxon
+from mli.lib.gbif_sync import GBIFSync
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+FIXTURES = path.join(path.dirname(path.abspath(__file__)),
+                     'data', 'gbif_species.json')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestGBIFServer('test_server_api'))
+    oSuite.addTest(TestGBIFServer('test_server_faults'))
+    oSuite.addTest(TestGBIFServer('test_server_sync'))
+    oSuite.addTest(TestGBIFServer('test_server_incremental'))
+    oSuite.addTest(TestGBIFServer('test_server_changes'))
+
+    return oSuite
+
+
+class TestGBIFServer(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.oServer = None
+
+    def tearDown(self):
+        if self.oServer:
+            self.oServer.stop()
+
+    def start(self, oTaxonomy, **kwargs):
+        self.oServer = GBIFServer(oTaxonomy, **kwargs)
+        return self.oServer.start()
+
+    def test_server_api(self):
+        """ Check if the recorded taxa are answered as gbif does. """
+        sURL = self.start(GBIFTaxonomy.from_file(FIXTURES))
+
+        lAnswer = requests.get(f'{sURL}species/suggest',
+                               {'q': 'lecanora all'}).json()
+        self.assertEqual([dData['key'] for dData in lAnswer],
+                         [2589040, 7253640])
+        dData = requests.get(f'{sURL}species/2589040').json()
+        self.assertEqual(dData['scientificName'],
+                         'Lecanora allophana (Ach.) Nyl.')
+        self.assertEqual(requests.get(f'{sURL}species/1').status_code, 404)
+
+        dPage = requests.get(f'{sURL}species/2589000/children',
+                             {'limit': 2, 'offset': 2}).json()
+        self.assertEqual([dData['key'] for dData in dPage['results']],
+                         [2589060])
+        self.assertTrue(dPage['endOfRecords'])
+        dPage = requests.get(f'{sURL}species/2589040/synonyms').json()
+        self.assertEqual([dData['key'] for dData in dPage['results']],
+                         [2589041, 2589042])
+
+        lNames = requests.post(f'{sURL}parser/name',
+                               json=['Lecanora allophana (Ach.) Nyl.']).json()
+        self.assertEqual(lNames[0]['canonicalName'], 'Lecanora allophana')
+        self.assertEqual(lNames[0]['bracketAuthorship'], 'Ach.')
+        lNames = requests.get(f'{sURL}parser/name',
+                              {'name': 'Lichen allophanus Ach.'}).json()
+        self.assertEqual(lNames[0]['authorship'], 'Ach.')
+        self.assertEqual(self.oServer.get_stats()['requests'], 7)
+
+    def test_server_faults(self):
+        """ Check if the rate limit and the failures are answered. """
+        sURL = self.start(GBIFTaxonomy.from_file(FIXTURES), fRate=0.01,
+                          iBurst=2)
+        lStatus = [requests.get(f'{sURL}species/2589000').status_code
+                   for _ in range(3)]
+        self.assertEqual(lStatus, [200, 200, 429])
+        self.oServer.stop()
+
+        sURL = self.start(GBIFTaxonomy(), fErrors=0.5, iSeed=1)
+        lStatus = [requests.get(f'{sURL}species/1').status_code
+                   for _ in range(100)]
+        self.assertEqual(lStatus.count(503), self.oServer.get_stats()[
+            'errors'])
+        self.assertGreater(lStatus.count(503), 30)
+        self.assertLess(lStatus.count(503), 70)
+
+    def test_server_sync(self):
+        """ Check if an update finds a synthetic family through failures. """
+        oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        oTaxonomy = GBIFTaxonomy.synthetic(iGenera=3, iSpecies=4)
+        self.assertEqual(oTaxonomy.seed(oConnector, bClear=True), 16)
+        iTaxa = oConnector.sql_count('Taxa')
+        iKeys = oConnector.sql_count('DBIndexes')
+        gbif_parser._dParsedNames.clear()
+
+        sURL = self.start(oTaxonomy, fErrors=0.1)
+        oOldClient = gbif_set_client(GBIFClient(sURL, fRate=0, iRetries=5,
+                                                fBackoff=0.001))
+        try:
+            gbif_get_update(oConnector, 21, iWorkers=4)
+        finally:
+            gbif_set_client(oOldClient).close()
+
+        # Two synonyms and a variety of every species.
+        self.assertEqual(oConnector.sql_count('Taxa'), iTaxa + 36)
+        self.assertEqual(oConnector.sql_count('DBIndexes'), iKeys + 48)
+        self.assertEqual(oConnector.execute_query(
+            'SELECT COUNT(*) FROM SyncJobs WHERE state="done";'
+        ).fetchone()[0], 12)
+        self.assertGreater(self.oServer.get_stats()['errors'], 0)
+
+    def test_server_incremental(self):
+        """ Check if a later update fetches only the changed taxa. """
+        oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        oTaxonomy = GBIFTaxonomy.synthetic(iGenera=3, iSpecies=4)
+        oTaxonomy.seed(oConnector, bClear=True)
+        gbif_parser._dParsedNames.clear()
+        sURL = self.start(oTaxonomy)
+        oClient = GBIFClient(sURL, fRate=0)
+        oSync = GBIFSync(oConnector, 4, oClient)
+
+        def update(bFull=False):
+            dBefore = self.oServer.get_stats()
+            oSync.update(21, bFull=bFull)
+            dAfter = self.oServer.get_stats()
+            return {sName: dAfter.get(sName, 0) - dBefore.get(sName, 0)
+                    for sName in ('species', 'children', 'synonyms')}
+
+        try:
+            self.assertEqual(update(), {'species': 12, 'children': 12,
+                                        'synonyms': 12})
+            # The synonyms are species too, they are fetched the next time.
+            self.assertEqual(update(), {'species': 24, 'children': 24,
+                                        'synonyms': 24})
+            iTaxa = oConnector.sql_count('Taxa')
+            # The same version of the dataset: nothing is requested.
+            self.assertEqual(update(), {'species': 0, 'children': 0,
+                                        'synonyms': 0})
+            self.assertEqual(oSync.oRegistry.get_stats()['fresh'], 36)
+
+            # A new version with a new variety of one species.
+            dSpecies = oTaxonomy.dTaxa[102]
+            oTaxonomy.make(1000, f'{dSpecies["canonicalName"]} novis',
+                           'VARIETY', 0, dSpecies,
+                           f'{dSpecies["canonicalName"]} var. novis')
+            oTaxonomy.sVersion = '2024-01-01'
+            self.assertEqual(update(), {'species': 36, 'children': 1,
+                                        'synonyms': 1})
+            dStats = oSync.oRegistry.get_stats()
+            self.assertEqual(dStats['subtrees'], 35)
+            # No taxon of the rank changed, the known children and
+            # synonyms aren't even parsed.
+            self.assertEqual(dStats['unchanged'], 36)
+            self.assertEqual(oConnector.sql_count('Taxa'), iTaxa + 1)
+
+            self.assertEqual(update(bFull=True), {
+                'species': 36, 'children': 36, 'synonyms': 36})
+            self.assertEqual(oConnector.sql_count('Taxa'), iTaxa + 1)
+        finally:
+            oClient.close()
+
+    def test_server_changes(self):
+        """ Check if a later update moves a known taxon to its new parent
+        and gives a known synonym its new status. """
+        oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        oTaxonomy = GBIFTaxonomy.synthetic(iGenera=2, iSpecies=2)
+        oTaxonomy.seed(oConnector, bClear=True)
+        gbif_parser._dParsedNames.clear()
+        self.start(oTaxonomy)
+        oClient = GBIFClient(self.oServer.get_url(), fRate=0)
+        oSync = GBIFSync(oConnector, 4, oClient)
+
+        def get_tree(iKey):
+            iTaxonID = oConnector.sql_get_id(
+                'DBIndexes', 'taxonID', 'taxonIndex, sourceID',
+                (str(iKey), 12,))
+            return oConnector.sql_get_values(
+                'TaxonTree', 'mainTaxonID, statusID', 'taxonID',
+                (iTaxonID,))[0]
+
+        def get_taxon(sName):
+            return oConnector.sql_get_id('Taxa', 'taxonID', 'canonicalName',
+                                         (sName,))
+
+        try:
+            oSync.update(21)
+            oSync.update(21)
+            dSpecies = oTaxonomy.dTaxa[102]
+            dSynonym = oTaxonomy.dTaxa[oTaxonomy.dSynonyms[102][0]]
+            dGenus = [dRecord for dRecord in oTaxonomy.dTaxa.values()
+                      if dRecord['rank'] == 'GENUS'][1]
+            self.assertEqual(get_tree(102), (get_taxon(dSpecies['parent']),
+                                             1))
+            self.assertEqual(get_tree(dSynonym['key']),
+                             (get_taxon(dSpecies['canonicalName']), 5))
+
+            # A new version: the species moved to another genus and the
+            # synonym is heterotypic.
+            dSpecies.update(parentKey=dGenus['key'],
+                            parent=dGenus['canonicalName'])
+            dSynonym.update(taxonomicStatus='HETEROTYPIC_SYNONYM')
+            oTaxonomy.sVersion = '2024-01-01'
+            oSync.update(21)
+            self.assertEqual(get_tree(102),
+                             (get_taxon(dGenus['canonicalName']), 1))
+            self.assertEqual(get_tree(dSynonym['key']),
+                             (get_taxon(dSpecies['canonicalName']), 4))
+            self.assertEqual(oSync.oMeta.dMeta['102'].recordHash,
+                             oSync.oMeta.get_hash(gbif_parser_taxon(
+                                 oTaxonomy.get(102))))
+        finally:
+            oClient.close()
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
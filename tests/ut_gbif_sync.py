@@ -0,0 +1,289 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path
+from urllib.parse import parse_qs, urlparse
+
+from mli.lib import gbif_parser
+from mli.lib.gbif_client import GBIFClient, gbif_set_client
+from mli.lib.gbif_parser import GBIF_BACKBONE
+from mli.lib.gbif_sync import GBIFSync
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+SPECIES = {'key': 1001,
+           'scientificName': 'Aabaarnia siphulicola Diederich',
+           'canonicalName': 'Aabaarnia siphulicola',
+           'rank': 'SPECIES',
+           'parent': 'Aabaarnia',
+           'synonym': False,
+           'taxonomicStatus': 'ACCEPTED'}
+SYNONYM = {'key': 1002,
+           'scientificName': 'Aabaarnia testii Nobody',
+           'canonicalName': 'Aabaarnia testii',
+           'rank': 'SPECIES',
+           'parent': 'Aabaarnia',
+           'accepted': 'Aabaarnia siphulicola Diederich',
+           'synonym': True,
+           'taxonomicStatus': 'HOMOTYPIC_SYNONYM'}
+VARIETY = {'key': 1003,
+           'scientificName': 'Aabaarnia siphulicola var. minor Diederich',
+           'canonicalName': 'Aabaarnia siphulicola minor',
+           'rank': 'VARIETY',
+           'parent': 'Aabaarnia siphulicola',
+           'synonym': False,
+           'taxonomicStatus': 'ACCEPTED'}
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestGBIFSync('test_sync_update'))
+    oSuite.addTest(TestGBIFSync('test_parser_names'))
+    oSuite.addTest(TestGBIFSync('test_sync_resume'))
+    oSuite.addTest(TestGBIFSync('test_iter_many'))
+    oSuite.addTest(TestGBIFSync('test_sync_dedup'))
+
+    return oSuite
+
+
+class GBIFHandler(BaseHTTPRequestHandler):
+    """ Answers as gbif for one species and counts parallel requests. """
+    oLock = threading.Lock()
+    iActive = 0
+    iMaxActive = 0
+    lPosts = []
+    lGets = []
+    lOffsets = []
+    bFail = False
+
+    def answer(self, oData):
+        with self.oLock:
+            GBIFHandler.iActive += 1
+            GBIFHandler.iMaxActive = max(self.iMaxActive, self.iActive)
+        time.sleep(0.005)
+        with self.oLock:
+            GBIFHandler.iActive -= 1
+
+        bBody = json.dumps(oData).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(bBody)))
+        self.end_headers()
+        self.wfile.write(bBody)
+
+    def do_GET(self):
+        oURL = urlparse(self.path)
+        sPath = oURL.path
+        self.lGets.append(sPath)
+        if self.bFail and sPath == '/species/1001/synonyms':
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif sPath == '/species/1001':
+            self.answer(SPECIES)
+        elif sPath == '/species/1001/synonyms':
+            self.answer({'results': [SYNONYM], 'endOfRecords': True})
+        elif sPath == '/species/1001/children':
+            self.answer({'results': [VARIETY], 'endOfRecords': True})
+        elif sPath == '/species/2000/children':
+            dQuery = parse_qs(oURL.query)
+            iOffset = int(dQuery['offset'][0])
+            iLimit = int(dQuery['limit'][0])
+            self.lOffsets.append(iOffset)
+            lResults = [dict(SPECIES, key=2000 + i,
+                             scientificName=f'Aabaarnia n{i} Nyl.')
+                        for i in range(iOffset, min(iOffset + iLimit, 5))]
+            self.answer({'results': lResults,
+                         'endOfRecords': iOffset + iLimit >= 5})
+        else:
+            self.answer([])
+
+    def do_POST(self):
+        bBody = self.rfile.read(int(self.headers['Content-Length']))
+        lAnswer = []
+        self.lPosts.append(json.loads(bBody))
+        for sName in json.loads(bBody):
+            lWords = sName.split(' ', 2)
+            lAnswer.append({'scientificName': sName,
+                            'canonicalName': ' '.join(lWords[:2]),
+                            'authorship': lWords[2],
+                            'year': 2001})
+        self.answer(lAnswer)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGBIFSync(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database and starts a local server. """
+        logging.disable(logging.CRITICAL)
+        self.oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        self.oConnector.insert_row('DBIndexes',
+                                   'taxonID, sourceID, taxonIndex',
+                                   (2705, 12, '1001',))
+        GBIFHandler.iMaxActive = 0
+        GBIFHandler.lPosts = []
+        GBIFHandler.lGets = []
+        GBIFHandler.lOffsets = []
+        GBIFHandler.bFail = False
+        gbif_parser._dParsedNames.clear()
+        self.oServer = ThreadingHTTPServer(('127.0.0.1', 0), GBIFHandler)
+        threading.Thread(target=self.oServer.serve_forever,
+                         daemon=True).start()
+        self.oClient = GBIFClient(
+            f'http://127.0.0.1:{self.oServer.server_port}/', fRate=0,
+            iRetries=0)
+
+    def tearDown(self):
+        self.oClient.close()
+        self.oServer.shutdown()
+        self.oServer.server_close()
+        self.oConnector.close()
+
+    def test_sync_update(self):
+        """ Check if all species are requested in parallel and the answers
+        are saved. """
+        iSpecies = len(self.oConnector.get_all_by_rank(21).fetchall())
+        oSync = GBIFSync(self.oConnector, iWorkers=4, oClient=self.oClient)
+        self.assertEqual(oSync.update(21), iSpecies)
+        self.assertGreater(GBIFHandler.iMaxActive, 1)
+        self.assertLessEqual(GBIFHandler.iMaxActive, 4)
+
+        self.assertEqual(self.oConnector.sql_get_id(
+            'Taxa', 'yearPublishing', 'taxonID', (2705,)), 2001)
+        iID = self.oConnector.sql_get_id('Taxa', 'taxonID', 'canonicalName',
+                                         ('Aabaarnia testii',))
+        self.assertTrue(iID)
+        self.assertEqual(self.oConnector.sql_get_values(
+            'TaxonTree', 'mainTaxonID, statusID', 'taxonID', (iID,)),
+            [(2705, 5)])
+        self.assertEqual(self.oConnector.sql_get_id(
+            'DBIndexes', 'taxonIndex', 'taxonID, sourceID', (iID, 12,)),
+            '1002')
+
+    def test_sync_resume(self):
+        """ Check if a failed taxon is tried again by the next update and
+        the done taxa are not repeated. """
+        iSpecies = len(self.oConnector.get_all_by_rank(21).fetchall())
+        GBIFHandler.bFail = True
+        oSync = GBIFSync(self.oConnector, iWorkers=4, oClient=self.oClient)
+        self.assertEqual(oSync.update(21), iSpecies - 1)
+        oQueue = oSync.get_queue(21)
+        self.assertEqual(oQueue.count()['pending'], 1)
+        self.assertFalse(self.oConnector.sql_get_id(
+            'Taxa', 'taxonID', 'canonicalName', ('Aabaarnia testii',)))
+
+        # The pause before the next attempt is over.
+        self.oConnector.execute_query('UPDATE SyncJobs SET nextTry=0;')
+        GBIFHandler.bFail = False
+        GBIFHandler.lGets = []
+        GBIFHandler.lOffsets = []
+        self.assertEqual(oSync.update(21), 1)
+        self.assertEqual(GBIFHandler.lGets,
+                         [f'/dataset/{GBIF_BACKBONE}', '/species/1001',
+                          '/species/1001/children',
+                          '/species/1001/synonyms'])
+        self.assertTrue(self.oConnector.sql_get_id(
+            'Taxa', 'taxonID', 'canonicalName', ('Aabaarnia testii',)))
+        self.assertEqual(oQueue.count()['done'], iSpecies)
+
+        # A finished update is started again from the beginning.
+        self.assertEqual(oSync.update(21), iSpecies)
+
+    def test_parser_names(self):
+        """ Check if names are parsed by batches and only once. """
+        lNames = [f'Lecanora n{i} Ach.' for i in range(150)]
+        oOldClient = gbif_set_client(self.oClient)
+        try:
+            dNames = gbif_parser.gbif_parser_names(lNames + lNames[:10])
+            self.assertEqual(len(GBIFHandler.lPosts), 2)
+            self.assertEqual([len(lPost) for lPost in GBIFHandler.lPosts],
+                             [100, 50])
+            self.assertEqual(dNames['Lecanora n7 Ach.'],
+                             ('Lecanora n7', 'Ach.', 2001))
+
+            self.assertEqual(gbif_parser.gbif_parser_name(lNames[3]),
+                             ('Lecanora n3', 'Ach.', 2001))
+            self.assertEqual(len(GBIFHandler.lPosts), 2)
+        finally:
+            gbif_set_client(oOldClient)
+
+    def test_iter_many(self):
+        """ Check if the next page is requested while the current one is
+        used, and all the records come in order. """
+        oOldClient = gbif_set_client(self.oClient)
+        try:
+            oRecords = gbif_parser.gbif_iter_many('species/2000/children',
+                                                  2000, iLimit=2)
+            lAnswer = [next(oRecords)]
+            for _ in range(100):
+                if 2 in GBIFHandler.lOffsets:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(GBIFHandler.lOffsets, [0, 2])
+
+            lAnswer.extend(oRecords)
+            self.assertEqual(GBIFHandler.lOffsets, [0, 2, 4])
+            self.assertEqual([dAnswer['id'] for dAnswer in lAnswer],
+                             [2000, 2001, 2002, 2003, 2004])
+            self.assertEqual(lAnswer[3]['name'], 'Aabaarnia n3')
+            self.assertEqual(len(gbif_parser.gbif_get_many(
+                'species/2000/children', 2000)), 5)
+        finally:
+            gbif_set_client(oOldClient)
+
+    def test_sync_dedup(self):
+        """ Check if a gbif key reached twice is requested once and the
+        known keys are not parsed. """
+        lSpecies = self.oConnector.get_all_by_rank(21).fetchall()
+        iOther = [tRow[0] for tRow in lSpecies if tRow[0] != 2705][0]
+        self.oConnector.insert_row('DBIndexes',
+                                   'taxonID, sourceID, taxonIndex',
+                                   (iOther, 12, '1001',))
+        self.oConnector.insert_row('DBIndexes',
+                                   'taxonID, sourceID, taxonIndex',
+                                   (227, 12, '1003',))
+        oSync = GBIFSync(self.oConnector, iWorkers=4, oClient=self.oClient)
+        self.assertEqual(oSync.update(21), len(lSpecies))
+
+        self.assertEqual(GBIFHandler.lGets.count('/species/1001/children'), 1)
+        self.assertEqual(GBIFHandler.lGets.count('/species/1001/synonyms'), 1)
+        for lPost in GBIFHandler.lPosts:
+            self.assertNotIn(VARIETY['scientificName'], lPost)
+        dStats = oSync.oRegistry.get_stats()
+        self.assertIn('1003', oSync.oRegistry.setKnown)
+        self.assertEqual(dStats['lookups'], 2)
+        self.assertEqual(dStats['lists'], 2)
+        self.assertEqual(dStats['parsed'], 1)
+        self.assertGreaterEqual(dStats['requests'], 4)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
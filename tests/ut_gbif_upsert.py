@@ -0,0 +1,167 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import sqlite3
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from mli.lib.gbif_upsert import gbif_upsert
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestGBIFUpsert('test_upsert_page'))
+    oSuite.addTest(TestGBIFUpsert('test_upsert_many'))
+    oSuite.addTest(TestGBIFUpsert('test_upsert_norm_names'))
+
+    return oSuite
+
+
+def answer(iKey, sName, sAuthor=None, iYear=None, sParent='Aabaarnia',
+           sRank='SPECIES', sStatus='ACCEPTED'):
+    """ Makes a dictionary as gbif_parser_taxon() does. """
+    return {'tax_status': sStatus, 'synonym': sStatus != 'ACCEPTED',
+            'id': iKey, 'rank': sRank, 'parent': sParent, 'name': sName,
+            'author': sAuthor, 'year': iYear}
+
+
+class TestGBIFUpsert(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database from the structure script. """
+        logging.disable(logging.CRITICAL)
+        self.oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        self.oConnector.create_indexes()
+        self.iTaxa = self.oConnector.sql_count('Taxa')
+
+    def tearDown(self):
+        del self.oConnector
+
+    def get_tree(self, iTaxonID):
+        return self.oConnector.sql_get_values(
+            'TaxonTree', 'mainTaxonID, statusID', 'taxonID', (iTaxonID,))
+
+    def test_upsert_page(self):
+        """ Check if known taxa are updated and new ones are inserted with
+        their parents. """
+        lAnswer = [
+            answer(1001, 'Aabaarnia siphulicola', 'Diederich', 2001),
+            answer(1002, 'Aabaarnia nova', 'Nyl.', 1860),
+            answer(1002, 'Aabaarnia nova', 'Nyl.', 1860),
+            answer(1003, 'Aabaarnia vetus', 'Ach.', None, 'Aabaarnia nova',
+                   sStatus='HOMOTYPIC_SYNONYM'),
+            answer(1004, 'SH1169675.09FU'),
+            answer(1005, 'Aabaarnia', sRank='UNRANKED'),
+            answer(1006, 'Aabaarnia cultivar', sRank='CULTIVAR'),
+            None]
+        dIDs = gbif_upsert(self.oConnector, lAnswer)
+        self.assertEqual(set(dIDs), {'1001', '1002', '1003'})
+        self.assertEqual(dIDs['1001'], 2705)
+        self.assertEqual(self.oConnector.sql_count('Taxa'), self.iTaxa + 2)
+
+        self.assertEqual(self.oConnector.sql_get_id(
+            'Taxa', 'yearPublishing', 'taxonID', (2705,)), 2001)
+        self.assertEqual(self.oConnector.sql_get_values(
+            'Taxa', 'scientificName, authorship, yearPublishing, rankID',
+            'taxonID', (dIDs['1002'],)),
+            [('Aabaarnia nova Nyl.', 'Nyl.', 1860, 21)])
+        self.assertEqual(self.get_tree(dIDs['1002']), [(227, 1)])
+        self.assertEqual(self.get_tree(dIDs['1003']), [(dIDs['1002'], 5)])
+        for sKey, iTaxonID in dIDs.items():
+            self.assertEqual(self.oConnector.sql_get_id(
+                'DBIndexes', 'taxonIndex', 'taxonID, sourceID',
+                (iTaxonID, 12,)), sKey)
+
+        # The same page changes nothing.
+        self.assertEqual(gbif_upsert(self.oConnector, lAnswer), dIDs)
+        self.assertEqual(self.oConnector.sql_count('Taxa'), self.iTaxa + 2)
+        self.assertEqual(self.oConnector.sql_count('DBIndexes'), 7 + 3)
+
+    def test_upsert_many(self):
+        """ Check if a page of 1000 children is saved by one call. """
+        lAnswer = [answer(2000 + i, f'Aabaarnia n{chr(97 + i % 26)}'
+                                    f'{chr(97 + i // 26 % 26)}'
+                                    f'{chr(97 + i // 676)}', 'Nyl.')
+                   for i in range(1000)]
+        dIDs = gbif_upsert(self.oConnector, lAnswer)
+        self.assertEqual(len(dIDs), 1000)
+        self.assertEqual(self.oConnector.sql_count('Taxa'),
+                         self.iTaxa + 1000)
+
+    def test_upsert_norm_names(self):
+        """ Check if the normalized names are kept in the columns of Taxa,
+        also for a database with the indexes on name_norm() of older version,
+        and if other tools can write to it. """
+        dIDs = gbif_upsert(self.oConnector, [
+            answer(1002, 'Aabaarnia nova', 'Nyl.', 1860)])
+        self.assertEqual(self.oConnector.get_taxon_id_norm(
+            'aabaarnia  NOVA nyl.'), dIDs['1002'])
+        self.assertEqual(self.oConnector.get_taxa_by_canonical_name(
+            'AABAARNIA NOVA'), [(dIDs['1002'], 'Aabaarnia nova Nyl.', 21)])
+        self.oConnector.update('Taxa', 'scientificName=?, canonicalName',
+                               'taxonID', ('Aabaarnia vetus',
+                                           'Aabaarnia vetus', dIDs['1002']))
+        self.assertFalse(self.oConnector.get_taxa_by_canonical_name(
+            'Aabaarnia nova'))
+        self.assertEqual(self.oConnector.get_taxon_id_norm('aabaarnia vetus'),
+                         dIDs['1002'])
+
+        with TemporaryDirectory() as sDir:
+            sFileDB = path.join(sDir, 'old.db')
+            oConnector = SQL(sFileDB)
+            with open(DB_SCRIPT) as fScript:
+                sScript = fScript.read().replace(
+                    ',\n    canonicalNameNorm  TEXT,\n    '
+                    'scientificNameNorm TEXT', '')
+            oConnector.execute_script(sScript)
+            oConnector.execute_script(
+                'CREATE INDEX Taxa_scientificNameNorm '
+                'ON Taxa (name_norm(scientificName));')
+            del oConnector
+
+            oConnector = SQL(sFileDB)
+            self.assertTrue(oConnector.create_indexes())
+            self.assertEqual(oConnector.get_taxon_id_norm('xanthoria'),
+                             oConnector.get_taxon_id('Xanthoria'))
+            self.assertFalse([sLine for sLine in oConnector.export_db()
+                              if 'name_norm(' in sLine])
+            del oConnector
+
+            # A connection without name_norm() can write to Taxa.
+            oSQLite = sqlite3.connect(sFileDB)
+            with oSQLite:
+                oSQLite.execute("INSERT INTO Taxa (scientificName, "
+                                "canonicalName) VALUES ('Abc def', 'Abc def')")
+            oSQLite.close()
+
+            oConnector = SQL(sFileDB)
+            self.assertTrue(oConnector.create_indexes())
+            self.assertTrue(oConnector.get_taxon_id_norm('abc DEF'))
+            del oConnector
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,135 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import os
+import tempfile
+import unittest
+
+from mli.lib.sql import SQL
+from mli.lib.thumbnail import ThumbnailCache
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestImages('test_image_insert'))
+    oSuite.addTest(TestImages('test_image_import_dir'))
+    oSuite.addTest(TestImages('test_thumbnail_cache'))
+
+    return oSuite
+
+
+def scale(bImage, iSize):
+    """ Makes a fake thumbnail of the first bytes of the image. """
+    return bImage[:iSize]
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database and a directory with images. """
+        self.oTempDir = tempfile.TemporaryDirectory()
+        self.oConnector = SQL(':memory:')
+        self.oConnector.execute_script('CREATE TABLE Images (imagesID '
+                                       'INTEGER PRIMARY KEY, taxonID INTEGER, '
+                                       'image BLOB, imageHash TEXT);')
+        self.sImageDir = os.path.join(self.oTempDir.name, 'images')
+        os.mkdir(self.sImageDir)
+        self.dImages = {}
+        for i, sFile in enumerate(['a.jpg', 'b.PNG', 'c.txt']):
+            bData = bytes([i]) * (100000 + i)
+            self.dImages[sFile] = bData
+            with open(os.path.join(self.sImageDir, sFile), 'wb') as fFile:
+                fFile.write(bData)
+
+    def tearDown(self):
+        del self.oConnector
+        self.oTempDir.cleanup()
+
+    def test_image_insert(self):
+        """ Check if an image is written and read by chunks. """
+        sFile = os.path.join(self.sImageDir, 'a.jpg')
+        iImageID = self.oConnector.image_insert(5, sFile, iChunk=1000)
+        self.assertTrue(iImageID)
+
+        lChunks = list(self.oConnector.image_iter(iImageID, iChunk=30000))
+        self.assertEqual(len(lChunks), 4)
+        self.assertEqual(b''.join(lChunks), self.dImages['a.jpg'])
+
+        self.assertEqual(self.oConnector.image_read(iImageID),
+                         self.dImages['a.jpg'])
+        sHash = hashlib.sha1(self.dImages['a.jpg']).hexdigest()
+        self.assertEqual(self.oConnector.sql_get_id(
+            'Images', 'imageHash', 'imagesID', (iImageID,)), sHash)
+        self.assertEqual(self.oConnector.image_get_hash(iImageID), sHash)
+        self.assertIsNone(self.oConnector.image_get_hash(iImageID + 1))
+
+        self.assertTrue(self.oConnector.image_delete(iImageID))
+        self.assertEqual(self.oConnector.sql_count('Images'), 0)
+
+    def test_image_import_dir(self):
+        """ Check if only images of the directory are imported. """
+        lImages = self.oConnector.image_import_dir(7, self.sImageDir)
+        self.assertEqual(len(lImages), 2)
+        self.assertEqual(self.oConnector.image_read(lImages[1]),
+                         self.dImages['b.PNG'])
+
+    def test_thumbnail_cache(self):
+        """ Check if a thumbnail is made once and remade after changes. """
+        lCalls = []
+
+        def scale_count(bImage, iSize):
+            lCalls.append(iSize)
+            return scale(bImage, iSize)
+
+        sCacheDir = os.path.join(self.oTempDir.name, 'cache')
+        oCache = ThumbnailCache(self.oConnector, sCacheDir, scale_count, 64)
+        iImageID = self.oConnector.image_insert(
+            1, os.path.join(self.sImageDir, 'a.jpg'))
+        sThumb = oCache.get_thumbnail(iImageID)
+        self.assertEqual(oCache.get_thumbnail(iImageID), sThumb)
+        self.assertEqual(len(lCalls), 1)
+        with open(sThumb, 'rb') as fThumb:
+            self.assertEqual(fThumb.read(), bytes(64))
+
+        # The stored hash is used, the image isn't read to find it.
+        oCache.invalidate(iImageID)
+        lHashed = []
+        self.oConnector.image_hash = lHashed.append
+        self.assertEqual(oCache.get_thumbnail(iImageID), sThumb)
+        self.assertEqual(lHashed, [])
+        del self.oConnector.image_hash
+
+        self.oConnector.execute_query('UPDATE Images SET image=?, '
+                                      'imageHash=NULL WHERE imagesID=?;',
+                                      (b'new image', iImageID,))
+        oCache.invalidate(iImageID)
+        sNewThumb = oCache.get_thumbnail(iImageID)
+        self.assertNotEqual(sNewThumb, sThumb)
+        self.assertEqual(os.listdir(sCacheDir),
+                         [os.path.basename(sNewThumb)])
+
+        self.oConnector.image_delete(iImageID)
+        self.assertEqual(oCache.clean(), 1)
+        self.assertIsNone(oCache.get_thumbnail(iImageID))
+        self.assertIsNone(oCache.get_thumbnail(999999))
+        self.assertEqual(len(lCalls), 2)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,125 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import tempfile
+import unittest
+from os import path
+
+from mli.lib.inat_csv_parser import INAT_SOURCE_ID, INAT_URL, \
+    inat_get_file, inat_parser
+from mli.lib.sql import SQL
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestINat('test_inat_import'))
+    oSuite.addTest(TestINat('test_inat_many'))
+
+    return oSuite
+
+
+class TestINat(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.oDir = tempfile.TemporaryDirectory()
+        self.oConnector = SQL(path.join(self.oDir.name, 'mli.db'))
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        self.oConnector.execute_query(
+            'DELETE FROM DBIndexes WHERE sourceID=?;', (INAT_SOURCE_ID,))
+        self.oConnector.oConnector.commit()
+
+    def tearDown(self):
+        self.oConnector.close()
+        self.oDir.cleanup()
+
+    def get_names(self, iStatus, iCount):
+        """ Takes names of different taxa with the status. """
+        return self.oConnector.execute_query(
+            'SELECT MIN(Taxa.taxonID), Taxa.canonicalName FROM Taxa '
+            'JOIN TaxonTree ON TaxonTree.taxonID=Taxa.taxonID '
+            'WHERE TaxonTree.statusID=? GROUP BY Taxa.canonicalName '
+            'ORDER BY 1 LIMIT ?;', (iStatus, iCount)).fetchall()
+
+    def get_links(self):
+        return dict(self.oConnector.execute_query(
+            'SELECT taxonID, taxonIndex FROM DBIndexes WHERE sourceID=?;',
+            (INAT_SOURCE_ID,)).fetchall())
+
+    def test_inat_import(self):
+        """ Check if a link is added to the first accepted taxon of the name
+        once. """
+        (iFirst, sFirst), (iSecond, sSecond), (iThird, sThird) = \
+            self.get_names(1, 3)
+        sSynonym = 'Synonymus inaturalisti'
+        iSynonym = self.oConnector.insert_row(
+            'Taxa', 'scientificName, canonicalName, rankID',
+            (sSynonym, sSynonym, 1))
+        self.oConnector.insert_row('TaxonTree',
+                                   'taxonID, mainTaxonID, statusID',
+                                   (iSynonym, iFirst, 2))
+        self.oConnector.insert_row('DBIndexes',
+                                   'taxonID, sourceID, taxonIndex',
+                                   (iThird, INAT_SOURCE_ID, '9'))
+
+        sFileCSV = path.join(self.oDir.name, 'inat.csv')
+        with open(sFileCSV, 'w', encoding='utf-8') as fCSV:
+            fCSV.write('Name;ID\n'
+                       f'{sFirst};\n'
+                       f'{sFirst};{INAT_URL}101\n'
+                       f'{sFirst};{INAT_URL}102\n'
+                       f' {sSecond} ;201\n'
+                       f'{sThird};{INAT_URL}301\n'
+                       f'{sSynonym};{INAT_URL}401\n'
+                       f'Nothing;{INAT_URL}501\n'
+                       ';\n')
+        lProgress = []
+        self.assertEqual(inat_get_file(self.oConnector, sFileCSV,
+                                       lProgress.append, iBatch=3), 2)
+        self.assertEqual(lProgress, [3, 6, 8])
+        self.assertEqual(self.get_links(), {iFirst: '101', iSecond: '201',
+                                            iThird: '9'})
+
+        # The second import adds nothing.
+        self.assertEqual(inat_get_file(self.oConnector, sFileCSV), 0)
+        self.assertEqual(len(self.get_links()), 3)
+        self.assertRaises(OSError, inat_get_file, self.oConnector,
+                          path.join(self.oDir.name, 'no.csv'))
+
+    def test_inat_many(self):
+        """ Check if an export with repeated and unknown names links every
+        taxon to its first row. """
+        lNames = self.get_names(1, 500)
+
+        def rows():
+            for iRow in range(20000):
+                _, sName = lNames[iRow % len(lNames)]
+                yield {'Name': sName if iRow < 10000 else f'Not {iRow}',
+                       'ID': f'{INAT_URL}{iRow}'}
+
+        iCount = inat_parser(self.oConnector, rows())
+        self.assertEqual(iCount, len(lNames))
+        self.assertEqual(self.get_links()[lNames[0][0]], '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
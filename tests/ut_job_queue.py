@@ -0,0 +1,130 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import os
+import tempfile
+import unittest
+
+from mli.lib.job_queue import JobQueue
+from mli.lib.sql import SQL
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestJobQueue('test_queue_lease'))
+    oSuite.addTest(TestJobQueue('test_queue_fail'))
+    oSuite.addTest(TestJobQueue('test_queue_recover'))
+    oSuite.addTest(TestJobQueue('test_queue_lease_exhausted'))
+
+    return oSuite
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database used by two connections. """
+        logging.disable(logging.CRITICAL)
+        self.oTempDir = tempfile.TemporaryDirectory()
+        sFileDB = os.path.join(self.oTempDir.name, 'mli.db')
+        self.oConnector = SQL(sFileDB)
+        self.oOther = SQL(sFileDB)
+        self.oQueue = JobQueue(self.oConnector, 'test', iMaxAttempts=2,
+                               fBackoff=0)
+        self.oQueue.add([(i, f'taxon {i}') for i in range(1, 11)])
+
+    def tearDown(self):
+        self.oConnector.close()
+        self.oOther.close()
+        self.oTempDir.cleanup()
+
+    def test_queue_lease(self):
+        """ Check if a job is given to one worker only. """
+        oOther = JobQueue(self.oOther, 'test')
+        self.assertEqual(self.oQueue.add([(1, None), (11, None)]), 1)
+        lFirst = self.oQueue.lease(4, 'first')
+        lSecond = oOther.lease(20, 'second')
+        self.assertEqual([oJob.taxonID for oJob in lFirst], [1, 2, 3, 4])
+        self.assertEqual(len(lSecond), 7)
+        self.assertFalse({oJob.jobID for oJob in lFirst} &
+                         {oJob.jobID for oJob in lSecond})
+        self.assertEqual(lFirst[0].payload, 'taxon 1')
+        self.assertEqual(self.oQueue.lease(1), [])
+
+        for oJob in lFirst:
+            self.oQueue.done(oJob.jobID)
+        self.assertEqual(self.oQueue.count(),
+                         {'pending': 0, 'running': 7, 'done': 4,
+                          'failed': 0})
+        self.assertEqual(JobQueue(self.oOther, 'other').count()['pending'],
+                         0)
+
+    def test_queue_fail(self):
+        """ Check if a failed job is tried again up to the limit. """
+        oJob = self.oQueue.lease()[0]
+        self.oQueue.fail(oJob.jobID, 'Timeout')
+        self.assertEqual(self.oQueue.count()['pending'], 10)
+
+        oJob = self.oQueue.lease(20)[0]
+        self.assertEqual((oJob.taxonID, oJob.attempts), (1, 2))
+        self.oQueue.fail(oJob.jobID, 'Timeout again')
+        self.assertEqual(self.oQueue.count()['failed'], 1)
+        self.assertEqual(self.oQueue.get_errors(),
+                         [(1, 2, 'Timeout again')])
+
+        self.assertEqual(self.oQueue.retry_failed(), 1)
+        self.assertEqual(self.oQueue.count()['failed'], 0)
+
+        self.oQueue.fBackoff = 3600
+        oJob = self.oQueue.lease()[0]
+        self.oQueue.fail(oJob.jobID, 'Timeout')
+        self.assertEqual(self.oQueue.lease(20), [])
+        self.assertEqual(self.oQueue.count()['pending'], 1)
+
+    def test_queue_recover(self):
+        """ Check if jobs of a killed worker are leased again. """
+        self.oQueue.fLease = -1
+        self.oQueue.lease(3)
+        self.oQueue.fLease = 600
+        self.assertEqual(len(JobQueue(self.oOther, 'test').lease(20)), 10)
+        self.assertEqual(self.oQueue.lease(20), [])
+
+        self.assertEqual(self.oQueue.recover(), 10)
+        self.assertEqual(self.oQueue.count()['pending'], 10)
+
+    def test_queue_lease_exhausted(self):
+        """ Check if a job whose last lease is over is failed instead of
+        being leased again. """
+        self.oQueue.fLease = -1
+        self.assertEqual(len(self.oQueue.lease(3)), 3)
+        lJobs = self.oQueue.lease(3)
+        self.assertEqual([(oJob.taxonID, oJob.attempts) for oJob in lJobs],
+                         [(1, 2), (2, 2), (3, 2)])
+
+        self.oQueue.fLease = 600
+        lJobs = self.oQueue.lease(5)
+        self.assertEqual([oJob.taxonID for oJob in lJobs], [4, 5, 6, 7, 8])
+        self.assertEqual(self.oQueue.count(),
+                         {'pending': 2, 'running': 5, 'done': 0,
+                          'failed': 3})
+        self.assertEqual([tRow[:2] for tRow in self.oQueue.get_errors()],
+                         [(1, 2), (2, 2), (3, 2)])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
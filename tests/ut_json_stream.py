@@ -0,0 +1,81 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import unittest
+
+from mli.lib.json_stream import json_stream_items
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestJSONStream('test_stream_chunks'))
+    oSuite.addTest(TestJSONStream('test_stream_errors'))
+
+    return oSuite
+
+
+def split(sText, iSize):
+    """ Cuts the UTF-8 text into chunks of the size. """
+    bText = sText.encode()
+    return [bText[iPos:iPos + iSize] for iPos in range(0, len(bText), iSize)]
+
+
+class TestJSONStream(unittest.TestCase):
+    def test_stream_chunks(self):
+        """ Check if the object is decoded the same at any cuts. """
+        dPage = {'offset': 1000, 'limit': 20,
+                 'results': [{'key': iKey, 'scientificName': 'Lecanora '
+                              f'allophana {iKey} Müll. Arg.',
+                              'numDescendants': iKey * 10, 'synonym': False,
+                              'nomenclaturalStatus': [], 'parent': None}
+                             for iKey in range(20)],
+                 'endOfRecords': False, 'count': 123456}
+        lResults = dPage.pop('results')
+        for sText in (json.dumps(dict(dPage, results=lResults)),
+                      json.dumps(dict(results=lResults, **dPage), indent=2,
+                                 ensure_ascii=False)):
+            for iSize in (1, 2, 3, 7, 100, len(sText)):
+                dRest = {}
+                self.assertEqual(list(json_stream_items(
+                    split(sText, iSize), 'results', dRest)), lResults)
+                self.assertEqual(dRest, dPage)
+
+        self.assertEqual(list(json_stream_items(
+            split('{"results": [], "count": 0}', 5))), [])
+        self.assertEqual(list(json_stream_items(
+            [b'{"results": [1, 22', b'3, true]}'])), [1, 223, True])
+
+    def test_stream_errors(self):
+        """ Check if a wrong object is found after its good elements. """
+        for sText in ('[1, 2]', '{"count": 1}', '{"results": [1, 2',
+                      '{"results": [1} ', '{"results": [1]} {}', ''):
+            with self.assertRaises(ValueError):
+                list(json_stream_items(split(sText, 4)))
+
+        lKeys = []
+        with self.assertRaises(ValueError):
+            for dData in json_stream_items(split(
+                    '{"results": [{"key": 1}, {"key": 2}, {"key"', 3)):
+                lKeys.append(dData['key'])
+        self.assertEqual(lKeys, [1, 2])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
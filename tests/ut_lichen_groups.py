@@ -0,0 +1,127 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import unittest
+from configparser import ConfigParser
+
+from mli.lib.gbif_parser import gbif_is_lichen
+from mli.lib.lichen_groups import LichenGroups, lichen_set_groups
+from mli.lib.sql import SQL
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestLichenGroups('test_lichen_rules'))
+    oSuite.addTest(TestLichenGroups('test_lichen_db'))
+    oSuite.addTest(TestLichenGroups('test_lichen_filter'))
+
+    return oSuite
+
+
+def taxon(sClass=None, sOrder=None, sFamily=None, sGenus=None):
+    """ Makes a record of gbif with the groups of a taxon. """
+    dTaxon = {'kingdom': 'Fungi'}
+    for sRank, sName in (('class', sClass), ('order', sOrder),
+                         ('family', sFamily), ('genus', sGenus)):
+        if sName:
+            dTaxon[sRank] = sName
+
+    return dTaxon
+
+
+class TestLichenGroups(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def test_lichen_rules(self):
+        """ Check if the lowest group decides. """
+        oGroups = LichenGroups()
+        self.assertTrue(oGroups.is_lichen(taxon('Lecanoromycetes')))
+        self.assertTrue(oGroups.is_lichen(
+            taxon('Eurotiomycetes', 'Verrucariales')))
+        self.assertTrue(oGroups.is_lichen(
+            taxon('Dothideomycetes', None, 'Strigulaceae')))
+        self.assertTrue(oGroups.is_lichen(
+            taxon('Agaricomycetes', 'Agaricales', 'Hygrophoraceae',
+                  'Lichenomphalia')))
+        self.assertFalse(oGroups.is_lichen(
+            taxon('Agaricomycetes', 'Agaricales', 'Hygrophoraceae',
+                  'Hygrocybe')))
+        self.assertFalse(oGroups.is_lichen({}))
+
+        oConfig = ConfigParser()
+        oConfig.read_string('[Lichens]\n'
+                            'genus = Lichenothelia, Arthonia\n'
+                            'not_genus = Sarea, Tromera\n'
+                            'family =\n')
+        oGroups.add_config(oConfig)
+        self.assertFalse(oGroups.is_lichen(
+            taxon('Lecanoromycetes', 'Lecanorales', None, 'Sarea')))
+        self.assertTrue(oGroups.is_lichen(
+            taxon('Dothideomycetes', None, None, 'Lichenothelia')))
+        self.assertTrue(oGroups.is_lichen(
+            taxon('Lecanoromycetes', 'Lecanorales', None, 'Lecanora')))
+
+        oOldGroups = lichen_set_groups(oGroups)
+        try:
+            self.assertFalse(gbif_is_lichen(
+                taxon('Lecanoromycetes', None, None, 'Tromera')))
+        finally:
+            lichen_set_groups(oOldGroups)
+
+    def test_lichen_db(self):
+        """ Check if the groups are read from the table. """
+        oConnector = SQL(':memory:')
+        oGroups = LichenGroups.from_db(oConnector)
+        self.assertEqual(oConnector.sql_count('LichenGroups'), 16)
+        self.assertTrue(oGroups.is_lichen(taxon('Arthoniomycetes')))
+
+        oConnector.execute_script(
+            "INSERT INTO LichenGroups VALUES ('genus', 'Sarea', 0); "
+            "DELETE FROM LichenGroups WHERE groupName='Arthoniomycetes';")
+        oGroups = LichenGroups.from_db(oConnector)
+        self.assertEqual(oConnector.sql_count('LichenGroups'), 16)
+        self.assertFalse(oGroups.is_lichen(taxon('Arthoniomycetes')))
+        self.assertFalse(oGroups.is_lichen(
+            taxon('Lecanoromycetes', None, None, 'Sarea')))
+        self.assertTrue(oGroups.is_lichen(
+            taxon('Lecanoromycetes', None, None, 'Lecanora')))
+
+    def test_lichen_filter(self):
+        """ Check if the lichens are selected from backbone rows in their
+        order. """
+        lGroups = [taxon('Lecanoromycetes', 'Lecanorales', 'Lecanoraceae',
+                         'Lecanora'),
+                   taxon('Agaricomycetes', 'Agaricales', 'Hygrophoraceae',
+                         'Hygrocybe'),
+                   taxon('Eurotiomycetes', 'Verrucariales',
+                         'Verrucariaceae', 'Verrucaria'),
+                   taxon('Sordariomycetes', 'Hypocreales', 'Nectriaceae')]
+        lRows = [dict(lGroups[iRow % 4], taxonID=iRow)
+                 for iRow in range(1000)]
+
+        lLichens = list(LichenGroups().filter_lichens(lRows))
+        self.assertEqual(len(lLichens), 500)
+        self.assertEqual([dRow['taxonID'] for dRow in lLichens[:4]],
+                         [0, 2, 4, 6])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,161 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import tempfile
+import threading
+import unittest
+from os import path
+
+from mli.lib.gbif_client import GBIFClient
+from mli.lib.metrics import Histogram, Metrics, metrics_set
+from mli.lib.pipeline import Pipeline
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestMetrics('test_metrics_histogram'))
+    oSuite.addTest(TestMetrics('test_metrics_threads'))
+    oSuite.addTest(TestMetrics('test_metrics_dump'))
+    oSuite.addTest(TestMetrics('test_metrics_sources'))
+
+    return oSuite
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.oMetrics = Metrics()
+        self.oOldMetrics = metrics_set(self.oMetrics)
+
+    def tearDown(self):
+        metrics_set(self.oOldMetrics)
+
+    def test_metrics_histogram(self):
+        """ Check if the percentiles are found by the buckets. """
+        oHistogram = Histogram((0.01, 0.1, 1.0))
+        self.assertIsNone(oHistogram.get_percentile(0.5))
+        for fValue in [0.005] * 50 + [0.05] * 40 + [0.5] * 9 + [7.0]:
+            oHistogram.add(fValue)
+        dStats = oHistogram.get_stats()
+        self.assertEqual(dStats['count'], 100)
+        self.assertEqual(dStats['p50'], 0.01)
+        self.assertEqual(dStats['p90'], 0.1)
+        self.assertEqual(dStats['p99'], 1.0)
+        self.assertEqual(dStats['min'], 0.005)
+        self.assertEqual(dStats['max'], 7.0)
+        self.assertAlmostEqual(dStats['mean'], 0.1375)
+        self.assertEqual(dStats['buckets'], {'0.01': 50, '0.1': 40,
+                                             '1.0': 9, 'inf': 1})
+        self.assertEqual(oHistogram.get_percentile(1.0), 7.0)
+
+        # A percentile isn't more than the largest value.
+        oHistogram = Histogram((1.0,))
+        oHistogram.add(0.2)
+        self.assertEqual(oHistogram.get_percentile(0.5), 0.2)
+
+    def test_metrics_threads(self):
+        """ Check if the metrics of many threads are all counted. """
+        oMetrics = self.oMetrics
+
+        def work(iThread):
+            for iStep in range(1000):
+                oMetrics.count('cache.hit' if iStep % 4 else 'cache.miss')
+                oMetrics.observe('http.species/{key}', 0.002)
+                oMetrics.gauge('queue', iThread)
+                oMetrics.add_rows('Taxa', 2)
+
+        lThreads = [threading.Thread(target=work, args=(iThread,))
+                    for iThread in range(8)]
+        for oThread in lThreads:
+            oThread.start()
+        for oThread in lThreads:
+            oThread.join()
+        oMetrics.count('errors.http', 3)
+        with oMetrics.timer('import.write'):
+            pass
+
+        dStats = oMetrics.get_stats()
+        self.assertEqual(dStats['counters']['cache.hit'], 6000)
+        self.assertEqual(dStats['cache_hit_rate'], 0.75)
+        self.assertEqual(
+            dStats['histograms']['http.species/{key}']['count'], 8000)
+        self.assertEqual(dStats['gauges']['queue']['max'], 7)
+        self.assertEqual(dStats['rows']['Taxa']['count'], 16000)
+        self.assertGreater(dStats['rows']['Taxa']['rate'], 0)
+        self.assertEqual(dStats['errors'], 3)
+        self.assertEqual(dStats['histograms']['import.write']['count'], 1)
+
+        sSummary = oMetrics.get_summary()
+        self.assertTrue(sSummary.startswith('http 8000 req 2 ms avg, '
+                                            'cache 75%, import.write '))
+        self.assertTrue(sSummary.endswith(', errors 3'))
+        lLines = oMetrics.get_summary(bDetail=True).splitlines()
+        self.assertTrue(lLines[0].startswith('http 8000 req '))
+        self.assertIn('  species/{key}: 8000 x, 16.00 s, p50 2 ms, '
+                      'p90 2 ms, max 2 ms', lLines)
+        self.assertIn('  rows Taxa: 16000, ', lLines[-4])
+        self.assertIn('  errors.http: 3', lLines)
+
+    def test_metrics_dump(self):
+        """ Check if the metrics are written as JSON. """
+        self.oMetrics.observe('http.wait', 0.5)
+        self.oMetrics.add_rows('LocalNames', 5)
+        with tempfile.TemporaryDirectory() as sDir:
+            sFile = path.join(sDir, 'new', 'metrics.json')
+            self.assertTrue(self.oMetrics.dump(sFile, {'command': 'inat'}))
+            with open(sFile) as fFile:
+                dStats = json.load(fFile)
+            self.assertFalse(self.oMetrics.dump(sDir))
+
+        self.assertEqual(dStats['command'], 'inat')
+        self.assertEqual(dStats['histograms']['http.wait']['sum'], 0.5)
+        self.assertEqual(dStats['rows']['LocalNames']['count'], 5)
+        self.assertIsNone(dStats['cache_hit_rate'])
+        self.assertIn('wait 0.5 s', self.oMetrics.get_summary())
+
+    def test_metrics_sources(self):
+        """ Check if the endpoints of gbif and the stages of a pipeline are
+        named in the metrics. """
+        oClient = GBIFClient('http://127.0.0.1:1/v1')
+        for sPath, sEndpoint in (
+                ('species/5/children', 'species/{key}/children'),
+                ('species/match?name=Lecanora', 'species/match'),
+                ('dataset/d7dddbf4-2cf0-4f39-9b2a-bb099caae36c',
+                 'dataset/{key}'),
+                ('https://example.org/v1/species/12/', 'v1/species/{key}')):
+            self.assertEqual(oClient.get_endpoint(oClient.get_url(sPath)),
+                             sEndpoint)
+
+        def write(lBatch):
+            if lBatch[0][0] == 3:
+                raise ValueError('bad row')
+
+        Pipeline(write, lambda iItem: iItem, lambda iData: iData,
+                 iFetchers=2, iParsers=1, iBatch=1,
+                 sName='test').run(range(5))
+        dStats = self.oMetrics.get_stats()
+        self.assertEqual(dStats['histograms']['test.fetch']['count'], 5)
+        self.assertEqual(dStats['histograms']['test.parse']['count'], 5)
+        self.assertEqual(dStats['histograms']['test.write']['count'], 5)
+        self.assertIn('test.active', dStats['gauges'])
+        self.assertIn('test.waiting', dStats['gauges'])
+        self.assertEqual(dStats['counters']['errors.test'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
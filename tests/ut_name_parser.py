@@ -0,0 +1,82 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import unittest
+from os import path
+
+from mli.lib.name_parser import name_parse, name_split
+from mli.lib.sql import SQL
+
+DATA_DIR = path.join(path.dirname(path.abspath(__file__)), 'data')
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestNameParser('test_name_parse_corpus'))
+    oSuite.addTest(TestNameParser('test_name_split_db'))
+
+    return oSuite
+
+
+class TestNameParser(unittest.TestCase):
+    def test_name_parse_corpus(self):
+        """ Check if the parser gives the same fields as GBIF name parser.
+        """
+        with open(path.join(DATA_DIR, 'name_parser_corpus.json'),
+                  encoding='utf-8') as fCorpus:
+            lCorpus = json.load(fCorpus)
+
+        for dName in lCorpus:
+            dParsed = name_parse(dName['scientificName'])._asdict()
+            for sField, sValue in dName.items():
+                with self.subTest(name=dName['scientificName'],
+                                  field=sField):
+                    self.assertEqual(dParsed[sField], sValue)
+
+    def test_name_split_db(self):
+        """ Check if the names of the database, which were split by GBIF,
+        are split in the same way. """
+        oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            oConnector.execute_script(fScript.read())
+        lRows = oConnector.execute_query(
+            'SELECT scientificName, canonicalName, authorship, '
+            'yearPublishing FROM Taxa;').fetchall()
+
+        iChecked = 0
+        for sSciName, sName, sAuthor, iYear in lRows:
+            sJoined = ' '.join(filter(None, (sName, sAuthor)))
+            if iYear:
+                sJoined = f'{sJoined}, {iYear}'
+            # Only the records which are made of their parts are checked.
+            if sJoined != sSciName or '×' in sSciName:
+                continue
+
+            iChecked += 1
+            self.assertEqual(name_split(sSciName),
+                             (sName, sAuthor or None, iYear or None),
+                             sSciName)
+        self.assertGreater(iChecked, 3000)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
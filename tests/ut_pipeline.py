@@ -0,0 +1,153 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+
+from mli.lib.pipeline import Pipeline
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestPipeline('test_pipeline_stages'))
+    oSuite.addTest(TestPipeline('test_pipeline_interval'))
+    oSuite.addTest(TestPipeline('test_pipeline_failures'))
+    oSuite.addTest(TestPipeline('test_pipeline_stop'))
+
+    return oSuite
+
+
+class TestPipeline(unittest.TestCase):
+    def test_pipeline_stages(self):
+        """ Check if all items pass the threads and are written by batches
+        from the calling thread. """
+        oMain = threading.current_thread()
+        setThreads = set()
+        lBatches = []
+
+        def fetch(iItem):
+            setThreads.add(threading.current_thread())
+            time.sleep(0.001)
+            return iItem * 2
+
+        def parse(iData):
+            return None if iData % 10 == 0 else iData + 1
+
+        def write(lBatch):
+            self.assertIs(threading.current_thread(), oMain)
+            lBatches.append(lBatch)
+
+        oPipeline = Pipeline(write, fetch, parse, iFetchers=4, iParsers=2,
+                             iBatch=7, fInterval=None)
+        dStats = oPipeline.run(range(100))
+        lWritten = sorted(oPair for lBatch in lBatches for oPair in lBatch)
+        self.assertEqual(lWritten, [(i, i * 2 + 1) for i in range(100)
+                                    if i % 5])
+        self.assertTrue(all(len(lBatch) <= 7 for lBatch in lBatches))
+        self.assertNotIn(oMain, setThreads)
+        self.assertEqual(dStats['read'], 100)
+        self.assertEqual(dStats['skipped'], 20)
+        self.assertEqual(dStats['written'], 80)
+        self.assertEqual(dStats['batches'], len(lBatches))
+
+        # Without threads the calling thread does everything in order.
+        lBatches.clear()
+        setThreads.clear()
+        Pipeline(write, fetch, iFetchers=0, iBatch=3).run(range(5))
+        self.assertEqual(lBatches, [[(0, 0), (1, 2), (2, 4)],
+                                    [(3, 6), (4, 8)]])
+        self.assertEqual(setThreads, {oMain})
+
+    def test_pipeline_interval(self):
+        """ Check if a batch is written when the interval has passed, while
+        the next item is still being fetched. """
+        lSizes = []
+        lReleased = []
+        oWritten = threading.Event()
+
+        def fetch(iItem):
+            # The second item waits until the first one is written.
+            if iItem:
+                lReleased.append(oWritten.wait(5))
+            return iItem
+
+        def write(lBatch):
+            lSizes.append(len(lBatch))
+            oWritten.set()
+
+        oPipeline = Pipeline(write, fetch, iFetchers=1, iBatch=100,
+                             fInterval=0.05)
+        dStats = oPipeline.run(range(2))
+        self.assertEqual(lSizes, [1, 1])
+        self.assertEqual(lReleased, [True])
+        self.assertEqual(dStats['batches'], 2)
+
+    def test_pipeline_failures(self):
+        """ Check if failed items are given to fFail and a failed batch is
+        written one by one. """
+        lFailed = []
+        lWritten = []
+
+        def fetch(iItem):
+            if iItem == 3:
+                raise ConnectionError('no answer')
+            return iItem
+
+        def write(lBatch):
+            if any(iItem == 5 for iItem, oData in lBatch):
+                raise ValueError('bad row')
+            lWritten.extend(lBatch)
+
+        oPipeline = Pipeline(write, fetch, iFetchers=2, iBatch=4,
+                             fInterval=None, fFail=lambda oItem, e:
+                             lFailed.append((oItem, type(e))))
+        dStats = oPipeline.run(range(10))
+        self.assertEqual(sorted(lFailed), [(3, ConnectionError),
+                                           (5, ValueError)])
+        self.assertEqual(sorted(iItem for iItem, oData in lWritten),
+                         [0, 1, 2, 4, 6, 7, 8, 9])
+        self.assertEqual(dStats['failed'], 2)
+        self.assertEqual(dStats['written'], 8)
+        self.assertEqual(dStats['split'], 1)
+
+        # Without splitting the exception of the batch stops the pipeline.
+        oPipeline = Pipeline(write, iBatch=4, bSplit=False)
+        self.assertRaises(ValueError, oPipeline.run, range(10))
+
+    def test_pipeline_stop(self):
+        """ Check if an exception of the writer stops the threads and the
+        source isn't read to the end. """
+        lRead = []
+
+        def source():
+            for iItem in range(10000):
+                lRead.append(iItem)
+                yield iItem
+
+        def write(lBatch):
+            raise RuntimeError('disk is full')
+
+        oPipeline = Pipeline(write, lambda iItem: iItem, iFetchers=4,
+                             iBatch=10, iWindow=20, bSplit=False)
+        self.assertRaises(RuntimeError, oPipeline.run, source())
+        self.assertLess(len(lRead), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
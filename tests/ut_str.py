@@ -18,12 +18,13 @@
 
 import unittest
 
-from mli.lib.str import str_sep_name_taxon
+from mli.lib.str import str_norm_name, str_sep_name_taxon
 
 
 def suite():
     oSuite = unittest.TestSuite()
     oSuite.addTest(TestStr('test_str_sep_name_taxon'))
+    oSuite.addTest(TestStr('test_str_norm_name'))
 
     return oSuite
 
@@ -67,6 +68,26 @@ class TestStr(unittest.TestCase):
         sTaxon = str_sep_name_taxon(sTestValue)
         self.assertEqual(sTaxon, 'Acanthotheciopsis caesiocarnea')
 
+    def test_str_norm_name(self):
+        """ Check if str_norm_name gives the same string for the same name
+        written in different ways. """
+        self.assertEqual(str_norm_name('Xanthoria parietina (L.) Th. Fr.'),
+                         'xanthoria parietina (l.) th.fr.')
+        self.assertEqual(str_norm_name('xanthoria  parietina ( L. ) Th.Fr.'),
+                         'xanthoria parietina (l.) th.fr.')
+        self.assertEqual(str_norm_name('Absconditella modesta (Zahlbr.) '
+                                       'Vĕzda'),
+                         'absconditella modesta (zahlbr.) vezda')
+        self.assertEqual(str_norm_name('Lafuente, Roca et Carbonell'),
+                         str_norm_name('Lafuente , Roca & Carbonell'))
+        self.assertEqual(str_norm_name('Cladonia x foo'),
+                         str_norm_name('Cladonia \u00d7foo'))
+        self.assertEqual(str_norm_name('\u00d7 Agropogon'),
+                         '\u00d7agropogon')
+        self.assertEqual(str_norm_name('Xanthoria'), 'xanthoria')
+        self.assertEqual(str_norm_name(''), '')
+        self.assertIsNone(str_norm_name(None))
+
 
 if __name__ == '__main__':
     runner = unittest.TextTestRunner()
@@ -0,0 +1,189 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import tempfile
+import threading
+import unittest
+from os import path
+
+from mli.lib.sql import SQL
+from mli.lib.taxon_card import TaxonCardCache
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestTaxonCard('test_taxon_page'))
+    oSuite.addTest(TestTaxonCard('test_card_cache'))
+    oSuite.addTest(TestTaxonCard('test_card_invalidate'))
+    oSuite.addTest(TestTaxonCard('test_card_persistent'))
+    oSuite.addTest(TestTaxonCard('test_card_prewarm'))
+    oSuite.addTest(TestTaxonCard('test_card_lru'))
+
+    return oSuite
+
+
+class TestTaxonCard(unittest.TestCase):
+    def setUp(self):
+        """ Creates a temporal database from the structure script. """
+        self.oConnector = SQL(':memory:')
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        logging.disable(logging.CRITICAL)
+        self.lRendered = []
+
+    def tearDown(self):
+        self.oConnector.close()
+
+    def render(self, oConnector, iTaxonID):
+        """ Makes a short card and remembers the call. """
+        self.lRendered.append(iTaxonID)
+        return oConnector.sql_get_id('Taxa', 'scientificName',
+                                     'taxonID', (iTaxonID,))
+
+    def test_taxon_page(self):
+        """ Check if get_taxon_page gets the same data as separate queries.
+        """
+        oPage = self.oConnector.get_taxon_page('Ascomycota')
+        self.assertEqual(oPage, self.oConnector.get_taxon_page(4))
+        self.assertEqual(oPage.taxonID, 4)
+        self.assertEqual(oPage.rankName, 'division')
+        self.assertEqual(oPage.statusID, 1)
+        self.assertEqual(oPage.mainName, 'Fungi')
+        self.assertEqual(oPage.synonyms, self.oConnector.get_synonyms(4))
+        self.assertEqual(oPage.children,
+                         self.oConnector.get_taxon_children(
+                             4, oPage.statusName))
+        self.assertEqual(oPage.dbLinks, self.oConnector.get_taxon_db_link(4))
+        self.assertTrue(oPage.dbLinks)
+        self.assertIsNone(self.oConnector.get_taxon_page('Mistake'))
+
+    def test_card_cache(self):
+        """ Check if a card is made once. """
+        oCache = TaxonCardCache(self.oConnector, sLang='en')
+        sHTML = oCache.get_card(4)
+        self.assertIn('<i>Ascomycota</i>', sHTML)
+        self.assertIn('Arthoniomycetes', sHTML)
+        self.assertIs(oCache.get_card(4), sHTML)
+
+    def test_card_invalidate(self):
+        """ Check if only cards which show the changed rows are forgotten. """
+        oCache = TaxonCardCache(self.oConnector, self.render, 'en')
+        for iTaxonID in (3, 4, 5, 6):
+            oCache.get_card(iTaxonID)
+
+        # Basidiomycota (5) is the child of Fungi (3) and the parent of
+        # Agaricomycetes (6).
+        self.oConnector.update('Taxa', 'authorship', 'taxonID', ('R.T.', 5,))
+        self.assertEqual(sorted(tKey[0] for tKey in oCache.dCards), [4, 6])
+
+        oCache.get_card(3)
+        self.oConnector.insert_row('DBIndexes',
+                                   'taxonID, sourceID, taxonIndex',
+                                   (4, 1, '48250',))
+        self.assertEqual(sorted(tKey[0] for tKey in oCache.dCards), [3, 6])
+
+        self.oConnector.update('TaxonTree', 'mainTaxonID', 'taxonID',
+                               (4, 6,))
+        self.assertEqual(sorted(tKey[0] for tKey in oCache.dCards), [3])
+
+    def test_card_persistent(self):
+        """ Check if cards are kept in the table and cleaned by triggers. """
+        oCache = TaxonCardCache(self.oConnector, self.render, 'en', True)
+        oCache.get_card(4)
+        oCache.get_card(5)
+        oCache.dCards.clear()
+        self.assertEqual(oCache.get_card(4), 'Ascomycota')
+        self.assertEqual(self.lRendered, [4, 5])
+
+        self.oConnector.execute_script('DROP TRIGGER temp.'
+                                       'TaxonCards_Taxa_update;')
+        self.oConnector.update('Taxa', 'authorship', 'taxonID', ('R.', 5,))
+        self.assertEqual(self.oConnector.sql_count('TaxonCards'), 1)
+
+    def test_card_prewarm(self):
+        """ Check if cards of the subtree of the taxon are made, the cards
+        made in the background are kept, and taxa asked for while the thread
+        works are queued. """
+        oCache = TaxonCardCache(self.oConnector, self.render, 'en',
+                                iMaxCards=20)
+        oCache.prewarm(3)
+        lSubtree = oCache.get_subtree(self.oConnector, 3)
+        self.assertEqual(len(lSubtree), 20)
+        self.assertEqual(lSubtree[:3], [3, 4, 5])
+        # The grandchildren are in the subtree too.
+        self.assertIn(7, lSubtree)
+        self.assertEqual(self.lRendered, lSubtree)
+        self.assertEqual(sorted(tKey[0] for tKey in oCache.dCards),
+                         sorted(lSubtree))
+        oCache.get_card(5)
+        self.assertEqual(self.lRendered, lSubtree)
+
+        with tempfile.TemporaryDirectory() as sDir:
+            self.oConnector.backup(path.join(sDir, 'mli.db'))
+            oConnector = SQL(path.join(sDir, 'mli.db'))
+            oRelease = threading.Event()
+
+            def render_wait(oConnector, iTaxonID):
+                oRelease.wait()
+                return self.render(oConnector, iTaxonID)
+
+            oCache = TaxonCardCache(oConnector, render_wait, 'en', True,
+                                    iMaxCards=20)
+            self.lRendered = []
+            oRelease.set()
+            oCache.get_card(2)
+            oCache.prewarm(4, bWait=True)
+            self.assertEqual(len(self.lRendered), len(
+                oCache.get_subtree(oConnector, 4)) + 1)
+
+            # The cards of the thread don't clean the cache.
+            iRendered = len(self.lRendered)
+            oCache.get_card(2)
+            oCache.get_card(4)
+            self.assertEqual(len(self.lRendered), iRendered)
+            self.assertEqual(oConnector.sql_count('TaxonCards'), iRendered)
+
+            # The taxon asked for while the thread works isn't lost.
+            oRelease.clear()
+            oPrewarm = oCache.prewarm(5)
+            self.assertIs(oCache.prewarm(1), oPrewarm)
+            oRelease.set()
+            oPrewarm.join()
+            self.assertIsNone(oCache.oPrewarm)
+            for iTaxonID in oCache.get_subtree(oConnector, 1):
+                self.assertTrue(oCache.has_card(iTaxonID))
+            oConnector.close()
+
+    def test_card_lru(self):
+        """ Check if the least recently used card is forgotten. """
+        oCache = TaxonCardCache(self.oConnector, self.render, 'en',
+                                iMaxCards=2)
+        for iTaxonID in (3, 4, 3, 5):
+            oCache.get_card(iTaxonID)
+        self.assertEqual([tKey[0] for tKey in oCache.dCards], [3, 5])
+        oCache.get_card(4)
+        self.assertEqual(self.lRendered, [3, 4, 5, 4])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
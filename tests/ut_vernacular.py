@@ -0,0 +1,163 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import tempfile
+import unittest
+import zipfile
+from os import path
+
+from mli.lib.sql import SQL
+from mli.lib.vernacular import LangMap, VernacularImporter
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+GBIF_NAMES = ('taxonID\tvernacularName\tlanguage\n'
+              '1001\tWhite test lichen\ten\n'
+              '1001\twhite  test Lichen \tEN-gb\n'
+              '1001\tWeiße Testflechte\tger\n'
+              '1001\tWeiße Testflechte\tdeu\n'
+              '1002\tКрасный лишайник\tru\n'
+              '1002\tOld name\ten\n'
+              '1003\tNo taxon\ten\n'
+              '1002\tNo language\txx\n'
+              '1002\t\ten\n')
+
+INAT_NAMES = ('id,vernacularName,language,locality,countryCode,source,'
+              'lexicon,contributor,created\n'
+              '5001,"Lichen, white",en,,,,English,,\n'
+              '5001,Белый лишайник,,,,,Russian,,\n'
+              '5001,白地衣,zh-Hant,,,,Chinese (Traditional),,\n'
+              'https://www.inaturalist.org/taxa/5002,Red lichen,,,,,English,'
+              ',\n')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestVernacular('test_vernacular_langs'))
+    oSuite.addTest(TestVernacular('test_vernacular_gbif'))
+    oSuite.addTest(TestVernacular('test_vernacular_inat'))
+    oSuite.addTest(TestVernacular('test_vernacular_bulk'))
+
+    return oSuite
+
+
+class TestVernacular(unittest.TestCase):
+    def setUp(self):
+        """ Makes a database with gbif and iNaturalist keys of two taxa. """
+        logging.disable(logging.CRITICAL)
+        self.oDir = tempfile.TemporaryDirectory()
+        self.oConnector = SQL(path.join(self.oDir.name, 'mli.db'))
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+        self.oConnector.insert_many(
+            'DBIndexes', 'taxonID, sourceID, taxonIndex',
+            [(2705, 12, '1001'), (2706, 12, '1002'), (2705, 1, '5001'),
+             (2706, 1, '5002')])
+        self.oConnector.insert_row('LocalNames', 'taxonID, langID, localName',
+                                   (2706, 122, 'old name'))
+
+    def tearDown(self):
+        self.oConnector.close()
+        self.oDir.cleanup()
+
+    def write(self, sName, sText):
+        sFile = path.join(self.oDir.name, sName)
+        with open(sFile, 'w', encoding='utf-8') as fFile:
+            fFile.write(sText)
+        return sFile
+
+    def get_names(self):
+        return self.oConnector.execute_query(
+            'SELECT taxonID, langID, localName FROM LocalNames '
+            'ORDER BY localNameID;').fetchall()
+
+    def test_vernacular_langs(self):
+        """ Check if the codes, the tags and the names of the languages are
+        resolved. """
+        oLangs = LangMap.from_db(self.oConnector)
+        self.assertGreater(len(oLangs), 487)
+        for sLang, iLang in (('en', 122), ('ENG', 122), ('en-GB', 122),
+                             ('en_US', 122), ('English', 122),
+                             ('ger', 106), ('deu', 106), ('German', 106),
+                             ('zh-Hant', 482), ('Chinese (Traditional)', 482),
+                             ('adygei', 6), ('afro-asiatic', 7),
+                             ('xx', None), ('', None), (None, None)):
+            self.assertEqual(oLangs.resolve(sLang), iLang, sLang)
+
+    def test_vernacular_gbif(self):
+        """ Check if the names of gbif are added once, also from an
+        archive. """
+        sFile = self.write('VernacularName.tsv', GBIF_NAMES)
+        oImporter = VernacularImporter(self.oConnector, 12, iBatch=2)
+        dCount = oImporter.load_file(sFile)
+        self.assertEqual(dCount, {'read': 9, 'names': 3, 'duplicates': 3,
+                                  'no_taxon': 1, 'no_lang': 1, 'empty': 1,
+                                  'failed': 0})
+        self.assertEqual(self.get_names()[1:], [
+            (2705, 122, 'White test lichen'),
+            (2705, 106, 'Weiße Testflechte'),
+            (2706, 364, 'Красный лишайник')])
+
+        sZip = path.join(self.oDir.name, 'backbone.zip')
+        with zipfile.ZipFile(sZip, 'w') as oZip:
+            oZip.writestr('VernacularName.tsv',
+                          GBIF_NAMES + '1002\tRed test lichen\ten\n')
+        dCount = oImporter.load_file(sZip)
+        self.assertEqual(dCount['names'], 1)
+        self.assertEqual(dCount['duplicates'], 6)
+        self.assertEqual(self.get_names()[-1], (2706, 122, 'Red test lichen'))
+
+        self.assertFalse(oImporter.load_file(path.join(self.oDir.name, 'no')))
+
+    def test_vernacular_inat(self):
+        """ Check if the names of iNaturalist are found by the lexicon. """
+        sFile = self.write('VernacularNames.csv', INAT_NAMES)
+        lProgress = []
+        dCount = VernacularImporter(self.oConnector, 1,
+                                    fProgress=lProgress.append).load_file(
+            sFile)
+        self.assertEqual(dCount['names'], 4)
+        self.assertEqual(lProgress, [4])
+        self.assertEqual(self.get_names()[1:], [
+            (2705, 122, 'Lichen, white'), (2705, 364, 'Белый лишайник'),
+            (2705, 482, '白地衣'), (2706, 122, 'Red lichen')])
+
+    def test_vernacular_bulk(self):
+        """ Check if many names are inserted by batches. """
+        lKeys = [(iTaxonID, 12, f'k{iTaxonID}')
+                 for iTaxonID in range(1, 2001)]
+        self.oConnector.insert_many('DBIndexes',
+                                    'taxonID, sourceID, taxonIndex', lKeys)
+
+        def rows():
+            for iRow in range(20000):
+                yield {'taxonID': f'k{iRow % 2000 + 1}',
+                       'vernacularName': f'Name {iRow % 10000}',
+                       'language': ('en', 'de', 'ru', 'fr')[iRow % 4]}
+
+        dCount = VernacularImporter(self.oConnector, 12,
+                                    iBatch=5000).load_rows(rows())
+        self.assertEqual(dCount['names'], 10000)
+        self.assertEqual(dCount['duplicates'], 10000)
+        self.assertEqual(self.oConnector.sql_count('LocalNames'), 10001)
+
+
+if __name__ == '__main__':
+    unittest.main()
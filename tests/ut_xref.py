@@ -0,0 +1,214 @@
+#     This code is a part of program Manual Lichen identification
+#     Copyright (C) 2022 contributors Manual Lichen identification
+#     The full list is available at the link
+#     https://github.com/tagezi/mli/blob/master/contributors.txt
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import tempfile
+import unittest
+import zipfile
+from os import path
+
+from mli.lib.sql import SQL
+from mli.lib.xref import XREF_SOURCES, XRefImporter, xref_iter_file, \
+    xref_norm_index
+
+DB_SCRIPT = path.join(path.dirname(path.abspath(__file__)),
+                      '..', 'db', 'db_structure.sql')
+
+# Makes epithets of numbers.
+DIGITS = str.maketrans('0123456789', 'abcdefghij')
+
+
+def suite():
+    oSuite = unittest.TestSuite()
+    oSuite.addTest(TestXRef('test_xref_files'))
+    oSuite.addTest(TestXRef('test_xref_import'))
+    oSuite.addTest(TestXRef('test_xref_many'))
+
+    return oSuite
+
+
+class TestXRef(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.oDir = tempfile.TemporaryDirectory()
+        self.oConnector = SQL(path.join(self.oDir.name, 'mli.db'))
+        with open(DB_SCRIPT) as fScript:
+            self.oConnector.execute_script(fScript.read())
+
+    def tearDown(self):
+        self.oConnector.close()
+        self.oDir.cleanup()
+
+    def write_file(self, sName, sText):
+        sFile = path.join(self.oDir.name, sName)
+        with open(sFile, 'w', encoding='utf-8') as fFile:
+            fFile.write(sText)
+        return sFile
+
+    def add_taxon(self, sName, sAuthor, iStatus, iMain=1):
+        iTaxonID = self.oConnector.insert_row(
+            'Taxa', 'scientificName, canonicalName, authorship, rankID',
+            (f'{sName} {sAuthor}', sName, sAuthor, 22))
+        self.oConnector.insert_row('TaxonTree',
+                                   'taxonID, mainTaxonID, statusID',
+                                   (iTaxonID, iMain, iStatus))
+        return iTaxonID
+
+    def get_links(self, iSourceID):
+        return dict(self.oConnector.execute_query(
+            'SELECT taxonID, taxonIndex FROM DBIndexes WHERE sourceID=?;',
+            (iSourceID,)).fetchall())
+
+    def test_xref_files(self):
+        """ Check if the rows of the files of the sources are read. """
+        self.assertEqual(xref_norm_index(' 15 '), '15')
+        self.assertEqual(xref_norm_index(12), '12')
+        self.assertEqual(xref_norm_index(None), '')
+        self.assertEqual(xref_norm_index('urn:lsid:dyntaxa.se:Taxon:6009620'),
+                         '6009620')
+        self.assertEqual(xref_norm_index(
+            'https://id.biodiversity.org.au/name/lichen/7456/'), '7456')
+        self.assertEqual(xref_norm_index(
+            'https://www.mycobank.org/page/Name%20details%20page/field/'
+            'Mycobank%20%2523/87300',
+            'https://www.mycobank.org/page/Name%20details%20page/field/'
+            'Mycobank%20%2523/'), '87300')
+
+        sFile = self.write_file('names.dmp',
+                                '1\t|\troot\t|\t\t|\tscientific name\t|\n'
+                                '2\t|\tbacteria\t|\t\t|\tgenbank\t|\n')
+        self.assertEqual(list(xref_iter_file(sFile, XREF_SOURCES['ncbi'])),
+                         [{'tax_id': '1', 'name_txt': 'root',
+                           'unique_name': None,
+                           'name_class': 'scientific name'},
+                          {'tax_id': '2', 'name_txt': 'bacteria',
+                           'unique_name': None, 'name_class': 'genbank'}])
+        sFile = self.write_file('taxonomy.tsv',
+                                'uid\t|\tparent_uid\t|\tname\t|\n'
+                                '93302\t|\t\t|\tcellular organisms\t|\n')
+        self.assertEqual(list(xref_iter_file(sFile, XREF_SOURCES['ott'])),
+                         [{'uid': '93302', 'parent_uid': None,
+                           'name': 'cellular organisms'}])
+        sFile = self.write_file('if.csv', 'RECORD NUMBER,NAME OF FUNGUS,'
+                                          'AUTHORS\n'
+                                          '87300,"Xanthoria parietina","(L.)'
+                                          ' Th. Fr."\n\n')
+        self.assertEqual(list(xref_iter_file(sFile)),
+                         [{'record number': '87300',
+                           'name of fungus': 'Xanthoria parietina',
+                           'authors': '(L.) Th. Fr.'}])
+        sFile = self.write_file('usage.jsonl',
+                                '{"key": 5, "canonicalName": "Fungi"}\n\n')
+        self.assertEqual(list(xref_iter_file(sFile)),
+                         [{'key': 5, 'canonicalname': 'Fungi'}])
+
+        sFile = path.join(self.oDir.name, 'dwca.zip')
+        with zipfile.ZipFile(sFile, 'w') as oZip:
+            oZip.writestr('NameUsage.tsv', 'col:ID\tcol:scientificName\n'
+                                           '4QHKG\tFungi\n')
+            oZip.writestr('Distribution.tsv', 'col:ID\tcol:area\n4QHKG\tX\n')
+        self.assertEqual(list(xref_iter_file(sFile)),
+                         [{'id': '4QHKG', 'scientificname': 'Fungi'}])
+
+    def test_xref_import(self):
+        """ Check if the keys are written to the taxa of the names. """
+        iAccepted = self.add_taxon('Xanthoria parietina', '(L.) Th.Fr.', 1)
+        iSynonym = self.add_taxon('Xanthoria parietina', 'auct.', 2,
+                                  iAccepted)
+        iLecanora = self.add_taxon('Lecanora muralis', '(Schreb.) Rabenh.',
+                                   1)
+        iOther = self.add_taxon('Lecanora rupicola', '(L.) Zahlbr.', 1)
+        iKnown = self.add_taxon('Cladonia rangiferina', '(L.) Weber', 1)
+        self.oConnector.insert_row('DBIndexes',
+                                   'taxonID, sourceID, taxonIndex',
+                                   (iKnown, 11, '1'))
+        sFile = self.write_file(
+            'if.csv',
+            'RECORD NUMBER,NAME OF FUNGUS,AUTHORS\n'
+            '1001,Xanthoria parietina,auct.\n'
+            '1002,Xanthoria parietina,(L.) Th.Fr.\n'
+            '1003,Xanthoria parietina,\n'
+            '1004,Lecanora muralis,(Schreb.) Nyl.\n'
+            '1005,Cladonia rangiferina,(L.) Weber\n'
+            '1006,Nothing,L.\n'
+            ',Lecanora rupicola,\n'
+            'http://www.indexfungorum.org/names/NamesRecord.asp?RecordID='
+            '1007,Lecanora rupicola,(L.) Zahlbr.\n')
+        lUnmatched = []
+        lProgress = []
+        oImporter = XRefImporter(self.oConnector, XREF_SOURCES['if'],
+                                 iBatch=2, fProgress=lProgress.append,
+                                 fUnmatched=lambda *t: lUnmatched.append(t))
+        dCount = oImporter.load_file(sFile)
+        self.assertEqual(dCount, {'read': 8, 'matched': 6, 'added': 4,
+                                  'updated': 0, 'known': 1,
+                                  'duplicates': 1, 'unmatched': 1,
+                                  'empty': 1, 'skipped': 0, 'failed': 0})
+        self.assertEqual(lProgress, [2, 4, 6, 7])
+        self.assertEqual(lUnmatched, [('Nothing L.', '1006')])
+        self.assertEqual(self.get_links(11),
+                         {iSynonym: '1001', iAccepted: '1002',
+                          iLecanora: '1004', iKnown: '1', iOther: '1007'})
+
+        # The keys are replaced, a taxon takes its first row.
+        sFile = self.write_file('if.csv',
+                                'RECORD NUMBER,NAME OF FUNGUS\n'
+                                '2001,Cladonia rangiferina\n'
+                                '2002,Cladonia rangiferina\n'
+                                '1004,Lecanora muralis\n')
+        oImporter = XRefImporter(self.oConnector, XREF_SOURCES['if'],
+                                 bUpdate=True)
+        dCount = oImporter.load_file(sFile)
+        self.assertEqual((dCount['added'], dCount['updated'],
+                          dCount['known'], dCount['duplicates']),
+                         (0, 1, 1, 1))
+        self.assertEqual(self.get_links(11)[iKnown], '2001')
+
+        # The rows are filtered by the source.
+        sFile = self.write_file('names.dmp',
+                                '9\t|\tLecanora muralis\t|\t\t|\tsynonym\t|\n'
+                                '8\t|\tLecanora muralis\t|\t\t|\t'
+                                'scientific name\t|\n')
+        oImporter = XRefImporter(self.oConnector, XREF_SOURCES['ncbi'])
+        dCount = oImporter.load_file(sFile)
+        self.assertEqual((dCount['added'], dCount['skipped']), (1, 1))
+        self.assertEqual(self.get_links(9), {iLecanora: '8'})
+        self.assertFalse(oImporter.load_file(sFile + '.no'))
+
+    def test_xref_many(self):
+        """ Check if a file with all names of the database and many unknown
+        names is imported by batches. """
+        lNames = self.oConnector.execute_query(
+            'SELECT taxonID, canonicalName FROM Taxa;').fetchall()
+        sFile = path.join(self.oDir.name, 'ncbi.dmp')
+        with open(sFile, 'w', encoding='utf-8') as fFile:
+            for iRow in range(20000):
+                sName = lNames[iRow][1] if iRow < len(lNames) else \
+                    'Incognita ' + str(iRow).translate(DIGITS)
+                fFile.write(f'{iRow}\t|\t{sName}\t|\t\t|\t'
+                            f'scientific name\t|\n')
+
+        dCount = XRefImporter(self.oConnector,
+                              XREF_SOURCES['ncbi']).load_file(sFile)
+        self.assertEqual(dCount['read'], 20000)
+        self.assertEqual(dCount['unmatched'], 20000 - len(lNames))
+        self.assertGreater(dCount['added'], len(lNames) // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()